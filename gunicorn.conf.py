@@ -0,0 +1,20 @@
+"""
+gunicorn の設定（ASGI: uvicorn ワーカー）
+
+AI相談・議事録生成などの async ビューは外部APIの応答待ちの間もワーカーを占有しない。
+同期ビュー・AsyncDispatchMixin の同期のdispatch処理は、Django（asgiref の sync_to_async）がスレッドで実行する。
+このファイルではスレッド数を設定しない。
+
+    gunicorn score.asgi:application -c gunicorn.conf.py
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = 'uvicorn_worker.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# Geminiの応答待ち（最大数十秒）を考慮
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
+errorlog = '-'
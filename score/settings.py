@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -46,12 +47,14 @@ AUTH_USER_MODEL = 'scoreai.User'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'scoreai.middleware.StaticFilesMiddleware',
+    'scoreai.middleware.RequestProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'scoreai.middleware.RateLimitMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -73,6 +76,7 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 # Add your custom context processor here
                 'scoreai.context_processors.selected_company',
+                'scoreai.context_processors.navigation',
                 'scoreai.context_processors.recaptcha_settings',
             ],
         },
@@ -80,6 +84,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'score.wsgi.application'
+ASGI_APPLICATION = 'score.asgi.application'
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -183,7 +188,10 @@ except ImportError:
     # AWS_SECRET_ACCESS_KEY = 'sth' or os.environ['AWS_SECRET_ACCESS_KEY']
     import dj_database_url
     # DATABASES['default'] = dj_database_url.config()
-    DATABASES['default'] = dj_database_url.config(conn_max_age=600, ssl_require=True)
+    # ASGIではリクエストごとに別スレッドの接続を使うため、永続接続は既定で無効（DB_CONN_MAX_AGEで指定可）
+    DATABASES['default'] = dj_database_url.config(
+        conn_max_age=int(os.environ.get('DB_CONN_MAX_AGE', 0)), conn_health_checks=True, ssl_require=True
+    )
     pass
 
 # セキュリティ設定の強化
@@ -291,6 +299,11 @@ LOGGING = {
             'level': 'INFO',  # Webhook処理は常にINFOレベルでログを出力
             'propagate': False,
         },
+        'scoreai.services.stripe_event_service': {
+            'handlers': ['console', 'file'],
+            'level': 'INFO',  # Webhookイベントの適用も常にINFOレベルでログを出力
+            'propagate': False,
+        },
     },
     'root': {
         'handlers': ['console'],
@@ -305,31 +318,123 @@ if not os.path.exists(log_dir):
     os.makedirs(log_dir)
 
 # キャッシング戦略の実装
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-        'TIMEOUT': 300,  # 5分
-        'OPTIONS': {
-            'MAX_ENTRIES': 1000
+# 共有キャッシュ: REDIS_URL がある場合はRedis、本番でない場合（DEBUG）はLocMemCache、
+# それ以外（Dockerイメージ単体など）はワーカー間で共有するファイルキャッシュ
+# Companyごとの計算結果は scoreai.utils.company_cache でこの前段にワーカー内のLRUを置く
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+            'KEY_PREFIX': 'scoreai',
+            'TIMEOUT': 300,  # 5分
         }
     }
-}
-
-# 本番環境ではRedisを使用（環境変数で設定可能）
-if not DEBUG and os.environ.get('REDIS_URL'):
+elif DEBUG:
     CACHES = {
         'default': {
-            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-            'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+            'TIMEOUT': 300,  # 5分
             'OPTIONS': {
-                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
-            },
+                'MAX_ENTRIES': 1000
+            }
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'scoreai-cache')),
             'KEY_PREFIX': 'scoreai',
             'TIMEOUT': 300,  # 5分
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000
+            }
         }
     }
 
+# Companyごとのキャッシュ（scoreai.utils.company_cache）
+# ワーカー内のLRUの件数と保持秒数
+COMPANY_CACHE_LOCAL_MAX_ENTRIES = int(os.environ.get('COMPANY_CACHE_LOCAL_MAX_ENTRIES', 1000))
+COMPANY_CACHE_LOCAL_TIMEOUT = 300
+# Companyのバージョンをワーカー内で保持する秒数（他のワーカーでの無効化はこの秒数だけ遅れて反映される）
+COMPANY_CACHE_VERSION_TIMEOUT = 2
+
+# AIに送るプロンプト全体（システムプロンプトを含む）のトークン数の上限（scoreai.utils.prompt_budget）
+# 超えた場合は関連度の低いデータから要約・省略する
+AI_PROMPT_TOKEN_BUDGET = int(os.environ.get('AI_PROMPT_TOKEN_BUDGET', 8000))
+
+# AI診断レポートの出力（PDF・PPTX・Excel・Word）をキャッシュする秒数（scoreai.services.diagnosis_report_service）
+DIAGNOSIS_REPORT_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+# 外部API（gemini・vision・storage・stripe）のタイムアウト・再試行・サーキットブレーカー（scoreai.utils.resilience）
+# 既定値（DEFAULT_POLICIES）をサービスごとに上書きする。例: {'gemini': {'timeout': 40, 'max_attempts': 1}}
+EXTERNAL_SERVICE_POLICIES = {}
+
+# ========================================
+# プロファイリング設定
+# ========================================
+
+# リクエストごとの処理時間・SQL・外部API呼び出しの記録（scoreai.middleware.RequestProfilingMiddleware）
+# 集計: python manage.py profiling_report
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False').lower() == 'true'
+# 記録するリクエストの割合（0〜1）
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '1.0'))
+# サンプルの保存先（ファイルごとの最大サイズとローテーション数）
+PROFILING_DIR = os.environ.get('PROFILING_DIR', os.path.join(BASE_DIR, 'logs', 'profiling'))
+PROFILING_MAX_BYTES = 10 * 1024 * 1024
+PROFILING_BACKUP_COUNT = 5
+
+# ========================================
+# レート制限設定
+# ========================================
+
+# レート制限の有効/無効
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+
+# カウンターの保存先（'auto': 共有キャッシュがあればキャッシュ、なければDB / 'cache' / 'db'）
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'auto')
+
+# URL名ごとのレート制限（scoreai.middleware.RateLimitMiddleware が適用）
+# rates: 'user'（未ログインの場合はIPアドレス）、'firm'、'ip' ごとの '回数/期間'
+RATE_LIMITS = {
+    'ai': {
+        'url_names': [
+            'ai_consultation_api',
+            'fiscal_ai_diagnosis_generate',
+            'fiscal_ai_diagnosis_chat',
+            'budget_suggest',
+            'budget_suggest_month',
+            'meeting_minutes_ai_generate',
+        ],
+        'methods': ['POST'],
+        'rates': {'user': '10/m', 'firm': '60/m'},
+    },
+    'ocr': {
+        'url_names': [
+            'import_fiscal_summary_ocr',
+            'financial_report',
+            'storage_file_process',
+        ],
+        'methods': ['POST'],
+        'rates': {'user': '10/m', 'firm': '30/m'},
+    },
+    'export': {
+        'url_names': [
+            'fiscal_ai_diagnosis_download',
+            'export_fiscal_summary_year',
+            'export_fiscal_summary_year_detail',
+            'export_debts',
+            'izakaya_plan_export',
+            'usage_report_export',
+            'download_fiscal_summary_year_csv_param',
+            'download_fiscal_summary_month_csv_param',
+        ],
+        'rates': {'user': '20/m', 'firm': '100/m'},
+    },
+}
+
 # ========================================
 # ユーザー登録制限設定
 # ========================================
@@ -402,3 +507,14 @@ BLOCKED_EMAIL_DOMAINS = [
 # 許可するドメインのリスト（空の場合は制限なし、設定するとこれ以外をブロック）
 # 例: ['example.co.jp', 'example.com']
 ALLOWED_EMAIL_DOMAINS = []
+
+# ========================================
+# バックグラウンド処理設定
+# ========================================
+
+# プロセス内でバックグラウンド処理（ストレージへのアップロード、Stripeイベントの適用）を実行するスレッド数
+# 0にするとプロセス内では実行せず、管理コマンド（process_storage_uploads、process_stripe_events）に任せる
+BACKGROUND_TASK_WORKERS = int(os.environ.get('BACKGROUND_TASK_WORKERS', '2'))
+
+# ストレージへのアップロードが完了するまでファイルを保持するディレクトリ
+STORAGE_UPLOAD_SPOOL_DIR = os.environ.get('STORAGE_UPLOAD_SPOOL_DIR', os.path.join(BASE_DIR, 'spool', 'uploads'))
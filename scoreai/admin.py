@@ -39,11 +39,15 @@ from .models import (
     AIConsultationScript,
     UserAIConsultationScript,
     AIConsultationHistory,
+    AIDiagnosisConversation,
+    AIDiagnosisReport,
     AIConsultationFAQ,
     MeetingMinutesAIScript,
     CloudStorageSetting,
     DocumentFolder,
     UploadedDocument,
+    OcrResult,
+    StripeEvent,
     Todo,
     TodoCategory,
 )
@@ -474,12 +478,28 @@ class AIConsultationHistoryAdmin(admin.ModelAdmin):
             'fields': ('input_tokens', 'output_tokens', 'total_tokens', 'tokens_display')
         }),
         ('データスナップショット', {
-            'fields': ('data_snapshot',),
+            'fields': ('data_snapshot', 'prompt_budget'),
             'classes': ('collapse',)
         }),
     )
 
 
+@admin.register(AIDiagnosisConversation)
+class AIDiagnosisConversationAdmin(admin.ModelAdmin):
+    list_display = ('user', 'fiscal_summary_year', 'message_count', 'updated_at')
+    search_fields = ('user__username', 'fiscal_summary_year__company__name')
+    ordering = ('-updated_at',)
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(AIDiagnosisReport)
+class AIDiagnosisReportAdmin(admin.ModelAdmin):
+    list_display = ('fiscal_summary_year', 'created_by', 'content_hash', 'updated_at')
+    search_fields = ('fiscal_summary_year__company__name',)
+    ordering = ('-updated_at',)
+    readonly_fields = ('document', 'content_hash', 'created_at', 'updated_at')
+
+
 @admin.register(CloudStorageSetting)
 class CloudStorageSettingAdmin(admin.ModelAdmin):
     list_display = ('user', 'company', 'storage_type', 'is_active', 'created_at', 'updated_at')
@@ -577,6 +597,30 @@ class FirmSubscriptionAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'event_type', 'customer_id', 'status', 'attempts', 'event_created', 'processed_at')
+    list_filter = ('status', 'event_type')
+    search_fields = ('id', 'customer_id')
+    ordering = ('-event_created',)
+    actions = ('retry_failed_events', 'skip_failed_events')
+    readonly_fields = ('id', 'event_type', 'customer_id', 'event_created', 'payload', 'received_at', 'processed_at')
+
+    def retry_failed_events(self, request, queryset):
+        """失敗したイベントを再試行"""
+        from .services.stripe_event_service import retry_failed_events
+        count = retry_failed_events(queryset)
+        self.message_user(request, f'{count}件のイベントを再試行します。')
+    retry_failed_events.short_description = '失敗したイベントを再試行'
+
+    def skip_failed_events(self, request, queryset):
+        """失敗したイベントをスキップして、同じ顧客の後続イベントの処理を再開"""
+        from .services.stripe_event_service import skip_failed_events
+        count = skip_failed_events(queryset)
+        self.message_user(request, f'{count}件のイベントをスキップしました。')
+    skip_failed_events.short_description = '失敗したイベントをスキップ'
+
+
 @admin.register(CompanyUsageTracking)
 class CompanyUsageTrackingAdmin(admin.ModelAdmin):
     list_display = ('company', 'firm', 'year', 'month', 'ai_consultation_count', 'ocr_count', 'api_count', 'is_reset', 'created_at')
@@ -697,12 +741,14 @@ class FirmNotificationAdmin(admin.ModelAdmin):
 
 @admin.register(UploadedDocument)
 class UploadedDocumentAdmin(admin.ModelAdmin):
-    list_display = ('company', 'document_type', 'stored_filename', 'storage_type', 'is_ocr_processed', 'is_data_saved', 'created_at')
+    list_display = ('company', 'document_type', 'stored_filename', 'storage_type', 'upload_status', 'is_ocr_processed', 'is_data_saved', 'created_at')
     list_display_links = ('stored_filename',)
-    list_filter = ('document_type', 'storage_type', 'is_ocr_processed', 'is_data_saved', 'created_at')
+    list_filter = ('document_type', 'storage_type', 'upload_status', 'is_ocr_processed', 'is_data_saved', 'created_at')
+    actions = ('retry_failed_uploads',)
     search_fields = ('company__name', 'stored_filename', 'original_filename', 'user__username')
     ordering = ('-created_at',)
     readonly_fields = ('created_at', 'updated_at', 'ocr_processed_at')
+    raw_id_fields = ('ocr_result',)
     fieldsets = (
         ('基本情報', {
             'fields': ('user', 'company', 'document_type', 'subfolder_type')
@@ -710,8 +756,11 @@ class UploadedDocumentAdmin(admin.ModelAdmin):
         ('ファイル情報', {
             'fields': ('original_filename', 'stored_filename', 'storage_type', 'file_id', 'folder_id', 'file_url', 'file_size', 'mime_type')
         }),
+        ('アップロード状態', {
+            'fields': ('upload_status', 'upload_attempts', 'next_upload_at', 'upload_error', 'spool_path')
+        }),
         ('処理状態', {
-            'fields': ('is_ocr_processed', 'ocr_processed_at', 'is_data_saved', 'saved_to_model', 'saved_record_id')
+            'fields': ('is_ocr_processed', 'ocr_processed_at', 'ocr_result', 'is_data_saved', 'saved_to_model', 'saved_record_id')
         }),
         ('メタデータ', {
             'fields': ('metadata',),
@@ -720,4 +769,22 @@ class UploadedDocumentAdmin(admin.ModelAdmin):
         ('タイムスタンプ', {
             'fields': ('created_at', 'updated_at')
         }),
-    )
\ No newline at end of file
+    )
+    
+    def retry_failed_uploads(self, request, queryset):
+        """失敗したアップロードを再試行"""
+        from .services.storage_upload_service import retry_upload
+        
+        documents = queryset.filter(upload_status='failed').exclude(spool_path='')
+        for document in documents:
+            retry_upload(document)
+        self.message_user(request, f'{len(documents)}件のアップロードを再試行します。')
+    retry_failed_uploads.short_description = '失敗したアップロードを再試行'
+
+@admin.register(OcrResult)
+class OcrResultAdmin(admin.ModelAdmin):
+    list_display = ('content_hash', 'backend_version', 'file_type', 'hit_count', 'created_at', 'last_used_at')
+    list_filter = ('backend_version', 'file_type')
+    search_fields = ('content_hash',)
+    ordering = ('-created_at',)
+    readonly_fields = ('content_hash', 'backend_version', 'file_type', 'page_hashes', 'hit_count', 'created_at', 'last_used_at')
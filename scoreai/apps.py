@@ -5,4 +5,12 @@ class ScoreaiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'scoreai' # 元々はこれ
     # name = 'score.scoreai' # これだとDeployでエラー
-    # name = 'src.score.scoreai' # これだとDeployでエラー
\ No newline at end of file
+    # name = 'src.score.scoreai' # これだとDeployでエラー
+
+    def ready(self):
+        from .services.pdf_service import register_fonts
+        from .utils.stripe_client import install_stripe_client
+
+        install_stripe_client()
+        # PDF出力の日本語フォントは起動時に1回だけ登録する（見つからない場合はここで警告）
+        register_fonts()
@@ -1,24 +1,26 @@
-from .models import UserCompany
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+from .utils.navigation import get_navigation
 
 
 # どのページからでもthis_companyを使えるようにするため
 def selected_company(request):
     if request.user.is_authenticated:
-        # 選択中の会社
-        selected_uc = UserCompany.objects.filter(user=request.user, is_selected=True).select_related('company').first()
-        # ユーザーが所属する全会社（会社切り替え用）
-        user_companies = UserCompany.objects.filter(
-            user=request.user, 
-            active=True
-        ).select_related('company').order_by('company__name')
+        navigation = get_navigation(request)
         return {
-            'this_company': selected_uc.company if selected_uc else None,
-            'header_user_companies': user_companies
+            # 選択中の会社
+            'this_company': navigation.selected_company,
+            # ユーザーが所属する全会社（会社切り替え用、参照された場合のみ取得）
+            'header_user_companies': SimpleLazyObject(lambda: navigation.user_companies),
         }
     return {'this_company': None, 'header_user_companies': []}
 
 
+# ヘッダー・サイドバーで参照するユーザーの所属情報（リクエスト内で1回だけ取得する）
+def navigation(request):
+    return {'nav': get_navigation(request)}
+
+
 # reCAPTCHA設定をテンプレートで使用できるようにする
 def recaptcha_settings(request):
     return {
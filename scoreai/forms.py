@@ -1,3 +1,5 @@
+import math
+
 from django import forms
 from django.core.exceptions import ValidationError
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm, PasswordChangeForm, PasswordResetForm, SetPasswordForm
@@ -30,6 +32,29 @@ from django.contrib.auth import get_user_model
 User = get_user_model()
 
 
+class NumberListField(forms.CharField):
+    """カンマ区切りの数値（シナリオ分析の候補値など）。重複を除いて昇順の float のリストにする"""
+
+    def __init__(self, *args, max_abs=1e12, **kwargs):
+        # 計算中に桁あふれ（inf）しないよう、絶対値の上限を設ける
+        self.max_abs = max_abs
+        super().__init__(*args, **kwargs)
+
+    def clean(self, value):
+        value = super().clean(value)
+        try:
+            values = [float(item) for item in value.replace('、', ',').split(',') if item.strip()]
+        except ValueError:
+            raise ValidationError('数値をカンマ区切りで入力してください')
+        if not all(math.isfinite(item) for item in values):
+            raise ValidationError('nan・inf や桁数の大きすぎる値は入力できません')
+        if any(abs(item) > self.max_abs for item in values):
+            raise ValidationError(f'絶対値が{self.max_abs:,.0f}以下の値を入力してください')
+        if self.required and not values:
+            raise ValidationError('1つ以上の値を入力してください')
+        return sorted(set(values))
+
+
 class CustomUserCreationForm(UserCreationForm):
     email = forms.EmailField(required=True, label='メールアドレス')
     # reCAPTCHAフィールド（フロントエンドで検証、バックエンドで確認）
@@ -3,8 +3,15 @@
 """
 from datetime import time
 from django import forms
+from scoreai.forms import NumberListField
 from scoreai.models import IzakayaPlan
 from scoreai.services.izakaya_plan_service import IzakayaPlanService
+from scoreai.services.izakaya_scenario_service import (
+    DRIVER_LABELS as SCENARIO_DRIVER_LABELS,
+    DRIVER_NAMES as SCENARIO_DRIVER_NAMES,
+    MAX_SCENARIOS,
+    IzakayaScenarioDrivers,
+)
 
 
 class IzakayaPlanForm(forms.ModelForm):
@@ -304,3 +311,64 @@ class IzakayaPlanForm(forms.ModelForm):
             instance.save()
         
         return instance
+
+
+class IzakayaScenarioForm(forms.Form):
+    """居酒屋出店計画のシナリオ分析フォーム（ドライバーはカンマ区切りで複数の候補値を入力）"""
+    price_change = NumberListField(
+        label=SCENARIO_DRIVER_LABELS['price_change'],
+        initial='-10, 0, 10',
+        help_text='昼・夜の客単価の変化率の候補（例: -10, -5, 0, 5, 10）'
+    )
+    customer_change = NumberListField(
+        label=SCENARIO_DRIVER_LABELS['customer_change'],
+        initial='-30, -20, -10, 0, 10, 20',
+        help_text='昼・夜の1日あたりの客数の変化率の候補'
+    )
+    operating_days_change = NumberListField(
+        label=SCENARIO_DRIVER_LABELS['operating_days_change'],
+        initial='0',
+        help_text='営業している時間帯の営業曜日数の増減の候補（例: -1, 0, 1）'
+    )
+    monthly_rent = NumberListField(
+        label=SCENARIO_DRIVER_LABELS['monthly_rent'],
+        required=False,
+        help_text='家賃の候補（空欄の場合は計画の家賃）'
+    )
+    cost_rate_change = NumberListField(
+        label=SCENARIO_DRIVER_LABELS['cost_rate_change'],
+        initial='-2, 0, 2',
+        help_text='昼・夜の原価率の変化の候補（例: -2, 0, 2）'
+    )
+
+    def clean_price_change(self):
+        values = self.cleaned_data['price_change']
+        if values[0] <= -100:
+            raise forms.ValidationError('客単価の変化率は-100%より大きい値を入力してください')
+        return values
+
+    def clean_customer_change(self):
+        values = self.cleaned_data['customer_change']
+        if values[0] <= -100:
+            raise forms.ValidationError('客数の変化率は-100%より大きい値を入力してください')
+        return values
+
+    def clean_monthly_rent(self):
+        values = self.cleaned_data['monthly_rent']
+        if values and values[0] < 0:
+            raise forms.ValidationError('家賃は0以上の値を入力してください')
+        return values
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if all(name in cleaned_data for name in SCENARIO_DRIVER_NAMES):
+            drivers = self.drivers
+            if drivers.scenario_count > MAX_SCENARIOS:
+                raise forms.ValidationError(
+                    f'シナリオ数が多すぎます（{drivers.scenario_count}通り）。{MAX_SCENARIOS}通り以下になるよう候補を減らしてください。'
+                )
+        return cleaned_data
+
+    @property
+    def drivers(self) -> IzakayaScenarioDrivers:
+        return IzakayaScenarioDrivers(**{name: self.cleaned_data[name] for name in SCENARIO_DRIVER_NAMES})
@@ -0,0 +1,99 @@
+"""
+負荷検証用のテナントデータを生成するコマンド
+
+同じシードなら同じ内容のデータを生成します。規模はプリセット（small / medium / large）を基準に、
+個別のオプションで上書きできます。
+
+使用方法:
+    python manage.py generate_load_data
+    python manage.py generate_load_data --preset large --seed 7
+    python manage.py generate_load_data --firms 3 --companies-per-firm 100 --debts-per-company 80
+    python manage.py generate_load_data --seed 7 --clear        # シード7で生成したデータを削除
+"""
+import time
+from dataclasses import replace
+
+from django.core.management.base import BaseCommand
+
+from scoreai.services.load_data_service import SCALE_PRESETS, LoadDataGenerator, user_email_prefix
+
+SCALE_OPTIONS = [
+    ('firms', 'Firm数'),
+    ('companies_per_firm', 'Firm1件あたりのCompany数'),
+    ('years', 'Company1件あたりの決算年数（月次は13か月 × 年数）'),
+    ('debts_per_company', 'Company1件あたりの借入件数'),
+    ('ai_history_per_company', 'Company1件あたりのAI相談履歴件数'),
+    ('documents_per_company', 'Company1件あたりのアップロード済みドキュメント件数'),
+]
+
+
+class Command(BaseCommand):
+    help = '負荷検証用のテナントデータを生成します（シードを指定すると同じデータを再現できます）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='乱数のシード（デフォルト: 42）',
+        )
+        parser.add_argument(
+            '--preset',
+            choices=sorted(SCALE_PRESETS),
+            default='medium',
+            help='規模のプリセット（デフォルト: medium）',
+        )
+        for name, label in SCALE_OPTIONS:
+            parser.add_argument(
+                f"--{name.replace('_', '-')}",
+                dest=name,
+                type=int,
+                default=None,
+                help=f'{label}（プリセットの値を上書き）',
+            )
+        parser.add_argument(
+            '--last-year',
+            type=int,
+            default=None,
+            help='最新の決算年度（デフォルト: 前年）',
+        )
+        parser.add_argument(
+            '--password',
+            default='loadtest123',
+            help='生成するユーザーのパスワード（デフォルト: loadtest123）',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='このシードで生成したデータを削除する（生成はしない）',
+        )
+
+    def handle(self, *args, **options):
+        overrides = {name: options[name] for name, _ in SCALE_OPTIONS if options[name] is not None}
+        scale = replace(SCALE_PRESETS[options['preset']], **overrides)
+        generator = LoadDataGenerator(
+            seed=options['seed'],
+            scale=scale,
+            last_year=options['last_year'],
+            password=options['password'],
+        )
+
+        if options['clear']:
+            deleted = generator.clear()
+            total = sum(deleted.values())
+            self.stdout.write(self.style.SUCCESS(f"シード{options['seed']}のデータを{total}件削除しました"))
+            for label, count in sorted(deleted.items()):
+                self.stdout.write(f'  {label}: {count}')
+            return
+
+        self.stdout.write(f'生成条件: {generator.describe()}')
+        started = time.monotonic()
+        counts = generator.generate()
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(f'✓ 負荷検証データを生成しました（{elapsed:.1f}秒）'))
+        for label, count in sorted(counts.items()):
+            self.stdout.write(f'  {label}: {count}')
+        self.stdout.write(
+            f"ログイン: {user_email_prefix(options['seed'])}f0@example.com / {options['password']}"
+        )
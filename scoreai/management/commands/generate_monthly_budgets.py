@@ -0,0 +1,90 @@
+"""
+Firmの顧問先の月次予算を一括作成するコマンド
+
+指定した年度の年次予算がある顧問先（契約中のFirmCompany）すべてについて、
+年次予算から12か月分の月次予算を作成する。顧問先の数に関係なく、
+既存データの確認・過去の月次実績の取得・保存はそれぞれ1回のクエリで行う。
+
+使い方:
+    python manage.py generate_monthly_budgets --firm <firm_id> --year 2025 --method previous_ratio
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from scoreai.models import Firm, FiscalSummary_Year
+from scoreai.services.monthly_budget_service import (
+    DEFAULT_REFERENCE_YEARS,
+    METHOD_EQUAL,
+    METHOD_PREVIOUS_RATIO,
+    build_monthly_budgets,
+    generate_monthly_budgets,
+)
+
+
+class Command(BaseCommand):
+    help = 'Firmの顧問先の年次予算から月次予算を一括作成します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--firm', required=True, help='FirmのID')
+        parser.add_argument('--year', type=int, required=True, help='対象の年度')
+        parser.add_argument(
+            '--method',
+            choices=[METHOD_EQUAL, METHOD_PREVIOUS_RATIO],
+            default=METHOD_PREVIOUS_RATIO,
+            help='equal: 12分割 / previous_ratio: 過去の月次実績の割合で配分（デフォルト）',
+        )
+        parser.add_argument(
+            '--reference-years',
+            type=int,
+            default=DEFAULT_REFERENCE_YEARS,
+            help=f'previous_ratio で参考にする過去の年数（デフォルト: {DEFAULT_REFERENCE_YEARS}）',
+        )
+        parser.add_argument(
+            '--override',
+            action='store_true',
+            help='既に月次予算がある顧問先も上書きする',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='保存せず、作成対象を表示するだけ',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            firm = Firm.objects.get(id=options['firm'])
+        except Firm.DoesNotExist:
+            raise CommandError(f"Firmが見つかりません: {options['firm']}")
+        if options['reference_years'] < 1:
+            raise CommandError('--reference-years は1以上を指定してください')
+
+        budget_years = list(
+            FiscalSummary_Year.objects.filter(
+                company__firm_companies__firm=firm,
+                company__firm_companies__active=True,
+                year=options['year'],
+                is_budget=True,
+            ).select_related('company').distinct().order_by('company__name')
+        )
+        self.stdout.write(f"{firm.name}: {options['year']}年の年次予算がある顧問先 {len(budget_years)}社")
+
+        if options['dry_run']:
+            monthly_budgets = build_monthly_budgets(budget_years, options['method'], options['reference_years'])
+            for budget_year in budget_years:
+                status = '作成' if str(budget_year.pk) in monthly_budgets else '月次実績なし'
+                self.stdout.write(f'  {budget_year.company.name}: {status}')
+            self.stdout.write(self.style.WARNING('DRY RUNモード: 保存していません'))
+            return
+
+        result = generate_monthly_budgets(
+            budget_years,
+            method=options['method'],
+            reference_years=options['reference_years'],
+            override=options['override'],
+        )
+        for budget_year in result.skipped:
+            self.stdout.write(f'  {budget_year.company.name}: 既存の月次予算があるためスキップ（--override で上書き）')
+        for budget_year in result.missing_actuals:
+            self.stdout.write(self.style.WARNING(f'  {budget_year.company.name}: 過去の月次実績がないためスキップ'))
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(result.generated)}社の月次予算を作成しました（{result.month_count}ヶ月分）'
+        ))
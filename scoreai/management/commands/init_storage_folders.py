@@ -6,6 +6,7 @@ from django.contrib.auth import get_user_model
 from scoreai.models import CloudStorageSetting, DocumentFolder
 from scoreai.utils.storage.google_drive import GoogleDriveAdapter
 from scoreai.utils.storage.box import BoxAdapter
+from scoreai.utils.storage.folder_cache import FolderIdCache
 import logging
 
 User = get_user_model()
@@ -118,8 +119,9 @@ class Command(BaseCommand):
                         )
                         continue
                 
-                # ルートフォルダIDを取得
-                root_folder_id = storage_setting.root_folder_id
+                # フォルダIDキャッシュを実際のフォルダ構造から作り直す（アップロード時のAPI呼び出しを省略するため）
+                folder_cache = FolderIdCache(storage_setting, adapter)
+                folder_cache.clear()
                 
                 # フォルダを作成
                 created_count = 0
@@ -129,10 +131,10 @@ class Command(BaseCommand):
                         folder_path = self._get_folder_path(folder)
                         
                         # フォルダを取得または作成
-                        folder_info = adapter.get_or_create_folder(folder_path, root_folder_id)
+                        folder_id = folder_cache.resolve(folder_path)
                         
                         self.stdout.write(
-                            f'  ✓ {folder_path} を作成しました (ID: {folder_info["id"]})'
+                            f'  ✓ {folder_path} を作成しました (ID: {folder_id})'
                         )
                         created_count += 1
                         
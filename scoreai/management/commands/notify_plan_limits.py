@@ -0,0 +1,22 @@
+"""
+プラン制限通知コマンド
+
+契約中のすべてのFirmのCompany数・AI相談回数・OCR回数を集計し、
+しきい値（80%、100%）を新たに超えたFirmに通知を作成します。
+同じしきい値の通知は1回だけ作成するため、定期的（例: 1時間ごと）に実行してください。
+"""
+import logging
+
+from django.core.management.base import BaseCommand
+
+from scoreai.utils.notifications import notify_plan_limits
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'プラン制限のしきい値を超えたFirmに通知を作成します'
+
+    def handle(self, *args, **options):
+        created_count = notify_plan_limits()
+        self.stdout.write(self.style.SUCCESS(f'プラン制限通知: {created_count}件作成しました'))
@@ -0,0 +1,51 @@
+"""
+クラウドストレージへのアップロード待ちを処理するコマンド
+
+通常はリクエスト後にバックグラウンドでアップロードされる。
+再試行待ちのアップロードや、プロセスの停止で処理されなかったアップロードを処理するために
+定期的（例: 10分ごと）に実行するか、--loop を指定してワーカーとして常駐させる。
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from scoreai.services.storage_upload_service import process_pending_uploads
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'クラウドストレージへのアップロード待ちのファイルをアップロードします'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=100,
+            help='1回に処理する最大件数（デフォルト: 100）',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='終了せずに一定間隔で処理を繰り返す',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=30,
+            help='--loop 指定時の処理間隔（秒、デフォルト: 30）',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            result = process_pending_uploads(limit=options['limit'])
+            if result['uploaded'] or result['retrying'] or not options['loop']:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"アップロード: {result['uploaded']}件, 再試行待ち・失敗: {result['retrying']}件"
+                    )
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
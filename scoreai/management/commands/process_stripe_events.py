@@ -0,0 +1,51 @@
+"""
+Stripe Webhookイベントの受信箱を処理するコマンド
+
+通常はWebhookの受信後にバックグラウンドで適用される。
+再試行待ちのイベントや、プロセスの停止で処理されなかったイベントを適用するために
+定期的（例: 10分ごと）に実行するか、--loop を指定してワーカーとして常駐させる。
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from scoreai.services.stripe_event_service import process_pending_stripe_events
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Stripe Webhookイベントの受信箱から未処理のイベントを顧客ごとに適用します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=500,
+            help='1回に処理する最大顧客数（デフォルト: 500）',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='終了せずに一定間隔で処理を繰り返す',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=30,
+            help='--loop 指定時の処理間隔（秒、デフォルト: 30）',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            result = process_pending_stripe_events(limit=options['limit'])
+            if result['processed'] or not options['loop']:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"対象顧客: {result['customers']}件, 適用したイベント: {result['processed']}件"
+                    )
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
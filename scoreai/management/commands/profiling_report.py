@@ -0,0 +1,142 @@
+"""
+プロファイリング結果の集計コマンド
+
+RequestProfilingMiddleware（settings.PROFILING_ENABLED = True）が記録したサンプルを
+URL名ごとに集計し、処理時間などの上位を表示します。
+
+    python manage.py profiling_report
+    python manage.py profiling_report --sort sql_count --limit 10 --hours 24
+    python manage.py profiling_report --json
+"""
+import json
+import time
+from collections import Counter, defaultdict
+from statistics import median
+
+from django.core.management.base import BaseCommand
+
+from scoreai.utils.profiling import get_profiling_dir, read_samples
+
+SORT_KEYS = {
+    'total_ms': '合計処理時間',
+    'p95_ms': '処理時間（95パーセンタイル）',
+    'sql_count': '平均SQL件数',
+    'sql_ms': '平均SQL時間',
+    'external_ms': '平均外部API時間',
+    'duplicates': '最大重複SQL件数',
+}
+
+
+def _percentile(values, percentile):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percentile / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(samples):
+    """サンプルをURL名ごとに集計"""
+    grouped = defaultdict(list)
+    for sample in samples:
+        grouped[sample.get('url_name') or '-'].append(sample)
+
+    rows = []
+    for url_name, items in grouped.items():
+        wall = [item['wall_ms'] for item in items]
+        external = defaultdict(float)
+        duplicates = Counter()
+        for item in items:
+            for service, elapsed in (item.get('external_ms') or {}).items():
+                external[service] += elapsed
+            for duplicate in item.get('duplicates') or []:
+                duplicates[duplicate['fingerprint']] = max(duplicates[duplicate['fingerprint']], duplicate['count'])
+        count = len(items)
+        rows.append({
+            'url_name': url_name,
+            'requests': count,
+            'total_ms': round(sum(wall), 1),
+            'p50_ms': round(median(wall), 1),
+            'p95_ms': round(_percentile(wall, 95), 1),
+            'sql_count': round(sum(item['sql_count'] for item in items) / count, 1),
+            'sql_ms': round(sum(item['sql_ms'] for item in items) / count, 1),
+            'external_ms': round(sum(external.values()) / count, 1),
+            'external_by_service': {service: round(elapsed / count, 1) for service, elapsed in external.items()},
+            'duplicates': max(duplicates.values(), default=0),
+            'top_duplicates': [
+                {'fingerprint': fingerprint, 'count': dup_count}
+                for fingerprint, dup_count in duplicates.most_common(3)
+            ],
+        })
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'プロファイリング結果をURL名ごとに集計して上位を表示します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sort',
+            choices=sorted(SORT_KEYS),
+            default='total_ms',
+            help='並び順（デフォルト: total_ms）',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='表示するURL名の数（デフォルト: 20）',
+        )
+        parser.add_argument(
+            '--hours',
+            type=float,
+            default=None,
+            help='直近の指定時間のサンプルのみを集計する',
+        )
+        parser.add_argument(
+            '--dir',
+            default=None,
+            help='サンプルの保存先（デフォルト: settings.PROFILING_DIR）',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='JSONで出力する',
+        )
+
+    def handle(self, *args, **options):
+        samples = read_samples(options['dir'])
+        if options['hours'] is not None:
+            since = time.time() - options['hours'] * 3600
+            samples = [sample for sample in samples if sample.get('ts', 0) >= since]
+
+        rows = summarize(samples)
+        rows.sort(key=lambda row: row[options['sort']], reverse=True)
+        rows = rows[:options['limit']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(rows, ensure_ascii=False, indent=2))
+            return
+
+        if not rows:
+            self.stdout.write(self.style.WARNING(
+                f"サンプルがありません（保存先: {options['dir'] or get_profiling_dir()}）"
+            ))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(samples)}件のサンプル / 並び順: {SORT_KEYS[options['sort']]}"
+        ))
+        self.stdout.write(
+            f"{'URL名':<40} {'件数':>6} {'合計ms':>10} {'p50ms':>8} {'p95ms':>8} "
+            f"{'SQL件数':>8} {'SQLms':>8} {'外部ms':>8} {'重複':>5}"
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{row['url_name'][:40]:<40} {row['requests']:>6} {row['total_ms']:>10.1f} "
+                f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['sql_count']:>8.1f} "
+                f"{row['sql_ms']:>8.1f} {row['external_ms']:>8.1f} {row['duplicates']:>5}"
+            )
+            if row['external_by_service']:
+                services = ', '.join(f'{service} {elapsed}ms' for service, elapsed in row['external_by_service'].items())
+                self.stdout.write(f"    外部API（平均）: {services}")
+            for duplicate in row['top_duplicates']:
+                self.stdout.write(f"    重複SQL x{duplicate['count']}: {duplicate['fingerprint'][:120]}")
@@ -1,16 +1,25 @@
 """
 月次利用状況リセットコマンド
 
-毎月1日に実行して、前月の利用状況をリセットし、当月の利用状況レコードを作成します。
+毎月1日に実行して、当月の利用状況レコードを作成します。
+
+利用状況は年月ごとのレコードで管理しているため、月替わりのリセットは当月のレコードを作成するだけでよい。
+Firm数に比例してクエリが増えないように、当月のレコードがないFirm・Companyを1回のクエリで求め、
+bulk_create(ignore_conflicts=True) でまとめて作成する。
+(firm, year, month) などの一意制約で重複を防ぐため、同時に実行したり2回実行したりしても安全です。
 """
 from django.core.management.base import BaseCommand
-from django.utils import timezone
 from django.db import transaction
-from scoreai.models import Firm, FirmSubscription, FirmUsageTracking
+from django.db.models import Count, Exists, OuterRef, Sum
+from django.utils import timezone
+from scoreai.models import CompanyUsageTracking, FirmCompany, FirmSubscription, FirmUsageTracking
 import logging
 
 logger = logging.getLogger(__name__)
 
+# bulk_createの1回あたりの件数
+BATCH_SIZE = 1000
+
 
 class Command(BaseCommand):
     help = '月次利用状況をリセットします（毎月1日に実行）'
@@ -24,17 +33,17 @@ class Command(BaseCommand):
         parser.add_argument(
             '--force',
             action='store_true',
-            help='既にリセット済みでも強制的にリセットする',
+            help='既に作成済みの当月の利用状況も0にリセットする',
         )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
         force = options['force']
-        
+
         now = timezone.now()
         current_year = now.year
         current_month = now.month
-        
+
         # 前月を計算
         if current_month == 1:
             previous_year = current_year - 1
@@ -42,7 +51,7 @@ class Command(BaseCommand):
         else:
             previous_year = current_year
             previous_month = current_month - 1
-        
+
         self.stdout.write(
             self.style.SUCCESS(
                 f'月次リセット処理を開始します...\n'
@@ -50,102 +59,128 @@ class Command(BaseCommand):
                 f'前月: {previous_year}年{previous_month}月'
             )
         )
-        
+
         if dry_run:
             self.stdout.write(self.style.WARNING('DRY RUNモード: 実際にはリセットしません'))
-        
-        # すべてのFirmを取得
-        firms = Firm.objects.filter(
-            subscription__isnull=False
-        ).select_related('subscription')
-        
-        total_firms = firms.count()
-        reset_count = 0
-        created_count = 0
-        error_count = 0
-        
-        for firm in firms:
-            try:
-                subscription = firm.subscription
-                
-                # 前月の利用状況を取得
-                previous_usage = FirmUsageTracking.objects.filter(
-                    firm=firm,
-                    subscription=subscription,
-                    year=previous_year,
-                    month=previous_month,
-                ).first()
-                
-                # 当月の利用状況を取得または作成
-                current_usage, created = FirmUsageTracking.objects.get_or_create(
-                    firm=firm,
-                    subscription=subscription,
-                    year=current_year,
-                    month=current_month,
-                    defaults={
-                        'ai_consultation_count': 0,
-                        'ocr_count': 0,
-                        'is_reset': True,
-                    }
+
+        # 当月のFirm利用状況がないサブスクリプション
+        missing_subscriptions = list(
+            FirmSubscription.objects.annotate(
+                has_current=Exists(
+                    FirmUsageTracking.objects.filter(
+                        firm_id=OuterRef('firm_id'),
+                        year=current_year,
+                        month=current_month,
+                    )
                 )
-                
-                if created:
-                    created_count += 1
-                    self.stdout.write(
-                        f'  {firm.name}: 当月の利用状況レコードを作成しました'
+            ).filter(has_current=False).values_list('id', 'firm_id')
+        )
+
+        # 当月のCompany利用状況がない、契約中のFirmの顧問先
+        missing_companies = list(
+            FirmCompany.objects.filter(
+                active=True,
+                firm__subscription__isnull=False,
+            ).annotate(
+                has_current=Exists(
+                    CompanyUsageTracking.objects.filter(
+                        company_id=OuterRef('company_id'),
+                        firm_id=OuterRef('firm_id'),
+                        year=current_year,
+                        month=current_month,
                     )
-                elif not current_usage.is_reset or force:
-                    # リセット済みでない場合、または強制リセットの場合
-                    if not dry_run:
-                        with transaction.atomic():
-                            current_usage.ai_consultation_count = 0
-                            current_usage.ocr_count = 0
-                            current_usage.is_reset = True
-                            current_usage.save()
-                        reset_count += 1
-                        self.stdout.write(
-                            f'  {firm.name}: 利用状況をリセットしました'
+                )
+            ).filter(has_current=False).values_list('company_id', 'firm_id').distinct()
+        )
+
+        reset_count = 0
+        if not dry_run:
+            with transaction.atomic():
+                FirmUsageTracking.objects.bulk_create(
+                    [
+                        FirmUsageTracking(
+                            firm_id=firm_id,
+                            subscription_id=subscription_id,
+                            year=current_year,
+                            month=current_month,
+                            is_reset=True,
                         )
-                    else:
-                        self.stdout.write(
-                            f'  {firm.name}: 利用状況をリセットします（DRY RUN）'
+                        for subscription_id, firm_id in missing_subscriptions
+                    ],
+                    batch_size=BATCH_SIZE,
+                    ignore_conflicts=True,
+                )
+                CompanyUsageTracking.objects.bulk_create(
+                    [
+                        CompanyUsageTracking(
+                            company_id=company_id,
+                            firm_id=firm_id,
+                            year=current_year,
+                            month=current_month,
+                            is_reset=True,
                         )
-                else:
-                    self.stdout.write(
-                        f'  {firm.name}: 既にリセット済みです'
+                        for company_id, firm_id in missing_companies
+                    ],
+                    batch_size=BATCH_SIZE,
+                    ignore_conflicts=True,
+                )
+
+                if force:
+                    # 作成済みのレコードも含めて当月の利用状況を0にする
+                    reset_count = FirmUsageTracking.objects.filter(
+                        year=current_year,
+                        month=current_month,
+                    ).update(
+                        ai_consultation_count=0,
+                        ai_consultation_tokens=0,
+                        ocr_count=0,
+                        api_count=0,
+                        is_reset=True,
+                        updated_at=now,
                     )
-                
-                # 前月の利用状況をログに記録
-                if previous_usage:
-                    self.stdout.write(
-                        f'    前月の利用状況: '
-                        f'AI相談 {previous_usage.ai_consultation_count}回, '
-                        f'OCR {previous_usage.ocr_count}回'
+                    CompanyUsageTracking.objects.filter(
+                        year=current_year,
+                        month=current_month,
+                    ).update(
+                        ai_consultation_count=0,
+                        ocr_count=0,
+                        api_count=0,
+                        is_reset=True,
+                        updated_at=now,
                     )
-                
-            except Exception as e:
-                error_count += 1
-                logger.error(
-                    f"Error resetting usage for firm {firm.id}: {e}",
-                    exc_info=True
-                )
-                self.stdout.write(
-                    self.style.ERROR(f'  {firm.name}: エラーが発生しました - {str(e)}')
-                )
-        
+
+        # 前月の利用状況の集計
+        previous_usage = FirmUsageTracking.objects.filter(
+            year=previous_year,
+            month=previous_month,
+        ).aggregate(
+            firms=Count('id'),
+            ai_consultation_count=Sum('ai_consultation_count'),
+            ocr_count=Sum('ocr_count'),
+            api_count=Sum('api_count'),
+        )
+
+        logger.info(
+            f"Monthly usage rollover {current_year}-{current_month:02d}: "
+            f"firms={len(missing_subscriptions)}, companies={len(missing_companies)}, "
+            f"reset={reset_count}, dry_run={dry_run}"
+        )
+
         # 結果を表示
+        created_label = '新規作成（予定）' if dry_run else '新規作成'
         self.stdout.write(
             self.style.SUCCESS(
                 f'\n処理完了:\n'
-                f'  対象Firm数: {total_firms}\n'
-                f'  新規作成: {created_count}\n'
-                f'  リセット: {reset_count}\n'
-                f'  エラー: {error_count}'
+                f'  {created_label}: Firm {len(missing_subscriptions)}件, Company {len(missing_companies)}件\n'
+                f'  強制リセット: {reset_count}\n'
+                f'  前月の利用状況（{previous_usage["firms"]}Firm）: '
+                f'AI相談 {previous_usage["ai_consultation_count"] or 0}回, '
+                f'OCR {previous_usage["ocr_count"] or 0}回, '
+                f'API {previous_usage["api_count"] or 0}回'
             )
         )
-        
+
         if dry_run:
             self.stdout.write(
                 self.style.WARNING('\nDRY RUNモードでした。実際にリセットするには --dry-run を外してください。')
             )
-
@@ -0,0 +1,133 @@
+"""
+主要な処理のベンチマークを実行するコマンド
+
+generate_load_data で生成したCompany（または --company で指定したCompany）を対象に、
+借入スケジュール計算・財務スコア・ダッシュボード・CSVインポート・Excelエクスポート・資料生成の
+実行時間とSQL件数を計測し、結果をJSONで保存します。
+
+使用方法:
+    python manage.py generate_load_data --seed 42
+    python manage.py run_benchmarks
+    python manage.py run_benchmarks --only debt_schedule dashboard_context --repeat 10
+    python manage.py run_benchmarks --compare logs/benchmarks/benchmark-20250101-120000.json
+"""
+import json
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from scoreai.models import Company
+from scoreai.services.load_data_service import company_code_prefix
+from scoreai.utils.benchmark import BENCHMARKS, compare_results, get_benchmark_context, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = '主要な処理のベンチマークを実行し、結果をJSONで保存します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company',
+            help='対象のCompanyのコード（デフォルト: --seed で生成した最初のCompany）',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='generate_load_data のシード（デフォルト: 42）',
+        )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            choices=sorted(BENCHMARKS),
+            help='実行するベンチマーク（デフォルト: すべて）',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='計測する回数（ウォームアップを除く、デフォルト: 5）',
+        )
+        parser.add_argument(
+            '--output',
+            help='結果の保存先（デフォルト: logs/benchmarks/benchmark-<日時>.json）',
+        )
+        parser.add_argument(
+            '--compare',
+            help='比較する過去の結果（JSON）',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='結果をJSONで標準出力に出力する',
+        )
+
+    def _get_company(self, options) -> Company:
+        if options['company']:
+            company = Company.objects.filter(code=options['company']).first()
+            if not company:
+                raise CommandError(f"Companyが見つかりません: {options['company']}")
+            return company
+        company = Company.objects.filter(
+            code__startswith=company_code_prefix(options['seed'])
+        ).order_by('code').first()
+        if not company:
+            raise CommandError(
+                f"シード{options['seed']}の負荷検証データがありません。先に generate_load_data を実行してください。"
+            )
+        return company
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat は1以上を指定してください。')
+        company = self._get_company(options)
+        try:
+            ctx = get_benchmark_context(company)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        report = run_benchmarks(ctx, names=options['only'], repeat=options['repeat'])
+
+        output = Path(options['output']) if options['output'] else (
+            Path(settings.BASE_DIR) / 'logs' / 'benchmarks' / f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json"
+        )
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+
+        comparison = None
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text(encoding='utf-8'))
+            except (OSError, ValueError) as e:
+                raise CommandError(f'比較する結果を読み込めません: {e}')
+            comparison = compare_results(report, baseline)
+
+        if options['json']:
+            self.stdout.write(json.dumps({**report, 'comparison': comparison}, ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"対象: {company.name}（{company.code}） / {options['repeat']}回計測 / 保存先: {output}"
+        ))
+        self.stdout.write(
+            f"{'ベンチマーク':<20} {'中央値ms':>10} {'最小ms':>10} {'p95ms':>10} {'SQL件数':>8}"
+        )
+        for result in report['results']:
+            if 'error' in result:
+                self.stdout.write(self.style.ERROR(f"{result['name']:<20} エラー: {result['error']}"))
+                continue
+            self.stdout.write(
+                f"{result['name']:<20} {result['median_ms']:>10.2f} {result['min_ms']:>10.2f} "
+                f"{result['p95_ms']:>10.2f} {result['queries']:>8}"
+            )
+
+        if comparison:
+            self.stdout.write('\n過去の結果との比較（中央値）:')
+            for row in comparison:
+                change = f"{row['change_pct']:+.1f}%" if row['change_pct'] is not None else '-'
+                style = self.style.ERROR if (row['change_pct'] or 0) > 10 else self.style.SUCCESS
+                self.stdout.write(style(
+                    f"{row['name']:<20} {row['baseline_median_ms']:>10.2f} → {row['median_ms']:>10.2f} ms "
+                    f"({change})  SQL {row['baseline_queries']} → {row['queries']}"
+                ))
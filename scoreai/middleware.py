@@ -0,0 +1,169 @@
+"""
+Middleware classes
+"""
+import logging
+import random
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .utils.profiling import end_profile, get_current_profile, start_profile, write_sample
+from .utils.rate_limit import check_rate_limits, rate_limited_response
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCapableMiddleware:
+    """
+    同期・非同期の両方のリクエスト処理に対応するミドルウェアの基底クラス
+
+    ASGIで同期専用のミドルウェアを挟むと、以降の処理がスレッド経由になり
+    asyncビューでもスレッドを占有してしまうため、非同期の場合は __acall__ を使う。
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+
+class StaticFilesMiddleware(AsyncCapableMiddleware, WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware の非同期対応版
+
+    静的ファイルの検索はメモリ上の辞書を引くだけなので、非同期の場合もそのまま実行する。
+    """
+
+    def __init__(self, get_response):
+        WhiteNoiseMiddleware.__init__(self, get_response)
+        AsyncCapableMiddleware.__init__(self, get_response)
+
+    def _find_static_file(self, request):
+        if self.autorefresh:
+            return self.find_file(request.path_info)
+        return self.files.get(request.path_info)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return WhiteNoiseMiddleware.__call__(self, request)
+
+    async def __acall__(self, request):
+        static_file = self._find_static_file(request)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class RateLimitMiddleware(AsyncCapableMiddleware):
+    """
+    settings.RATE_LIMITS に登録したURL名のビューにレート制限を適用
+
+    RATE_LIMITS = {
+        '<制限の名前>': {
+            'url_names': [...],               # 対象のURL名
+            'methods': ['POST'],              # 対象のHTTPメソッド（省略時はすべて）
+            'rates': {'user': '10/m', 'firm': '60/m'},
+        },
+    }
+    AuthenticationMiddleware より後に追加すること。
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        if not url_name:
+            return None
+
+        for name, config in getattr(settings, 'RATE_LIMITS', {}).items():
+            if url_name not in config['url_names']:
+                continue
+            methods = config.get('methods')
+            if methods and request.method not in methods:
+                continue
+            retry_after = check_rate_limits(request, name, config['rates'])
+            if retry_after is not None:
+                return rate_limited_response(request, retry_after)
+        return None
+
+
+class RequestProfilingMiddleware(AsyncCapableMiddleware):
+    """
+    リクエストごとの処理時間・SQL・外部API呼び出しを記録（settings.PROFILING_ENABLED = True の場合のみ）
+
+    settings.PROFILING_SAMPLE_RATE（0〜1）の割合のリクエストだけを記録する。
+    記録したサンプルは管理コマンド profiling_report で集計する。
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 1.0)
+
+    def _is_sampled(self) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    @staticmethod
+    def _record_queries(stack: ExitStack, profile) -> None:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(profile.record_query))
+
+    @staticmethod
+    def _write_sample(request, profile, response) -> None:
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        write_sample(profile.to_sample(
+            url_name=url_name or request.path,
+            method=request.method,
+            status_code=response.status_code,
+        ))
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self._is_sampled():
+            return self.get_response(request)
+
+        token = start_profile()
+        profile = get_current_profile()
+        try:
+            with ExitStack() as stack:
+                self._record_queries(stack, profile)
+                response = self.get_response(request)
+        finally:
+            end_profile(token)
+
+        self._write_sample(request, profile, response)
+        return response
+
+    async def __acall__(self, request):
+        if not self._is_sampled():
+            return await self.get_response(request)
+
+        token = start_profile()
+        profile = get_current_profile()
+        # DB接続はスレッドごとのため、ORMを実行するスレッド（sync_to_async）で計測を開始・終了する
+        stack = ExitStack()
+        try:
+            await sync_to_async(self._record_queries)(stack, profile)
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            end_profile(token)
+
+        await sync_to_async(self._write_sample, thread_sensitive=False)(request, profile, response)
+        return response
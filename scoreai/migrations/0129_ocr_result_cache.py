@@ -0,0 +1,56 @@
+# Generated by Django 5.1.2 on 2026-10-18 22:50
+
+import django.core.serializers.json
+import django.db.models.deletion
+import ulid.api.api
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoreai', '0128_populate_todo_firm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OcrPageResult',
+            fields=[
+                ('id', models.CharField(default=ulid.api.api.Api.new, editable=False, max_length=26, primary_key=True, serialize=False)),
+                ('image_hash', models.CharField(help_text='ラスタライズ後のページ画像のSHA-256', max_length=64, verbose_name='画像ハッシュ')),
+                ('backend_version', models.CharField(max_length=100, verbose_name='OCRバックエンドバージョン')),
+                ('text', models.TextField(blank=True, verbose_name='抽出テキスト')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'OCRページ結果キャッシュ',
+                'verbose_name_plural': 'OCRページ結果キャッシュ',
+                'unique_together': {('image_hash', 'backend_version')},
+            },
+        ),
+        migrations.CreateModel(
+            name='OcrResult',
+            fields=[
+                ('id', models.CharField(default=ulid.api.api.Api.new, editable=False, max_length=26, primary_key=True, serialize=False)),
+                ('content_hash', models.CharField(help_text='ファイル内容のSHA-256', max_length=64, verbose_name='ファイルハッシュ')),
+                ('backend_version', models.CharField(max_length=100, verbose_name='OCRバックエンドバージョン')),
+                ('file_type', models.CharField(help_text='pdf / image', max_length=10, verbose_name='ファイルタイプ')),
+                ('page_hashes', models.JSONField(blank=True, default=list, verbose_name='ページ画像ハッシュ')),
+                ('extracted_text', models.TextField(verbose_name='抽出テキスト')),
+                ('parsed_results', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text="{'financial_statement': {...}, 'loan_contract': {...}}の形式", verbose_name='パース結果')),
+                ('hit_count', models.IntegerField(default=0, verbose_name='再利用回数')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now=True, verbose_name='最終利用日時')),
+            ],
+            options={
+                'verbose_name': 'OCR結果キャッシュ',
+                'verbose_name_plural': 'OCR結果キャッシュ',
+                'unique_together': {('content_hash', 'backend_version')},
+            },
+        ),
+        migrations.AddField(
+            model_name='uploadeddocument',
+            name='ocr_result',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='documents', to='scoreai.ocrresult', verbose_name='OCR結果'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 23:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoreai', '0129_ocr_result_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cloudstoragesetting',
+            name='folder_id_cache',
+            field=models.JSONField(blank=True, default=dict, help_text='ルートフォルダからのパス → フォルダIDの対応', verbose_name='フォルダIDキャッシュ'),
+        ),
+    ]
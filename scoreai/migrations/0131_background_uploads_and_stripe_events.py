@@ -0,0 +1,81 @@
+# Generated by Django 5.1.2 on 2026-10-18 23:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoreai', '0130_cloud_storage_folder_id_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeEvent',
+            fields=[
+                ('id', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='イベントID')),
+                ('event_type', models.CharField(max_length=100, verbose_name='イベントタイプ')),
+                ('customer_id', models.CharField(blank=True, max_length=255, verbose_name='Stripe顧客ID')),
+                ('event_created', models.DateTimeField(verbose_name='イベント発生日時')),
+                ('payload', models.JSONField(verbose_name='ペイロード')),
+                ('status', models.CharField(choices=[('pending', '未処理'), ('processed', '処理済み'), ('failed', '失敗')], default='pending', max_length=20, verbose_name='処理状態')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='処理試行回数')),
+                ('last_error', models.TextField(blank=True, verbose_name='エラー内容')),
+                ('next_attempt_at', models.DateTimeField(blank=True, null=True, verbose_name='次回処理日時')),
+                ('received_at', models.DateTimeField(auto_now_add=True, verbose_name='受信日時')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='処理日時')),
+            ],
+            options={
+                'verbose_name': 'Stripeイベント',
+                'verbose_name_plural': 'Stripeイベント',
+                'ordering': ['event_created', 'received_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='uploadeddocument',
+            name='next_upload_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='次回アップロード日時'),
+        ),
+        migrations.AddField(
+            model_name='uploadeddocument',
+            name='spool_path',
+            field=models.CharField(blank=True, help_text='アップロード完了までファイルを保持するローカルパス', max_length=500, verbose_name='スプールファイル'),
+        ),
+        migrations.AddField(
+            model_name='uploadeddocument',
+            name='upload_attempts',
+            field=models.PositiveIntegerField(default=0, verbose_name='アップロード試行回数'),
+        ),
+        migrations.AddField(
+            model_name='uploadeddocument',
+            name='upload_error',
+            field=models.TextField(blank=True, verbose_name='アップロードエラー'),
+        ),
+        migrations.AddField(
+            model_name='uploadeddocument',
+            name='upload_status',
+            field=models.CharField(choices=[('pending', 'アップロード待ち'), ('uploading', 'アップロード中'), ('uploaded', 'アップロード済み'), ('failed', 'アップロード失敗')], default='uploaded', max_length=20, verbose_name='アップロード状態'),
+        ),
+        migrations.AlterField(
+            model_name='uploadeddocument',
+            name='file_id',
+            field=models.CharField(blank=True, help_text='ストレージ内のファイルID', max_length=255, verbose_name='ファイルID'),
+        ),
+        migrations.AlterField(
+            model_name='uploadeddocument',
+            name='folder_id',
+            field=models.CharField(blank=True, help_text='ストレージ内のフォルダID', max_length=255, verbose_name='フォルダID'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadeddocument',
+            index=models.Index(fields=['upload_status', 'next_upload_at'], name='scoreai_upl_upload__0fb1fc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stripeevent',
+            index=models.Index(fields=['customer_id', 'status', 'event_created'], name='scoreai_str_custome_923d42_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stripeevent',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='scoreai_str_status_821a9f_idx'),
+        ),
+    ]
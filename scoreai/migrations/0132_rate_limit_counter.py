@@ -0,0 +1,25 @@
+# Generated by Django 5.1.2 on 2026-10-18 23:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoreai', '0131_background_uploads_and_stripe_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitCounter',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='キー')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='回数')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='有効期限')),
+            ],
+            options={
+                'verbose_name': 'レート制限カウンター',
+                'verbose_name_plural': 'レート制限カウンター',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.2 on 2026-10-18 23:22
+
+import django.db.models.deletion
+import ulid.api.api
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoreai', '0132_rate_limit_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanLimitNotificationState',
+            fields=[
+                ('id', models.CharField(default=ulid.api.api.Api.new, editable=False, max_length=26, primary_key=True, serialize=False)),
+                ('metric', models.CharField(choices=[('companies', 'Company数'), ('ai_consultation', 'AI相談回数'), ('ocr', 'OCR読み込み回数')], max_length=30, verbose_name='対象')),
+                ('period', models.CharField(blank=True, help_text='月次の制限は YYYY-MM、Company数は空', max_length=7, verbose_name='期間')),
+                ('notified_level', models.IntegerField(default=0, verbose_name='通知済みレベル（%）')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('firm', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='plan_limit_notification_states', to='scoreai.firm', verbose_name='Firm')),
+            ],
+            options={
+                'verbose_name': 'プラン制限通知状態',
+                'verbose_name_plural': 'プラン制限通知状態',
+                'unique_together': {('firm', 'metric', 'period')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.2 on 2026-10-19 00:32
+
+import django.core.serializers.json
+import django.db.models.deletion
+import ulid.api.api
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoreai', '0133_plan_limit_notification_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIDiagnosisConversation',
+            fields=[
+                ('id', models.CharField(default=ulid.api.api.Api.new, editable=False, max_length=26, primary_key=True, serialize=False)),
+                ('summary', models.TextField(blank=True, verbose_name='これまでの会話の要約')),
+                ('messages', models.JSONField(blank=True, default=list, help_text="[{'role': 'user' | 'assistant', 'content': '...'}]", verbose_name='直近の発言')),
+                ('message_count', models.IntegerField(default=0, help_text='要約した発言を含む', verbose_name='発言数')),
+                ('fiscal_data', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='診断用データ')),
+                ('report', models.TextField(blank=True, verbose_name='診断レポート')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('fiscal_summary_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='diagnosis_conversations', to='scoreai.fiscalsummary_year', verbose_name='年次財務諸表')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='diagnosis_conversations', to=settings.AUTH_USER_MODEL, verbose_name='ユーザー')),
+            ],
+            options={
+                'verbose_name': 'AI診断の会話',
+                'verbose_name_plural': 'AI診断の会話',
+                'unique_together': {('user', 'fiscal_summary_year')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-19 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoreai', '0134_ai_diagnosis_conversation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiconsultationhistory',
+            name='prompt_budget',
+            field=models.JSONField(blank=True, default=dict, help_text='トークン予算と、要約・省略したデータ', verbose_name='プロンプトの調整'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-19 10:20
+
+import django.db.models.deletion
+import ulid.api.api
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoreai', '0135_aiconsultationhistory_prompt_budget'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIDiagnosisReport',
+            fields=[
+                ('id', models.CharField(default=ulid.api.api.Api.new, editable=False, max_length=26, primary_key=True, serialize=False)),
+                ('report_text', models.TextField(verbose_name='診断レポート')),
+                ('document', models.JSONField(blank=True, default=dict, help_text="{'blocks': [{'type': 'heading' | 'paragraph' | 'list' | 'table' | 'kpi', ...}]}", verbose_name='文書モデル')),
+                ('content_hash', models.CharField(help_text='文書モデルのSHA-256', max_length=64, verbose_name='内容のハッシュ')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ai_diagnosis_reports', to=settings.AUTH_USER_MODEL, verbose_name='作成者')),
+                ('fiscal_summary_year', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='ai_diagnosis_report', to='scoreai.fiscalsummary_year', verbose_name='年次財務諸表')),
+            ],
+            options={
+                'verbose_name': 'AI診断レポート',
+                'verbose_name_plural': 'AI診断レポート',
+            },
+        ),
+    ]
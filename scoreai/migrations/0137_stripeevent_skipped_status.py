@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoreai', '0136_aidiagnosisreport'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stripeevent',
+            name='status',
+            field=models.CharField(choices=[('pending', '未処理'), ('processed', '処理済み'), ('failed', '失敗'), ('skipped', 'スキップ')], default='pending', max_length=20, verbose_name='処理状態'),
+        ),
+    ]
@@ -1,6 +1,9 @@
 """
 Mixin classes for views
 """
+import inspect
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db import transaction
 from django.contrib import messages
@@ -160,6 +163,23 @@ class SelectedCompanyMixin(LoginRequiredMixin, ErrorHandlingMixin):
         return user_firm.firm
 
 
+class AsyncDispatchMixin:
+    """
+    外部APIの応答待ちが長いハンドラーを async def で定義するビュー用のMixin
+
+    ログイン・Company選択などの既存の同期のdispatch処理はスレッドで実行し、
+    ハンドラーが返したコルーチンはイベントループ上でawaitする。
+    ハンドラー内のORM処理（this_company などを含む）は sync_to_async で囲むこと。
+    他のMixinより前（左）に指定する。
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        response = await sync_to_async(super().dispatch)(request, *args, **kwargs)
+        if inspect.isawaitable(response):
+            response = await response
+        return response
+
+
 class TransactionMixin:
     """Mixin to add transaction management to views"""
     
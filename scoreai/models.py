@@ -6,6 +6,7 @@ from django.db.models import ExpressionWrapper, F, fields, IntegerField, Generat
 from django.db.models.functions import Floor, Now, ExtractYear, ExtractMonth
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django_ulid.models import ulid
 from django.db.models import Case, When, Value, IntegerField
 from datetime import datetime
@@ -68,7 +69,26 @@ class User(AbstractUser):
         verbose_name_plural = 'ユーザー'
 
 
-class Company(models.Model):
+class CompanyCacheInvalidationMixin:
+    """保存・削除のたびにCompanyのキャッシュ（utils.company_cache）を無効化する"""
+
+    def get_cache_company_id(self):
+        return self.company_id
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .utils.company_cache import invalidate_company
+        invalidate_company(self.get_cache_company_id())
+
+    def delete(self, *args, **kwargs):
+        company_id = self.get_cache_company_id()
+        result = super().delete(*args, **kwargs)
+        from .utils.company_cache import invalidate_company
+        invalidate_company(company_id)
+        return result
+
+
+class Company(CompanyCacheInvalidationMixin, models.Model):
     id = models.CharField(primary_key=True, default=ulid.new, editable=False, max_length=26)
     name = models.CharField(max_length=255)
     fiscal_month = models.IntegerField("決算月", validators=[MinValueValidator(1), MaxValueValidator(12)])
@@ -164,6 +184,9 @@ class Company(models.Model):
     def user_count(self):
         return UserCompany.objects.filter(company=self, active=True).count()
 
+    def get_cache_company_id(self):
+        return self.id
+
     def __str__(self):
         return self.name
 
@@ -898,6 +921,54 @@ class SubscriptionHistory(models.Model):
         return f"{self.firm.name} - {old_name} → {self.new_plan.name} ({self.changed_at.strftime('%Y-%m-%d')})"
 
 
+class StripeEvent(models.Model):
+    """Stripe Webhookイベントの受信箱（イベントIDで重複を排除し、顧客ごとに受信順で処理する）"""
+    STATUS_CHOICES = [
+        ('pending', '未処理'),
+        ('processed', '処理済み'),
+        ('failed', '失敗'),
+        ('skipped', 'スキップ'),
+    ]
+    
+    id = models.CharField('イベントID', primary_key=True, max_length=255)
+    event_type = models.CharField('イベントタイプ', max_length=100)
+    customer_id = models.CharField('Stripe顧客ID', max_length=255, blank=True)
+    event_created = models.DateTimeField('イベント発生日時')
+    payload = models.JSONField('ペイロード')
+    status = models.CharField('処理状態', max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField('処理試行回数', default=0)
+    last_error = models.TextField('エラー内容', blank=True)
+    next_attempt_at = models.DateTimeField('次回処理日時', null=True, blank=True)
+    received_at = models.DateTimeField('受信日時', auto_now_add=True)
+    processed_at = models.DateTimeField('処理日時', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Stripeイベント'
+        verbose_name_plural = 'Stripeイベント'
+        ordering = ['event_created', 'received_at']
+        indexes = [
+            models.Index(fields=['customer_id', 'status', 'event_created']),
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_type} ({self.id}) - {self.get_status_display()}"
+
+
+class RateLimitCounter(models.Model):
+    """レート制限のカウンター（共有キャッシュがない環境で使用）"""
+    key = models.CharField('キー', primary_key=True, max_length=255)
+    count = models.PositiveIntegerField('回数', default=0)
+    expires_at = models.DateTimeField('有効期限', db_index=True)
+    
+    class Meta:
+        verbose_name = 'レート制限カウンター'
+        verbose_name_plural = 'レート制限カウンター'
+    
+    def __str__(self):
+        return f"{self.key}: {self.count}"
+
+
 class FirmNotification(models.Model):
     """Firm向け通知"""
     NOTIFICATION_TYPES = [
@@ -927,6 +998,30 @@ class FirmNotification(models.Model):
         return f"{self.firm.name} - {self.title}"
 
 
+class PlanLimitNotificationState(models.Model):
+    """プラン制限通知の最終通知レベル（同じレベルの通知を重複して作成しないために記録）"""
+    METRIC_CHOICES = [
+        ('companies', 'Company数'),
+        ('ai_consultation', 'AI相談回数'),
+        ('ocr', 'OCR読み込み回数'),
+    ]
+    
+    id = models.CharField(primary_key=True, default=ulid.new, editable=False, max_length=26)
+    firm = models.ForeignKey(Firm, on_delete=models.CASCADE, related_name='plan_limit_notification_states', verbose_name='Firm')
+    metric = models.CharField('対象', max_length=30, choices=METRIC_CHOICES)
+    period = models.CharField('期間', max_length=7, blank=True, help_text='月次の制限は YYYY-MM、Company数は空')
+    notified_level = models.IntegerField('通知済みレベル（%）', default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'プラン制限通知状態'
+        verbose_name_plural = 'プラン制限通知状態'
+        unique_together = ('firm', 'metric', 'period')
+    
+    def __str__(self):
+        return f"{self.firm.name} - {self.get_metric_display()} {self.period} ({self.notified_level}%)"
+
+
 class FinancialInstitution(models.Model):
     name = models.CharField(max_length=255)
     short_name = models.CharField(max_length=24)
@@ -958,7 +1053,7 @@ class SecuredType(models.Model):
         return self.name
 
         
-class Debt(models.Model):
+class Debt(CompanyCacheInvalidationMixin, models.Model):
     DEBT_TYPE_CHOICES = [
         ('certificate', '証書貸付'),
         ('corporate_bond', '社債'),
@@ -1101,17 +1196,14 @@ class Debt(models.Model):
     @property
     def balances_monthly(self):
         """今後12ヶ月間の各月の残高を計算（社債・手形貸付対応、キャッシュ付き）"""
-        from django.core.cache import cache
+        from .utils import company_cache
         
-        # キャッシュキーを生成（DebtのIDのみを使用、更新時はsaveメソッドで無効化）
-        cache_key = f'debt_balances_monthly_{self.id}'
-        
-        # キャッシュから取得を試みる
-        cached_balances = cache.get(cache_key)
-        if cached_balances is not None:
-            return cached_balances
-        
-        # キャッシュがない場合は計算
+        # Companyごとのキャッシュに保存（借入の保存・削除時にCompany単位で無効化）
+        return company_cache.get_or_set(
+            self.company_id, f'debt_balances_monthly:{self.id}', self._compute_balances_monthly, 3600
+        )
+
+    def _compute_balances_monthly(self):
         start_month = self.elapsed_months
         balances = []
         current_balance = self.principal
@@ -1141,8 +1233,6 @@ class Debt(models.Model):
                     # 返済開始後は残高0（期日一括償還）
                     balances.append(0)
             
-            # 結果をキャッシュ（1時間）
-            cache.set(cache_key, balances, 3600)
             return balances
         
         # 返済開始前の残高を計算（証書貸付・社債）
@@ -1150,8 +1240,6 @@ class Debt(models.Model):
             # 返済開始前は元本
             for i in range(12):
                 balances.append(current_balance)
-            # 結果をキャッシュ（1時間）
-            cache.set(cache_key, balances, 3600)
             return balances
         
         # 返済開始後の残高を計算（証書貸付・社債）
@@ -1179,8 +1267,6 @@ class Debt(models.Model):
                 balance, _ = self.balance_after_months(months_from_start)
                 balances.append(balance)
         
-        # 結果をキャッシュ（1時間）
-        cache.set(cache_key, balances, 3600)
         return balances
 
     @property
@@ -1301,15 +1387,8 @@ class Debt(models.Model):
 
     def save(self, *args, **kwargs):
         self.clean()
-        # 保存前にキャッシュを無効化
-        from django.core.cache import cache
-        if self.pk:
-            # 既存レコードの更新時はキャッシュを削除
-            cache.delete(f'debt_balances_monthly_{self.id}')
+        # Companyのキャッシュ（月次残高など）は CompanyCacheInvalidationMixin で無効化する
         super().save(*args, **kwargs)
-        # 保存後も念のためキャッシュをクリア
-        if self.pk:
-            cache.delete(f'debt_balances_monthly_{self.id}')
 
     class Meta:
         verbose_name = '借入'
@@ -1325,7 +1404,7 @@ class Debt(models.Model):
         return f"{self.company.name} - {self.issue_date} - ¥{self.principal:,}"
 
 
-class MeetingMinutes(models.Model):
+class MeetingMinutes(CompanyCacheInvalidationMixin, models.Model):
     CATEGORY_CHOICES = [
         ('meeting', '打ち合わせ'),
         ('shareholders', '株主総会'),
@@ -1393,7 +1472,7 @@ class Blog(models.Model):
         return self.title
 
 
-class FiscalSummary_Year(models.Model):
+class FiscalSummary_Year(CompanyCacheInvalidationMixin, models.Model):
     id = models.CharField(primary_key=True, default=ulid.new, editable=False, max_length=26)
     company = models.ForeignKey('Company', on_delete=models.CASCADE, related_name='fiscal_summary_years')
     year = models.IntegerField("年度", validators=[MinValueValidator(2000), MaxValueValidator(2100)])
@@ -1693,7 +1772,7 @@ class FiscalSummary_Year(models.Model):
         return f"{self.company.name} - {self.year}年 ({budget_label})"
         
 
-class FiscalSummary_Month(models.Model):
+class FiscalSummary_Month(CompanyCacheInvalidationMixin, models.Model):
     fiscal_summary_year = models.ForeignKey(FiscalSummary_Year, on_delete=models.PROTECT, related_name='monthly_summaries')
     period = models.IntegerField("月度", validators=[MinValueValidator(1), MaxValueValidator(13)])
     sales = models.DecimalField("売上高", max_digits=12, decimal_places=2)
@@ -1740,8 +1819,20 @@ class FiscalSummary_Month(models.Model):
         self.full_clean()
         super().save(*args, **kwargs)
 
+    def get_cache_company_id(self):
+        # 読み込み済みの FiscalSummary_Year があればそれを使い、保存のたびにSQLを発行しない
+        if FiscalSummary_Month.fiscal_summary_year.is_cached(self):
+            return self.fiscal_summary_year.company_id
+        cached = getattr(self, '_cache_company_id', None)
+        if cached is None or cached[0] != self.fiscal_summary_year_id:
+            company_id = FiscalSummary_Year.objects.filter(
+                pk=self.fiscal_summary_year_id
+            ).values_list('company_id', flat=True).first()
+            cached = self._cache_company_id = (self.fiscal_summary_year_id, company_id)
+        return cached[1]
+
 # 株式発行 Captableの機能
-class Stakeholder_name(models.Model):
+class Stakeholder_name(CompanyCacheInvalidationMixin, models.Model):
     id = models.CharField(primary_key=True, default=ulid.new, editable=False, max_length=26)
     name = models.CharField("株主名", max_length=255)
     company = models.ForeignKey(Company, on_delete=models.PROTECT)
@@ -2118,6 +2209,7 @@ class CloudStorageSetting(models.Model):
     refresh_token = models.TextField("リフレッシュトークン", blank=True, help_text="OAuth2リフレッシュトークン（暗号化推奨）")
     token_expires_at = models.DateTimeField("トークン有効期限", null=True, blank=True)
     root_folder_id = models.CharField("ルートフォルダID", max_length=255, blank=True, help_text="ストレージ内のルートフォルダID")
+    folder_id_cache = models.JSONField("フォルダIDキャッシュ", default=dict, blank=True, help_text="ルートフォルダからのパス → フォルダIDの対応")
     is_active = models.BooleanField("有効", default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -2181,6 +2273,13 @@ class UploadedDocument(models.Model):
         ('other', 'その他'),
     ]
     
+    UPLOAD_STATUS_CHOICES = [
+        ('pending', 'アップロード待ち'),
+        ('uploading', 'アップロード中'),
+        ('uploaded', 'アップロード済み'),
+        ('failed', 'アップロード失敗'),
+    ]
+    
     id = models.CharField(primary_key=True, default=ulid.new, editable=False, max_length=26)
     user = models.ForeignKey(
         User,
@@ -2199,15 +2298,30 @@ class UploadedDocument(models.Model):
     original_filename = models.CharField("元のファイル名", max_length=255)
     stored_filename = models.CharField("保存ファイル名", max_length=255, help_text="システムが自動生成したファイル名")
     storage_type = models.CharField("ストレージタイプ", max_length=20, choices=CloudStorageSetting.STORAGE_CHOICES)
-    file_id = models.CharField("ファイルID", max_length=255, help_text="ストレージ内のファイルID")
-    folder_id = models.CharField("フォルダID", max_length=255, help_text="ストレージ内のフォルダID")
+    file_id = models.CharField("ファイルID", max_length=255, blank=True, help_text="ストレージ内のファイルID")
+    folder_id = models.CharField("フォルダID", max_length=255, blank=True, help_text="ストレージ内のフォルダID")
     file_url = models.URLField("ファイルURL", max_length=500, blank=True)
     file_size = models.BigIntegerField("ファイルサイズ（バイト）", null=True, blank=True)
     mime_type = models.CharField("MIMEタイプ", max_length=100, blank=True)
     
+    # アップロード関連（ストレージへのアップロードはバックグラウンドで実行）
+    upload_status = models.CharField("アップロード状態", max_length=20, choices=UPLOAD_STATUS_CHOICES, default='uploaded')
+    spool_path = models.CharField("スプールファイル", max_length=500, blank=True, help_text="アップロード完了までファイルを保持するローカルパス")
+    upload_attempts = models.PositiveIntegerField("アップロード試行回数", default=0)
+    upload_error = models.TextField("アップロードエラー", blank=True)
+    next_upload_at = models.DateTimeField("次回アップロード日時", null=True, blank=True)
+    
     # OCR処理関連
     is_ocr_processed = models.BooleanField("OCR処理済み", default=False)
     ocr_processed_at = models.DateTimeField("OCR処理日時", null=True, blank=True)
+    ocr_result = models.ForeignKey(
+        'OcrResult',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='documents',
+        verbose_name="OCR結果"
+    )
     
     # データ保存関連
     is_data_saved = models.BooleanField("データ保存済み", default=False)
@@ -2227,6 +2341,7 @@ class UploadedDocument(models.Model):
             models.Index(fields=['user', 'company', 'document_type']),
             models.Index(fields=['is_ocr_processed']),
             models.Index(fields=['is_data_saved']),
+            models.Index(fields=['upload_status', 'next_upload_at']),
         ]
     
     def __str__(self):
@@ -2250,6 +2365,51 @@ class UploadedDocument(models.Model):
         return subfolder_names.get(self.subfolder_type, self.subfolder_type)
 
 
+class OcrResult(models.Model):
+    """OCR結果キャッシュ（ファイル内容のSHA-256 × OCRバックエンドバージョンごと）"""
+    id = models.CharField(primary_key=True, default=ulid.new, editable=False, max_length=26)
+    content_hash = models.CharField("ファイルハッシュ", max_length=64, help_text="ファイル内容のSHA-256")
+    backend_version = models.CharField("OCRバックエンドバージョン", max_length=100)
+    file_type = models.CharField("ファイルタイプ", max_length=10, help_text="pdf / image")
+    page_hashes = models.JSONField("ページ画像ハッシュ", default=list, blank=True)
+    extracted_text = models.TextField("抽出テキスト")
+    parsed_results = models.JSONField(
+        "パース結果",
+        default=dict,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        help_text="{'financial_statement': {...}, 'loan_contract': {...}}の形式"
+    )
+    hit_count = models.IntegerField("再利用回数", default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField("最終利用日時", auto_now=True)
+
+    class Meta:
+        verbose_name = 'OCR結果キャッシュ'
+        verbose_name_plural = 'OCR結果キャッシュ'
+        unique_together = ('content_hash', 'backend_version')
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.backend_version})"
+
+
+class OcrPageResult(models.Model):
+    """ページ画像単位のOCR結果キャッシュ"""
+    id = models.CharField(primary_key=True, default=ulid.new, editable=False, max_length=26)
+    image_hash = models.CharField("画像ハッシュ", max_length=64, help_text="ラスタライズ後のページ画像のSHA-256")
+    backend_version = models.CharField("OCRバックエンドバージョン", max_length=100)
+    text = models.TextField("抽出テキスト", blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'OCRページ結果キャッシュ'
+        verbose_name_plural = 'OCRページ結果キャッシュ'
+        unique_together = ('image_hash', 'backend_version')
+
+    def __str__(self):
+        return f"{self.image_hash[:12]} ({self.backend_version})"
+
+
 class AIConsultationHistory(models.Model):
     """AI相談の履歴"""
     id = models.CharField(primary_key=True, default=ulid.new, editable=False, max_length=26)
@@ -2273,6 +2433,8 @@ class AIConsultationHistory(models.Model):
         verbose_name="使用したスクリプト（ユーザー）"
     )  # 使用したスクリプト（ユーザー用）
     data_snapshot = models.JSONField(default=dict, verbose_name="データスナップショット")  # 相談時に使用したデータのスナップショット
+    # トークン予算に収めるために要約・省略したデータ（utils.prompt_budget.PromptBudgetResult.as_dict）
+    prompt_budget = models.JSONField("プロンプトの調整", default=dict, blank=True, help_text="トークン予算と、要約・省略したデータ")
     # トークン数（将来の制限用、現状は記録のみ）
     input_tokens = models.IntegerField("入力トークン数", default=0, null=True, blank=True, help_text="プロンプトのトークン数")
     output_tokens = models.IntegerField("出力トークン数", default=0, null=True, blank=True, help_text="AI応答のトークン数")
@@ -2299,6 +2461,68 @@ class AIConsultationHistory(models.Model):
         return "未記録"
 
 
+class AIDiagnosisConversation(models.Model):
+    """
+    AI診断の会話（年次財務諸表ごと・ユーザーごと）
+
+    古い発言は summary（要約）にまとめ、messages には直近の発言だけを残す。
+    診断用の財務データは会話の開始時に1回だけ収集して fiscal_data に保存し、レポート作成で再利用する。
+    """
+    id = models.CharField(primary_key=True, default=ulid.new, editable=False, max_length=26)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='diagnosis_conversations', verbose_name="ユーザー")
+    fiscal_summary_year = models.ForeignKey(
+        'FiscalSummary_Year',
+        on_delete=models.CASCADE,
+        related_name='diagnosis_conversations',
+        verbose_name="年次財務諸表"
+    )
+    summary = models.TextField("これまでの会話の要約", blank=True)
+    messages = models.JSONField("直近の発言", default=list, blank=True, help_text="[{'role': 'user' | 'assistant', 'content': '...'}]")
+    message_count = models.IntegerField("発言数", default=0, help_text="要約した発言を含む")
+    fiscal_data = models.JSONField("診断用データ", null=True, blank=True, encoder=DjangoJSONEncoder)
+    report = models.TextField("診断レポート", blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'AI診断の会話'
+        verbose_name_plural = 'AI診断の会話'
+        unique_together = ('user', 'fiscal_summary_year')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.fiscal_summary_year} - {self.message_count}件"
+
+
+class AIDiagnosisReport(models.Model):
+    """
+    AI診断レポート（年次財務諸表ごとに最新の1件）
+
+    本文は保存時に1回だけ文書モデル（見出し・段落・箇条書き・表・KPI）に変換して document に保存し、
+    PDF・PPTX・Excel・Wordの出力はすべて document から作成する（services.diagnosis_report_service）。
+    出力したファイルは content_hash をキーにキャッシュする。
+    """
+    id = models.CharField(primary_key=True, default=ulid.new, editable=False, max_length=26)
+    fiscal_summary_year = models.OneToOneField(
+        'FiscalSummary_Year',
+        on_delete=models.CASCADE,
+        related_name='ai_diagnosis_report',
+        verbose_name="年次財務諸表"
+    )
+    report_text = models.TextField("診断レポート")
+    document = models.JSONField("文書モデル", default=dict, blank=True, help_text="{'blocks': [{'type': 'heading' | 'paragraph' | 'list' | 'table' | 'kpi', ...}]}")
+    content_hash = models.CharField("内容のハッシュ", max_length=64, help_text="文書モデルのSHA-256")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='ai_diagnosis_reports', verbose_name="作成者")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'AI診断レポート'
+        verbose_name_plural = 'AI診断レポート'
+
+    def __str__(self):
+        return f"{self.fiscal_summary_year} - {self.content_hash[:12]}"
+
+
 # ============================================================================
 # 業界別専門相談室 モデル
 # ============================================================================
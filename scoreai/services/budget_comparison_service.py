@@ -0,0 +1,393 @@
+"""
+予算と実績の比較（予算vs実績・年次比較・月次推移の各ビューで共通）
+
+比較する項目はフィールドの定義（COMPARISON_FIELDS / MONTHLY_FIELDS）で管理する。
+各項目の差異・差異率・達成率・前年比は、年度ごとに項目を1つずつ計算するのではなく、
+対象年度（と前年度）の予算・実績をまとめてDataFrameにし、pandasの列演算で一度に計算する。
+
+- 年次データ（FiscalSummary_Year）は対象年度と前年度を1回のクエリで取得
+- 月次データ（FiscalSummary_Month）は対象年度分を1回のクエリで取得
+- 複数年度の比較（load_budget_comparisons(company, [2022, 2023, 2024])）も同じクエリ数
+
+使い方:
+    comparison = load_budget_comparison(company, 2024)
+    comparison.financial_indicators  # 損益・経営指標の予算/実績/差異
+    comparison.bs_indicators         # 貸借対照表の予算/実績/差異
+    comparison.monthly               # 月次の予算/実績/差異
+"""
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from ..models import Company, FiscalSummary_Month, FiscalSummary_Year
+
+PL = 'pl'
+RATIO = 'ratio'
+BS = 'bs'
+
+PERIODS = range(1, 13)
+
+
+@dataclass(frozen=True)
+class ComparisonField:
+    """
+    比較する項目の定義
+
+    Attributes:
+        field: モデルのフィールド名（経営指標はモデルのプロパティ名）
+        label: 表示名
+        section: PL / RATIO / BS
+        higher_is_better: 実績が予算を上回ると良い項目か（負債はFalse）
+        positive_base: 差異率・達成率の計算で、基準値が0より大きい場合のみ計算するか
+            （Falseの場合は基準値が0でなければ計算する）
+        numerator, denominator: 経営指標（RATIO）の計算式（numerator ÷ denominator × 100）
+    """
+    field: str
+    label: str
+    section: str
+    higher_is_better: bool = True
+    positive_base: bool = False
+    numerator: Optional[str] = None
+    denominator: Optional[str] = None
+
+
+COMPARISON_FIELDS: List[ComparisonField] = [
+    # 損益計算書
+    ComparisonField('sales', '売上高', PL, positive_base=True),
+    ComparisonField('gross_profit', '粗利益', PL),
+    ComparisonField('operating_profit', '営業利益', PL),
+    ComparisonField('ordinary_profit', '経常利益', PL),
+    ComparisonField('net_profit', '当期純利益', PL),
+    # 経営指標（FiscalSummary_Year の同名のプロパティと同じ計算）
+    ComparisonField('gross_profit_margin', '売上総利益率', RATIO, numerator='gross_profit', denominator='sales'),
+    ComparisonField('operating_profit_margin', '営業利益率', RATIO, numerator='operating_profit', denominator='sales'),
+    ComparisonField('ROA', 'ROA', RATIO, numerator='ordinary_profit', denominator='total_assets'),
+    ComparisonField('equity_ratio', '自己資本比率', RATIO, positive_base=True, numerator='total_net_assets', denominator='total_assets'),
+    ComparisonField('current_ratio', '流動比率', RATIO, numerator='total_current_assets', denominator='total_current_liabilities'),
+    # 貸借対照表
+    ComparisonField('cash_and_deposits', '現金及び預金', BS),
+    ComparisonField('accounts_receivable', '売上債権', BS),
+    ComparisonField('inventory', '棚卸資産', BS),
+    ComparisonField('total_current_assets', '流動資産合計', BS),
+    ComparisonField('total_fixed_assets', '固定資産合計', BS),
+    ComparisonField('total_assets', '資産合計', BS),
+    ComparisonField('accounts_payable', '仕入債務', BS, higher_is_better=False),
+    ComparisonField('short_term_loans_payable', '短期借入金', BS, higher_is_better=False),
+    ComparisonField('total_current_liabilities', '流動負債合計', BS, higher_is_better=False),
+    ComparisonField('long_term_loans_payable', '長期借入金', BS, higher_is_better=False),
+    ComparisonField('total_liabilities', '負債合計', BS, higher_is_better=False),
+    ComparisonField('capital_stock', '資本金', BS),
+    ComparisonField('retained_earnings', '利益剰余金', BS),
+    ComparisonField('total_net_assets', '純資産合計', BS),
+]
+
+MONTHLY_FIELDS: List[ComparisonField] = [
+    ComparisonField('sales', '売上高', PL, positive_base=True),
+    ComparisonField('gross_profit', '粗利益', PL),
+    ComparisonField('operating_profit', '営業利益', PL),
+    ComparisonField('ordinary_profit', '経常利益', PL),
+]
+
+AMOUNT_FIELDS = [spec for spec in COMPARISON_FIELDS if spec.section != RATIO]
+RATIO_FIELDS = [spec for spec in COMPARISON_FIELDS if spec.section == RATIO]
+# 年次データから読み込む列（金額項目と経営指標の計算に使う項目）
+YEAR_COLUMNS = list(dict.fromkeys(
+    [spec.field for spec in AMOUNT_FIELDS]
+    + [name for spec in RATIO_FIELDS for name in (spec.numerator, spec.denominator)]
+))
+
+
+def fields_in(section: str) -> List[ComparisonField]:
+    """セクションの項目の定義"""
+    return [spec for spec in COMPARISON_FIELDS if spec.section == section]
+
+
+def display_month(period: int, fiscal_month: int) -> int:
+    """period（1-12）を決算月を考慮した表示月に変換（period=1が決算月の次の月、period=12が決算月）"""
+    month = (fiscal_month + period) % 12
+    return month or 12
+
+
+@dataclass
+class BudgetComparison:
+    """1年度分の予算と実績の比較結果"""
+    year: int
+    fiscal_month: int
+    budget_year: Optional[FiscalSummary_Year] = None
+    actual_year: Optional[FiscalSummary_Year] = None
+    previous_year: Optional[FiscalSummary_Year] = None
+    # 項目名 → {'label', 'section', 'budget', 'actual', 'diff', 'diff_rate', 'previous', 'yoy', 'yoy_rate', 'favorable'}
+    # 実績がない年度は空
+    indicators: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # 表示月（display_month）を設定した月次データ（period順）
+    budget_months: List[FiscalSummary_Month] = field(default_factory=list)
+    actual_months: List[FiscalSummary_Month] = field(default_factory=list)
+    # 予算または実績があるperiod（1-12）ごとの比較（'budget_month'/'actual_month' は月次データ、ない場合はNone）
+    monthly: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def financial_indicators(self) -> Dict[str, Dict[str, Any]]:
+        """損益と経営指標"""
+        return {name: values for name, values in self.indicators.items() if values['section'] in (PL, RATIO)}
+
+    @property
+    def bs_indicators(self) -> Dict[str, Dict[str, Any]]:
+        """貸借対照表"""
+        return {name: values for name, values in self.indicators.items() if values['section'] == BS}
+
+    def chart_data(self, section: str) -> Dict[str, List[Any]]:
+        """セクションのグラフ用データ（予算がない場合の予算はNone）"""
+        if not self.indicators:
+            return {'labels': [], 'budget': [], 'actual': []}
+        specs = fields_in(section)
+        has_budget = self.budget_year is not None
+        return {
+            'labels': [spec.label for spec in specs],
+            'budget': [self.indicators[spec.field]['budget'] if has_budget else None for spec in specs],
+            'actual': [self.indicators[spec.field]['actual'] for spec in specs],
+        }
+
+    @property
+    def monthly_labels(self) -> List[str]:
+        """月次グラフのラベル（決算月の次の月から12か月）"""
+        return [f'{display_month(period, self.fiscal_month)}月' for period in PERIODS]
+
+    def monthly_chart_data(self) -> Dict[str, List[Any]]:
+        """月次の売上高・営業利益のグラフ用データ"""
+        return {
+            'labels': [f"{row['display_month']}月" for row in self.monthly],
+            'budget_sales': [row['budget_sales'] for row in self.monthly],
+            'actual_sales': [row['actual_sales'] for row in self.monthly],
+            'budget_operating_profit': [row['budget_operating_profit'] for row in self.monthly],
+            'actual_operating_profit': [row['actual_operating_profit'] for row in self.monthly],
+        }
+
+    def monthly_total(self, key: str) -> float:
+        """月次の合計（例: monthly_total('budget_sales')）"""
+        return sum(row[key] for row in self.monthly if row[key] is not None)
+
+
+def get_available_years(company: Company) -> List[int]:
+    """予算または実績がある年度（新しい順）"""
+    return list(
+        FiscalSummary_Year.objects.filter(company=company)
+        .values_list('year', flat=True).distinct().order_by('-year')
+    )
+
+
+def load_budget_comparison(company: Company, year: int) -> BudgetComparison:
+    """1年度分の予算と実績の比較"""
+    return load_budget_comparisons(company, [year])[year]
+
+
+def load_budget_comparisons(company: Company, years: Iterable[int]) -> Dict[int, BudgetComparison]:
+    """
+    複数年度の予算と実績の比較
+
+    年次データ（前年度を含む）と月次データをそれぞれ1回のクエリで取得し、
+    すべての年度の差異・差異率・前年比・月次の達成率をまとめて計算する。
+    """
+    years = sorted(set(years))
+    fiscal_month = company.fiscal_month
+
+    year_objects = _load_years(company, years)
+    comparisons = {
+        year: BudgetComparison(
+            year=year,
+            fiscal_month=fiscal_month,
+            budget_year=year_objects.get((year, True)),
+            actual_year=year_objects.get((year, False)),
+            previous_year=year_objects.get((year - 1, False)),
+        )
+        for year in years
+    }
+
+    indicators = _compare_years(year_objects, years)
+    for year, comparison in comparisons.items():
+        if comparison.actual_year is not None:
+            comparison.indicators = indicators[year]
+
+    months = _load_months(company, years)
+    for (year, is_budget), month_list in _group_months(months, fiscal_month).items():
+        if is_budget:
+            comparisons[year].budget_months = month_list
+        else:
+            comparisons[year].actual_months = month_list
+    for year, rows in _compare_months(months, years, fiscal_month).items():
+        comparisons[year].monthly = rows
+
+    return comparisons
+
+
+def _load_years(company: Company, years: Sequence[int]) -> Dict[tuple, FiscalSummary_Year]:
+    """対象年度と前年度の年次データ（(年度, 予算フラグ) → FiscalSummary_Year）"""
+    target_years = set(years) | {year - 1 for year in years}
+    year_objects = {}
+    queryset = FiscalSummary_Year.objects.filter(
+        company=company, year__in=target_years
+    ).order_by('year', 'is_budget', '-is_draft')
+    for fiscal_year in queryset:
+        year_objects.setdefault((fiscal_year.year, fiscal_year.is_budget), fiscal_year)
+    return year_objects
+
+
+def _load_months(company: Company, years: Sequence[int]) -> List[FiscalSummary_Month]:
+    """
+    対象年度の月次データ
+
+    同じperiod・予算フラグの月次が複数ある場合は、年次データの予算フラグと一致するものを優先する。
+    """
+    queryset = FiscalSummary_Month.objects.filter(
+        fiscal_summary_year__company=company,
+        fiscal_summary_year__year__in=years,
+    ).select_related('fiscal_summary_year').order_by('period')
+    selected = {}
+    for month in queryset:
+        key = (month.fiscal_summary_year.year, month.is_budget, month.period)
+        matches_year = month.is_budget == month.fiscal_summary_year.is_budget
+        if key not in selected or matches_year:
+            selected[key] = month
+    return sorted(selected.values(), key=lambda month: month.period)
+
+
+def _group_months(months: List[FiscalSummary_Month], fiscal_month: int) -> Dict[tuple, List[FiscalSummary_Month]]:
+    """(年度, 予算フラグ) ごとの月次データ（表示月を設定）"""
+    grouped: Dict[tuple, List[FiscalSummary_Month]] = {}
+    for month in months:
+        month.display_month = display_month(month.period, fiscal_month)
+        grouped.setdefault((month.fiscal_summary_year.year, month.is_budget), []).append(month)
+    return grouped
+
+
+def _rate(numerator: pd.Series, base: pd.Series, positive_base: bool) -> pd.Series:
+    """numerator ÷ base × 100（基準値が条件を満たさない行はNaN）"""
+    valid = base > 0 if positive_base else base != 0
+    return numerator / base.where(valid) * 100
+
+
+def _quantize(value: float) -> float:
+    """モデルの経営指標のプロパティと同じ丸め（小数点以下2桁、四捨五入）"""
+    if pd.isna(value):
+        return value
+    return float(Decimal(value).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+
+
+def _add_ratios(frame: pd.DataFrame) -> pd.DataFrame:
+    """経営指標の列を追加（分母が条件を満たさない場合は0、データがない行はNaN）"""
+    frame = frame.copy()
+    for spec in RATIO_FIELDS:
+        denominator = frame[spec.denominator]
+        ratio = (frame[spec.numerator] / denominator * 100).where(
+            denominator > 0 if spec.positive_base else denominator != 0, 0
+        ).where(denominator.notna())
+        frame[spec.field] = ratio.map(_quantize)
+    return frame
+
+
+def _frame(year_objects: Dict[tuple, FiscalSummary_Year], is_budget: bool, years: Sequence[int]) -> pd.DataFrame:
+    """年度を行、項目を列にした予算または実績のDataFrame（データがない年度はNaN）"""
+    records = {
+        year: {column: getattr(fiscal_year, column) for column in YEAR_COLUMNS}
+        for (year, budget), fiscal_year in year_objects.items()
+        if budget == is_budget
+    }
+    frame = pd.DataFrame.from_dict(records, orient='index', columns=YEAR_COLUMNS, dtype='float64')
+    return _add_ratios(frame.reindex(list(years)))
+
+
+def _compare_years(year_objects: Dict[tuple, FiscalSummary_Year], years: Sequence[int]) -> Dict[int, Dict[str, Dict[str, Any]]]:
+    """年度ごとの項目別の予算/実績/差異/差異率/前年比"""
+    columns = [spec.field for spec in COMPARISON_FIELDS]
+    budget = _frame(year_objects, True, years)[columns]
+    actual = _frame(year_objects, False, years)[columns]
+    previous = _frame(year_objects, False, [year - 1 for year in years])[columns].set_axis(list(years))
+
+    diff = actual - budget
+    yoy = actual - previous
+    diff_rate = pd.DataFrame({
+        spec.field: _rate(diff[spec.field], budget[spec.field], spec.positive_base) for spec in AMOUNT_FIELDS
+    }, index=list(years))
+    yoy_rate = pd.DataFrame({
+        spec.field: _rate(yoy[spec.field], previous[spec.field], spec.positive_base) for spec in AMOUNT_FIELDS
+    }, index=list(years))
+    direction = pd.Series({spec.field: 1 if spec.higher_is_better else -1 for spec in COMPARISON_FIELDS})
+    favorable = (diff * direction) >= 0
+
+    results: Dict[int, Dict[str, Dict[str, Any]]] = {}
+    for year in years:
+        has_budget = not budget.loc[year].isna().all()
+        indicators = {}
+        for spec in COMPARISON_FIELDS:
+            convert = _to_float if spec.section == RATIO else _to_int
+            name = spec.field
+            indicators[name] = {
+                'label': spec.label,
+                'section': spec.section,
+                'budget': convert(budget.at[year, name]) if has_budget else 0,
+                'actual': convert(actual.at[year, name]),
+                'diff': convert(diff.at[year, name]),
+                'diff_rate': _to_float(diff_rate.at[year, name]) if name in diff_rate else None,
+                'previous': convert(previous.at[year, name]),
+                'yoy': convert(yoy.at[year, name]),
+                'yoy_rate': _to_float(yoy_rate.at[year, name]) if name in yoy_rate else None,
+                'favorable': bool(favorable.at[year, name]) if has_budget else None,
+            }
+        results[year] = indicators
+    return results
+
+
+def _compare_months(months: List[FiscalSummary_Month], years: Sequence[int], fiscal_month: int) -> Dict[int, List[Dict[str, Any]]]:
+    """年度ごとの月次（period 1-12）の予算/実績/差異/達成率"""
+    columns = [spec.field for spec in MONTHLY_FIELDS]
+    index = pd.MultiIndex.from_product([list(years), list(PERIODS)], names=['year', 'period'])
+    month_objects = {(month.fiscal_summary_year.year, month.is_budget, month.period): month for month in months}
+
+    def frame(is_budget: bool) -> pd.DataFrame:
+        records = [
+            {'year': month.fiscal_summary_year.year, 'period': month.period,
+             **{column: float(getattr(month, column)) for column in columns}}
+            for month in months
+            if month.is_budget == is_budget and month.period in PERIODS
+        ]
+        if not records:
+            return pd.DataFrame(np.nan, index=index, columns=columns)
+        return pd.DataFrame.from_records(records).set_index(['year', 'period'])[columns].reindex(index)
+
+    budget = frame(True)
+    actual = frame(False)
+    both = budget.notna() & actual.notna()
+    diff = (actual - budget).where(both)
+    # 予算・実績の両方がある月は、予算が条件を満たさない場合の達成率を0とする
+    achievement_rate = pd.DataFrame({
+        spec.field: _rate(actual[spec.field], budget[spec.field], spec.positive_base).fillna(0) for spec in MONTHLY_FIELDS
+    }, index=index).where(both)
+    has_budget = budget.notna().any(axis=1)
+    has_actual = actual.notna().any(axis=1)
+
+    results: Dict[int, List[Dict[str, Any]]] = {year: [] for year in years}
+    for (year, period) in index[has_budget | has_actual]:
+        row = {
+            'period': period,
+            'display_month': display_month(period, fiscal_month),
+            'budget_month': month_objects.get((year, True, period)),
+            'actual_month': month_objects.get((year, False, period)),
+            'has_actual': bool(has_actual.at[(year, period)]),
+        }
+        for column in columns:
+            row[f'budget_{column}'] = _to_float(budget.at[(year, period), column])
+            row[f'actual_{column}'] = _to_float(actual.at[(year, period), column])
+            row[f'{column}_diff'] = _to_float(diff.at[(year, period), column])
+            row[f'{column}_achievement_rate'] = _to_float(achievement_rate.at[(year, period), column])
+        results[year].append(row)
+    return results
+
+
+def _to_int(value: Any) -> Optional[int]:
+    return None if pd.isna(value) else int(value)
+
+
+def _to_float(value: Any) -> Optional[float]:
+    return None if pd.isna(value) else float(value)
@@ -0,0 +1,296 @@
+"""
+予算シナリオのシミュレーション（what-if の感度分析）
+
+前期実績（FiscalSummary_Year）をベースに、次のドライバーの候補値の全組み合わせについて
+予算年度の損益・現預金・借入残高を計算する。計算はNumPyの配列演算で一度に行うため、
+数百通りのシナリオでもAIを呼び出さずにすぐ比較できる。
+
+ドライバー:
+    - sales_growth: 売上高成長率（%）
+    - gross_margin_change: 売上総利益率の変化（ポイント）
+    - sga_growth: 販管費の増加率（%）
+    - new_borrowing: 新規借入額（千円、期首に借入）
+    - interest_rate_change: 金利の変化（ポイント、既存借入・新規借入の両方に適用）
+
+既存借入の返済額・利息は、借入の返済スケジュール（Debt.balance_after_months）から計算する。
+
+使い方:
+    schedule = load_debt_schedule(company, base.year, base.year + 1)
+    grid = simulate_scenarios(base, ScenarioDrivers(sales_growth=[0, 5, 10]), schedule)
+    grid.rows()            # シナリオごとの結果
+    grid.budget_data(0)    # シナリオを年次予算（FiscalSummary_Year）の値に変換
+"""
+from dataclasses import dataclass, field
+from itertools import product
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from ..models import Company, Debt, FiscalSummary_Year
+
+# 法人税等の実効税率（経常利益がプラスの場合のみ課税）
+TAX_RATE = 0.30
+# 新規借入の返済期間（月、期首から元金均等返済）
+NEW_BORROWING_MONTHS = 60
+# 既存借入がない場合の新規借入の金利（%）
+DEFAULT_INTEREST_RATE = 2.0
+# 1回のシミュレーションで計算するシナリオ数の上限
+MAX_SCENARIOS = 1000
+
+DRIVER_NAMES = ['sales_growth', 'gross_margin_change', 'sga_growth', 'new_borrowing', 'interest_rate_change']
+DRIVER_LABELS = {
+    'sales_growth': '売上高成長率（%）',
+    'gross_margin_change': '粗利率の変化（pt）',
+    'sga_growth': '販管費増加率（%）',
+    'new_borrowing': '新規借入額（千円）',
+    'interest_rate_change': '金利の変化（pt）',
+}
+RESULT_LABELS = {
+    'sales': '売上高',
+    'gross_profit': '粗利益',
+    'operating_profit': '営業利益',
+    'interest_expense': '支払利息',
+    'ordinary_profit': '経常利益',
+    'net_profit': '当期純利益',
+    'cash_and_deposits': '期末現預金',
+    'debt_balance': '期末借入残高',
+    'debt_repayment': '年間返済額',
+}
+
+
+@dataclass
+class ScenarioDrivers:
+    """ドライバーごとの候補値"""
+    sales_growth: Sequence[float] = (0.0,)
+    gross_margin_change: Sequence[float] = (0.0,)
+    sga_growth: Sequence[float] = (0.0,)
+    new_borrowing: Sequence[float] = (0.0,)
+    interest_rate_change: Sequence[float] = (0.0,)
+
+    @property
+    def scenario_count(self) -> int:
+        count = 1
+        for name in DRIVER_NAMES:
+            count *= len(getattr(self, name))
+        return count
+
+
+@dataclass
+class DebtSchedule:
+    """既存借入の予算年度の返済スケジュール（千円）"""
+    opening_balance: float = 0.0
+    closing_balance: float = 0.0
+    interest: float = 0.0
+    # 残高加重平均の金利（%、既存借入がない場合はNone）
+    average_rate: Any = None
+
+    @property
+    def repayment(self) -> float:
+        return self.opening_balance - self.closing_balance
+
+
+def load_debt_schedule(company: Company, base_year: int, target_year: int) -> DebtSchedule:
+    """
+    既存借入の予算年度の期首・期末残高と利息
+
+    予算年度の期末を「次の決算期から (target_year - base_year - 1) 年後の決算期」とし、
+    calculate_debt_balance_at_year_end（balance_fy1〜）と同じ時点の残高を返済スケジュールから求める。
+    """
+    years_ahead = max(1, target_year - base_year)
+    schedule = DebtSchedule()
+    weighted_rate = 0.0
+    for debt in Debt.objects.filter(company=company, is_nodisplay=False).select_related('company'):
+        months_to_year_end = debt.elapsed_months + debt.fiscal_year_months + 12 * (years_ahead - 1)
+        opening, _ = debt.balance_after_months(months_to_year_end - 12)
+        closing, _ = debt.balance_after_months(months_to_year_end)
+        interest = sum(
+            float(debt.balance_after_months(months_to_year_end - 12 + month)[1]) for month in range(1, 13)
+        )
+        schedule.opening_balance += float(opening) / 1000
+        schedule.closing_balance += float(closing) / 1000
+        schedule.interest += interest / 1000
+        weighted_rate += float(opening) * float(debt.interest_rate)
+    if schedule.opening_balance > 0:
+        schedule.average_rate = weighted_rate / 1000 / schedule.opening_balance
+    return schedule
+
+
+@dataclass
+class ScenarioGrid:
+    """シミュレーション結果（各配列の要素がシナリオ）"""
+    base: FiscalSummary_Year
+    target_year: int
+    drivers: Dict[str, np.ndarray]
+    results: Dict[str, np.ndarray]
+    investment_amount: int = 0
+    capital_increase: int = 0
+    details: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.results['sales'])
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """シナリオごとの {'index', ドライバー..., 結果...}（結果は千円単位に丸める）"""
+        return [
+            {
+                'index': index,
+                **{name: float(values[index]) for name, values in self.drivers.items()},
+                **{name: int(round(values[index])) for name, values in self.results.items()},
+            }
+            for index in range(len(self))
+        ]
+
+    def budget_data(self, index: int) -> Dict[str, int]:
+        """
+        シナリオを年次予算（FiscalSummary_Year）のフィールドの値に変換
+
+        売上債権・棚卸資産・仕入債務は売上高に比例させ、固定資産は投資額を加え減価償却費を引く。
+        貸借対照表は資産合計 = 負債合計 + 純資産合計 となる。
+        """
+        base = self.base
+        value = {name: float(values[index]) for name, values in {**self.results, **self.details}.items()}
+        growth = value['sales'] / base.sales if base.sales else 1.0
+
+        accounts_receivable = base.accounts_receivable * growth
+        inventory = base.inventory * growth
+        accounts_payable = base.accounts_payable * growth
+        total_current_assets = (
+            base.total_current_assets - base.cash_and_deposits - base.accounts_receivable - base.inventory
+            + value['cash_and_deposits'] + accounts_receivable + inventory
+        )
+        total_fixed_assets = base.total_fixed_assets + self.investment_amount - value['depreciation']
+        total_assets = base.total_assets - base.total_current_assets - base.total_fixed_assets + total_current_assets + total_fixed_assets
+
+        debt_balance = value['debt_balance']
+        short_term_loans = min(debt_balance, base.short_term_loans_payable)
+        total_liabilities = (
+            base.total_liabilities - base.accounts_payable - base.short_term_loans_payable - base.long_term_loans_payable
+            + accounts_payable + debt_balance
+        )
+        total_net_assets = base.total_net_assets + value['net_profit'] + self.capital_increase
+
+        data = {
+            'sales': value['sales'],
+            'gross_profit': value['gross_profit'],
+            'operating_profit': value['operating_profit'],
+            'interest_expense': value['interest_expense'],
+            'ordinary_profit': value['ordinary_profit'],
+            'income_taxes': value['income_taxes'],
+            'net_profit': value['net_profit'],
+            'cash_and_deposits': value['cash_and_deposits'],
+            'accounts_receivable': accounts_receivable,
+            'inventory': inventory,
+            'total_current_assets': total_current_assets,
+            'total_fixed_assets': total_fixed_assets,
+            'total_assets': total_assets,
+            'accounts_payable': accounts_payable,
+            'short_term_loans_payable': short_term_loans,
+            'long_term_loans_payable': debt_balance - short_term_loans,
+            'total_liabilities': total_liabilities,
+            'capital_stock': base.capital_stock + self.capital_increase,
+            'retained_earnings': base.retained_earnings + value['net_profit'],
+            'total_net_assets': total_net_assets,
+        }
+        data = {name: int(round(amount)) for name, amount in data.items()}
+        # 端数の丸めで貸借がずれないよう、資産合計は負債合計 + 純資産合計にそろえる
+        data['total_assets'] = data['total_liabilities'] + data['total_net_assets']
+        return data
+
+
+def _driver_grid(drivers: ScenarioDrivers) -> Dict[str, np.ndarray]:
+    """ドライバーの全組み合わせ（各ドライバーの配列の長さはシナリオ数）"""
+    combinations = np.array(list(product(*(getattr(drivers, name) for name in DRIVER_NAMES))), dtype=float)
+    return {name: combinations[:, position] for position, name in enumerate(DRIVER_NAMES)}
+
+
+def simulate_scenarios(
+    base: FiscalSummary_Year,
+    drivers: ScenarioDrivers,
+    debt_schedule: DebtSchedule,
+    target_year: int = None,
+    investment_amount: int = 0,
+    capital_increase: int = 0,
+) -> ScenarioGrid:
+    """
+    ドライバーの全組み合わせについて予算年度の損益・現預金・借入残高を計算
+
+    Args:
+        base: 前期実績
+        drivers: ドライバーごとの候補値
+        debt_schedule: 既存借入の返済スケジュール（load_debt_schedule）
+        target_year: 予算年度（省略時は前期の翌年度）
+        investment_amount: 設備投資額（千円）
+        capital_increase: 資本金増加額（千円）
+
+    Raises:
+        ValueError: シナリオ数が MAX_SCENARIOS を超える場合
+    """
+    if drivers.scenario_count > MAX_SCENARIOS:
+        raise ValueError(f'シナリオ数が多すぎます（{drivers.scenario_count}通り、上限{MAX_SCENARIOS}通り）')
+    grid = _driver_grid(drivers)
+
+    # 損益
+    sales = base.sales * (1 + grid['sales_growth'] / 100)
+    base_margin = base.gross_profit / base.sales if base.sales else 0.0
+    gross_profit = sales * (base_margin + grid['gross_margin_change'] / 100)
+    sga = (base.gross_profit - base.operating_profit) * (1 + grid['sga_growth'] / 100)
+    operating_profit = gross_profit - sga
+
+    # 借入（新規借入は期首に借入し、NEW_BORROWING_MONTHS か月の元金均等返済）
+    new_borrowing = grid['new_borrowing']
+    new_repayment = new_borrowing * min(1.0, 12 / NEW_BORROWING_MONTHS)
+    new_closing = new_borrowing - new_repayment
+    base_rate = debt_schedule.average_rate if debt_schedule.average_rate is not None else DEFAULT_INTEREST_RATE
+    rate_change = grid['interest_rate_change'] / 100
+    existing_average = (debt_schedule.opening_balance + debt_schedule.closing_balance) / 2
+    interest_expense = (
+        debt_schedule.interest
+        + existing_average * rate_change
+        + (new_borrowing + new_closing) / 2 * (base_rate / 100 + rate_change)
+    )
+
+    # 営業外収益・費用（支払利息以外）は前期と同額
+    other_non_operating = base.ordinary_profit - base.operating_profit + base.interest_expense
+    ordinary_profit = operating_profit + other_non_operating - interest_expense
+    income_taxes = np.maximum(ordinary_profit, 0) * TAX_RATE
+    net_profit = ordinary_profit - income_taxes
+
+    # 現預金（運転資本は売上高に比例して増減）
+    depreciation = base.depreciation_expense + base.depreciation_cogs
+    working_capital = base.accounts_receivable + base.inventory - base.accounts_payable
+    working_capital_change = working_capital * grid['sales_growth'] / 100
+    debt_repayment = debt_schedule.repayment + new_repayment
+    cash_and_deposits = (
+        base.cash_and_deposits
+        + net_profit + depreciation - working_capital_change
+        - investment_amount
+        + new_borrowing - debt_repayment
+        + capital_increase
+    )
+    # 期末借入残高（前期の貸借対照表の借入金から返済額を引き、新規借入を加える）
+    debt_balance = (
+        base.short_term_loans_payable + base.long_term_loans_payable - debt_schedule.repayment + new_closing
+    )
+
+    return ScenarioGrid(
+        base=base,
+        target_year=target_year or base.year + 1,
+        drivers=grid,
+        results={
+            'sales': sales,
+            'gross_profit': gross_profit,
+            'operating_profit': operating_profit,
+            'interest_expense': interest_expense,
+            'ordinary_profit': ordinary_profit,
+            'net_profit': net_profit,
+            'cash_and_deposits': cash_and_deposits,
+            'debt_balance': debt_balance,
+            'debt_repayment': debt_repayment,
+        },
+        investment_amount=investment_amount,
+        capital_increase=capital_increase,
+        details={
+            'income_taxes': income_taxes,
+            'depreciation': np.full_like(sales, float(depreciation)),
+        },
+    )
@@ -0,0 +1,137 @@
+"""
+借入の集計（金融機関別・保証別など）を提供するサービス
+
+借入一覧（DebtService.get_debt_list_with_totals）を1回だけ走査して、指定したすべての集計キーごとに
+元本・月返済額・月次残高・月次利息・決算期残高の合計を作成する。
+月次残高・利息は Debt のプロパティ（返済予定から計算し、company_cache に保存）なので、
+借入1件につき1回だけ参照する。絞り込みは借入を取得するクエリセット（SQL）で行う。
+
+使い方:
+    analytics = get_debt_analytics(company)                       # すべての借入、既定の集計
+    analytics = get_debt_analytics(company, debts=filter.qs, groupings={})  # 絞り込み後の借入、集計なし
+    context.update(analytics.context())
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.db.models import QuerySet
+
+from ..models import Company, Debt
+from .debt_service import DebtService
+
+# 集計名とキー（テンプレートでは debt_list_<集計名> として参照する）
+DEFAULT_GROUPINGS: Dict[str, Tuple[str, ...]] = {
+    'byBank': ('financial_institution',),
+    'bySecuredType': ('secured_type',),
+    'bySecuredByManagement': ('is_securedby_management',),
+    'byCollateraled': ('is_collateraled',),
+    'byBankAndSecuredType': ('financial_institution', 'secured_type'),
+}
+
+MONTHS = 12
+
+
+def _empty_group() -> Dict[str, Any]:
+    return {
+        'principal': 0,
+        'monthly_repayment': 0,
+        'balances_monthly': [0] * MONTHS,
+        'interest_amount_monthly': [0] * MONTHS,
+        'balance_fy1': 0,
+    }
+
+
+def group_debts(
+    debt_list: Iterable[Dict[str, Any]],
+    groupings: Optional[Dict[str, Sequence[str]]] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    借入リストを1回の走査ですべての集計キーごとに集計
+
+    Args:
+        debt_list: 借入データのリスト（get_debt_list_with_totals の debt_list）
+        groupings: {集計名: キーのタプル}（省略時は DEFAULT_GROUPINGS）
+
+    Returns:
+        {集計名: [{キー: 値, ..., 'principal', 'monthly_repayment', 'balances_monthly',
+                   'interest_amount_monthly', 'balance_fy1'}, ...]}（各集計は最初に出現した順）
+    """
+    if groupings is None:
+        groupings = DEFAULT_GROUPINGS
+    groups: Dict[str, Dict[Tuple, Dict[str, Any]]] = {name: {} for name in groupings}
+
+    for debt in debt_list:
+        balances_monthly = debt['balances_monthly']
+        interest_amount_monthly = debt['interest_amount_monthly']
+        for name, keys in groupings.items():
+            key = tuple(debt[field_name] for field_name in keys)
+            group = groups[name].get(key)
+            if group is None:
+                group = groups[name][key] = _empty_group()
+            group['principal'] += debt['principal']
+            group['monthly_repayment'] += debt['monthly_repayment']
+            group['balance_fy1'] += debt['balance_fy1']
+            group_balances = group['balances_monthly']
+            group_interest = group['interest_amount_monthly']
+            for i in range(MONTHS):
+                group_balances[i] += balances_monthly[i]
+                group_interest[i] += interest_amount_monthly[i]
+
+    return {
+        name: [{**dict(zip(groupings[name], key)), **values} for key, values in groups[name].items()]
+        for name in groupings
+    }
+
+
+@dataclass
+class DebtAnalytics:
+    """借入一覧・合計・集計の結果"""
+    debt_list: List[Dict[str, Any]]
+    totals: Dict[str, Any]
+    nodisplay: List[Debt]
+    rescheduled: List[Debt]
+    finished: List[Debt]
+    groups: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+
+    @property
+    def weighted_average_interest(self) -> List[float]:
+        return DebtService.calculate_weighted_average_interest(
+            self.totals['total_interest_amount_monthly'],
+            self.totals['total_balances_monthly']
+        )
+
+    def context(self) -> Dict[str, Any]:
+        """借入管理のテンプレート用のコンテキスト（debt_list, debt_list_totals, debt_list_byBank など）"""
+        return {
+            'debt_list': self.debt_list,
+            'debt_list_totals': self.totals,
+            'debt_list_nodisplay': self.nodisplay,
+            'debt_list_rescheduled': self.rescheduled,
+            'debt_list_finished': self.finished,
+            'weighted_average_interest': self.weighted_average_interest,
+            **{f'debt_list_{name}': groups for name, groups in self.groups.items()},
+        }
+
+
+def get_debt_analytics(
+    company: Company,
+    debts: Optional[QuerySet] = None,
+    groupings: Optional[Dict[str, Sequence[str]]] = None,
+) -> DebtAnalytics:
+    """
+    会社の借入一覧・合計・集計を作成
+
+    Args:
+        company: 対象となる会社
+        debts: 対象の借入のクエリセット（画面の絞り込み条件を適用したもの。省略時は会社のすべての借入）
+        groupings: {集計名: キーのタプル}（省略時は DEFAULT_GROUPINGS、{} の場合は集計しない）
+    """
+    debt_list, totals, nodisplay, rescheduled, finished = DebtService.get_debt_list_with_totals(company, debts)
+    return DebtAnalytics(
+        debt_list=debt_list,
+        totals=totals,
+        nodisplay=nodisplay,
+        rescheduled=rescheduled,
+        finished=finished,
+        groups=group_debts(debt_list, groupings),
+    )
@@ -1,7 +1,7 @@
 """
 借入管理に関するビジネスロジックを提供するサービス層
 """
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any
 from django.db.models import QuerySet
 from ..models import Debt, Company
 
@@ -31,7 +31,10 @@ class DebtService:
         )
     
     @staticmethod
-    def get_debt_list_with_totals(company: Company) -> Tuple[List[Dict[str, Any]], Dict[str, Any], List[Debt], List[Debt], List[Debt]]:
+    def get_debt_list_with_totals(
+        company: Company,
+        debts: Optional[QuerySet] = None
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any], List[Debt], List[Debt], List[Debt]]:
         """
         選択済みの会社の借入データを取得し、集計情報を返します。
         
@@ -40,6 +43,7 @@ class DebtService:
         
         Args:
             company: 対象となる会社オブジェクト
+            debts: 対象の借入のクエリセット（絞り込み済みのもの。省略時は会社のすべての借入）
             
         Returns:
             Tuple containing:
@@ -49,7 +53,14 @@ class DebtService:
             - debt_list_rescheduled: リスケ済みの借入リスト
             - debt_list_finished: 完済済みの借入リスト
         """
-        debts = DebtService.get_debt_queryset(company)
+        if debts is None:
+            debts = DebtService.get_debt_queryset(company)
+        else:
+            debts = debts.filter(company=company).select_related(
+                'financial_institution',
+                'secured_type',
+                'company'
+            )
         
         debt_list = []
         debt_list_rescheduled = []
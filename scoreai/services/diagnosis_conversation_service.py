@@ -0,0 +1,183 @@
+"""
+AI診断の会話（FiscalAIDiagnosisChatView）の管理
+
+会話はセッションではなく AIDiagnosisConversation に保存する。
+直近の発言が HISTORY_TOKEN_BUDGET を超えたら、古い発言を要約（summary）にまとめるため、
+会話が長くなってもGeminiに送るプロンプトの大きさは一定の範囲に収まる。
+診断用の財務データは会話の開始時に1回だけ収集し、レポートも1回だけ作成して再利用する。
+
+使い方:
+    conversation = start_conversation(user, fiscal_summary_year)   # 診断で情報が不足していたとき
+    reply = reply_to(conversation, '売上の内訳は...')
+    if is_report_ready(conversation):
+        report = get_report(conversation)
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+from ..models import AIDiagnosisConversation, FiscalSummary_Year
+from .diagnosis_report_service import save_report
+from ..utils.fiscal_ai_diagnosis import build_ai_diagnosis_prompt, collect_fiscal_data_for_diagnosis
+from ..utils.gemini import estimate_tokens, get_gemini_response
+
+logger = logging.getLogger(__name__)
+
+CHAT_MODEL = 'gemini-2.0-flash-exp'
+CHAT_SYSTEM_INSTRUCTION = """あなたは財務分析の専門家です。ユーザーから不足している財務情報を聞き出し、適切な質問をして情報を収集してください。
+情報が十分に集まったら、分析レポートを作成してください。"""
+SUMMARY_SYSTEM_INSTRUCTION = """あなたは会話の記録係です。財務診断のための会話を、ユーザーから得た事実・数値・要望を漏らさずに簡潔な箇条書きで要約してください。"""
+
+# 直近の発言として送るトークン数の上限（超えたら古い発言を要約にまとめる）
+HISTORY_TOKEN_BUDGET = 2000
+# 要約のトークン数の上限
+SUMMARY_TOKEN_BUDGET = 800
+# 要約にまとめずに残す直近の発言数
+RECENT_MESSAGES = 4
+# レポートを作成する発言数（3往復）
+REPORT_READY_MESSAGES = 6
+
+
+def start_conversation(
+    user,
+    fiscal_summary_year: FiscalSummary_Year,
+    fiscal_data: Optional[Dict[str, Any]] = None,
+) -> AIDiagnosisConversation:
+    """
+    新しい会話を開始（前回の会話は破棄する）
+
+    Args:
+        fiscal_data: 収集済みの診断用データ（省略時はここで収集する）
+    """
+    if fiscal_data is None:
+        fiscal_data = collect_fiscal_data_for_diagnosis(fiscal_summary_year.company, fiscal_summary_year.year)
+    conversation, _ = AIDiagnosisConversation.objects.update_or_create(
+        user=user,
+        fiscal_summary_year=fiscal_summary_year,
+        defaults={
+            'summary': '',
+            'messages': [],
+            'message_count': 0,
+            'fiscal_data': fiscal_data,
+            'report': '',
+        },
+    )
+    return conversation
+
+
+def get_conversation(user, fiscal_summary_year: FiscalSummary_Year) -> AIDiagnosisConversation:
+    """続きの会話（なければ開始する）"""
+    conversation = AIDiagnosisConversation.objects.filter(user=user, fiscal_summary_year=fiscal_summary_year).first()
+    if conversation is None or conversation.fiscal_data is None:
+        return start_conversation(user, fiscal_summary_year)
+    return conversation
+
+
+def _messages_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(estimate_tokens(message['content']) for message in messages)
+
+
+def _format_messages(messages: List[Dict[str, str]]) -> str:
+    return "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+
+
+def _truncate(text: str, token_budget: int) -> str:
+    """トークン数の上限に収まるよう末尾を切り詰める"""
+    if estimate_tokens(text) <= token_budget:
+        return text
+    while text and estimate_tokens(text) > token_budget:
+        text = text[:int(len(text) * 0.9)]
+    return text + '…'
+
+
+def summarize_messages(summary: str, messages: List[Dict[str, str]]) -> str:
+    """
+    これまでの要約に古い発言を加えた新しい要約
+
+    Geminiで要約できない場合は、各発言の先頭を並べたものを要約とする。
+    """
+    prompt_parts = []
+    if summary:
+        prompt_parts.append(f"## これまでの要約\n{summary}")
+    prompt_parts.append(f"## 追加する会話\n{_format_messages(messages)}")
+    prompt_parts.append("上記をまとめて、1つの要約にしてください。")
+    try:
+        new_summary = get_gemini_response(
+            prompt="\n\n".join(prompt_parts),
+            system_instruction=SUMMARY_SYSTEM_INSTRUCTION,
+            model=CHAT_MODEL,
+        )
+    except Exception as e:
+        logger.warning(f"Failed to summarize diagnosis conversation: {e}")
+        new_summary = None
+    if not new_summary:
+        lines = [summary] if summary else []
+        lines += [f"- {message['role']}: {_truncate(message['content'], 100)}" for message in messages]
+        new_summary = "\n".join(lines)
+    return _truncate(new_summary, SUMMARY_TOKEN_BUDGET)
+
+
+def compact(conversation: AIDiagnosisConversation) -> bool:
+    """
+    直近の発言が HISTORY_TOKEN_BUDGET を超えていれば、古い発言を要約にまとめる（保存はしない）
+
+    Returns:
+        要約した場合True
+    """
+    messages = conversation.messages
+    if len(messages) <= RECENT_MESSAGES or _messages_tokens(messages) <= HISTORY_TOKEN_BUDGET:
+        return False
+    # 直近 RECENT_MESSAGES 件は必ず残し、それより前は予算に収まるまで要約に回す
+    split = len(messages) - RECENT_MESSAGES
+    while split < len(messages) - 1 and _messages_tokens(messages[split:]) > HISTORY_TOKEN_BUDGET:
+        split += 1
+    conversation.summary = summarize_messages(conversation.summary, messages[:split])
+    conversation.messages = messages[split:]
+    return True
+
+
+def build_chat_prompt(conversation: AIDiagnosisConversation) -> str:
+    """要約と直近の発言から会話の続きを依頼するプロンプト"""
+    prompt_parts = []
+    if conversation.summary:
+        prompt_parts.append(f"これまでの会話の要約：\n{conversation.summary}\n")
+    prompt_parts.append(f"以下の会話を続けてください：\n\n{_format_messages(conversation.messages)}\n\nassistant:")
+    return "\n".join(prompt_parts)
+
+
+def reply_to(conversation: AIDiagnosisConversation, user_message: str) -> str:
+    """ユーザーの発言にAIが応答し、会話を保存"""
+    conversation.messages = conversation.messages + [{'role': 'user', 'content': user_message}]
+    compact(conversation)
+
+    ai_response = get_gemini_response(
+        prompt=build_chat_prompt(conversation),
+        system_instruction=CHAT_SYSTEM_INSTRUCTION,
+        model=CHAT_MODEL,
+    )
+
+    conversation.messages = conversation.messages + [{'role': 'assistant', 'content': ai_response or ''}]
+    conversation.message_count += 2
+    conversation.save(update_fields=['summary', 'messages', 'message_count', 'updated_at'])
+    return ai_response
+
+
+def is_report_ready(conversation: AIDiagnosisConversation) -> bool:
+    """レポートを作成できるか（簡易版：会話が一定回数以上の場合）"""
+    return conversation.message_count >= REPORT_READY_MESSAGES
+
+
+def get_report(conversation: AIDiagnosisConversation) -> str:
+    """診断レポート（会話ごとに1回だけ作成し、以降は保存したものを返す）"""
+    if conversation.report:
+        return conversation.report
+    report = get_gemini_response(
+        prompt=build_ai_diagnosis_prompt(conversation.fiscal_data, missing_info=None),
+        system_instruction=CHAT_SYSTEM_INSTRUCTION,
+        model=CHAT_MODEL,
+    )
+    if report:
+        conversation.report = report
+        conversation.save(update_fields=['report', 'updated_at'])
+        # ダウンロード用に文書モデルに変換して保存
+        save_report(conversation.fiscal_summary_year, report, user=conversation.user)
+    return report
@@ -0,0 +1,386 @@
+"""
+AI診断レポートの文書モデルと出力（PDF・PPTX・Excel・Word）
+
+AIが作成したレポート（Markdown形式のテキスト）は保存時に1回だけ文書モデルに変換し、
+AIDiagnosisReport.document に保存する。各形式の出力は同じ文書モデルから作成するため、
+形式ごとに内容が食い違うことはない。出力したファイルは文書モデルのハッシュ（content_hash）と
+タイトルをキーにキャッシュするため、同じレポートの2回目以降のダウンロードは出力処理を行わない。
+
+文書モデル:
+    {'blocks': [
+        {'type': 'heading', 'level': 1 | 2 | 3, 'text': '...'},
+        {'type': 'paragraph', 'text': '...'},
+        {'type': 'list', 'items': ['...', ...]},
+        {'type': 'table', 'header': ['...', ...], 'rows': [['...', ...], ...]},
+        {'type': 'kpi', 'items': [{'label': '売上高', 'value': '1億2,000万円'}, ...]},
+    ]}
+
+使い方:
+    report = save_report(fiscal_summary_year, report_text, user=request.user)
+    content = render_report(report, 'pdf')
+"""
+import hashlib
+import json
+import logging
+import re
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ..models import AIDiagnosisReport, FiscalSummary_Year
+
+logger = logging.getLogger(__name__)
+
+# 出力処理を変更した場合に上げる（キャッシュ済みの古い出力を使わないため）
+RENDERER_VERSION = 2
+
+CACHE_KEY_PREFIX = 'diagnosis_report'
+DEFAULT_CACHE_TIMEOUT = 60 * 60 * 24 * 7  # 7日
+
+HEADING_PATTERN = re.compile(r'^(#{1,6})(?!#)\s*(.*)$')
+# 見出しのレベルの上限（レベル4以降は中見出しより下の小見出しとしてまとめる）
+MAX_HEADING_LEVEL = 3
+LIST_PATTERN = re.compile(r'^(?:[-*・]|\d+[.)])\s+(.*)$')
+# 「指標: 数値」（短い値のみ。説明文の箇条書きはKPIにしない）
+KPI_PATTERN = re.compile(r'^(.{1,30}?)\s*[:：]\s*(?=.*\d)(.{1,40})$')
+TABLE_SEPARATOR_PATTERN = re.compile(r'^\|?[\s:|-]+\|?$')
+
+
+# ========================================
+# 文書モデル
+# ========================================
+
+def _strip_inline(text: str) -> str:
+    """強調記号（**・__・`）を除く"""
+    return re.sub(r'(\*\*|__|`)', '', text).strip()
+
+
+def _split_table_row(line: str) -> List[str]:
+    return [_strip_inline(cell) for cell in line.strip().strip('|').split('|')]
+
+
+def _list_block(items: List[str]) -> Dict[str, Any]:
+    """箇条書き（すべての項目が「指標: 数値」の場合はKPI）"""
+    matches = [KPI_PATTERN.match(item) for item in items]
+    if all(matches):
+        return {
+            'type': 'kpi',
+            'items': [{'label': match.group(1).strip(), 'value': match.group(2).strip()} for match in matches],
+        }
+    return {'type': 'list', 'items': items}
+
+
+def _table_block(lines: List[str]) -> Optional[Dict[str, Any]]:
+    """表（区切り行だけで見出し行がない場合はNone）"""
+    rows = [_split_table_row(line) for line in lines if not TABLE_SEPARATOR_PATTERN.match(line)]
+    if not rows:
+        return None
+    header, body = rows[0], rows[1:]
+    width = len(header)
+    return {
+        'type': 'table',
+        'header': header,
+        'rows': [(row + [''] * width)[:width] for row in body],
+    }
+
+
+def parse_report(report_text: str) -> Dict[str, Any]:
+    """AIが作成したレポート（Markdown形式）を文書モデルに変換"""
+    blocks = []
+    list_items: List[str] = []
+    table_lines: List[str] = []
+
+    def flush():
+        if list_items:
+            blocks.append(_list_block(list(list_items)))
+            list_items.clear()
+        if table_lines:
+            table = _table_block(list(table_lines))
+            if table:
+                blocks.append(table)
+            table_lines.clear()
+
+    for raw_line in (report_text or '').splitlines():
+        line = raw_line.strip()
+        if line.startswith('|'):
+            if list_items:
+                flush()
+            table_lines.append(line)
+            continue
+        list_match = LIST_PATTERN.match(line)
+        if list_match:
+            if table_lines:
+                flush()
+            list_items.append(_strip_inline(list_match.group(1)))
+            continue
+
+        flush()
+        if not line or line in ('---', '***'):
+            continue
+        heading_match = HEADING_PATTERN.match(line)
+        if heading_match:
+            blocks.append({
+                'type': 'heading',
+                'level': min(len(heading_match.group(1)), MAX_HEADING_LEVEL),
+                'text': _strip_inline(heading_match.group(2)),
+            })
+        else:
+            blocks.append({'type': 'paragraph', 'text': _strip_inline(line)})
+    flush()
+    return {'blocks': blocks}
+
+
+def compute_content_hash(document: Dict[str, Any]) -> str:
+    """文書モデルのSHA-256"""
+    serialized = json.dumps(document, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+def save_report(fiscal_summary_year: FiscalSummary_Year, report_text: str, user=None) -> AIDiagnosisReport:
+    """レポートを文書モデルに変換して保存（年次財務諸表ごとに最新の1件）"""
+    document = parse_report(report_text)
+    report, _ = AIDiagnosisReport.objects.update_or_create(
+        fiscal_summary_year=fiscal_summary_year,
+        defaults={
+            'report_text': report_text,
+            'document': document,
+            'content_hash': compute_content_hash(document),
+            'created_by': user,
+        },
+    )
+    return report
+
+
+def get_saved_report(fiscal_summary_year: FiscalSummary_Year) -> Optional[AIDiagnosisReport]:
+    """保存済みのレポート（なければNone）"""
+    return AIDiagnosisReport.objects.filter(fiscal_summary_year=fiscal_summary_year).first()
+
+
+def get_report_title(fiscal_summary_year: FiscalSummary_Year) -> str:
+    return f"{fiscal_summary_year.company.name} - AI診断レポート（{fiscal_summary_year.year}年度）"
+
+
+def _sections(document: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """大・中見出し（レベル1・2）ごとに区切る（PDFの改ページ・PPTXのスライドの単位）"""
+    sections = []
+    current = {'heading': None, 'blocks': []}
+    for block in document.get('blocks', []):
+        if block['type'] == 'heading' and block['level'] <= 2:
+            if current['heading'] is not None or current['blocks']:
+                sections.append(current)
+            current = {'heading': block, 'blocks': []}
+        else:
+            current['blocks'].append(block)
+    if current['heading'] is not None or current['blocks']:
+        sections.append(current)
+    return sections
+
+
+# ========================================
+# 出力
+# ========================================
+
+def render_pdf(document: Dict[str, Any], title: str) -> bytes:
+    """PDF（大・中見出しごとに改ページ）"""
+    from .pdf_service import PdfDocument
+
+    pdf = PdfDocument(rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    pdf.title(title)
+    for index, section in enumerate(_sections(document)):
+        heading = section['heading']
+        if heading is not None:
+            if index > 0:
+                pdf.page_break()
+            pdf.paragraph(heading['text'], 'title' if heading['level'] == 1 else 'heading')
+        for block in section['blocks']:
+            if block['type'] == 'heading':
+                pdf.heading(block['text'])
+            elif block['type'] == 'paragraph':
+                pdf.paragraph(block['text'])
+            elif block['type'] == 'list':
+                for item in block['items']:
+                    pdf.paragraph(f"・{item}")
+            elif block['type'] == 'table':
+                pdf.table(block['header'], block['rows'])
+            elif block['type'] == 'kpi':
+                pdf.key_value_table([[item['label'], item['value']] for item in block['items']])
+            pdf.spacer(0.1)
+    return pdf.to_bytes()
+
+
+def render_pptx(document: Dict[str, Any], title: str) -> bytes:
+    """PPTX（大・中見出しごとに1枚のスライド）"""
+    from pptx import Presentation
+    from pptx.util import Inches, Pt
+
+    prs = Presentation()
+    prs.slide_width = Inches(10)
+    prs.slide_height = Inches(7.5)
+
+    for index, section in enumerate(_sections(document)):
+        slide = prs.slides.add_slide(prs.slide_layouts[6])  # 白紙レイアウト
+
+        title_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(9), Inches(1))
+        title_frame = title_box.text_frame
+        title_frame.word_wrap = True
+        title_frame.text = section['heading']['text'] if section['heading'] else title
+        title_frame.paragraphs[0].font.size = Pt(24)
+        title_frame.paragraphs[0].font.bold = True
+
+        content_frame = slide.shapes.add_textbox(Inches(0.5), Inches(1.5), Inches(9), Inches(5.5)).text_frame
+        content_frame.word_wrap = True
+
+        def add_line(text, bold=False, size=12):
+            # 最初の段落は空のまま作成されるため再利用する
+            p = content_frame.paragraphs[0] if not content_frame.text and len(content_frame.paragraphs) == 1 else content_frame.add_paragraph()
+            p.text = text
+            p.font.size = Pt(size)
+            p.font.bold = bold
+
+        for block in section['blocks']:
+            if block['type'] == 'heading':
+                add_line(block['text'], bold=True, size=14)
+            elif block['type'] == 'paragraph':
+                add_line(block['text'])
+            elif block['type'] == 'list':
+                for item in block['items']:
+                    add_line(f"・{item}")
+            elif block['type'] == 'table':
+                add_line(' | '.join(block['header']), bold=True)
+                for row in block['rows']:
+                    add_line(' | '.join(row))
+            elif block['type'] == 'kpi':
+                for item in block['items']:
+                    add_line(f"{item['label']}: {item['value']}", bold=True)
+
+    buffer = BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+
+def render_excel(document: Dict[str, Any], title: str) -> bytes:
+    """Excel（1シート。表・KPIはセルに分けて出力）"""
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, Font, PatternFill
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "AI診断レポート"
+
+    ws['A1'] = title
+    ws['A1'].font = Font(size=16, bold=True)
+    ws.merge_cells('A1:D1')
+
+    header_fill = PatternFill(start_color='DCE6F1', end_color='DCE6F1', fill_type='solid')
+    heading_sizes = {1: 14, 2: 12, 3: 11}
+    row = 3
+
+    def write_row(values, bold=False, fill=None):
+        nonlocal row
+        for column, value in enumerate(values, start=1):
+            cell = ws.cell(row=row, column=column, value=value)
+            cell.alignment = Alignment(wrap_text=True, vertical='top')
+            if bold:
+                cell.font = Font(bold=True)
+            if fill:
+                cell.fill = fill
+        row += 1
+
+    for block in document.get('blocks', []):
+        if block['type'] == 'heading':
+            if row > 3:
+                row += 1
+            ws.cell(row=row, column=1, value=block['text']).font = Font(bold=True, size=heading_sizes[block['level']])
+            row += 1
+        elif block['type'] == 'paragraph':
+            write_row([block['text']])
+        elif block['type'] == 'list':
+            for item in block['items']:
+                write_row([f"・{item}"])
+        elif block['type'] == 'table':
+            write_row(block['header'], bold=True, fill=header_fill)
+            for table_row in block['rows']:
+                write_row(table_row)
+        elif block['type'] == 'kpi':
+            for item in block['items']:
+                write_row([item['label'], item['value']])
+                label_cell = ws.cell(row=row - 1, column=1)
+                label_cell.font = Font(bold=True)
+                label_cell.fill = header_fill
+
+    ws.column_dimensions['A'].width = 60
+    for column in ('B', 'C', 'D', 'E'):
+        ws.column_dimensions[column].width = 20
+
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def render_docx(document: Dict[str, Any], title: str) -> bytes:
+    """Word"""
+    from docx import Document
+
+    doc = Document()
+    doc.add_heading(title, level=0)
+
+    for block in document.get('blocks', []):
+        if block['type'] == 'heading':
+            doc.add_heading(block['text'], level=block['level'])
+        elif block['type'] == 'paragraph':
+            doc.add_paragraph(block['text'])
+        elif block['type'] == 'list':
+            for item in block['items']:
+                doc.add_paragraph(item, style='List Bullet')
+        elif block['type'] in ('table', 'kpi'):
+            if block['type'] == 'table':
+                rows = [block['header']] + block['rows']
+            else:
+                rows = [[item['label'], item['value']] for item in block['items']]
+            table = doc.add_table(rows=len(rows), cols=len(rows[0]))
+            table.style = 'Table Grid'
+            for row_cells, values in zip(table.rows, rows):
+                for cell, value in zip(row_cells.cells, values):
+                    cell.text = value
+            if block['type'] == 'table':
+                for cell in table.rows[0].cells:
+                    for run in cell.paragraphs[0].runs:
+                        run.bold = True
+
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+# 形式 → (出力関数, Content-Type, 拡張子, 必要なライブラリ)
+RENDERERS: Dict[str, tuple] = {
+    'pdf': (render_pdf, 'application/pdf', 'pdf', 'reportlab'),
+    'pptx': (render_pptx, 'application/vnd.openxmlformats-officedocument.presentationml.presentation', 'pptx', 'python-pptx'),
+    'excel': (render_excel, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx', 'openpyxl'),
+    'docx': (render_docx, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'docx', 'python-docx'),
+}
+
+
+def _cache_key(report: AIDiagnosisReport, format_type: str, title: str) -> str:
+    title_hash = hashlib.sha256(title.encode('utf-8')).hexdigest()[:16]
+    return f'{CACHE_KEY_PREFIX}:{format_type}:v{RENDERER_VERSION}:{report.content_hash}:{title_hash}'
+
+
+def render_report(report: AIDiagnosisReport, format_type: str, title: Optional[str] = None) -> bytes:
+    """
+    レポートを指定の形式で出力（内容のハッシュごとにキャッシュ）
+
+    Raises:
+        KeyError: 未対応の形式
+        ImportError: 出力に必要なライブラリがインストールされていない場合
+    """
+    renderer: Callable[[Dict[str, Any], str], bytes] = RENDERERS[format_type][0]
+    title = title or get_report_title(report.fiscal_summary_year)
+    key = _cache_key(report, format_type, title)
+    content = cache.get(key)
+    if content is None:
+        content = renderer(report.document, title)
+        cache.set(key, content, getattr(settings, 'DIAGNOSIS_REPORT_CACHE_TIMEOUT', DEFAULT_CACHE_TIMEOUT))
+    return content
@@ -10,8 +10,6 @@ from django.utils import timezone
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
-# フォント登録時の警告を抑制（起動時のログノイズを減らす）
-logging.getLogger('reportlab').setLevel(logging.ERROR)
 
 # オプショナルな依存関係のチェック
 try:
@@ -23,68 +21,7 @@ except ImportError:
     OPENPYXL_AVAILABLE = False
     logger.warning("openpyxl is not installed. Excel export will not be available.")
 
-try:
-    from reportlab.lib.pagesizes import A4, letter
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-    from reportlab.lib import colors
-    from reportlab.pdfbase import pdfmetrics
-    from reportlab.pdfbase.ttfonts import TTFont
-    import os
-    REPORTLAB_AVAILABLE = True
-    
-    # 日本語フォントの登録を試行
-    try:
-        # フォントファイルのパスを確認（複数の可能性のあるパスを試す）
-        font_paths = [
-            # macOS システムフォント（実際に存在するフォントを優先）
-            '/System/Library/Fonts/AppleSDGothicNeo.ttc',  # macOS で確認済み（最優先）
-            '/System/Library/Fonts/Supplemental/Hiragino Sans GB.ttc',
-            '/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc',
-            '/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc',
-            '/Library/Fonts/ヒラギノ角ゴシック W3.ttc',
-            '/Library/Fonts/ヒラギノ角ゴシック W6.ttc',
-            # Linux (IPAゴシック)
-            '/usr/share/fonts/truetype/ipafont/ipagp.ttf',
-            '/usr/share/fonts/opentype/ipafont-gothic/ipagp.ttf',
-            # Windows
-            'C:/Windows/Fonts/msgothic.ttc',
-            'C:/Windows/Fonts/meiryo.ttc',
-            # プロジェクト内
-            os.path.join(os.path.dirname(__file__), '../../static/fonts/ipaexg.ttf'),
-            os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'static/scoreai/fonts/ipaexg.ttf'),
-        ]
-        
-        font_registered = False
-        for font_path in font_paths:
-            if os.path.exists(font_path):
-                try:
-                    pdfmetrics.registerFont(TTFont('JapaneseFont', font_path))
-                    font_registered = True
-                    # 成功時のみinfoレベルで記録（起動時のログを抑制）
-                    if logger.isEnabledFor(logging.INFO):
-                        logger.info(f"Japanese font registered: {font_path}")
-                    break
-                except Exception as e:
-                    # エラーはdebugレベルで記録（起動時の警告を抑制）
-                    logger.debug(f"Failed to register font {font_path}: {e}")
-                    continue
-        
-        if not font_registered:
-            # 警告レベルを下げる（フォントが見つからなくてもアプリケーションは動作する）
-            # 起動時の警告を抑制するため、debugレベルに変更
-            logger.debug("Japanese font not found. PDF export will use default font (may have character encoding issues).")
-            JAPANESE_FONT_AVAILABLE = False
-        else:
-            JAPANESE_FONT_AVAILABLE = True
-    except Exception as e:
-        logger.debug(f"Error registering Japanese font: {e}")
-        JAPANESE_FONT_AVAILABLE = False
-except ImportError:
-    REPORTLAB_AVAILABLE = False
-    JAPANESE_FONT_AVAILABLE = False
-    logger.warning("reportlab is not installed. PDF export will not be available.")
+from .pdf_service import REPORTLAB_AVAILABLE, PdfDocument
 
 
 class ExportService:
@@ -247,88 +184,19 @@ class ExportService:
         if not REPORTLAB_AVAILABLE:
             raise ImportError("reportlab is not installed. Please install it: pip install reportlab")
         
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        story = []
-        
-        # スタイルの定義
-        styles = getSampleStyleSheet()
-        
-        # 日本語フォントが利用可能な場合は使用
-        font_name = 'JapaneseFont' if JAPANESE_FONT_AVAILABLE else 'Helvetica'
-        header_font_name = 'JapaneseFont' if JAPANESE_FONT_AVAILABLE else 'Helvetica-Bold'
-        
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=16,
-            textColor=colors.HexColor('#366092'),
-            spaceAfter=30,
-            alignment=1,  # 中央揃え
-            fontName=font_name
-        )
-        
-        normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=styles['Normal'],
-            fontName=font_name
-        )
-        
-        # タイトル
-        story.append(Paragraph(title, title_style))
-        story.append(Spacer(1, 0.2 * inch))
+        pdf = PdfDocument()
+        pdf.title(title)
         
         # 追加情報の表示
         if additional_info:
-            info_text = []
-            for key, value in additional_info.items():
-                info_text.append(f"<b>{key}:</b> {value}")
-            story.append(Paragraph("<br/>".join(info_text), normal_style))
-            story.append(Spacer(1, 0.2 * inch))
-        
-        # テーブルの作成
-        # 日本語フォントが利用可能な場合は、データをParagraphに変換
-        if JAPANESE_FONT_AVAILABLE:
-            table_data = [[Paragraph(str(h), normal_style) for h in headers]]
-            for row in data:
-                table_data.append([Paragraph(str(cell), normal_style) for cell in row])
-        else:
-            table_data = [headers] + data
-        
-        # テーブルのスタイル
-        table_style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), header_font_name),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-        ])
-        
-        if JAPANESE_FONT_AVAILABLE:
-            table_style.add('FONTNAME', (0, 1), (-1, -1), font_name)
+            pdf.info(additional_info)
         
-        table = Table(table_data, repeatRows=1)
-        table.setStyle(table_style)
-        story.append(table)
+        # テーブル（行数が多い場合は分割してレイアウト）
+        pdf.table(headers, data)
         
         # フッター（生成日時）
-        story.append(Spacer(1, 0.3 * inch))
-        footer_text = f"生成日時: {timezone.now().strftime('%Y年%m月%d日 %H:%M:%S')}"
-        story.append(Paragraph(footer_text, normal_style))
+        pdf.spacer(0.3)
+        pdf.paragraph(f"生成日時: {timezone.now().strftime('%Y年%m月%d日 %H:%M:%S')}")
         
-        # PDFの生成
-        doc.build(story)
-        
-        # レスポンスの作成
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        response.write(buffer.getvalue())
-        buffer.close()
-        
-        return response
+        return pdf.to_response(filename)
 
@@ -0,0 +1,311 @@
+"""
+居酒屋出店計画のシナリオ分析（what-if の感度分析）
+
+1つの計画（IzakayaPlan）をベースに、次のドライバーの候補値の全組み合わせについて
+月間売上・原価・経費・利益と初期投資の回収期間を計算する。計算はNumPyの配列演算で一度に行うため、
+計画を1項目ずつ修正して保存し直さなくても、数千通りのシナリオをすぐ比較できる。
+
+ドライバー（昼・夜の両方の時間帯に適用）:
+    - price_change: 客単価の変化率（%）
+    - customer_change: 客数の変化率（%）
+    - operating_days_change: 営業曜日数の増減（日/週、営業している時間帯のみ。1〜7日の範囲）
+    - monthly_rent: 月額家賃（円）
+    - cost_rate_change: 原価率の変化（ポイント）
+
+ベースのシナリオ（変化率0・計画の家賃）の結果は IzakayaPlanService.calculate_all と円単位で一致する
+（時間帯ごとの売上・原価・経費は同じく1円未満を四捨五入する）。
+
+使い方:
+    grid = simulate_plan_scenarios(plan, IzakayaScenarioDrivers(price_change=[-10, 0, 10], customer_change=[-20, 0, 20]))
+    grid.rows()                                            # シナリオごとの結果
+    grid.surface('monthly_profit', 'price_change', 'customer_change')  # 2つのドライバーの損益の表
+    grid.payback_distribution()                            # 回収期間の分布
+"""
+from dataclasses import dataclass, field
+from itertools import product
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..models import IzakayaPlan
+
+# 1か月あたりの各曜日の出現回数（IzakayaPlanService.calculate_time_slot_revenue と同じ）
+DAYS_PER_WEEKDAY = 4.33
+# 回収不可能な場合の回収期間（IzakayaPlanService.calculate_payback_period と同じ）
+NOT_RECOVERABLE = 999
+# 1回のシミュレーションで計算するシナリオ数の上限
+MAX_SCENARIOS = 10000
+
+DRIVER_NAMES = ['price_change', 'customer_change', 'operating_days_change', 'monthly_rent', 'cost_rate_change']
+DRIVER_LABELS = {
+    'price_change': '客単価の変化率（%）',
+    'customer_change': '客数の変化率（%）',
+    'operating_days_change': '営業曜日数の増減（日/週）',
+    'monthly_rent': '月額家賃（円）',
+    'cost_rate_change': '原価率の変化（pt）',
+}
+RESULT_LABELS = {
+    'monthly_revenue': '月間売上',
+    'monthly_cost_of_goods_sold': '月間売上原価',
+    'monthly_gross_profit': '月間粗利益',
+    'monthly_cost': '月間経費',
+    'monthly_profit': '月間利益',
+    'break_even_customers': '損益分岐点の客数（人/日）',
+}
+# 回収期間の分布の区分（上限の月数、ラベル）
+PAYBACK_BUCKETS = [
+    (12, '1年以内'),
+    (24, '1年超〜2年'),
+    (36, '2年超〜3年'),
+    (60, '3年超〜5年'),
+    (120, '5年超〜10年'),
+    (np.inf, '10年超'),
+]
+
+
+@dataclass
+class IzakayaScenarioDrivers:
+    """ドライバーごとの候補値（monthly_rent を省略した場合は計画の家賃）"""
+    price_change: Sequence[float] = (0.0,)
+    customer_change: Sequence[float] = (0.0,)
+    operating_days_change: Sequence[float] = (0.0,)
+    monthly_rent: Sequence[float] = ()
+    cost_rate_change: Sequence[float] = (0.0,)
+
+    def values(self, plan: IzakayaPlan) -> Dict[str, List[float]]:
+        values = {name: [float(value) for value in getattr(self, name)] for name in DRIVER_NAMES}
+        if not values['monthly_rent']:
+            values['monthly_rent'] = [float(plan.monthly_rent or 0)]
+        return values
+
+    @property
+    def scenario_count(self) -> int:
+        count = 1
+        for name in DRIVER_NAMES:
+            count *= max(len(getattr(self, name)), 1)
+        return count
+
+
+def _round_half_up(values: np.ndarray) -> np.ndarray:
+    """1円未満を四捨五入（Decimal の ROUND_HALF_UP と同じく、負の値は0から遠い方へ）"""
+    return np.sign(values) * np.floor(np.abs(values) + 0.5)
+
+
+@dataclass
+class _TimeSlot:
+    """時間帯（昼・夜）の計画値"""
+    price: float
+    customers: int
+    days: int
+    coefficient: float
+    cost_rate: float
+
+    @classmethod
+    def from_plan(cls, plan: IzakayaPlan, prefix: str) -> '_TimeSlot':
+        coefficients = getattr(plan, f'{prefix}_monthly_coefficients') or {}
+        return cls(
+            price=float(getattr(plan, f'{prefix}_price_per_customer') or 0),
+            customers=getattr(plan, f'{prefix}_customer_count') or 0,
+            days=len(getattr(plan, f'{prefix}_operating_days') or []),
+            coefficient=sum(coefficients.values()) / len(coefficients) if coefficients else 1.0,
+            cost_rate=float(getattr(plan, f'{prefix}_cost_rate') or 0),
+        )
+
+    def revenue(self, grid: Dict[str, np.ndarray], customer_factor: Any = None) -> np.ndarray:
+        """月間売上 = 客単価 × 客数 × 営業日数 × 月毎指数（時間帯ごとに四捨五入）"""
+        if self.days == 0:
+            return np.zeros_like(grid['price_change'])
+        # 客単価は計画と同じく1円単位（客数は変化率をそのまま反映する）
+        price = _round_half_up(self.price * (1 + grid['price_change'] / 100))
+        if customer_factor is None:
+            customer_factor = 1 + grid['customer_change'] / 100
+        customers = self.customers * customer_factor
+        days = np.clip(self.days + grid['operating_days_change'], 1, 7)
+        # 整数の積を先に計算して、計画の値では Decimal と同じ値になるようにする
+        revenue = _round_half_up(price * customers * (days * 433) * self.coefficient / 100)
+        return np.where((price > 0) & (customers > 0), revenue, 0.0)
+
+    def cost_rate_values(self, grid: Dict[str, np.ndarray]) -> np.ndarray:
+        return np.clip(self.cost_rate + grid['cost_rate_change'], 0, 100)
+
+
+def _is_legacy_plan(plan: IzakayaPlan, lunch: _TimeSlot, dinner: _TimeSlot) -> bool:
+    """時間帯別の売上がなく、旧フィールド（営業時間・席数）で売上を計算する計画"""
+    has_time_slots = any(slot.days and slot.price > 0 and slot.customers > 0 for slot in (lunch, dinner))
+    return not has_time_slots and bool(plan.opening_hours_start and plan.opening_hours_end)
+
+
+@dataclass
+class IzakayaScenarioGrid:
+    """シミュレーション結果（各配列の要素がシナリオ。形状は各ドライバーの候補数の直積）"""
+    plan: IzakayaPlan
+    drivers: Dict[str, np.ndarray]
+    results: Dict[str, np.ndarray]
+    shape: Tuple[int, ...]
+    driver_values: Dict[str, List[float]]
+    details: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.results['monthly_revenue'])
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """シナリオごとの {'index', ドライバー..., 結果..., 'payback_period_years', 'payback_period_months'}"""
+        return [
+            {
+                'index': index,
+                **{name: float(values[index]) for name, values in self.drivers.items()},
+                **{name: _to_number(values[index]) for name, values in self.results.items()},
+                'payback_period_years': int(self.details['payback_period_years'][index]),
+                'payback_period_months': int(self.details['payback_period_months'][index]),
+            }
+            for index in range(len(self))
+        ]
+
+    def base_index(self) -> int:
+        """ベースのシナリオ（変化率0・計画の家賃。候補にない場合は最も近い値）の位置"""
+        base = {name: 0.0 for name in DRIVER_NAMES}
+        base['monthly_rent'] = float(self.plan.monthly_rent or 0)
+        positions = tuple(
+            int(np.argmin(np.abs(np.array(self.driver_values[name]) - base[name]))) for name in DRIVER_NAMES
+        )
+        return int(np.ravel_multi_index(positions, self.shape))
+
+    def surface(self, result: str, x: str, y: str) -> Dict[str, Any]:
+        """
+        2つのドライバーについての結果の表（その他のドライバーはベースのシナリオの値）
+
+        Returns:
+            {'x': xの候補, 'y': yの候補, 'values': [[y[0]のときの x ごとの値], ...], 'rows': [(y[0], values[0]), ...]}
+        """
+        values = self.results[result].reshape(self.shape)
+        base_positions = np.unravel_index(self.base_index(), self.shape)
+        index = [
+            slice(None) if name in (x, y) else base_positions[position]
+            for position, name in enumerate(DRIVER_NAMES)
+        ]
+        table = values[tuple(index)]
+        # 残った軸は DRIVER_NAMES の順なので、行が y・列が x になるようにそろえる
+        if DRIVER_NAMES.index(x) < DRIVER_NAMES.index(y):
+            table = table.T
+        values = [[_to_number(value) for value in row] for row in table]
+        return {
+            'x': self.driver_values[x],
+            'y': self.driver_values[y],
+            'values': values,
+            'rows': list(zip(self.driver_values[y], values)),
+        }
+
+    def payback_distribution(self) -> List[Dict[str, Any]]:
+        """回収期間の分布（区分ごとのシナリオ数と割合。最後の区分は回収不可能）"""
+        months = self.details['payback_months']
+        total = len(self)
+        distribution = []
+        lower = -np.inf
+        for upper, label in PAYBACK_BUCKETS:
+            count = int(np.count_nonzero((months > lower) & (months <= upper)))
+            distribution.append({'label': label, 'count': count, 'ratio': count / total if total else 0.0})
+            lower = upper
+        count = int(np.count_nonzero(np.isnan(months)))
+        distribution.append({'label': '回収不可能', 'count': count, 'ratio': count / total if total else 0.0})
+        return distribution
+
+    def payback_percentiles(self, percentiles: Sequence[float] = (10, 50, 90)) -> Dict[float, Optional[float]]:
+        """回収できるシナリオの回収期間（月）のパーセンタイル"""
+        months = self.details['payback_months']
+        recoverable = months[~np.isnan(months)]
+        if not len(recoverable):
+            return {percentile: None for percentile in percentiles}
+        return {percentile: float(np.percentile(recoverable, percentile)) for percentile in percentiles}
+
+
+def _to_number(value: float) -> Any:
+    """整数（円）に丸める（無限大・NaNはNone）"""
+    if not np.isfinite(value):
+        return None
+    return int(round(float(value)))
+
+
+def _driver_grid(values: Dict[str, List[float]]) -> Dict[str, np.ndarray]:
+    """ドライバーの全組み合わせ（各ドライバーの配列の長さはシナリオ数）"""
+    combinations = np.array(list(product(*(values[name] for name in DRIVER_NAMES))), dtype=float)
+    return {name: combinations[:, position] for position, name in enumerate(DRIVER_NAMES)}
+
+
+def simulate_plan_scenarios(plan: IzakayaPlan, drivers: IzakayaScenarioDrivers) -> IzakayaScenarioGrid:
+    """
+    ドライバーの全組み合わせについて月間の損益と回収期間を計算
+
+    Raises:
+        ValueError: シナリオ数が MAX_SCENARIOS を超える場合、
+            時間帯別の売上が設定されていない（旧フィールドの）計画の場合
+    """
+    if drivers.scenario_count > MAX_SCENARIOS:
+        raise ValueError(f'シナリオ数が多すぎます（{drivers.scenario_count}通り、上限{MAX_SCENARIOS}通り）')
+    lunch = _TimeSlot.from_plan(plan, 'lunch')
+    dinner = _TimeSlot.from_plan(plan, 'dinner')
+    if _is_legacy_plan(plan, lunch, dinner):
+        raise ValueError('昼・夜の客単価・客数・営業曜日が設定されていない計画はシナリオ分析できません。計画を編集して設定してください。')
+
+    driver_values = drivers.values(plan)
+    grid = _driver_grid(driver_values)
+    slots = (lunch, dinner)
+
+    # 売上・原価（時間帯ごと）
+    slot_revenues = [slot.revenue(grid) for slot in slots]
+    revenue = sum(slot_revenues)
+    cost_of_goods_sold = _round_half_up(
+        sum(slot_revenue * slot.cost_rate_values(grid) for slot, slot_revenue in zip(slots, slot_revenues)) / 100
+    )
+    gross_profit = revenue - cost_of_goods_sold
+
+    # 経費（家賃以外は計画のまま）
+    fixed_cost = (
+        plan.number_of_staff * float(plan.staff_monthly_salary)
+        + plan.part_time_hours_per_month * float(plan.part_time_hourly_wage)
+        + float(plan.monthly_utilities)
+        + float(plan.monthly_supplies)
+        + float(plan.monthly_advertising)
+        + float(plan.monthly_fees)
+        + float(plan.monthly_other_expenses)
+    )
+    monthly_cost = _round_half_up(fixed_cost + grid['monthly_rent'])
+    monthly_profit = gross_profit - monthly_cost
+
+    # 回収期間（calculate_payback_period と同じく、余りの月数は四捨五入）
+    initial_investment = float(plan.initial_investment or 0)
+    recoverable = monthly_profit > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payback_months = np.where(recoverable, initial_investment / monthly_profit, np.nan)
+    if initial_investment <= 0:
+        payback_months = np.where(recoverable, 0.0, np.nan)
+    payback_years = np.where(recoverable, np.floor(payback_months / 12), NOT_RECOVERABLE)
+    payback_remainder = np.where(recoverable, _round_half_up(np.mod(payback_months, 12)), NOT_RECOVERABLE)
+
+    # 損益分岐点の客数（客数に比例する売上・原価から、月間利益が0になる1日あたりの客数を求める）
+    unit_revenues = [slot.revenue(grid, customer_factor=1.0) for slot in slots]
+    unit_gross_profit = sum(
+        unit_revenue * (1 - slot.cost_rate_values(grid) / 100) for slot, unit_revenue in zip(slots, unit_revenues)
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        break_even_factor = np.where(unit_gross_profit > 0, monthly_cost / unit_gross_profit, np.inf)
+    break_even_customers = break_even_factor * (lunch.customers + dinner.customers)
+
+    return IzakayaScenarioGrid(
+        plan=plan,
+        drivers=grid,
+        results={
+            'monthly_revenue': revenue,
+            'monthly_cost_of_goods_sold': cost_of_goods_sold,
+            'monthly_gross_profit': gross_profit,
+            'monthly_cost': monthly_cost,
+            'monthly_profit': monthly_profit,
+            'break_even_customers': break_even_customers,
+        },
+        shape=tuple(len(driver_values[name]) for name in DRIVER_NAMES),
+        driver_values=driver_values,
+        details={
+            'payback_months': payback_months,
+            'payback_period_years': payback_years,
+            'payback_period_months': payback_remainder,
+        },
+    )
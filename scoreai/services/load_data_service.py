@@ -0,0 +1,414 @@
+"""
+負荷検証用のテナントデータ生成サービス
+
+大きなFirm（多数のCompany・10年分の決算・借入・AI相談履歴・アップロード済みドキュメント）を
+ローカル環境で再現するためのデータを生成する。管理コマンド generate_load_data から使用する。
+
+- 乱数はシードとFirm・Companyの番号から作るため、同じシードなら同じ内容のデータになる
+  （規模を大きくしても、既存の番号のCompanyの内容は変わらない）
+- 生成したデータはシードごとの接頭辞（Companyのコード・ユーザーのメールアドレス）で識別し、
+  clear() でまとめて削除できる
+"""
+import datetime
+import logging
+import random
+from dataclasses import asdict, dataclass
+from decimal import Decimal
+from typing import Dict, List
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import (
+    AIConsultationHistory,
+    AIConsultationType,
+    Company,
+    Debt,
+    FinancialInstitution,
+    Firm,
+    FirmCompany,
+    FirmPlan,
+    FirmSubscription,
+    FiscalSummary_Month,
+    FiscalSummary_Year,
+    IndustryBenchmark,
+    IndustryClassification,
+    IndustryIndicator,
+    IndustrySubClassification,
+    SecuredType,
+    Todo,
+    UploadedDocument,
+    UserCompany,
+    UserFirm,
+)
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+BENCHMARK_INDICATORS = [
+    'sales_growth_rate',
+    'operating_profit_margin',
+    'labor_productivity',
+    'EBITDA_interest_bearing_debt_ratio',
+    'operating_working_capital_turnover_period',
+    'equity_ratio',
+]
+
+
+@dataclass
+class LoadScale:
+    """生成するデータの規模"""
+    firms: int = 1
+    companies_per_firm: int = 20
+    years: int = 10
+    debts_per_company: int = 50
+    ai_history_per_company: int = 100
+    documents_per_company: int = 30
+
+
+SCALE_PRESETS: Dict[str, LoadScale] = {
+    'small': LoadScale(firms=1, companies_per_firm=5, years=5, debts_per_company=10, ai_history_per_company=20, documents_per_company=5),
+    'medium': LoadScale(),
+    'large': LoadScale(firms=5, companies_per_firm=50, years=10, debts_per_company=50, ai_history_per_company=300, documents_per_company=100),
+}
+
+
+def company_code_prefix(seed: int) -> str:
+    return f'LD{seed}-'
+
+
+def user_email_prefix(seed: int) -> str:
+    return f'load-{seed}-'
+
+
+class LoadDataGenerator:
+    """シードと規模を指定して負荷検証用のデータを生成する"""
+
+    def __init__(self, seed: int = 42, scale: LoadScale = None, last_year: int = None, password: str = 'loadtest123'):
+        self.seed = seed
+        self.scale = scale or LoadScale()
+        self.last_year = last_year or timezone.now().year - 1
+        self.password = password
+        self.counts: Dict[str, int] = {}
+
+    def _rng(self, *keys) -> random.Random:
+        """シードと番号から決まる乱数生成器"""
+        return random.Random('-'.join(str(key) for key in (self.seed, *keys)))
+
+    def _bulk_create(self, model, objs: List) -> List:
+        created = model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+        self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(created)
+        return created
+
+    # ------------------------------------------------------------------
+    # 共通マスター
+    # ------------------------------------------------------------------
+
+    def _prepare_masters(self) -> None:
+        self.plan, _ = FirmPlan.objects.get_or_create(
+            plan_type='enterprise',
+            defaults={'name': 'Enterpriseプラン', 'max_companies': 0, 'max_ai_consultations_per_month': 0, 'max_ocr_per_month': 0},
+        )
+        self.institutions = [
+            FinancialInstitution.objects.get_or_create(
+                JBAcode=f'L{index:03d}',
+                defaults={'name': f'負荷検証銀行{index}', 'short_name': f'検証銀行{index}'},
+            )[0]
+            for index in range(10)
+        ]
+        self.secured_types = [
+            SecuredType.objects.get_or_create(name=name)[0]
+            for name in ('プロパー', '信用保証協会', '日本政策金融公庫')
+        ]
+        self.classification, _ = IndustryClassification.objects.get_or_create(
+            code='LD01', defaults={'name': '負荷検証業'},
+        )
+        self.subclassification, _ = IndustrySubClassification.objects.get_or_create(
+            code='LD0101', defaults={'name': '負荷検証小分類', 'industry_classification': self.classification},
+        )
+        indicators = [IndustryIndicator.objects.get_or_create(name=name)[0] for name in BENCHMARK_INDICATORS]
+        benchmarks = [
+            IndustryBenchmark(
+                year=year,
+                industry_classification=self.classification,
+                industry_subclassification=self.subclassification,
+                company_size=company_size,
+                indicator=indicator,
+                median=Decimal('10'),
+                standard_deviation=Decimal('3'),
+                range_iv=Decimal('2'),
+                range_iii=Decimal('6'),
+                range_ii=Decimal('12'),
+                range_i=Decimal('20'),
+            )
+            for year in range(self.last_year - self.scale.years + 1, self.last_year + 1)
+            for company_size in ('s', 'm', 'l')
+            for indicator in indicators
+        ]
+        IndustryBenchmark.objects.bulk_create(benchmarks, batch_size=BATCH_SIZE, ignore_conflicts=True)
+        self.consultation_type, _ = AIConsultationType.objects.get_or_create(
+            name='財務相談', defaults={'description': '財務に関する相談'},
+        )
+
+    # ------------------------------------------------------------------
+    # Firm・Company
+    # ------------------------------------------------------------------
+
+    def _create_firm(self, firm_index: int):
+        owner = User.objects.create_user(
+            username=f'ld{self.seed}f{firm_index}',
+            email=f'{user_email_prefix(self.seed)}f{firm_index}@example.com',
+            password=self.password,
+            is_financial_consultant=True,
+        )
+        firm = Firm.objects.create(name=f'負荷検証事務所{self.seed}-{firm_index}', owner=owner)
+        UserFirm.objects.create(user=owner, firm=firm, is_owner=True, is_selected=True)
+        FirmSubscription.objects.create(firm=firm, plan=self.plan, status='active')
+        self.counts['Firm'] = self.counts.get('Firm', 0) + 1
+        return owner, firm
+
+    def _create_companies(self, firm_index: int, owner, firm) -> List[Company]:
+        companies = []
+        for company_index in range(self.scale.companies_per_firm):
+            rng = self._rng(firm_index, company_index, 'company')
+            companies.append(Company(
+                name=f'負荷検証会社{self.seed}-{firm_index}-{company_index:04d}',
+                code=f'{company_code_prefix(self.seed)}{firm_index:03d}-{company_index:04d}',
+                fiscal_month=rng.randint(1, 12),
+                company_size=rng.choice(['s', 'm', 'l']),
+                industry_classification=self.classification,
+                industry_subclassification=self.subclassification,
+            ))
+        companies = self._bulk_create(Company, companies)
+        self._bulk_create(FirmCompany, [
+            FirmCompany(firm=firm, company=company, start_date=datetime.date(self.last_year - 1, 4, 1))
+            for company in companies
+        ])
+        self._bulk_create(UserCompany, [
+            UserCompany(user=owner, company=company, as_consultant=True, is_selected=index == 0)
+            for index, company in enumerate(companies)
+        ])
+        return companies
+
+    # ------------------------------------------------------------------
+    # Companyごとのデータ
+    # ------------------------------------------------------------------
+
+    def _fiscal_years(self, company: Company, rng: random.Random) -> List[FiscalSummary_Year]:
+        years = []
+        sales = rng.randint(50_000, 2_000_000)
+        for index in range(self.scale.years):
+            sales = max(10_000, int(sales * rng.uniform(0.9, 1.15)))
+            gross_margin = rng.uniform(0.2, 0.6)
+            operating_margin = rng.uniform(-0.05, 0.12)
+            total_assets = int(sales * rng.uniform(0.6, 1.4))
+            net_assets = int(total_assets * rng.uniform(0.05, 0.5))
+            years.append(FiscalSummary_Year(
+                company=company,
+                year=self.last_year - self.scale.years + 1 + index,
+                sales=sales,
+                gross_profit=int(sales * gross_margin),
+                operating_profit=int(sales * operating_margin),
+                ordinary_profit=int(sales * (operating_margin - 0.005)),
+                net_profit=int(sales * (operating_margin - 0.02)),
+                payroll_expense=int(sales * rng.uniform(0.1, 0.3)),
+                directors_compensation=int(sales * 0.03),
+                depreciation_expense=int(sales * 0.02),
+                interest_expense=int(sales * 0.005),
+                cash_and_deposits=int(total_assets * 0.2),
+                accounts_receivable=int(sales * 0.12),
+                inventory=int(sales * 0.08),
+                total_current_assets=int(total_assets * 0.5),
+                total_fixed_assets=total_assets - int(total_assets * 0.5),
+                total_assets=total_assets,
+                accounts_payable=int(sales * 0.07),
+                short_term_loans_payable=int(total_assets * 0.1),
+                total_current_liabilities=int((total_assets - net_assets) * 0.4),
+                long_term_loans_payable=int(total_assets * 0.3),
+                total_long_term_liabilities=(total_assets - net_assets) - int((total_assets - net_assets) * 0.4),
+                total_liabilities=total_assets - net_assets,
+                capital_stock=10_000,
+                retained_earnings=net_assets - 10_000,
+                total_stakeholder_equity=net_assets,
+                total_net_assets=net_assets,
+                number_of_employees_EOY=max(1, sales // 20_000),
+            ))
+        years.append(FiscalSummary_Year(
+            company=company,
+            year=self.last_year,
+            is_budget=True,
+            sales=int(sales * 1.05),
+            gross_profit=int(sales * 1.05 * 0.4),
+            operating_profit=int(sales * 1.05 * 0.05),
+            ordinary_profit=int(sales * 1.05 * 0.045),
+        ))
+        return years
+
+    def _monthly_summaries(self, fiscal_year: FiscalSummary_Year, rng: random.Random) -> List[FiscalSummary_Month]:
+        months = []
+        periods = 12 if fiscal_year.is_budget else 13
+        gross_rate = Decimal(fiscal_year.gross_profit) / Decimal(fiscal_year.sales) if fiscal_year.sales else Decimal(0)
+        operating_rate = Decimal(fiscal_year.operating_profit) / Decimal(fiscal_year.sales) if fiscal_year.sales else Decimal(0)
+        for period in range(1, periods + 1):
+            weight = Decimal('0.05') if period == 13 else Decimal(str(round(rng.uniform(0.8, 1.2), 3)))
+            sales = Decimal(fiscal_year.sales) / 12 * weight
+            months.append(FiscalSummary_Month(
+                fiscal_summary_year=fiscal_year,
+                period=period,
+                is_budget=fiscal_year.is_budget,
+                sales=round(sales, 2),
+                gross_profit=round(sales * gross_rate, 2),
+                operating_profit=round(sales * operating_rate, 2),
+                ordinary_profit=round(sales * operating_rate * Decimal('0.9'), 2),
+            ))
+        return months
+
+    def _debts(self, company: Company, rng: random.Random) -> List[Debt]:
+        debts = []
+        for _ in range(self.scale.debts_per_company):
+            issue_date = datetime.date(self.last_year - rng.randint(0, 8), rng.randint(1, 12), 1)
+            principal = rng.randrange(1_000_000, 200_000_000, 1_000_000)
+            debt_type = rng.choices(['certificate', 'corporate_bond', 'promissory_note'], weights=[8, 1, 1])[0]
+            if debt_type == 'promissory_note':
+                monthly_repayment, repayment_months = principal, []
+            elif debt_type == 'corporate_bond':
+                monthly_repayment, repayment_months = principal // 10, sorted(rng.sample(range(1, 13), 2))
+            else:
+                monthly_repayment, repayment_months = principal // rng.choice([60, 84, 120]), []
+            is_rescheduled = rng.random() < 0.05
+            debts.append(Debt(
+                company=company,
+                financial_institution=rng.choice(self.institutions),
+                secured_type=rng.choice(self.secured_types),
+                debt_type=debt_type,
+                principal=principal,
+                issue_date=issue_date,
+                start_date=issue_date + datetime.timedelta(days=rng.choice([31, 62, 183])),
+                interest_rate=Decimal(str(round(rng.uniform(0.3, 3.0), 4))),
+                monthly_repayment=monthly_repayment,
+                repayment_months=repayment_months,
+                is_securedby_management=rng.random() < 0.5,
+                is_collateraled=rng.random() < 0.3,
+                is_rescheduled=is_rescheduled,
+                reschedule_date=datetime.date(self.last_year, 4, 1) if is_rescheduled else None,
+                reschedule_balance=principal // 2 if is_rescheduled else None,
+                is_nodisplay=rng.random() < 0.03,
+            ))
+        return debts
+
+    def _ai_histories(self, company: Company, owner, rng: random.Random) -> List[AIConsultationHistory]:
+        histories = []
+        for index in range(self.scale.ai_history_per_company):
+            input_tokens = rng.randint(500, 8000)
+            output_tokens = rng.randint(200, 2000)
+            histories.append(AIConsultationHistory(
+                user=owner,
+                company=company,
+                consultation_type=self.consultation_type,
+                user_message=f'資金繰りについての相談 {index}',
+                ai_response='負荷検証用の回答です。' * rng.randint(5, 50),
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                total_tokens=input_tokens + output_tokens,
+            ))
+        return histories
+
+    def _documents(self, company: Company, owner, rng: random.Random) -> List[UploadedDocument]:
+        document_types = [choice for choice, _ in UploadedDocument.DOCUMENT_TYPES]
+        documents = []
+        for index in range(self.scale.documents_per_company):
+            document_type = rng.choice(document_types)
+            documents.append(UploadedDocument(
+                user=owner,
+                company=company,
+                document_type=document_type,
+                original_filename=f'{document_type}_{index:04d}.pdf',
+                stored_filename=f'{company.code}_{document_type}_{index:04d}.pdf',
+                storage_type='google_drive',
+                file_id=f'load-{company.code}-{index:04d}',
+                file_size=rng.randint(50_000, 5_000_000),
+                mime_type='application/pdf',
+                upload_status='uploaded',
+            ))
+        return documents
+
+    def _todos(self, company: Company, owner, firm, rng: random.Random) -> List[Todo]:
+        statuses = ['pending', 'in_progress', 'completed']
+        return [
+            Todo(
+                company=company,
+                firm=firm,
+                owner_type=rng.choice(['company', 'firm']),
+                title=f'To Do {index}',
+                status=rng.choice(statuses),
+                due_date=datetime.date(self.last_year, rng.randint(1, 12), rng.randint(1, 28)),
+                created_by=owner,
+            )
+            for index in range(10)
+        ]
+
+    def _create_company_data(self, firm_index: int, companies: List[Company], owner, firm) -> None:
+        fiscal_years, debts, histories, documents, todos = [], [], [], [], []
+        rngs = {}
+        for company_index, company in enumerate(companies):
+            rng = self._rng(firm_index, company_index, 'data')
+            rngs[company.pk] = rng
+            fiscal_years.extend(self._fiscal_years(company, rng))
+        fiscal_years = self._bulk_create(FiscalSummary_Year, fiscal_years)
+
+        months = []
+        for fiscal_year in fiscal_years:
+            months.extend(self._monthly_summaries(fiscal_year, rngs[fiscal_year.company_id]))
+        self._bulk_create(FiscalSummary_Month, months)
+
+        for company in companies:
+            rng = rngs[company.pk]
+            debts.extend(self._debts(company, rng))
+            histories.extend(self._ai_histories(company, owner, rng))
+            documents.extend(self._documents(company, owner, rng))
+            todos.extend(self._todos(company, owner, firm, rng))
+        self._bulk_create(Debt, debts)
+        histories = self._bulk_create(AIConsultationHistory, histories)
+        self._bulk_create(UploadedDocument, documents)
+        self._bulk_create(Todo, todos)
+
+        # 相談履歴の作成日時を直近12か月に分散させる（auto_now_add のため作成後に更新する）
+        now = timezone.now()
+        rng = self._rng(firm_index, 'history_dates')
+        for history in histories:
+            history.created_at = now - datetime.timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+        AIConsultationHistory.objects.bulk_update(histories, ['created_at'], batch_size=BATCH_SIZE)
+
+    # ------------------------------------------------------------------
+
+    @transaction.atomic
+    def generate(self) -> Dict[str, int]:
+        """データを生成し、モデルごとの作成件数を返す"""
+        self._prepare_masters()
+        for firm_index in range(self.scale.firms):
+            owner, firm = self._create_firm(firm_index)
+            companies = self._create_companies(firm_index, owner, firm)
+            self._create_company_data(firm_index, companies, owner, firm)
+            logger.info(f"Generated load data for firm {firm.name} ({len(companies)} companies)")
+        return self.counts
+
+    @transaction.atomic
+    def clear(self) -> Dict[str, int]:
+        """このシードで生成したデータを削除し、モデルごとの削除件数を返す"""
+        companies = Company.objects.filter(code__startswith=company_code_prefix(self.seed))
+        # FiscalSummary_Month は FiscalSummary_Year を PROTECT で参照しているため先に削除する
+        _, deleted_months = FiscalSummary_Month.objects.filter(fiscal_summary_year__company__in=companies).delete()
+        _, deleted_companies = companies.delete()
+        _, deleted_users = User.objects.filter(email__startswith=user_email_prefix(self.seed)).delete()
+        deleted: Dict[str, int] = {}
+        for result in (deleted_months, deleted_companies, deleted_users):
+            for label, count in result.items():
+                deleted[label] = deleted.get(label, 0) + count
+        return deleted
+
+    def describe(self) -> Dict:
+        return {'seed': self.seed, 'last_year': self.last_year, **asdict(self.scale)}
@@ -0,0 +1,218 @@
+"""
+年次予算から月次予算を作成するサービス
+
+月度ごとに取得・保存するのではなく、対象のすべての年次予算について12か月分をNumPyの配列でまとめて計算し、
+bulk_create(update_conflicts=True) の1回の一括アップサートで保存する。
+複数のCompanyの年次予算を渡せば、Firmの全顧問先の月次予算も同じクエリ数で作成できる。
+
+作成方法:
+    - equal: 年次予算を12で分割
+    - previous_ratio: 過去の月次実績の季節性（各月が年間合計に占める割合）で配分
+      割合は過去 reference_years 年分の実績の平均とする
+
+金額は千円単位（月次データの小数点以下2桁）で、小数点以下2桁未満は切り捨てる（0方向）。
+
+使い方:
+    result = generate_monthly_budgets(budget_years, method='previous_ratio', reference_years=3)
+"""
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict, List, Sequence
+
+import numpy as np
+from django.db import transaction
+
+from ..models import FiscalSummary_Month, FiscalSummary_Year
+from ..utils.company_cache import invalidate_company
+
+METHOD_EQUAL = 'equal'
+METHOD_PREVIOUS_RATIO = 'previous_ratio'
+
+# 月次予算として作成する項目
+BUDGET_FIELDS = ['sales', 'gross_profit', 'operating_profit', 'ordinary_profit']
+PERIODS = np.arange(1, 13)
+DEFAULT_REFERENCE_YEARS = 3
+BATCH_SIZE = 1000
+
+
+@dataclass
+class MonthlyBudgetResult:
+    """月次予算の作成結果"""
+    # 月次予算を作成した年次予算
+    generated: List[FiscalSummary_Year] = field(default_factory=list)
+    # 既存の月次予算があるため作成しなかった年次予算（override=False の場合）
+    skipped: List[FiscalSummary_Year] = field(default_factory=list)
+    # 過去の月次実績がないため作成できなかった年次予算（previous_ratio の場合）
+    missing_actuals: List[FiscalSummary_Year] = field(default_factory=list)
+
+    @property
+    def month_count(self) -> int:
+        return len(self.generated) * len(PERIODS)
+
+
+def equal_weights(count: int) -> np.ndarray:
+    """12等分の配分比率（形状: 年次予算数 × 12か月 × 項目数）"""
+    return np.full((count, len(PERIODS), len(BUDGET_FIELDS)), 1 / len(PERIODS))
+
+
+def seasonal_weights(actual_months: np.ndarray) -> np.ndarray:
+    """
+    過去の月次実績から各月の配分比率を計算
+
+    Args:
+        actual_months: 月次実績（形状: 年次予算数 × 過去の年数 × 12か月 × 項目数、データがない月はNaN）
+
+    Returns:
+        配分比率（形状: 年次予算数 × 12か月 × 項目数、各年次予算・項目の12か月の合計は1）
+
+    年ごとに各月が年間合計（その年にある月の合計）に占める割合を求め、過去の年で平均する。
+    年間合計が0以下の年は使わず、どの年も使えない項目は12等分とする。
+    実績がない月は、実績がある月の割合の平均で補う。
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        totals = np.nansum(actual_months, axis=2, keepdims=True)
+        shares = np.where(totals > 0, actual_months / totals, np.nan)
+
+        weights = _nanmean(shares, axis=1)
+        # 実績がない月は、実績がある月の平均で補う
+        month_mean = _nanmean(weights, axis=1, keepdims=True)
+        weights = np.where(np.isnan(weights), month_mean, weights)
+        weights = np.where(np.isnan(weights), 1 / len(PERIODS), weights)
+        return weights / weights.sum(axis=1, keepdims=True)
+
+
+def _nanmean(values: np.ndarray, axis: int, keepdims: bool = False) -> np.ndarray:
+    """np.nanmean（すべてNaNの場合に警告を出さずNaNを返す）"""
+    counts = np.sum(~np.isnan(values), axis=axis, keepdims=keepdims)
+    sums = np.nansum(values, axis=axis, keepdims=keepdims)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def allocate(annual: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    年次予算を配分比率で月次に配分
+
+    Args:
+        annual: 年次予算（形状: 年次予算数 × 項目数、千円）
+        weights: 配分比率（形状: 年次予算数 × 12か月 × 項目数）
+
+    Returns:
+        月次予算（形状: 年次予算数 × 12か月 × 項目数、単位は0.01千円の整数）
+    """
+    cents = annual[:, np.newaxis, :] * 100 * weights
+    # 1/12 などの浮動小数点の誤差で切り捨てが1小さくならないよう、先に十分小さい桁で丸める
+    return np.trunc(np.round(cents, 6)).astype(np.int64)
+
+
+def _load_actual_months(budget_years: Sequence[FiscalSummary_Year], reference_years: int) -> np.ndarray:
+    """年次予算ごとの過去 reference_years 年分の月次実績（形状: 年次予算数 × 過去の年数 × 12か月 × 項目数）"""
+    actual_months = np.full((len(budget_years), reference_years, len(PERIODS), len(BUDGET_FIELDS)), np.nan)
+    positions: Dict[tuple, tuple] = {}
+    for index, budget_year in enumerate(budget_years):
+        for offset in range(reference_years):
+            positions[(str(budget_year.company_id), budget_year.year - 1 - offset)] = (index, offset)
+
+    rows = FiscalSummary_Month.objects.filter(
+        fiscal_summary_year__company_id__in={str(budget_year.company_id) for budget_year in budget_years},
+        fiscal_summary_year__year__in={year for _, year in positions},
+        fiscal_summary_year__is_budget=False,
+        fiscal_summary_year__is_draft=False,
+        is_budget=False,
+        period__lte=len(PERIODS),
+    ).values_list('fiscal_summary_year__company_id', 'fiscal_summary_year__year', 'period', *BUDGET_FIELDS)
+    for company_id, year, period, *values in rows:
+        position = positions.get((company_id, year))
+        if position is not None:
+            actual_months[position + (period - 1,)] = [float(value) for value in values]
+    return actual_months
+
+
+def build_monthly_budgets(
+    budget_years: Sequence[FiscalSummary_Year],
+    method: str = METHOD_EQUAL,
+    reference_years: int = DEFAULT_REFERENCE_YEARS,
+) -> Dict[str, List[Dict[str, Decimal]]]:
+    """
+    年次予算ごとの12か月分の月次予算（保存しない）
+
+    Returns:
+        年次予算のID → period順の [{'sales': Decimal, ...}, ...]
+        previous_ratio で過去の月次実績がない年次予算は含まない
+    """
+    budget_years = list(budget_years)
+    if not budget_years:
+        return {}
+    annual = np.array([[getattr(budget_year, name) for name in BUDGET_FIELDS] for budget_year in budget_years], dtype=float)
+
+    targets = np.ones(len(budget_years), dtype=bool)
+    if method == METHOD_PREVIOUS_RATIO:
+        actual_months = _load_actual_months(budget_years, reference_years)
+        targets = np.any(~np.isnan(actual_months), axis=(1, 2, 3))
+        weights = seasonal_weights(actual_months)
+    else:
+        weights = equal_weights(len(budget_years))
+
+    cents = allocate(annual, weights)
+    return {
+        str(budget_year.pk): [
+            {name: Decimal(int(value)).scaleb(-2) for name, value in zip(BUDGET_FIELDS, month)}
+            for month in cents[index]
+        ]
+        for index, budget_year in enumerate(budget_years)
+        if targets[index]
+    }
+
+
+def generate_monthly_budgets(
+    budget_years: Sequence[FiscalSummary_Year],
+    method: str = METHOD_EQUAL,
+    reference_years: int = DEFAULT_REFERENCE_YEARS,
+    override: bool = False,
+) -> MonthlyBudgetResult:
+    """
+    年次予算から月次予算を作成して保存
+
+    既存の月次予算がある年次予算は、override=True の場合は上書きし（13か月目の予算は削除）、
+    override=False の場合は作成しない。月次実績（is_budget=False）には影響しない。
+    """
+    budget_years = list(budget_years)
+    result = MonthlyBudgetResult()
+    if not budget_years:
+        return result
+
+    if not override:
+        existing_ids = set(map(str,
+            FiscalSummary_Month.objects.filter(fiscal_summary_year__in=budget_years, is_budget=True)
+            .values_list('fiscal_summary_year_id', flat=True).distinct()
+        ))
+        result.skipped = [budget_year for budget_year in budget_years if str(budget_year.pk) in existing_ids]
+        budget_years = [budget_year for budget_year in budget_years if str(budget_year.pk) not in existing_ids]
+
+    monthly_budgets = build_monthly_budgets(budget_years, method, reference_years)
+    result.generated = [budget_year for budget_year in budget_years if str(budget_year.pk) in monthly_budgets]
+    result.missing_actuals = [budget_year for budget_year in budget_years if str(budget_year.pk) not in monthly_budgets]
+    if not result.generated:
+        return result
+
+    months = [
+        FiscalSummary_Month(fiscal_summary_year=budget_year, period=period, is_budget=True, **values)
+        for budget_year in result.generated
+        for period, values in zip(PERIODS.tolist(), monthly_budgets[str(budget_year.pk)])
+    ]
+    with transaction.atomic():
+        FiscalSummary_Month.objects.bulk_create(
+            months,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['fiscal_summary_year', 'period', 'is_budget'],
+            update_fields=BUDGET_FIELDS,
+        )
+        if override:
+            FiscalSummary_Month.objects.filter(
+                fiscal_summary_year__in=result.generated, is_budget=True, period__gt=len(PERIODS)
+            ).delete()
+        # bulk_create は save() を呼ばないため、Companyのキャッシュはここで無効化する
+        for company_id in {str(budget_year.company_id) for budget_year in result.generated}:
+            invalidate_company(company_id)
+    return result
@@ -0,0 +1,315 @@
+"""
+PDF出力の共通サービス
+
+日本語フォントの登録・段落スタイル・表のスタイルを1か所にまとめ、すべてのPDF出力で共有する。
+
+- フォント: プロセスごとに1回だけ登録する（ScoreaiConfig.ready() で起動時に登録し、
+  見つからない場合は起動時に警告する）
+- スタイル: 段落スタイル・表のスタイルはプロセス内でキャッシュし、リクエストごとに作成しない
+- 表: 行数の多い表は TABLE_CHUNK_ROWS 行ごとの表に分けて（見出し行を繰り返して）レイアウトするため、
+  ページ分割の計算量が行数に比例する。出力はファイルやHttpResponseに直接書き込む
+
+使い方:
+    pdf = PdfDocument()
+    pdf.title('借入一覧')
+    pdf.table(headers, rows)
+    return pdf.to_response('借入一覧.pdf')
+"""
+import logging
+import os
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence
+from xml.sax.saxutils import escape
+
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+# フォント登録時の警告を抑制（起動時のログノイズを減らす）
+logging.getLogger('reportlab').setLevel(logging.ERROR)
+
+# オプショナルな依存関係のチェック
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle, StyleSheet1, getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+    REPORTLAB_AVAILABLE = True
+except ImportError:
+    REPORTLAB_AVAILABLE = False
+    logger.warning("reportlab is not installed. PDF export will not be available.")
+
+JAPANESE_FONT_NAME = 'JapaneseFont'
+HEADER_COLOR = '#366092'
+
+# 1つの表としてレイアウトする最大行数（超える場合は見出し行を繰り返して分割する）
+TABLE_CHUNK_ROWS = 200
+# 折り返して表示できる列の最小幅（インチ。これより狭くなる列数の表は折り返さない）
+MIN_WRAP_COLUMN_WIDTH = 0.6
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 日本語フォントの候補（先頭から順に試す）
+FONT_PATHS = [
+    # macOS システムフォント（実際に存在するフォントを優先）
+    '/System/Library/Fonts/AppleSDGothicNeo.ttc',
+    '/System/Library/Fonts/Supplemental/Hiragino Sans GB.ttc',
+    '/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc',
+    '/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc',
+    '/Library/Fonts/ヒラギノ角ゴシック W3.ttc',
+    '/Library/Fonts/ヒラギノ角ゴシック W6.ttc',
+    # Linux (IPAゴシック)
+    '/usr/share/fonts/truetype/ipafont/ipagp.ttf',
+    '/usr/share/fonts/opentype/ipafont-gothic/ipagp.ttf',
+    # Windows
+    'C:/Windows/Fonts/msgothic.ttc',
+    'C:/Windows/Fonts/meiryo.ttc',
+    # プロジェクト内
+    os.path.join(_BASE_DIR, 'static/fonts/ipaexg.ttf'),
+    os.path.join(os.path.dirname(_BASE_DIR), 'static/fonts/ipaexg.ttf'),
+    os.path.join(os.path.dirname(_BASE_DIR), 'static/scoreai/fonts/ipaexg.ttf'),
+]
+
+
+@lru_cache(maxsize=None)
+def register_fonts() -> bool:
+    """
+    日本語フォントを登録（プロセスごとに1回だけ）
+
+    Returns:
+        日本語フォントを登録できた場合はTrue（Falseの場合はHelveticaで出力する）
+    """
+    if not REPORTLAB_AVAILABLE:
+        return False
+    for font_path in FONT_PATHS:
+        if not os.path.exists(font_path):
+            continue
+        try:
+            pdfmetrics.registerFont(TTFont(JAPANESE_FONT_NAME, font_path))
+        except Exception as e:
+            logger.debug(f"Failed to register font {font_path}: {e}")
+            continue
+        # <b> などの太字指定でも同じフォントを使う
+        pdfmetrics.registerFontFamily(
+            JAPANESE_FONT_NAME,
+            normal=JAPANESE_FONT_NAME, bold=JAPANESE_FONT_NAME,
+            italic=JAPANESE_FONT_NAME, boldItalic=JAPANESE_FONT_NAME,
+        )
+        logger.info(f"Japanese font registered: {font_path}")
+        return True
+    logger.warning("Japanese font not found. PDF export will use Helvetica (Japanese text will not be rendered).")
+    return False
+
+
+def japanese_font_available() -> bool:
+    return register_fonts()
+
+
+def get_font_name(bold: bool = False) -> str:
+    """本文・見出しに使うフォント名"""
+    if register_fonts():
+        return JAPANESE_FONT_NAME
+    return 'Helvetica-Bold' if bold else 'Helvetica'
+
+
+@lru_cache(maxsize=None)
+def get_styles() -> 'StyleSheet1':
+    """
+    段落スタイル（プロセス内でキャッシュ）
+
+    title: 表題 / heading: 見出し / normal: 本文 / cell: 表のセル / header_cell: 表の見出し行のセル
+    """
+    font_name = get_font_name()
+    sample = getSampleStyleSheet()
+    styles = StyleSheet1()
+    styles.add(ParagraphStyle(
+        'title', parent=sample['Heading1'], fontName=get_font_name(bold=True), fontSize=16,
+        textColor=colors.HexColor(HEADER_COLOR), spaceAfter=30, alignment=TA_CENTER,
+    ))
+    styles.add(ParagraphStyle(
+        'heading', parent=sample['Heading2'], fontName=get_font_name(bold=True), fontSize=12,
+        textColor=colors.HexColor(HEADER_COLOR), spaceAfter=12, spaceBefore=12,
+    ))
+    styles.add(ParagraphStyle('normal', parent=sample['Normal'], fontName=font_name, leading=16))
+    styles.add(ParagraphStyle('cell', parent=sample['Normal'], fontName=font_name, fontSize=9, leading=12))
+    styles.add(ParagraphStyle(
+        'header_cell', parent=sample['Normal'], fontName=get_font_name(bold=True), fontSize=10, leading=12,
+        textColor=colors.whitesmoke,
+    ))
+    return styles
+
+
+@lru_cache(maxsize=None)
+def get_cell_style(style_name: str = 'cell', align: str = 'LEFT') -> 'ParagraphStyle':
+    """
+    表のセルの段落スタイル（配置ごとにプロセス内でキャッシュ）
+
+    表の ALIGN はセル幅いっぱいの Paragraph を動かさないため、折り返すセルは段落側で配置する。
+    """
+    style = get_styles()[style_name]
+    alignment = {'CENTER': TA_CENTER, 'RIGHT': TA_RIGHT}.get(align.upper(), TA_LEFT)
+    if alignment == style.alignment:
+        return style
+    return ParagraphStyle(f'{style_name}_{align.lower()}', parent=style, alignment=alignment)
+
+
+@lru_cache(maxsize=None)
+def get_table_style(align: str = 'LEFT', striped: bool = True, header: str = 'row') -> 'TableStyle':
+    """
+    表のスタイル（プロセス内でキャッシュ。TableStyle は複数の表で共有できる）
+
+    Args:
+        align: セル内の配置（LEFT / CENTER / RIGHT）
+        striped: 本文の行を交互に色分けする
+        header: 'row'（1行目が見出し）、'column'（1列目が見出し）
+    """
+    commands = [
+        ('ALIGN', (0, 0), (-1, -1), align),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTNAME', (0, 0), (-1, -1), get_font_name()),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ]
+    if header == 'row':
+        commands += [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(HEADER_COLOR)),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), get_font_name(bold=True)),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ]
+        if striped:
+            commands.append(('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F2F2F2')]))
+    else:
+        commands += [
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#DCE6F1')),
+            ('FONTNAME', (0, 0), (0, -1), get_font_name(bold=True)),
+        ]
+    return TableStyle(commands)
+
+
+def _check_reportlab() -> None:
+    if not REPORTLAB_AVAILABLE:
+        raise ImportError("reportlab is not installed. Please install it: pip install reportlab")
+
+
+class PdfDocument:
+    """
+    PDFの構成要素（表題・見出し・段落・表・改ページ）を順に追加して出力する
+
+    文字列は自動でエスケープする（ReportLabのマークアップを使う場合は markup=True）。
+    """
+
+    def __init__(self, pagesize=None, **doc_options):
+        """doc_options: SimpleDocTemplate の引数（rightMargin など）"""
+        _check_reportlab()
+        self.styles = get_styles()
+        self.story: List[Any] = []
+        self.doc_options = {'pagesize': pagesize or A4, **doc_options}
+
+    def _frame_width(self) -> float:
+        """本文の幅（ポイント。SimpleDocTemplate の余白の既定値は1インチ）"""
+        margins = self.doc_options.get('leftMargin', inch) + self.doc_options.get('rightMargin', inch)
+        return self.doc_options['pagesize'][0] - margins
+
+    def _paragraph(self, text: Any, style: Any, markup: bool = False):
+        """style: スタイル名または ParagraphStyle"""
+        text = '' if text is None else str(text)
+        if isinstance(style, str):
+            style = self.styles[style]
+        return Paragraph(text if markup else escape(text), style)
+
+    def title(self, text: str) -> 'PdfDocument':
+        self.story += [self._paragraph(text, 'title'), Spacer(1, 0.2 * inch)]
+        return self
+
+    def heading(self, text: str) -> 'PdfDocument':
+        self.story.append(self._paragraph(text, 'heading'))
+        return self
+
+    def paragraph(self, text: str, style: str = 'normal', markup: bool = False) -> 'PdfDocument':
+        self.story.append(self._paragraph(text, style, markup=markup))
+        return self
+
+    def info(self, items: Dict[str, Any]) -> 'PdfDocument':
+        """「項目: 値」の一覧"""
+        lines = [f"<b>{escape(str(key))}:</b> {escape(str(value))}" for key, value in items.items()]
+        self.story += [self._paragraph('<br/>'.join(lines), 'normal', markup=True), Spacer(1, 0.2 * inch)]
+        return self
+
+    def spacer(self, height: float = 0.2) -> 'PdfDocument':
+        """height: インチ"""
+        self.story.append(Spacer(1, height * inch))
+        return self
+
+    def page_break(self) -> 'PdfDocument':
+        self.story.append(PageBreak())
+        return self
+
+    def table(
+        self,
+        headers: Optional[Sequence[Any]],
+        rows: Sequence[Sequence[Any]],
+        col_widths: Optional[Sequence[float]] = None,
+        align: str = 'LEFT',
+        striped: bool = True,
+        wrap: bool = True,
+    ) -> 'PdfDocument':
+        """
+        表を追加（TABLE_CHUNK_ROWS 行ごとに分割し、各表に見出し行を繰り返す）
+
+        Args:
+            headers: 見出し行（Noneの場合は1列目を見出しとする項目・値の表）
+            rows: 本文の行
+            col_widths: 列幅（インチ）
+            align: セル内の配置（LEFT / CENTER / RIGHT。折り返すセルにも適用する）
+            wrap: セルの文字列を折り返す（Paragraphに変換する）。
+                列幅の指定がなく、列数が多くて折り返せない場合は折り返さない
+        """
+        header_style = 'row' if headers is not None else 'column'
+        column_count = len(headers) if headers is not None else max((len(row) for row in rows), default=0)
+        if wrap and not col_widths and column_count * MIN_WRAP_COLUMN_WIDTH * inch > self._frame_width():
+            wrap = False
+        style = get_table_style(align, striped, header_style)
+        widths = [width * inch for width in col_widths] if col_widths else None
+
+        def cell(value, style_name='cell'):
+            if not wrap:
+                return '' if value is None else str(value)
+            return self._paragraph(value, get_cell_style(style_name, align))
+
+        header_row = [cell(value, 'header_cell') for value in headers] if headers is not None else None
+        chunk_size = TABLE_CHUNK_ROWS if rows else 1
+        for start in range(0, max(len(rows), 1), chunk_size):
+            body = [[cell(value) for value in row] for row in rows[start:start + chunk_size]]
+            data = ([header_row] if header_row is not None else []) + body
+            if not data:
+                continue
+            table = Table(data, colWidths=widths, repeatRows=1 if header_row is not None else 0, hAlign='LEFT')
+            table.setStyle(style)
+            self.story.append(table)
+        return self
+
+    def key_value_table(self, rows: Sequence[Sequence[Any]], col_widths: Optional[Sequence[float]] = None) -> 'PdfDocument':
+        """1列目が見出しの表"""
+        return self.table(None, rows, col_widths=col_widths)
+
+    def write(self, output: BinaryIO) -> None:
+        """ファイルオブジェクト（BytesIO・HttpResponseなど）に出力"""
+        SimpleDocTemplate(output, **self.doc_options).build(self.story)
+
+    def to_bytes(self) -> bytes:
+        buffer = BytesIO()
+        self.write(buffer)
+        return buffer.getvalue()
+
+    def to_response(self, filename: str) -> HttpResponse:
+        """ダウンロード用のレスポンス（中間のバッファを作らずにレスポンスへ直接出力）"""
+        response = HttpResponse(content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        self.write(response)
+        return response
@@ -0,0 +1,302 @@
+"""
+クラウドストレージへのバックグラウンドアップロード
+
+OCR読み込みなどのリクエストでは、ファイルをローカルのスプールディレクトリに保存して
+UploadedDocument（upload_status='pending'）を作成するだけにし、
+ストレージへのアップロードはバックグラウンドで実行する。
+
+- アクセストークンの期限切れはrefresh_access_tokenで更新して即時に再試行する
+- その他の失敗は指数バックオフで再試行し、上限に達した場合は 'failed' にする（スプールファイルは残す）
+- 再試行は同じホストでの次のアップロード時、または管理コマンド process_storage_uploads で実行する
+  （スプールディレクトリはホストごとのため、複数ホストで動かす場合は共有ボリュームを指定する）
+"""
+import logging
+import os
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ..models import CloudStorageSetting, UploadedDocument
+from ..utils.background import run_in_background
+from ..utils.document_naming import get_folder_path
+from ..utils.storage.base import StorageAdapter
+from ..utils.storage.folder_cache import FolderIdCache
+
+logger = logging.getLogger(__name__)
+
+# アップロードに対応しているストレージタイプ
+SUPPORTED_STORAGE_TYPES = ('google_drive', 'box')
+
+# 再試行の上限と間隔（30秒、1分、2分…最大1時間）
+MAX_UPLOAD_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+
+# 'uploading' のまま放置された（プロセスが停止した）アップロードを再実行するまでの時間
+UPLOAD_LEASE_SECONDS = 600
+
+
+def get_storage_adapter(storage_setting: CloudStorageSetting) -> Optional[StorageAdapter]:
+    """ストレージ設定に対応するアダプターを作成（未対応のストレージタイプの場合はNone）"""
+    if storage_setting.storage_type == 'google_drive':
+        from ..utils.storage.google_drive import GoogleDriveAdapter
+        adapter_class = GoogleDriveAdapter
+    elif storage_setting.storage_type == 'box':
+        from ..utils.storage.box import BoxAdapter
+        adapter_class = BoxAdapter
+    else:
+        return None
+
+    return adapter_class(
+        user=storage_setting.user,
+        access_token=storage_setting.access_token,
+        refresh_token=storage_setting.refresh_token
+    )
+
+
+def get_spool_dir() -> Path:
+    """スプールディレクトリ（存在しない場合は作成）"""
+    spool_dir = Path(getattr(settings, 'STORAGE_UPLOAD_SPOOL_DIR', Path(settings.BASE_DIR) / 'spool' / 'uploads'))
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    return spool_dir
+
+
+def enqueue_upload(
+    storage_setting: CloudStorageSetting,
+    file_content: bytes,
+    original_filename: str,
+    stored_filename: str,
+    document_type: str,
+    subfolder_type: Optional[str] = None,
+    mime_type: Optional[str] = None,
+    ocr_result_id: Optional[str] = None,
+    metadata: Optional[Dict] = None,
+) -> UploadedDocument:
+    """
+    ファイルをスプールに保存し、アップロード待ちのUploadedDocumentを作成
+
+    アップロードはトランザクションのコミット後にバックグラウンドで実行する。
+
+    Args:
+        storage_setting: アップロード先のストレージ設定
+        file_content: ファイル内容
+        original_filename: 元のファイル名
+        stored_filename: ストレージに保存するファイル名
+        document_type: ドキュメントタイプ
+        subfolder_type: サブフォルダタイプ
+        mime_type: MIMEタイプ
+        ocr_result_id: OCR結果のID
+        metadata: 追加情報
+
+    Returns:
+        作成したUploadedDocument（upload_status='pending'）
+    """
+    uploaded_doc = UploadedDocument(
+        user_id=storage_setting.user_id,
+        company_id=storage_setting.company_id,
+        document_type=document_type,
+        subfolder_type=subfolder_type or '',
+        original_filename=original_filename,
+        stored_filename=stored_filename,
+        storage_type=storage_setting.storage_type,
+        file_size=len(file_content),
+        mime_type=mime_type or '',
+        upload_status='pending',
+        next_upload_at=timezone.now(),
+        is_ocr_processed=ocr_result_id is not None,
+        ocr_processed_at=timezone.now() if ocr_result_id else None,
+        ocr_result_id=ocr_result_id,
+        metadata=metadata,
+    )
+
+    spool_path = get_spool_dir() / f"{uploaded_doc.id}{Path(stored_filename).suffix}"
+    spool_path.write_bytes(file_content)
+    uploaded_doc.spool_path = str(spool_path)
+    uploaded_doc.save()
+
+    run_in_background(_upload_and_sweep, str(uploaded_doc.pk))
+    return uploaded_doc
+
+
+def _claimable() -> Q:
+    """アップロードを開始できるドキュメントの条件"""
+    now = timezone.now()
+    return (
+        Q(upload_status='pending') & (Q(next_upload_at__isnull=True) | Q(next_upload_at__lte=now))
+    ) | Q(upload_status='uploading', next_upload_at__lte=now)
+
+
+def _claim(document_id: str) -> bool:
+    """ドキュメントを 'uploading' にする（他のワーカーが処理中の場合はFalse）"""
+    return UploadedDocument.objects.filter(_claimable(), pk=document_id).update(
+        upload_status='uploading',
+        upload_attempts=F('upload_attempts') + 1,
+        next_upload_at=timezone.now() + timedelta(seconds=UPLOAD_LEASE_SECONDS),
+    ) == 1
+
+
+def _save_tokens(storage_setting: CloudStorageSetting, adapter: StorageAdapter) -> None:
+    """リフレッシュしたトークンをストレージ設定に保存"""
+    storage_setting.access_token = adapter.access_token
+    storage_setting.refresh_token = adapter.refresh_token or storage_setting.refresh_token
+    storage_setting.save(update_fields=['access_token', 'refresh_token', 'updated_at'])
+
+
+def _upload(
+    storage_setting: CloudStorageSetting,
+    adapter: StorageAdapter,
+    uploaded_doc: UploadedDocument
+) -> Tuple[Dict, str]:
+    """スプールファイルをアップロード（認証エラーの場合はトークンを更新して1回だけ再試行）"""
+    folder_cache = FolderIdCache(storage_setting, adapter)
+    folder_path = get_folder_path(uploaded_doc.document_type, uploaded_doc.subfolder_type or None)
+
+    for attempt in range(2):
+        with open(uploaded_doc.spool_path, 'rb') as file_content:
+            try:
+                return folder_cache.upload_file(
+                    file_content=file_content,
+                    filename=uploaded_doc.stored_filename,
+                    folder_path=folder_path,
+                    mime_type=uploaded_doc.mime_type or None
+                )
+            except Exception as e:
+                if attempt or not adapter.is_auth_error(e):
+                    raise
+                logger.info(f"Storage access token expired, refreshing: {storage_setting.id}")
+                if not adapter.refresh_access_token():
+                    raise
+                _save_tokens(storage_setting, adapter)
+
+
+def _mark_failed(uploaded_doc: UploadedDocument, error: str) -> None:
+    uploaded_doc.upload_status = 'failed'
+    uploaded_doc.upload_error = error
+    uploaded_doc.next_upload_at = None
+    uploaded_doc.save(update_fields=['upload_status', 'upload_error', 'next_upload_at', 'updated_at'])
+    logger.error(f"Storage upload failed: {uploaded_doc.id} ({error})")
+
+
+def _schedule_retry(uploaded_doc: UploadedDocument, error: Exception) -> None:
+    """指数バックオフで再試行を予約（上限に達した場合は 'failed'）"""
+    if uploaded_doc.upload_attempts >= MAX_UPLOAD_ATTEMPTS:
+        _mark_failed(uploaded_doc, str(error))
+        return
+
+    delay = min(RETRY_BASE_SECONDS * 2 ** (uploaded_doc.upload_attempts - 1), RETRY_MAX_SECONDS)
+    uploaded_doc.upload_status = 'pending'
+    uploaded_doc.upload_error = str(error)
+    uploaded_doc.next_upload_at = timezone.now() + timedelta(seconds=delay)
+    uploaded_doc.save(update_fields=['upload_status', 'upload_error', 'next_upload_at', 'updated_at'])
+    logger.warning(
+        f"Storage upload failed, retrying in {delay}s: {uploaded_doc.id} "
+        f"(attempt {uploaded_doc.upload_attempts}/{MAX_UPLOAD_ATTEMPTS}): {error}"
+    )
+
+
+def process_upload(document_id: str, adapters: Optional[Dict[str, StorageAdapter]] = None) -> bool:
+    """
+    アップロード待ちのドキュメントを1件アップロード
+
+    Args:
+        document_id: UploadedDocumentのID
+        adapters: ストレージ設定IDごとのアダプター（まとめて処理する場合にAPIクライアントを再利用する）
+
+    Returns:
+        アップロードした場合True
+    """
+    if not _claim(document_id):
+        return False
+
+    uploaded_doc = UploadedDocument.objects.get(pk=document_id)
+    if not uploaded_doc.spool_path or not os.path.exists(uploaded_doc.spool_path):
+        _mark_failed(uploaded_doc, 'スプールファイルが見つかりません')
+        return False
+
+    storage_setting = CloudStorageSetting.objects.select_related('user').filter(
+        user_id=uploaded_doc.user_id,
+        company_id=uploaded_doc.company_id,
+        storage_type=uploaded_doc.storage_type,
+        is_active=True
+    ).first()
+    if not storage_setting:
+        _mark_failed(uploaded_doc, 'ストレージ設定が見つかりません')
+        return False
+
+    try:
+        adapter = adapters.get(storage_setting.id) if adapters is not None else None
+        if adapter is None:
+            adapter = get_storage_adapter(storage_setting)
+            if adapter is None:
+                _mark_failed(uploaded_doc, f'未対応のストレージタイプです: {storage_setting.storage_type}')
+                return False
+            if adapters is not None:
+                adapters[storage_setting.id] = adapter
+        file_info, folder_id = _upload(storage_setting, adapter, uploaded_doc)
+    except Exception as e:
+        _schedule_retry(uploaded_doc, e)
+        return False
+
+    spool_path = uploaded_doc.spool_path
+    uploaded_doc.file_id = file_info['id']
+    uploaded_doc.folder_id = folder_id
+    uploaded_doc.file_url = file_info.get('webViewLink', '') or ''
+    uploaded_doc.upload_status = 'uploaded'
+    uploaded_doc.upload_error = ''
+    uploaded_doc.next_upload_at = None
+    uploaded_doc.spool_path = ''
+    uploaded_doc.save(update_fields=[
+        'file_id', 'folder_id', 'file_url', 'upload_status', 'upload_error',
+        'next_upload_at', 'spool_path', 'updated_at'
+    ])
+    try:
+        os.remove(spool_path)
+    except OSError:
+        logger.warning(f"Failed to remove spool file: {spool_path}")
+
+    logger.info(f"File uploaded to cloud storage: {uploaded_doc.stored_filename} ({uploaded_doc.id})")
+    return True
+
+
+def process_pending_uploads(limit: int = 100) -> Dict[str, int]:
+    """
+    アップロード待ち（再試行の時刻を過ぎたもの）をまとめてアップロード
+
+    スプールファイルがこのホストにあるものだけを対象にする。
+
+    Returns:
+        {'uploaded': アップロード件数, 'retrying': 再試行・失敗件数}
+    """
+    candidates = UploadedDocument.objects.filter(_claimable()).exclude(
+        spool_path=''
+    ).order_by('next_upload_at').values_list('id', 'spool_path')[:limit]
+
+    adapters: Dict[str, StorageAdapter] = {}
+    result = {'uploaded': 0, 'retrying': 0}
+    for document_id, spool_path in candidates:
+        if not os.path.exists(spool_path):
+            continue
+        if process_upload(document_id, adapters):
+            result['uploaded'] += 1
+        else:
+            result['retrying'] += 1
+    return result
+
+
+def _upload_and_sweep(document_id: str) -> None:
+    """バックグラウンド処理: 登録したドキュメントをアップロードし、再試行待ちのものも処理する"""
+    process_upload(document_id)
+    process_pending_uploads(limit=10)
+
+
+def retry_upload(uploaded_doc: UploadedDocument) -> None:
+    """失敗したアップロードを再試行（試行回数をリセット）"""
+    uploaded_doc.upload_status = 'pending'
+    uploaded_doc.upload_attempts = 0
+    uploaded_doc.next_upload_at = timezone.now()
+    uploaded_doc.save(update_fields=['upload_status', 'upload_attempts', 'next_upload_at', 'updated_at'])
+    run_in_background(_upload_and_sweep, str(uploaded_doc.pk))
@@ -0,0 +1,639 @@
+"""
+Stripe Webhookイベントの受信箱と処理
+
+Webhookエンドポイントはイベントを検証してStripeEventに記録するだけにし、
+サブスクリプションへの反映はバックグラウンド（または管理コマンド process_stripe_events）で行う。
+
+- イベントIDを主キーにしているため、Stripeの再送（リトライ）は記録時点で無視される
+- 同じ顧客のイベントはイベント発生順に1件ずつ適用する（先頭のイベントが再試行待ちの間は後続も待つ）
+- 処理に失敗したイベントは指数バックオフで再試行し、上限に達した場合は 'failed' にする。
+  'failed' のイベントは管理画面で再試行またはスキップするまで、その顧客の後続イベントを止める
+- Stripe APIの呼び出し（StripeEventHandler.fetch）はDBのトランザクション・行ロックの外で行う
+"""
+import datetime
+import logging
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+import stripe
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import Firm, FirmPlan, FirmSubscription, StripeEvent
+
+logger = logging.getLogger(__name__)
+
+# Stripe APIキーの設定
+stripe.api_key = getattr(settings, 'STRIPE_SECRET_KEY', '')
+
+# 再試行の上限と間隔（1分、2分、4分…最大1時間）
+MAX_EVENT_ATTEMPTS = 8
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 3600
+# 顧客のキューの先頭になるイベントの状態（'failed' は解除されるまで後続を止める）
+QUEUED_STATUSES = ('pending', 'failed')
+
+
+def _from_timestamp(value) -> Optional[datetime.datetime]:
+    """StripeのUNIXタイムスタンプをdatetime（UTC）に変換"""
+    if not value:
+        return None
+    return datetime.datetime.fromtimestamp(value, tz=datetime.timezone.utc)
+
+
+def _to_dict(stripe_object) -> Dict[str, Any]:
+    """Stripe APIのレスポンス（StripeObject）を辞書に変換"""
+    if isinstance(stripe_object, dict):
+        return stripe_object
+    return stripe_object.to_dict()
+
+
+def _find_plan_by_price_id(price_id: str) -> Optional[FirmPlan]:
+    """価格ID（月額・年額）からプランを取得"""
+    return FirmPlan.objects.filter(
+        stripe_price_id_monthly=price_id
+    ).first() or FirmPlan.objects.filter(
+        stripe_price_id_yearly=price_id
+    ).first()
+
+
+class StripeEventHandler:
+    """Stripeイベントをサブスクリプションに反映するハンドラー"""
+
+    # イベントタイプ → 処理メソッド名
+    EVENT_HANDLERS = {
+        'checkout.session.completed': 'handle_checkout_session_completed',
+        'customer.subscription.created': 'handle_subscription_created',
+        'customer.subscription.updated': 'handle_subscription_updated',
+        'customer.subscription.deleted': 'handle_subscription_deleted',
+        'invoice.payment_succeeded': 'handle_invoice_payment_succeeded',
+        'invoice.payment_failed': 'handle_invoice_payment_failed',
+        # invoice_payment.paidはinvoice.payment_succeededと同じ処理
+        'invoice_payment.paid': 'handle_invoice_payment_succeeded',
+    }
+
+    def __init__(self, stripe_api=None):
+        """
+        Args:
+            stripe_api: Stripe APIクライアント（Subscription.retrieve、Customer.retrieveを持つもの。
+                        テストではローカルのフェイクを渡す）
+        """
+        self.stripe = stripe_api or stripe
+
+    def fetch(self, event_type: str, event_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        イベントの適用に必要なStripeのオブジェクトを取得
+
+        ネットワークを使うため、DBのトランザクション・行ロックの外で呼ぶ。
+
+        Returns:
+            {'subscription': サブスクリプション, 'customer': 顧客}（必要なものだけ。顧客を取得できなかった場合はNone）
+        """
+        remote = {}
+        method_name = self.EVENT_HANDLERS.get(event_type)
+        subscription = None
+        if method_name in ('handle_checkout_session_completed', 'handle_invoice_payment_succeeded'):
+            stripe_subscription_id = event_data.get('subscription')
+            if stripe_subscription_id:
+                subscription = _to_dict(self.stripe.Subscription.retrieve(stripe_subscription_id))
+                remote['subscription'] = subscription
+        elif method_name == 'handle_subscription_created':
+            subscription = _to_dict(event_data)
+
+        if subscription is not None:
+            firm_id = (subscription.get('metadata') or {}).get('firm_id')
+            if method_name == 'handle_checkout_session_completed':
+                firm_id = firm_id or (event_data.get('metadata') or {}).get('firm_id')
+            if not firm_id and subscription.get('customer'):
+                remote['customer'] = self._retrieve_customer(subscription['customer'])
+        return remote
+
+    def _retrieve_customer(self, stripe_customer_id: str) -> Optional[Dict[str, Any]]:
+        """顧客を取得（取得できない場合はNone）"""
+        try:
+            return _to_dict(self.stripe.Customer.retrieve(stripe_customer_id))
+        except Exception as e:
+            logger.error(f"Error retrieving customer: {e}", exc_info=True)
+            return None
+
+    def handle(self, event_type: str, event_data: Dict[str, Any], remote: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        イベントを処理
+
+        Args:
+            remote: fetch で取得済みのStripeのオブジェクト（省略時はここで取得する）
+
+        Returns:
+            処理対象のイベントタイプの場合True
+        """
+        method_name = self.EVENT_HANDLERS.get(event_type)
+        if not method_name:
+            logger.info(f"Unhandled event type: {event_type}")
+            return False
+        if remote is None:
+            remote = self.fetch(event_type, event_data)
+        logger.info(f"Processing {event_type} event")
+        getattr(self, method_name)(event_data, remote)
+        return True
+
+    @transaction.atomic
+    def handle_checkout_session_completed(self, session_data, remote=None):
+        """Checkout Session完了時の処理"""
+        logger.info(f"Handling checkout.session.completed: {session_data.get('id')}")
+
+        # metadataから取得
+        metadata = session_data.get('metadata') or {}
+        firm_id = metadata.get('firm_id')
+        plan_id = metadata.get('plan_id')
+
+        logger.info(f"Metadata - firm_id: {firm_id}, plan_id: {plan_id}")
+
+        # subscription_idを取得
+        stripe_subscription_id = session_data.get('subscription')
+        if not stripe_subscription_id:
+            logger.warning("No subscription ID in checkout session")
+            return
+
+        # Stripeからサブスクリプション情報を取得
+        if remote is None:
+            remote = self.fetch('checkout.session.completed', session_data)
+        stripe_subscription = remote['subscription']
+        logger.info(f"Retrieved subscription from Stripe: {stripe_subscription_id} (status: {stripe_subscription.get('status')})")
+
+        # metadataにplan_idとfirm_idを追加（サブスクリプション作成処理で使用）
+        if not stripe_subscription.get('metadata'):
+            stripe_subscription['metadata'] = {}
+        if plan_id and 'plan_id' not in stripe_subscription['metadata']:
+            stripe_subscription['metadata']['plan_id'] = plan_id
+        if firm_id and 'firm_id' not in stripe_subscription['metadata']:
+            stripe_subscription['metadata']['firm_id'] = firm_id
+
+        # サブスクリプション作成処理を呼び出す（プラン情報を含む）
+        self.handle_subscription_created(stripe_subscription, remote)
+        logger.info("Checkout session completed and subscription created/updated")
+
+    @transaction.atomic
+    def handle_subscription_created(self, subscription_data, remote=None):
+        """サブスクリプション作成時の処理"""
+        subscription_data = _to_dict(subscription_data)
+        stripe_subscription_id = subscription_data['id']
+        stripe_customer_id = subscription_data['customer']
+
+        logger.info(f"Handling subscription.created: {stripe_subscription_id}")
+
+        # metadataから取得を試みる
+        metadata = subscription_data.get('metadata') or {}
+        firm_id = metadata.get('firm_id')
+        plan_id = metadata.get('plan_id')
+
+        # metadataにない場合は、Customerのmetadataから取得
+        if not firm_id:
+            if remote is not None and 'customer' in remote:
+                customer = remote['customer']
+            else:
+                customer = self._retrieve_customer(stripe_customer_id)
+            if customer:
+                firm_id = (customer.get('metadata') or {}).get('firm_id')
+                logger.info(f"Retrieved firm_id from customer metadata: {firm_id}")
+
+        price_id = subscription_data.get('items', {}).get('data', [{}])[0].get('price', {}).get('id', '')
+
+        # plan_idがmetadataにない場合は、price_idからプランを特定
+        if not plan_id and price_id:
+            plan = _find_plan_by_price_id(price_id)
+            if plan:
+                plan_id = plan.id
+                logger.info(f"Found plan by price_id: {plan.name} (ID: {plan_id})")
+            else:
+                logger.warning(f"Plan not found for price_id: {price_id}")
+
+        if not firm_id:
+            logger.warning(f"Missing firm_id in subscription {stripe_subscription_id}")
+            return
+
+        if not plan_id:
+            logger.warning(f"Missing plan_id in subscription {stripe_subscription_id}")
+            return
+
+        try:
+            firm = Firm.objects.get(id=firm_id)
+            plan = FirmPlan.objects.get(id=plan_id)
+        except (Firm.DoesNotExist, FirmPlan.DoesNotExist) as e:
+            logger.error(f"Firm or Plan not found: {e}", exc_info=True)
+            return
+
+        # 既存のサブスクリプションを取得（stripe_subscription_id、見つからない場合はfirmで検索）
+        existing_subscription = FirmSubscription.objects.filter(
+            stripe_subscription_id=stripe_subscription_id
+        ).first() or FirmSubscription.objects.filter(
+            firm=firm
+        ).first()
+
+        if existing_subscription:
+            # 既存のサブスクリプションを更新
+            old_plan = existing_subscription.plan
+            plan_changed = old_plan != plan
+
+            existing_subscription.plan = plan
+            existing_subscription.status = 'active'
+            existing_subscription.stripe_customer_id = stripe_customer_id
+            existing_subscription.stripe_subscription_id = stripe_subscription_id
+            existing_subscription.stripe_price_id = price_id
+            existing_subscription.current_period_start = _from_timestamp(subscription_data.get('current_period_start'))
+            existing_subscription.current_period_end = _from_timestamp(subscription_data.get('current_period_end'))
+            existing_subscription.save()
+
+            # プラン変更履歴を記録
+            if plan_changed:
+                from ..models import SubscriptionHistory
+                SubscriptionHistory.objects.create(
+                    firm=firm,
+                    subscription=existing_subscription,
+                    old_plan=old_plan,
+                    new_plan=plan,
+                    reason='Stripe Checkout経由でのプラン変更',
+                    changed_by=None,  # Webhook経由のためユーザー情報なし
+                )
+                logger.info(f"Plan changed from {old_plan.name} to {plan.name} for subscription {existing_subscription.id}")
+
+            subscription = existing_subscription
+        else:
+            # 新しいサブスクリプションを作成
+            subscription = FirmSubscription.objects.create(
+                firm=firm,
+                plan=plan,
+                status='active',
+                stripe_customer_id=stripe_customer_id,
+                stripe_subscription_id=stripe_subscription_id,
+                stripe_price_id=price_id,
+                started_at=timezone.now(),
+                current_period_start=_from_timestamp(subscription_data.get('current_period_start')),
+                current_period_end=_from_timestamp(subscription_data.get('current_period_end')),
+            )
+
+        logger.info(f"Subscription state - ID: {subscription.id}, Plan: {subscription.plan.name}, Status: {subscription.status}")
+
+    @transaction.atomic
+    def handle_subscription_updated(self, subscription_data, remote=None):
+        """サブスクリプション更新時の処理（プラン変更含む）"""
+        from ..utils.plan_downgrade import handle_plan_downgrade
+
+        stripe_subscription_id = subscription_data.get('id')
+        logger.info(f"Handling subscription update: {stripe_subscription_id}")
+
+        # 既存のサブスクリプションを取得
+        subscription = FirmSubscription.objects.filter(
+            stripe_subscription_id=stripe_subscription_id
+        ).first()
+
+        if not subscription:
+            logger.warning(f"Subscription not found: {stripe_subscription_id}")
+            return
+
+        # 古いプランを保存
+        old_plan = subscription.plan
+
+        # 新しい価格IDを取得
+        items = subscription_data.get('items', {}).get('data', [])
+        if not items:
+            logger.warning("No items in subscription data")
+            return
+
+        new_price_id = items[0].get('price', {}).get('id')
+        if not new_price_id:
+            logger.warning("No price ID in subscription data")
+            return
+
+        # 新しいプランを取得
+        new_plan = _find_plan_by_price_id(new_price_id)
+        if not new_plan:
+            logger.warning(f"Plan not found for price ID: {new_price_id}")
+            return
+
+        logger.info(f"Plan changed from {old_plan.name} to {new_plan.name}")
+
+        # プランを更新
+        subscription.plan = new_plan
+        subscription.stripe_price_id = new_price_id
+
+        # プラン変更履歴を記録
+        from ..models import SubscriptionHistory
+        SubscriptionHistory.objects.create(
+            firm=subscription.firm,
+            subscription=subscription,
+            old_plan=old_plan,
+            new_plan=new_plan,
+            reason='Stripe Webhook経由でのプラン変更',
+        )
+
+        # 通知を作成
+        from ..utils.notifications import notify_subscription_updated
+        notify_subscription_updated(subscription.firm, new_plan.name)
+
+        # ダウングレードの場合は処理を実行
+        if old_plan.max_companies > new_plan.max_companies or (
+            old_plan.max_companies == 0 and new_plan.max_companies > 0
+        ):
+            logger.info("Plan downgrade detected, handling grace period...")
+            companies_in_grace, grace_days = handle_plan_downgrade(subscription.firm, new_plan)
+            logger.info(f"{len(companies_in_grace)} companies entered grace period for {grace_days} days")
+
+            # ダウングレード通知を作成
+            from ..utils.notifications import notify_plan_downgrade
+            notify_plan_downgrade(subscription.firm, old_plan.name, new_plan.name, len(companies_in_grace))
+
+        # その他のサブスクリプション情報を更新
+        subscription.status = subscription_data.get('status', subscription.status)
+        subscription.current_period_start = (
+            _from_timestamp(subscription_data.get('current_period_start')) or subscription.current_period_start
+        )
+        subscription.current_period_end = (
+            _from_timestamp(subscription_data.get('current_period_end')) or subscription.current_period_end
+        )
+        subscription.canceled_at = _from_timestamp(subscription_data.get('canceled_at')) or subscription.canceled_at
+        subscription.ends_at = _from_timestamp(subscription_data.get('cancel_at')) or subscription.ends_at
+
+        subscription.save()
+        logger.info(f"Subscription updated successfully: {subscription.id}")
+
+    @transaction.atomic
+    def handle_subscription_deleted(self, subscription_data, remote=None):
+        """サブスクリプション削除時の処理"""
+        stripe_subscription_id = subscription_data['id']
+
+        try:
+            subscription = FirmSubscription.objects.get(
+                stripe_subscription_id=stripe_subscription_id
+            )
+        except FirmSubscription.DoesNotExist:
+            logger.warning(f"Subscription not found: {stripe_subscription_id}")
+            return
+
+        subscription.status = 'canceled'
+        if subscription_data.get('ended_at'):
+            subscription.ends_at = _from_timestamp(subscription_data['ended_at'])
+        subscription.canceled_at = timezone.now()
+        subscription.save()
+
+        logger.info(f"Subscription deleted: {subscription.id}")
+
+    @transaction.atomic
+    def handle_invoice_payment_succeeded(self, invoice_data, remote=None):
+        """請求書の支払い成功時の処理"""
+        stripe_subscription_id = invoice_data.get('subscription')
+
+        if not stripe_subscription_id:
+            logger.warning("Invoice has no subscription")
+            return
+
+        # Stripeから最新のサブスクリプション情報を取得
+        if remote is None:
+            remote = self.fetch('invoice.payment_succeeded', invoice_data)
+        stripe_subscription = remote['subscription']
+
+        subscription = FirmSubscription.objects.filter(
+            stripe_subscription_id=stripe_subscription_id
+        ).first()
+        if not subscription:
+            logger.warning(f"Subscription not found: {stripe_subscription_id}, creating from Stripe data")
+            self.handle_subscription_created(stripe_subscription, remote)
+            subscription = FirmSubscription.objects.filter(
+                stripe_subscription_id=stripe_subscription_id
+            ).first()
+            if not subscription:
+                return
+
+        # プラン変更のチェック（price_idが変更された場合）
+        items = stripe_subscription.get('items', {}).get('data', [])
+        if items:
+            new_price_id = items[0].get('price', {}).get('id', '')
+            if new_price_id and new_price_id != subscription.stripe_price_id:
+                new_plan = _find_plan_by_price_id(new_price_id)
+                if new_plan:
+                    old_plan = subscription.plan
+                    subscription.plan = new_plan
+                    subscription.stripe_price_id = new_price_id
+                    logger.info(
+                        f"Plan changed for subscription {subscription.id}: "
+                        f"{old_plan.name} (ID: {old_plan.id}) -> {new_plan.name} (ID: {new_plan.id})"
+                    )
+                else:
+                    logger.warning(f"Plan not found for price_id: {new_price_id} in subscription {subscription.id}")
+
+        # サブスクリプションを有効化
+        subscription.status = 'active'
+
+        # 期間を更新
+        if invoice_data.get('period_start'):
+            subscription.current_period_start = _from_timestamp(invoice_data['period_start'])
+        if invoice_data.get('period_end'):
+            subscription.current_period_end = _from_timestamp(invoice_data['period_end'])
+
+        subscription.save()
+        logger.info(f"Invoice payment succeeded for subscription: {subscription.id} (status: {subscription.status}, plan: {subscription.plan.name})")
+
+    @transaction.atomic
+    def handle_invoice_payment_failed(self, invoice_data, remote=None):
+        """請求書の支払い失敗時の処理"""
+        from ..utils.notifications import notify_payment_failed
+
+        stripe_subscription_id = invoice_data.get('subscription')
+        customer_id = invoice_data.get('customer')
+
+        if not stripe_subscription_id:
+            logger.warning("Invoice has no subscription")
+            return
+
+        # サブスクリプションを取得（見つからない場合は顧客IDから取得）
+        subscription = FirmSubscription.objects.filter(
+            stripe_subscription_id=stripe_subscription_id
+        ).first()
+        if not subscription and customer_id:
+            subscription = FirmSubscription.objects.filter(
+                stripe_customer_id=customer_id
+            ).first()
+
+        if not subscription:
+            logger.warning(f"Subscription not found for invoice: {invoice_data.get('id')}")
+            return
+
+        # 通知を作成
+        notify_payment_failed(subscription.firm, invoice_data.get('id'))
+        logger.info(f"Payment failed notification created for firm {subscription.firm.id}")
+
+        # サブスクリプションを支払い遅延状態に
+        if subscription.stripe_subscription_id == stripe_subscription_id:
+            subscription.status = 'past_due'
+            subscription.save()
+            logger.info(f"Invoice payment failed for subscription: {subscription.id}")
+
+
+def _event_customer_id(event: Dict[str, Any]) -> str:
+    """イベントの対象顧客ID（顧客単位で順番に処理するためのキー）"""
+    event_object = event.get('data', {}).get('object', {}) or {}
+    if event_object.get('object') == 'customer':
+        return event_object.get('id') or ''
+    customer = event_object.get('customer')
+    if isinstance(customer, dict):
+        customer = customer.get('id')
+    return customer or ''
+
+
+def record_stripe_event(event: Dict[str, Any]) -> Optional[StripeEvent]:
+    """
+    検証済みのイベントを受信箱に記録
+
+    Args:
+        event: Webhookのペイロード（JSONをデコードした辞書）
+
+    Returns:
+        新しく記録したStripeEvent。記録済み（Stripeの再送）の場合はNone
+    """
+    try:
+        with transaction.atomic():
+            stripe_event, created = StripeEvent.objects.get_or_create(
+                id=event['id'],
+                defaults={
+                    'event_type': event.get('type', ''),
+                    'customer_id': _event_customer_id(event),
+                    'event_created': _from_timestamp(event.get('created')) or timezone.now(),
+                    'payload': event,
+                }
+            )
+    except IntegrityError:
+        # 同じイベントを並行して受信した場合
+        return None
+
+    if not created:
+        logger.info(f"Stripe event already recorded: {event['id']}")
+        return None
+    return stripe_event
+
+
+def _schedule_retry(stripe_event: StripeEvent, error: Exception) -> None:
+    """指数バックオフで再試行を予約（上限に達した場合は 'failed'）"""
+    stripe_event.last_error = str(error)
+    if stripe_event.attempts >= MAX_EVENT_ATTEMPTS:
+        stripe_event.status = 'failed'
+        stripe_event.next_attempt_at = None
+        logger.error(
+            f"Stripe event failed after {stripe_event.attempts} attempts: {stripe_event.id} ({stripe_event.event_type}): {error}. "
+            f"Later events for customer {stripe_event.customer_id!r} are blocked until it is retried or skipped in the admin."
+        )
+    else:
+        delay = min(RETRY_BASE_SECONDS * 2 ** (stripe_event.attempts - 1), RETRY_MAX_SECONDS)
+        stripe_event.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        logger.warning(
+            f"Stripe event processing failed, retrying in {delay}s: {stripe_event.id} "
+            f"({stripe_event.event_type}, attempt {stripe_event.attempts}/{MAX_EVENT_ATTEMPTS}): {error}"
+        )
+    stripe_event.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at'])
+
+
+def _queue_head(customer_id: str, lock: bool = False) -> Optional[StripeEvent]:
+    """顧客のキューの先頭のイベント（未処理または失敗）"""
+    queryset = StripeEvent.objects.filter(customer_id=customer_id, status__in=QUEUED_STATUSES)
+    if lock:
+        queryset = queryset.select_for_update()
+    return queryset.order_by('event_created', 'received_at').first()
+
+
+def process_customer_events(customer_id: str, handler: Optional[StripeEventHandler] = None) -> int:
+    """
+    顧客の未処理イベントを発生順に適用
+
+    Stripe APIからの取得はロックの外で行い、適用は先頭のイベントをロックしてから行う。
+    取得中に他のワーカーが先頭のイベントを処理した場合は取得し直すため、
+    複数のワーカーが同じ顧客を処理してもイベントの順序は入れ替わらない。
+    先頭のイベントが 'failed' の場合は、解除されるまで後続のイベントを適用しない。
+
+    Args:
+        customer_id: Stripe顧客ID
+        handler: イベントハンドラー
+
+    Returns:
+        処理したイベント数
+    """
+    handler = handler or StripeEventHandler()
+    processed = 0
+
+    while True:
+        head = _queue_head(customer_id)
+        if head is None:
+            return processed
+        if head.status == 'failed':
+            logger.warning(f"Stripe events for customer {customer_id!r} are blocked by failed event {head.id}")
+            return processed
+        if head.next_attempt_at and head.next_attempt_at > timezone.now():
+            # 先頭のイベントが再試行待ちの間は、後続のイベントも適用しない
+            return processed
+
+        event_data = head.payload['data']['object']
+        error = None
+        remote = None
+        try:
+            remote = handler.fetch(head.event_type, event_data)
+        except Exception as e:
+            error = e
+
+        with transaction.atomic():
+            stripe_event = _queue_head(customer_id, lock=True)
+            if (stripe_event is None or stripe_event.pk != head.pk
+                    or stripe_event.status != 'pending' or stripe_event.attempts != head.attempts):
+                # 取得中に他のワーカーが処理した
+                continue
+
+            stripe_event.attempts += 1
+            if error is None:
+                try:
+                    with transaction.atomic():
+                        handler.handle(stripe_event.event_type, event_data, remote)
+                except Exception as e:
+                    error = e
+            if error is not None:
+                _schedule_retry(stripe_event, error)
+                return processed
+
+            stripe_event.status = 'processed'
+            stripe_event.processed_at = timezone.now()
+            stripe_event.last_error = ''
+            stripe_event.next_attempt_at = None
+            stripe_event.save(update_fields=['status', 'attempts', 'processed_at', 'last_error', 'next_attempt_at'])
+            processed += 1
+
+
+def retry_failed_events(queryset) -> int:
+    """失敗したイベントを未処理に戻す（試行回数をリセットし、次回の処理で再試行する）"""
+    return queryset.filter(status='failed').update(status='pending', attempts=0, next_attempt_at=None)
+
+
+def skip_failed_events(queryset) -> int:
+    """失敗したイベントを適用せずにスキップする（同じ顧客の後続イベントの処理を再開する）"""
+    return queryset.filter(status='failed').update(status='skipped', next_attempt_at=None)
+
+
+def process_pending_stripe_events(handler: Optional[StripeEventHandler] = None, limit: int = 500) -> Dict[str, int]:
+    """
+    処理可能な未処理イベントを顧客ごとに適用
+
+    Returns:
+        {'customers': 対象顧客数, 'processed': 処理したイベント数}
+    """
+    handler = handler or StripeEventHandler()
+    now = timezone.now()
+    blocked_customer_ids = StripeEvent.objects.filter(status='failed').values('customer_id')
+    customer_ids = list(
+        StripeEvent.objects.filter(
+            Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now),
+            status='pending',
+        ).exclude(
+            customer_id__in=blocked_customer_ids
+        ).order_by().values_list('customer_id', flat=True).distinct()[:limit]
+    )
+
+    processed = 0
+    for customer_id in customer_ids:
+        processed += process_customer_events(customer_id, handler)
+    return {'customers': len(customer_ids), 'processed': processed}
@@ -1,19 +1,33 @@
 from django import template
 from scoreai.models import UserFirm, UserCompany
+from scoreai.utils.navigation import get_navigation
 
 register = template.Library()
 
+
+def _get_navigation(context, user=None):
+    """テンプレートのリクエストのNavigationContext（リクエストのユーザー以外の場合はNone）"""
+    request = context.get('request')
+    if request is None or (user is not None and user != getattr(request, 'user', None)):
+        return None
+    return get_navigation(request)
+
+
 @register.filter
 def get_item(dictionary, key):
     return dictionary.get(str(key))
 
 
-@register.simple_tag
-def get_user_firm_owner(user):
+@register.simple_tag(takes_context=True)
+def get_user_firm_owner(context, user):
     """ユーザーがオーナーであるFirmを取得"""
     if not user or not user.is_authenticated:
         return None
     
+    navigation = _get_navigation(context, user)
+    if navigation:
+        return navigation.firm_owner
+    
     user_firm = UserFirm.objects.filter(
         user=user,
         is_owner=True,
@@ -23,12 +37,16 @@ def get_user_firm_owner(user):
     return user_firm
 
 
-@register.simple_tag
-def get_user_selected_company(user):
+@register.simple_tag(takes_context=True)
+def get_user_selected_company(context, user):
     """ユーザーが選択中のCompanyを取得"""
     if not user or not user.is_authenticated:
         return None
     
+    navigation = _get_navigation(context, user)
+    if navigation:
+        return navigation.selected_active_company
+    
     user_company = UserCompany.objects.filter(
         user=user,
         is_selected=True,
@@ -38,12 +56,18 @@ def get_user_selected_company(user):
     return user_company.company if user_company else None
 
 
-@register.simple_tag
-def get_user_company(user, company):
+@register.simple_tag(takes_context=True)
+def get_user_company(context, user, company):
     """ユーザーとCompanyからUserCompanyを取得"""
     if not user or not user.is_authenticated or not company:
         return None
     
+    navigation = _get_navigation(context, user)
+    if navigation:
+        user_company = navigation.selected_user_company
+        if user_company and user_company.company_id == company.pk and user_company.active:
+            return user_company
+    
     user_company = UserCompany.objects.filter(
         user=user,
         company=company,
@@ -53,12 +77,16 @@ def get_user_company(user, company):
     return user_company
 
 
-@register.simple_tag
-def get_user_selected_firm(user):
+@register.simple_tag(takes_context=True)
+def get_user_selected_firm(context, user):
     """ユーザーが選択中のFirmを取得"""
     if not user or not user.is_authenticated:
         return None
     
+    navigation = _get_navigation(context, user)
+    if navigation:
+        return navigation.selected_firm
+    
     user_firm = UserFirm.objects.filter(
         user=user,
         is_selected=True,
@@ -68,12 +96,16 @@ def get_user_selected_firm(user):
     return user_firm.firm if user_firm else None
 
 
-@register.simple_tag
-def get_company_firm_for_plan_check(company):
+@register.simple_tag(takes_context=True)
+def get_company_firm_for_plan_check(context, company):
     """Companyが属するFirmを取得（プランチェック用）"""
     if not company:
         return None
     
+    navigation = _get_navigation(context)
+    if navigation:
+        return navigation.get_company_firm(company)
+    
     from scoreai.models import FirmCompany
     firm_company = FirmCompany.objects.filter(
         company=company,
@@ -2,15 +2,15 @@
 通知機能用のテンプレートタグ
 """
 from django import template
-from ..models import FirmNotification
+from ..utils import notifications
 
 register = template.Library()
 
 
 @register.simple_tag
 def get_unread_notification_count(firm):
-    """未読通知数を取得"""
+    """未読通知数を取得（キャッシュした件数）"""
     if not firm:
         return 0
-    return FirmNotification.objects.filter(firm=firm, is_read=False).count()
+    return notifications.get_unread_notification_count(firm.id)
 
@@ -0,0 +1,314 @@
+"""
+テスト用のデータ作成ヘルパー
+
+実際の利用に近いテナント（Firm・複数のCompany・10年分の決算・月次・借入・業界指標・To Do）を
+まとめて作成する。大量のレコードは bulk_create で作成するため、テストの準備は数百ミリ秒で終わる。
+
+    tenant = create_tenant()
+    tenant.owner        # Firmのオーナー（財務コンサルタント）
+    tenant.company      # オーナーが選択中のCompany（データはこのCompanyに作成する）
+"""
+import datetime
+import itertools
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import List, Optional
+
+from django.contrib.auth import get_user_model
+
+from ..models import (
+    AIConsultationHistory,
+    AIConsultationType,
+    Company,
+    Debt,
+    FinancialInstitution,
+    Firm,
+    FirmCompany,
+    FirmPlan,
+    FirmSubscription,
+    FirmUsageTracking,
+    FiscalSummary_Month,
+    FiscalSummary_Year,
+    IndustryBenchmark,
+    IndustryClassification,
+    IndustryIndicator,
+    IndustrySubClassification,
+    MeetingMinutes,
+    SecuredType,
+    Todo,
+    UserCompany,
+    UserFirm,
+)
+
+User = get_user_model()
+
+DEFAULT_PASSWORD = 'testpass123'
+
+# 作成するレコードの識別子を一意にするための連番
+_sequence = itertools.count(1)
+
+
+def _next() -> int:
+    return next(_sequence)
+
+
+def create_user(**kwargs) -> User:
+    number = _next()
+    kwargs.setdefault('username', f'user{number}')
+    kwargs.setdefault('email', f'user{number}@example.com')
+    kwargs.setdefault('password', DEFAULT_PASSWORD)
+    return User.objects.create_user(**kwargs)
+
+
+def create_company(**kwargs) -> Company:
+    number = _next()
+    kwargs.setdefault('name', f'テスト会社{number:04d}')
+    kwargs.setdefault('code', f'T{number:07d}')
+    kwargs.setdefault('fiscal_month', 3)
+    return Company.objects.create(**kwargs)
+
+
+def create_firm(owner: User, plan_type: str = 'professional', **kwargs) -> Firm:
+    """Firm・オーナーのUserFirm・サブスクリプションを作成"""
+    kwargs.setdefault('name', f'テスト事務所{_next():04d}')
+    firm = Firm.objects.create(owner=owner, **kwargs)
+    UserFirm.objects.create(user=owner, firm=firm, is_owner=True, is_selected=True)
+    plan, _ = FirmPlan.objects.get_or_create(
+        plan_type=plan_type,
+        defaults={'name': plan_type, 'max_companies': 0, 'max_ai_consultations_per_month': 0, 'max_ocr_per_month': 0},
+    )
+    FirmSubscription.objects.create(firm=firm, plan=plan, status='active')
+    return firm
+
+
+def add_company_to_firm(firm: Firm, company: Company, user: Optional[User] = None, is_selected: bool = False) -> FirmCompany:
+    """CompanyをFirmのクライアントにし、userを担当コンサルタントとして割り当てる"""
+    firm_company = FirmCompany.objects.create(firm=firm, company=company, start_date=datetime.date(2020, 4, 1))
+    if user is not None:
+        UserCompany.objects.create(user=user, company=company, as_consultant=True, is_selected=is_selected)
+    return firm_company
+
+
+def create_fiscal_years(company: Company, years: int = 10, last_year: int = 2024, is_budget: bool = False) -> List[FiscalSummary_Year]:
+    """直近 years 年分の年次決算（売上が毎年5%成長する決算書）"""
+    objs = []
+    for index in range(years):
+        year = last_year - years + 1 + index
+        sales = int(100000 * (1.05 ** index))
+        objs.append(FiscalSummary_Year(
+            company=company,
+            year=year,
+            is_budget=is_budget,
+            sales=sales,
+            gross_profit=int(sales * 0.4),
+            operating_profit=int(sales * 0.05),
+            ordinary_profit=int(sales * 0.045),
+            net_profit=int(sales * 0.03),
+            payroll_expense=int(sales * 0.2),
+            depreciation_expense=int(sales * 0.02),
+            interest_expense=int(sales * 0.005),
+            cash_and_deposits=int(sales * 0.2),
+            accounts_receivable=int(sales * 0.15),
+            inventory=int(sales * 0.1),
+            total_current_assets=int(sales * 0.5),
+            total_fixed_assets=int(sales * 0.4),
+            total_assets=int(sales * 0.9),
+            accounts_payable=int(sales * 0.1),
+            total_current_liabilities=int(sales * 0.3),
+            long_term_loans_payable=int(sales * 0.25),
+            total_long_term_liabilities=int(sales * 0.3),
+            total_liabilities=int(sales * 0.6),
+            capital_stock=10000,
+            total_net_assets=int(sales * 0.3),
+            number_of_employees_EOY=20 + index,
+        ))
+    return FiscalSummary_Year.objects.bulk_create(objs)
+
+
+def create_monthly_summaries(fiscal_years: List[FiscalSummary_Year], periods: int = 13) -> List[FiscalSummary_Month]:
+    """年次決算ごとに periods か月分の月次推移（13月目は決算整理月）"""
+    objs = []
+    for fiscal_year in fiscal_years:
+        monthly_sales = Decimal(fiscal_year.sales) / 12
+        for period in range(1, periods + 1):
+            sales = (monthly_sales * Decimal('0.1')) if period == 13 else monthly_sales
+            objs.append(FiscalSummary_Month(
+                fiscal_summary_year=fiscal_year,
+                period=period,
+                is_budget=fiscal_year.is_budget,
+                sales=round(sales, 2),
+                gross_profit=round(sales * Decimal('0.4'), 2),
+                operating_profit=round(sales * Decimal('0.05'), 2),
+                ordinary_profit=round(sales * Decimal('0.045'), 2),
+            ))
+    return FiscalSummary_Month.objects.bulk_create(objs)
+
+
+def create_debts(company: Company, count: int = 50) -> List[Debt]:
+    """count 件の借入（金融機関・保証区分・借入区分をばらけさせる）"""
+    institutions = [
+        FinancialInstitution.objects.get_or_create(
+            JBAcode=f'9{index:03d}',
+            defaults={'name': f'テスト銀行{index}', 'short_name': f'テスト{index}'},
+        )[0]
+        for index in range(5)
+    ]
+    secured_types = [SecuredType.objects.create(name=name) for name in ('プロパー', '信用保証協会', '日本政策金融公庫')]
+
+    objs = []
+    for index in range(count):
+        issue_date = datetime.date(2018 + index % 7, index % 12 + 1, 1)
+        principal = 10_000_000 + 1_000_000 * index
+        if index % 10 == 9:
+            debt_type, monthly_repayment, repayment_months = 'promissory_note', principal, []
+        elif index % 10 == 8:
+            debt_type, monthly_repayment, repayment_months = 'corporate_bond', principal // 10, [6, 12]
+        else:
+            debt_type, monthly_repayment, repayment_months = 'certificate', principal // 84, []
+        objs.append(Debt(
+            company=company,
+            financial_institution=institutions[index % len(institutions)],
+            secured_type=secured_types[index % len(secured_types)],
+            debt_type=debt_type,
+            principal=principal,
+            issue_date=issue_date,
+            start_date=issue_date + datetime.timedelta(days=31),
+            interest_rate=Decimal('1.2500') + Decimal(index % 5) / 10,
+            monthly_repayment=monthly_repayment,
+            repayment_months=repayment_months,
+            is_securedby_management=index % 2 == 0,
+            is_collateraled=index % 3 == 0,
+            is_rescheduled=index % 17 == 16,
+            reschedule_date=datetime.date(2023, 4, 1) if index % 17 == 16 else None,
+            reschedule_balance=principal // 2 if index % 17 == 16 else None,
+            is_nodisplay=index % 25 == 24,
+        ))
+    return Debt.objects.bulk_create(objs)
+
+
+def create_benchmarks(company: Company, years=(2022, 2023, 2024)) -> List[IndustryBenchmark]:
+    """Companyの業種・規模に対応する業界指標（Companyに業種を設定する）"""
+    classification, _ = IndustryClassification.objects.get_or_create(code='T01', defaults={'name': 'テスト業'})
+    subclassification, _ = IndustrySubClassification.objects.get_or_create(
+        code='T0101',
+        defaults={'name': 'テスト小分類', 'industry_classification': classification},
+    )
+    company.industry_classification = classification
+    company.industry_subclassification = subclassification
+    company.save(update_fields=['industry_classification', 'industry_subclassification'])
+
+    indicator_names = [
+        'sales_growth_rate', 'operating_profit_margin', 'labor_productivity',
+        'EBITDA_interest_bearing_debt_ratio', 'operating_working_capital_turnover_period', 'equity_ratio',
+    ]
+    indicators = [IndustryIndicator.objects.get_or_create(name=name)[0] for name in indicator_names]
+    objs = [
+        IndustryBenchmark(
+            year=year,
+            industry_classification=classification,
+            industry_subclassification=subclassification,
+            company_size=company.company_size,
+            indicator=indicator,
+            median=Decimal('10'),
+            standard_deviation=Decimal('2'),
+            range_iv=Decimal('4'),
+            range_iii=Decimal('8'),
+            range_ii=Decimal('12'),
+            range_i=Decimal('16'),
+        )
+        for year in years
+        for indicator in indicators
+    ]
+    return IndustryBenchmark.objects.bulk_create(objs, ignore_conflicts=True)
+
+
+def create_todos(company: Company, user: User, firm: Optional[Firm] = None, count: int = 20) -> List[Todo]:
+    statuses = ['pending', 'in_progress', 'completed']
+    objs = [
+        Todo(
+            company=company,
+            firm=firm if index % 2 else None,
+            owner_type='firm' if index % 2 else 'company',
+            title=f'To Do {index}',
+            status=statuses[index % len(statuses)],
+            due_date=datetime.date(2024, index % 12 + 1, 15),
+            created_by=user,
+        )
+        for index in range(count)
+    ]
+    return Todo.objects.bulk_create(objs)
+
+
+@dataclass
+class Tenant:
+    owner: User
+    firm: Firm
+    company: Company
+    companies: List[Company] = field(default_factory=list)
+    fiscal_years: List[FiscalSummary_Year] = field(default_factory=list)
+    budget_years: List[FiscalSummary_Year] = field(default_factory=list)
+    debts: List[Debt] = field(default_factory=list)
+    consultation_type: Optional[AIConsultationType] = None
+
+
+def create_tenant(companies: int = 20, years: int = 10, debts: int = 50, todos: int = 20, last_year: int = 2024) -> Tenant:
+    """
+    実際の利用に近いテナントを作成
+
+    オーナー（財務コンサルタント）が companies 社を担当し、先頭のCompanyを選択している。
+    先頭のCompanyには years 年分の年次決算と 13か月 × years 年分の月次推移、直近年度の予算、
+    debts 件の借入、業界指標、To Do、議事録、AI相談履歴、Firmの利用状況を作成する。
+    """
+    owner = create_user(is_financial_consultant=True)
+    firm = create_firm(owner)
+    client_companies = [create_company() for _ in range(companies)]
+    for index, company in enumerate(client_companies):
+        add_company_to_firm(firm, company, user=owner, is_selected=index == 0)
+    company = client_companies[0]
+
+    fiscal_years = create_fiscal_years(company, years=years, last_year=last_year)
+    create_monthly_summaries(fiscal_years)
+    budget_years = create_fiscal_years(company, years=1, last_year=last_year, is_budget=True)
+    create_monthly_summaries(budget_years, periods=12)
+
+    create_benchmarks(company)
+    debt_list = create_debts(company, count=debts)
+    create_todos(company, owner, firm=firm, count=todos)
+    MeetingMinutes.objects.bulk_create([
+        MeetingMinutes(company=company, created_by=owner, meeting_date=datetime.date(2024, month, 1), notes=f'議事録 {month}')
+        for month in range(1, 13)
+    ])
+
+    consultation_type = AIConsultationType.objects.create(name=f'財務相談{_next()}', description='財務に関する相談')
+    AIConsultationHistory.objects.bulk_create([
+        AIConsultationHistory(
+            user=owner,
+            company=company,
+            consultation_type=consultation_type,
+            user_message=f'質問 {index}',
+            ai_response=f'回答 {index}',
+            input_tokens=1000,
+            output_tokens=500,
+            total_tokens=1500,
+        )
+        for index in range(15)
+    ])
+    today = datetime.date.today()
+    FirmUsageTracking.objects.create(
+        firm=firm,
+        subscription=firm.subscription,
+        year=today.year,
+        month=today.month,
+        ai_consultation_count=15,
+    )
+
+    return Tenant(
+        owner=owner,
+        firm=firm,
+        company=company,
+        companies=client_companies,
+        fiscal_years=fiscal_years,
+        budget_years=budget_years,
+        debts=debt_list,
+        consultation_type=consultation_type,
+    )
@@ -0,0 +1,107 @@
+"""
+asyncビュー（AI相談・AI議事録生成）のテスト
+
+Geminiを応答の遅いスタブに置き換え、同時リクエストの応答待ちが重なって処理されることを確認する。
+"""
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import AIConsultationHistory, AIConsultationType
+from ..utils import gemini as gemini_module
+from .factories import add_company_to_firm, create_company, create_firm, create_user
+
+GEMINI_DELAY = 0.3
+CONCURRENT_REQUESTS = 5
+
+
+class SlowGeminiStub:
+    """client.aio.models.generate_content が GEMINI_DELAY 秒かかる google.genai のスタブ"""
+
+    def __init__(self, text='AIの回答です。'):
+        self.text = text
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+    def Client(self, api_key=None, http_options=None):
+        return SimpleNamespace(
+            models=SimpleNamespace(list=lambda: [SimpleNamespace(name='models/gemini-test')]),
+            aio=SimpleNamespace(models=SimpleNamespace(generate_content=self._generate_content)),
+        )
+
+    async def _generate_content(self, model, contents, config):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(GEMINI_DELAY)
+        finally:
+            self.in_flight -= 1
+        return SimpleNamespace(
+            text=self.text,
+            usage_metadata=SimpleNamespace(prompt_token_count=100, candidates_token_count=20, total_token_count=120),
+        )
+
+
+@override_settings(RATE_LIMIT_ENABLED=False, GEMINI_API_KEY='test-key')
+class AsyncAIViewsTest(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.firm = create_firm(self.user)
+        self.company = create_company()
+        add_company_to_firm(self.firm, self.company, user=self.user, is_selected=True)
+        self.consultation_type = AIConsultationType.objects.create(name='財務相談', description='財務に関する相談')
+        self.stub = SlowGeminiStub()
+        for patcher in (
+            mock.patch.object(gemini_module, 'genai', self.stub),
+            mock.patch.dict(os.environ),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_concurrent_consultations_wait_for_gemini_in_parallel(self):
+        await self.async_client.aforce_login(self.user)
+        url = reverse('ai_consultation_api', args=[self.consultation_type.id])
+
+        started = time.perf_counter()
+        responses = await asyncio.gather(*[
+            self.async_client.post(url, {'message': f'資金繰りの相談 {index}'})
+            for index in range(CONCURRENT_REQUESTS)
+        ])
+        elapsed = time.perf_counter() - started
+
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.json()['success'])
+            self.assertEqual(response.json()['tokens']['total'], 120)
+        # すべてのリクエストのGemini呼び出しが同時に応答待ちになる（ワーカー数に制限されない）
+        self.assertEqual(self.stub.max_in_flight, CONCURRENT_REQUESTS)
+        self.assertLess(elapsed, GEMINI_DELAY * CONCURRENT_REQUESTS)
+        self.assertEqual(
+            await AIConsultationHistory.objects.filter(company=self.company, total_tokens=120).acount(),
+            CONCURRENT_REQUESTS,
+        )
+
+    async def test_meeting_minutes_generation(self):
+        await self.async_client.aforce_login(self.user)
+        url = reverse('meeting_minutes_ai_generate')
+
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        response = await self.async_client.post(url, {
+            'meeting_type': 'board_of_directors',
+            'meeting_category': 'regular',
+            'agenda': 'representative_director',
+        })
+
+        self.assertRedirects(response, reverse('meeting_minutes_ai_result'), fetch_redirect_response=False)
+        session = await self.async_client.asession()
+        self.assertEqual(await session.aget('generated_minutes'), self.stub.text)
+        self.assertEqual(self.stub.calls, 1)
@@ -0,0 +1,81 @@
+"""
+予算と実績の比較（budget_comparison_service）のテスト
+"""
+from decimal import Decimal
+
+from django.test import TestCase
+
+from ..models import FiscalSummary_Month
+from ..services.budget_comparison_service import load_budget_comparison, load_budget_comparisons
+from .factories import create_company, create_fiscal_years, create_monthly_summaries
+
+
+class BudgetComparisonTest(TestCase):
+    def setUp(self):
+        self.company = create_company(fiscal_month=3)
+        self.actual_years = create_fiscal_years(self.company, years=3, last_year=2024)
+        self.budget_year = create_fiscal_years(self.company, years=1, last_year=2024, is_budget=True)[0]
+        self.budget_year.sales = 120000
+        self.budget_year.total_liabilities = 50000
+        self.budget_year.save()
+        create_monthly_summaries(self.actual_years)
+        create_monthly_summaries([self.budget_year], periods=12)
+
+    def test_indicators_match_model(self):
+        comparison = load_budget_comparison(self.company, 2024)
+        actual = self.actual_years[-1]
+        previous = self.actual_years[-2]
+
+        sales = comparison.financial_indicators['sales']
+        self.assertEqual(sales['budget'], 120000)
+        self.assertEqual(sales['actual'], actual.sales)
+        self.assertEqual(sales['diff'], actual.sales - 120000)
+        self.assertAlmostEqual(sales['diff_rate'], (actual.sales - 120000) / 120000 * 100)
+        self.assertEqual(sales['yoy'], actual.sales - previous.sales)
+        self.assertFalse(sales['favorable'])
+
+        for name in ('gross_profit_margin', 'operating_profit_margin', 'ROA', 'equity_ratio', 'current_ratio'):
+            with self.subTest(name=name):
+                self.assertEqual(comparison.financial_indicators[name]['actual'], float(getattr(actual, name)))
+                self.assertEqual(comparison.financial_indicators[name]['budget'], float(getattr(self.budget_year, name)))
+
+        # 負債は実績が予算を上回ると不利
+        self.assertFalse(comparison.bs_indicators['total_liabilities']['favorable'])
+
+    def test_year_without_budget(self):
+        comparison = load_budget_comparison(self.company, 2023)
+
+        self.assertIsNone(comparison.budget_year)
+        self.assertEqual(comparison.financial_indicators['sales']['budget'], 0)
+        self.assertIsNone(comparison.financial_indicators['sales']['diff'])
+        self.assertIsNone(comparison.chart_data('pl')['budget'][0])
+        # 予算のみの月はない（実績のみの月として表示）
+        self.assertTrue(all(row['has_actual'] and row['sales_diff'] is None for row in comparison.monthly))
+
+    def test_monthly_achievement_rate(self):
+        FiscalSummary_Month.objects.filter(fiscal_summary_year=self.budget_year, period=2).update(sales=0)
+        comparison = load_budget_comparison(self.company, 2024)
+
+        self.assertEqual([row['period'] for row in comparison.monthly], list(range(1, 13)))
+        self.assertEqual(comparison.monthly[0]['display_month'], 4)
+        first = comparison.monthly[0]
+        self.assertAlmostEqual(first['sales_achievement_rate'], first['actual_sales'] / first['budget_sales'] * 100)
+        # 予算が0の月の達成率は0
+        self.assertEqual(comparison.monthly[1]['sales_achievement_rate'], 0)
+        self.assertEqual(comparison.budget_months[0].display_month, 4)
+        self.assertEqual(comparison.monthly_total('budget_sales'), sum(
+            float(month.sales) for month in comparison.budget_months
+        ))
+        self.assertIsInstance(comparison.monthly[0]['budget_month'].sales, Decimal)
+
+    def test_multiple_years_in_two_queries(self):
+        with self.assertNumQueries(2):
+            comparisons = load_budget_comparisons(self.company, [2022, 2023, 2024])
+
+        self.assertEqual(sorted(comparisons), [2022, 2023, 2024])
+        # 2022年度は前年度のデータがない
+        self.assertIsNone(comparisons[2022].financial_indicators['sales']['yoy'])
+        self.assertEqual(
+            comparisons[2024].financial_indicators['sales']['previous'],
+            comparisons[2023].financial_indicators['sales']['actual'],
+        )
@@ -0,0 +1,149 @@
+"""
+予算シナリオのシミュレーション（budget_scenario_service）のテスト
+"""
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Debt, FiscalSummary_Year
+from ..services.budget_scenario_service import (
+    DebtSchedule,
+    ScenarioDrivers,
+    load_debt_schedule,
+    simulate_scenarios,
+)
+from .factories import add_company_to_firm, create_company, create_debts, create_firm, create_fiscal_years, create_user
+
+
+class BudgetScenarioServiceTest(TestCase):
+    def setUp(self):
+        self.company = create_company()
+        # 売上高100,000千円、粗利40,000、営業利益5,000、経常利益4,500、支払利息500、長期借入金25,000
+        self.base = create_fiscal_years(self.company, years=1, last_year=2024)[0]
+
+    def test_grid_covers_all_combinations(self):
+        drivers = ScenarioDrivers(sales_growth=[0, 5, 10], sga_growth=[0, 3], new_borrowing=[0, 10000])
+
+        grid = simulate_scenarios(self.base, drivers, DebtSchedule())
+
+        self.assertEqual(len(grid), 12)
+        self.assertEqual(grid.target_year, 2025)
+        rows = grid.rows()
+        self.assertEqual({(row['sales_growth'], row['sga_growth'], row['new_borrowing']) for row in rows}, {
+            (sales, sga, borrowing) for sales in (0, 5, 10) for sga in (0, 3) for borrowing in (0, 10000)
+        })
+        # 前期と同じ条件のシナリオは前期の営業利益と同じ
+        unchanged = next(row for row in rows if not any(row[name] for name in ('sales_growth', 'sga_growth', 'new_borrowing')))
+        self.assertEqual(unchanged['operating_profit'], self.base.operating_profit)
+
+    def test_scenario_matches_hand_calculation(self):
+        drivers = ScenarioDrivers(
+            sales_growth=[10], gross_margin_change=[1], sga_growth=[5], new_borrowing=[6000], interest_rate_change=[1],
+        )
+
+        row = simulate_scenarios(self.base, drivers, DebtSchedule()).rows()[0]
+
+        self.assertEqual(row['sales'], 110000)
+        self.assertEqual(row['gross_profit'], 45100)
+        self.assertEqual(row['operating_profit'], 45100 - 35000 * 1.05)
+        # 新規借入（期首6,000千円、5年返済）の平均残高5,400千円 × 金利3%（既定2% + 1pt）
+        self.assertEqual(row['interest_expense'], 162)
+        ordinary_profit = 8350 - 162
+        self.assertEqual(row['ordinary_profit'], ordinary_profit)
+        self.assertEqual(row['net_profit'], round(ordinary_profit * 0.7))
+        # 現預金 = 前期 + 純利益 + 減価償却費 - 運転資本の増加 + 新規借入 - 返済
+        self.assertEqual(row['cash_and_deposits'], round(20000 + ordinary_profit * 0.7 + 2000 - 1500 + 6000 - 1200))
+        self.assertEqual(row['debt_balance'], 25000 + 4800)
+
+    def test_budget_data_balances(self):
+        drivers = ScenarioDrivers(sales_growth=[-10, 20], new_borrowing=[0, 30000])
+        grid = simulate_scenarios(self.base, drivers, DebtSchedule(), investment_amount=5000, capital_increase=1000)
+
+        for index in range(len(grid)):
+            with self.subTest(index=index):
+                data = grid.budget_data(index)
+                assets = data['total_current_assets'] + data['total_fixed_assets']
+                self.assertAlmostEqual(assets, data['total_liabilities'] + data['total_net_assets'], delta=2)
+                self.assertEqual(data['capital_stock'], self.base.capital_stock + 1000)
+                self.assertEqual(
+                    data['short_term_loans_payable'] + data['long_term_loans_payable'], grid.rows()[index]['debt_balance']
+                )
+
+    def test_existing_debts_use_repayment_schedule(self):
+        create_debts(self.company, count=6)
+        debts = list(Debt.objects.filter(company=self.company, is_nodisplay=False))
+
+        schedule = load_debt_schedule(self.company, 2024, 2025)
+
+        # 期末残高は calculate_debt_balance_at_year_end と同じ balance_fy1
+        self.assertAlmostEqual(schedule.closing_balance, sum(float(debt.balance_fy1) for debt in debts) / 1000, places=3)
+        self.assertGreater(schedule.repayment, 0)
+        self.assertGreater(schedule.interest, 0)
+
+        row = simulate_scenarios(self.base, ScenarioDrivers(), schedule).rows()[0]
+        self.assertEqual(row['debt_repayment'], round(schedule.repayment))
+        self.assertEqual(row['interest_expense'], round(schedule.interest))
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class BudgetScenarioViewTest(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.firm = create_firm(self.user)
+        self.company = create_company()
+        add_company_to_firm(self.firm, self.company, user=self.user, is_selected=True)
+        create_fiscal_years(self.company, years=2, last_year=2024)
+        self.client.force_login(self.user)
+        self.data = {
+            'target_year': 2025,
+            'sales_growth': '0, 5, 10',
+            'gross_margin_change': '0',
+            'sga_growth': '0, 3',
+            'new_borrowing': '0',
+            'interest_rate_change': '0',
+            'investment_amount': 0,
+            'capital_increase': 0,
+        }
+
+    def test_simulate_renders_grid(self):
+        response = self.client.get(reverse('budget_scenario'))
+        self.assertEqual(response.context['form'].initial['target_year'], 2025)
+
+        response = self.client.post(reverse('budget_scenario'), self.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['rows']), 6)
+        self.assertFalse(FiscalSummary_Year.objects.filter(company=self.company, is_budget=True).exists())
+
+    def test_save_scenario_as_budget(self):
+        response = self.client.post(reverse('budget_scenario'), {**self.data, 'scenario': 4})
+
+        budget_year = FiscalSummary_Year.objects.get(company=self.company, year=2025, is_budget=True)
+        self.assertRedirects(
+            response, reverse('fiscal_summary_year_update', kwargs={'pk': budget_year.pk}), fetch_redirect_response=False
+        )
+        # 候補値の組み合わせ順: 売上高成長率10%・販管費増加率0%
+        actual = FiscalSummary_Year.objects.get(company=self.company, year=2024, is_budget=False)
+        self.assertEqual(budget_year.sales, round(actual.sales * 1.1))
+
+    def test_invalid_values(self):
+        response = self.client.post(reverse('budget_scenario'), {**self.data, 'sales_growth': '5, abc'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('sales_growth', response.context['form'].errors)
+
+    def test_non_finite_values_rejected(self):
+        for value in ('nan', 'inf', '-inf', '1e999', '1e20'):
+            with self.subTest(value=value):
+                response = self.client.post(reverse('budget_scenario'), {**self.data, 'sales_growth': f'0, {value}'})
+
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('sales_growth', response.context['form'].errors)
+
+    def test_out_of_range_scenario_rejected(self):
+        for scenario in ('-1', '6', 'abc'):
+            with self.subTest(scenario=scenario):
+                response = self.client.post(reverse('budget_scenario'), {**self.data, 'scenario': scenario})
+
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(FiscalSummary_Year.objects.filter(company=self.company, is_budget=True).exists())
+
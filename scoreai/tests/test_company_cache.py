@@ -0,0 +1,136 @@
+"""
+Companyごとのキャッシュのテスト
+"""
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from ..utils import company_cache
+from ..utils.company_cache import LocalLRUCache, get_or_set, invalidate_company
+from .factories import create_company, create_debts
+
+
+class LocalLRUCacheTest(TestCase):
+    def test_evicts_least_recently_used(self):
+        lru = LocalLRUCache(max_entries=2)
+        lru.set('a', 1, 60)
+        lru.set('b', 2, 60)
+        lru.get('a')
+        lru.set('c', 3, 60)
+
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('c'), 3)
+
+    def test_expired_entry_is_not_returned(self):
+        lru = LocalLRUCache()
+        with mock.patch.object(company_cache.time, 'monotonic', return_value=100.0):
+            lru.set('a', 1, 10)
+        with mock.patch.object(company_cache.time, 'monotonic', return_value=111.0):
+            self.assertIsNone(lru.get('a'))
+
+
+class CompanyCacheTest(TestCase):
+    def setUp(self):
+        # ワーカー間で共有するファイルキャッシュ
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        settings_override = override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir}},
+            COMPANY_CACHE_VERSION_TIMEOUT=0,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self._clear_worker()
+        self.addCleanup(self._clear_worker)
+
+    def _clear_worker(self):
+        """別のワーカープロセスに切り替えた状態にする"""
+        company_cache.local_cache.clear()
+        company_cache._local_versions.clear()
+
+    def test_value_is_shared_between_workers(self):
+        compute = mock.Mock(return_value=[1, 2, 3])
+        self.assertEqual(get_or_set('C1', 'balances', compute), [1, 2, 3])
+
+        self._clear_worker()
+
+        self.assertEqual(get_or_set('C1', 'balances', compute), [1, 2, 3])
+        compute.assert_called_once()
+
+    def test_invalidation_reaches_values_held_by_other_workers(self):
+        get_or_set('C1', 'balances', lambda: 'old')
+        get_or_set('C2', 'balances', lambda: 'other')
+        # 他のワーカーのLRUに値がある状態でも、バージョンが変わるため参照されない
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_company('C1')
+
+        self.assertEqual(get_or_set('C1', 'balances', lambda: 'new'), 'new')
+        self.assertEqual(get_or_set('C2', 'balances', lambda: 'recomputed'), 'other')
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_or_set('C1', 'slow', compute)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['value'] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertIsNone(cache.get(f"{company_cache.company_cache_key('C1', 'slow')}:lock"))
+
+    def test_debt_save_invalidates_monthly_balances(self):
+        debt = create_debts(create_company(), count=1)[0]
+        before = debt.balances_monthly
+
+        debt.principal += 100_000_000
+        with self.captureOnCommitCallbacks(execute=True):
+            debt.save()
+
+        self.assertNotEqual(debt.balances_monthly, before)
+
+    def test_month_save_resolves_company_without_extra_query(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from ..models import FiscalSummary_Month
+        from .factories import create_fiscal_years, create_monthly_summaries
+
+        company = create_company()
+        fiscal_year = create_fiscal_years(company, years=1)[0]
+        create_monthly_summaries([fiscal_year], periods=1)
+        year_table = fiscal_year._meta.db_table
+
+        def year_queries(month):
+            with CaptureQueriesContext(connection) as ctx:
+                with self.captureOnCommitCallbacks(execute=True):
+                    month.save()
+                    month.save()
+            # full_clean の外部キーの存在確認（SELECT 1）は対象外
+            return [q for q in ctx.captured_queries if f'"{year_table}"."company_id"' in q['sql']]
+
+        # 年度を読み込み済みなら会社IDのためのSQLを発行しない
+        month = FiscalSummary_Month.objects.select_related('fiscal_summary_year').get(fiscal_summary_year=fiscal_year)
+        self.assertEqual(year_queries(month), [])
+        self.assertEqual(month.get_cache_company_id(), company.pk)
+
+        # 未読み込みでも会社IDの取得は1回だけ
+        month = FiscalSummary_Month.objects.get(fiscal_summary_year=fiscal_year)
+        self.assertEqual(len(year_queries(month)), 1)
+        self.assertEqual(month.get_cache_company_id(), company.pk)
@@ -0,0 +1,66 @@
+"""
+AI相談用データのキャッシュ（ai_consultation_data.get_consultation_context）のテスト
+"""
+import datetime
+
+from django.test import TestCase
+
+from ..models import AIConsultationType, MeetingMinutes
+from ..services.monthly_budget_service import generate_monthly_budgets
+from ..utils.ai_consultation_data import build_consultation_prompt, get_consultation_data, get_monthly_data
+from .factories import create_company, create_debts, create_fiscal_years, create_user
+
+ALL_DATA_TYPES = ['fiscal_summary', 'debt_info', 'monthly_data', 'meeting_minutes', 'stakeholder_name']
+
+
+class ConsultationContextTest(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.company = create_company()
+        self.fiscal_years = create_fiscal_years(self.company, years=3, last_year=2024)
+        create_debts(self.company, count=5)
+        self.consultation_type = AIConsultationType.objects.create(name='財務相談')
+
+    def test_follow_up_skips_data_collection(self):
+        get_consultation_data(self.consultation_type, self.company, selected_data_types=ALL_DATA_TYPES)
+
+        with self.assertNumQueries(0):
+            data = get_consultation_data(self.consultation_type, self.company, selected_data_types=ALL_DATA_TYPES)
+
+        self.assertEqual(data['fiscal_summary']['year'], 2024)
+        self.assertTrue(data['debt_info'])
+        self.assertEqual(set(data.fragments), set(ALL_DATA_TYPES))
+
+    def test_writes_invalidate_context(self):
+        get_consultation_data(self.consultation_type, self.company, selected_data_types=ALL_DATA_TYPES)
+
+        latest = self.fiscal_years[-1]
+        latest.sales = 123456
+        latest.save()
+        MeetingMinutes.objects.create(
+            company=self.company, created_by=self.user, meeting_date=datetime.date(2024, 5, 1), notes='設備投資の相談',
+        )
+        data = get_consultation_data(self.consultation_type, self.company, selected_data_types=ALL_DATA_TYPES)
+
+        self.assertEqual(data['fiscal_summary']['sales'], 123456)
+        self.assertEqual(data['meeting_minutes'][0]['notes'], '設備投資の相談')
+
+    def test_bulk_monthly_budgets_invalidate_context(self):
+        budget_year = create_fiscal_years(self.company, years=1, last_year=2025, is_budget=True)[0]
+        self.assertEqual(get_monthly_data(self.company, year=2025, is_budget=True), [])
+
+        generate_monthly_budgets([budget_year])
+
+        self.assertEqual(len(get_monthly_data(self.company, year=2025, is_budget=True)), 12)
+
+    def test_prompt_uses_serialized_fragments(self):
+        data = get_consultation_data(self.consultation_type, self.company)
+
+        class Script:
+            system_instruction = 'system'
+            prompt_template = '{fiscal_summary}\n{debt_info}'
+
+        prompt, _ = build_consultation_prompt(self.consultation_type, '質問', data, user_script=Script)
+
+        self.assertEqual(prompt, f"{data.fragments['fiscal_summary']}\n{data.fragments['debt_info']}")
+        self.assertIn('"sales": 110250', prompt)
@@ -0,0 +1,103 @@
+"""
+借入の集計（debt_analytics_service）と借入管理画面のテスト
+"""
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..services.debt_analytics_service import DEFAULT_GROUPINGS, get_debt_analytics, group_debts
+from ..services.debt_service import DebtService
+from .factories import add_company_to_firm, create_company, create_debts, create_firm, create_user
+
+
+def group_by_keys(debt_list, keys):
+    """1つの集計を素朴に計算（比較用）"""
+    groups = {}
+    for debt in debt_list:
+        key = tuple(debt[name] for name in keys)
+        group = groups.setdefault(key, {
+            'principal': 0, 'monthly_repayment': 0, 'balance_fy1': 0,
+            'balances_monthly': [0] * 12, 'interest_amount_monthly': [0] * 12,
+        })
+        group['principal'] += debt['principal']
+        group['monthly_repayment'] += debt['monthly_repayment']
+        group['balance_fy1'] += debt['balance_fy1']
+        group['balances_monthly'] = [a + b for a, b in zip(group['balances_monthly'], debt['balances_monthly'])]
+        group['interest_amount_monthly'] = [
+            a + b for a, b in zip(group['interest_amount_monthly'], debt['interest_amount_monthly'])
+        ]
+    return [{**dict(zip(keys, key)), **values} for key, values in groups.items()]
+
+
+class GroupDebtsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = create_company()
+        create_debts(self.company, count=30)
+
+    def test_all_groupings_in_one_pass(self):
+        debt_list = DebtService.get_debt_list_with_totals(self.company)[0]
+        groups = group_debts(debt_list)
+
+        self.assertEqual(set(groups), set(DEFAULT_GROUPINGS))
+        for name, keys in DEFAULT_GROUPINGS.items():
+            with self.subTest(name=name):
+                self.assertEqual(groups[name], group_by_keys(debt_list, keys))
+        self.assertEqual(
+            sum(group['principal'] for group in groups['byBank']),
+            sum(debt['principal'] for debt in debt_list),
+        )
+
+    def test_filtered_debts(self):
+        debts = DebtService.get_debt_queryset(self.company)
+        bank = debts.first().financial_institution
+
+        analytics = get_debt_analytics(self.company, debts=debts.filter(financial_institution=bank))
+
+        self.assertTrue(analytics.debt_list)
+        self.assertTrue(all(debt['financial_institution'] == bank for debt in analytics.debt_list))
+        self.assertEqual([group['financial_institution'] for group in analytics.groups['byBank']], [bank])
+        self.assertEqual(
+            analytics.totals['total_balances_monthly'],
+            analytics.groups['byBank'][0]['balances_monthly'],
+        )
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class DebtViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        firm = create_firm(self.user)
+        self.company = create_company()
+        add_company_to_firm(firm, self.company, user=self.user, is_selected=True)
+        create_debts(self.company, count=30)
+        self.client.force_login(self.user)
+
+    def test_overview_groupings(self):
+        response = self.client.get(reverse('debts_overview'))
+
+        self.assertEqual(response.status_code, 200)
+        debt_list = response.context['debt_list']
+        self.assertEqual(
+            response.context['debt_list_byBankAndSecuredType'],
+            group_by_keys(debt_list, ('financial_institution', 'secured_type')),
+        )
+        self.assertEqual(
+            response.context['debt_list_bySecuredByManagement'],
+            group_by_keys(debt_list, ('is_securedby_management',)),
+        )
+
+    def test_list_respects_filters(self):
+        all_debts = self.client.get(reverse('debts_all')).context['debt_list']
+        response = self.client.get(reverse('debts_all'), {'is_collateraled': 'true'})
+
+        self.assertEqual(response.status_code, 200)
+        debt_list = response.context['debt_list']
+        self.assertTrue(debt_list)
+        self.assertLess(len(debt_list), len(all_debts))
+        self.assertTrue(all(debt['is_collateraled'] for debt in debt_list))
+        self.assertEqual(
+            response.context['debt_list_totals']['total_monthly_repayment'],
+            sum(debt['monthly_repayment'] for debt in debt_list),
+        )
@@ -0,0 +1,86 @@
+"""
+AI診断の会話（diagnosis_conversation_service）のテスト
+"""
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import AIDiagnosisConversation
+from ..services import diagnosis_conversation_service as service
+from ..utils.gemini import estimate_tokens
+from .factories import add_company_to_firm, create_company, create_firm, create_fiscal_years, create_user
+
+
+class DiagnosisConversationServiceTest(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.company = create_company()
+        self.fiscal_year = create_fiscal_years(self.company, years=3, last_year=2024)[-1]
+
+    def test_prompt_stays_bounded(self):
+        prompts = []
+
+        def respond(prompt, **kwargs):
+            prompts.append(prompt)
+            return 'ご回答ありがとうございます。' * 30
+
+        with mock.patch.object(service, 'get_gemini_response', side_effect=respond):
+            conversation = service.start_conversation(self.user, self.fiscal_year)
+            for turn in range(30):
+                service.reply_to(conversation, f'{turn}回目の回答です。' + '売上の内訳について説明します。' * 20)
+
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.message_count, 60)
+        self.assertLessEqual(len(conversation.messages), service.RECENT_MESSAGES + 1)
+        self.assertTrue(conversation.summary)
+        limit = service.HISTORY_TOKEN_BUDGET + service.SUMMARY_TOKEN_BUDGET + 1000
+        self.assertTrue(all(estimate_tokens(prompt) <= limit for prompt in prompts))
+
+    def test_fiscal_data_and_report_reused(self):
+        with mock.patch.object(service, 'collect_fiscal_data_for_diagnosis', wraps=service.collect_fiscal_data_for_diagnosis) as collect, \
+                mock.patch.object(service, 'get_gemini_response', return_value='応答') as gemini:
+            conversation = service.start_conversation(self.user, self.fiscal_year)
+            for _ in range(4):
+                conversation = service.get_conversation(self.user, self.fiscal_year)
+                service.reply_to(conversation, '回答')
+                if service.is_report_ready(conversation):
+                    self.assertEqual(service.get_report(conversation), '応答')
+
+        self.assertEqual(collect.call_count, 1)
+        # 応答4回 + レポート1回
+        self.assertEqual(gemini.call_count, 5)
+
+    def test_summary_falls_back_without_gemini(self):
+        messages = [{'role': 'user', 'content': '当期は設備投資を行いました。' * 50}]
+
+        with mock.patch.object(service, 'get_gemini_response', side_effect=ValueError('利用制限')):
+            summary = service.summarize_messages('', messages)
+
+        self.assertTrue(summary.startswith('- user: 当期は設備投資を行いました。'))
+        self.assertLessEqual(estimate_tokens(summary), service.SUMMARY_TOKEN_BUDGET + 1)
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class DiagnosisChatViewTest(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.firm = create_firm(self.user)
+        self.company = create_company()
+        add_company_to_firm(self.firm, self.company, user=self.user, is_selected=True)
+        self.fiscal_year = create_fiscal_years(self.company, years=1, last_year=2024)[0]
+        self.client.force_login(self.user)
+
+    def test_chat_is_stored_in_model(self):
+        url = reverse('fiscal_ai_diagnosis_chat', kwargs={'fiscal_summary_year_id': self.fiscal_year.id})
+        with mock.patch.object(service, 'get_gemini_response', return_value='応答'):
+            for _ in range(3):
+                response = self.client.post(url, json.dumps({'message': '回答'}), content_type='application/json')
+
+        data = response.json()
+        self.assertTrue(data['report_ready'])
+        self.assertEqual(data['report'], '応答')
+        conversation = AIDiagnosisConversation.objects.get(user=self.user, fiscal_summary_year=self.fiscal_year)
+        self.assertEqual(conversation.message_count, 6)
+        self.assertFalse(any(key.startswith('diagnosis_chat_') for key in self.client.session.keys()))
@@ -0,0 +1,104 @@
+"""
+AI診断レポートの文書モデルと出力（diagnosis_report_service）のテスト
+"""
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import AIDiagnosisReport
+from ..services import diagnosis_report_service as service
+from ..views import fiscal_ai_diagnosis_views
+from .factories import add_company_to_firm, create_company, create_firm, create_fiscal_years, create_user
+
+REPORT_TEXT = """# 総合評価
+当期は**増収増益**となりました。
+
+- 売上高: 1億2,000万円
+- 営業利益率: 5.2%
+
+## ローカルベンチマークとの比較
+| 指標 | 当社 | 業界平均 |
+|------|------|----------|
+| 売上高増加率 | 10% | 3% |
+| 営業利益率 | 5.2% | 4.0 |
+
+### 改善提案
+- 在庫回転期間を短縮する
+- 固定費を見直す
+"""
+
+
+class ParseReportTest(TestCase):
+    def test_blocks(self):
+        blocks = service.parse_report(REPORT_TEXT)['blocks']
+
+        self.assertEqual([block['type'] for block in blocks], ['heading', 'paragraph', 'kpi', 'heading', 'table', 'heading', 'list'])
+        self.assertEqual(blocks[0], {'type': 'heading', 'level': 1, 'text': '総合評価'})
+        self.assertEqual(blocks[1]['text'], '当期は増収増益となりました。')
+        self.assertEqual(blocks[2]['items'][0], {'label': '売上高', 'value': '1億2,000万円'})
+        self.assertEqual(blocks[4]['header'], ['指標', '当社', '業界平均'])
+        self.assertEqual(blocks[4]['rows'][1], ['営業利益率', '5.2%', '4.0'])
+        self.assertEqual(blocks[6]['items'], ['在庫回転期間を短縮する', '固定費を見直す'])
+
+    def test_table_without_rows_is_skipped(self):
+        self.assertEqual(service.parse_report('|')['blocks'], [])
+        self.assertEqual(service.parse_report('| --- |\n本文')['blocks'], [{'type': 'paragraph', 'text': '本文'}])
+
+    def test_deep_headings_are_clamped(self):
+        blocks = service.parse_report('#### 詳細\n###### 補足\n####### 見出しではない')['blocks']
+
+        self.assertEqual(blocks[0], {'type': 'heading', 'level': 3, 'text': '詳細'})
+        self.assertEqual(blocks[1], {'type': 'heading', 'level': 3, 'text': '補足'})
+        self.assertEqual(blocks[2]['type'], 'paragraph')
+
+
+class DiagnosisReportRenderTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        company = create_company()
+        self.fiscal_year = create_fiscal_years(company, years=1, last_year=2024)[0]
+        self.report = service.save_report(self.fiscal_year, REPORT_TEXT)
+
+    def test_all_formats_render_from_document(self):
+        signatures = {'pdf': b'%PDF', 'pptx': b'PK', 'excel': b'PK', 'docx': b'PK'}
+        for format_type, signature in signatures.items():
+            with self.subTest(format_type=format_type):
+                self.assertTrue(service.render_report(self.report, format_type).startswith(signature))
+
+    def test_output_cached_by_content_hash(self):
+        renderer = mock.Mock(return_value=b'content')
+        with mock.patch.dict(service.RENDERERS, {'pdf': (renderer, 'application/pdf', 'pdf', 'reportlab')}):
+            service.render_report(self.report, 'pdf')
+            service.render_report(AIDiagnosisReport.objects.get(pk=self.report.pk), 'pdf')
+            self.assertEqual(renderer.call_count, 1)
+
+            # 内容が変わった場合は出力し直す
+            report = service.save_report(self.fiscal_year, REPORT_TEXT + '\n追記')
+            service.render_report(report, 'pdf')
+            self.assertEqual(renderer.call_count, 2)
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class DiagnosisDownloadViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.firm = create_firm(self.user)
+        self.company = create_company()
+        add_company_to_firm(self.firm, self.company, user=self.user, is_selected=True)
+        self.fiscal_year = create_fiscal_years(self.company, years=1, last_year=2024)[0]
+        self.client.force_login(self.user)
+
+    def test_saved_report_downloaded_without_regenerating(self):
+        service.save_report(self.fiscal_year, REPORT_TEXT)
+        url = reverse('fiscal_ai_diagnosis_download', kwargs={'fiscal_summary_year_id': self.fiscal_year.id, 'format_type': 'pdf'})
+
+        with mock.patch.object(fiscal_ai_diagnosis_views, 'get_gemini_response') as gemini:
+            response = self.client.get(url)
+
+        gemini.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF'))
@@ -0,0 +1,170 @@
+"""
+居酒屋出店計画のシナリオ分析（izakaya_scenario_service）のテスト
+"""
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import IzakayaPlan
+from ..services.izakaya_plan_service import IzakayaPlanService
+from ..services.izakaya_scenario_service import IzakayaScenarioDrivers, simulate_plan_scenarios
+from .factories import add_company_to_firm, create_company, create_firm, create_user
+
+RESULT_FIELDS = [
+    'monthly_revenue', 'monthly_cost_of_goods_sold', 'monthly_gross_profit', 'monthly_cost', 'monthly_profit',
+    'payback_period_years', 'payback_period_months',
+]
+
+
+def create_plan(company, user, **kwargs):
+    values = {
+        'lunch_operating_days': ['monday', 'tuesday', 'wednesday', 'thursday', 'friday'],
+        'lunch_price_per_customer': 1050,
+        'lunch_customer_count': 25,
+        'lunch_cost_rate': 32.5,
+        'lunch_monthly_coefficients': {'1': 0.9, '2': 1.0, '12': 1.3},
+        'dinner_operating_days': ['tuesday', 'wednesday', 'thursday', 'friday', 'saturday'],
+        'dinner_price_per_customer': 3800,
+        'dinner_customer_count': 40,
+        'dinner_cost_rate': 30,
+        'initial_investment': 15000000,
+        'monthly_rent': 350000,
+        'number_of_staff': 2,
+        'staff_monthly_salary': 280000,
+        'part_time_hours_per_month': 400,
+        'part_time_hourly_wage': 1150,
+        'monthly_utilities': 120000,
+        'monthly_supplies': 50000,
+        'monthly_advertising': 30000,
+        'monthly_fees': 40000,
+        'monthly_other_expenses': 25000,
+        **kwargs,
+    }
+    return IzakayaPlan.objects.create(company=company, user=user, **values)
+
+
+class IzakayaScenarioServiceTest(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.company = create_company()
+
+    def assert_matches_plan(self, row, plan):
+        IzakayaPlanService.calculate_all(plan)
+        plan.refresh_from_db()
+        for name in RESULT_FIELDS:
+            self.assertEqual(row[name], getattr(plan, name), name)
+
+    def test_base_case_matches_plan_calculation(self):
+        plan = create_plan(self.company, self.user)
+        grid = simulate_plan_scenarios(plan, IzakayaScenarioDrivers(
+            price_change=[-10, 0, 10], customer_change=[-20, 0, 20], cost_rate_change=[-2, 0, 2],
+        ))
+
+        self.assertEqual(len(grid), 27)
+        self.assert_matches_plan(grid.rows()[grid.base_index()], plan)
+
+    def test_scenario_matches_edited_plan(self):
+        plan = create_plan(self.company, self.user)
+        grid = simulate_plan_scenarios(plan, IzakayaScenarioDrivers(
+            price_change=[0, 10], customer_change=[0, 20], operating_days_change=[0, 1],
+            monthly_rent=[300000, 350000], cost_rate_change=[0, 2.5],
+        ))
+        row = next(
+            row for row in grid.rows()
+            if (row['price_change'], row['customer_change'], row['operating_days_change'], row['monthly_rent'], row['cost_rate_change'])
+            == (10, 20, 1, 300000, 2.5)
+        )
+
+        edited = create_plan(
+            self.company, self.user,
+            lunch_operating_days=['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday'],
+            lunch_price_per_customer=1155, lunch_customer_count=30, lunch_cost_rate=35,
+            dinner_operating_days=['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday'],
+            dinner_price_per_customer=4180, dinner_customer_count=48, dinner_cost_rate=32.5,
+            monthly_rent=300000,
+        )
+        self.assert_matches_plan(row, edited)
+
+    def test_surface_break_even_and_payback_distribution(self):
+        plan = create_plan(self.company, self.user)
+        grid = simulate_plan_scenarios(plan, IzakayaScenarioDrivers(
+            price_change=[-10, 0, 10], customer_change=[-50, 0, 20], monthly_rent=[300000, 350000, 500000],
+        ))
+
+        surface = grid.surface('monthly_profit', 'price_change', 'customer_change')
+        self.assertEqual(surface['x'], [-10, 0, 10])
+        self.assertEqual(surface['y'], [-50, 0, 20])
+        rows = grid.rows()
+        for y_index, customer_change in enumerate(surface['y']):
+            for x_index, price_change in enumerate(surface['x']):
+                row = next(
+                    row for row in rows
+                    if row['price_change'] == price_change and row['customer_change'] == customer_change
+                    and row['monthly_rent'] == 350000
+                )
+                self.assertEqual(surface['values'][y_index][x_index], row['monthly_profit'])
+
+        # 損益分岐点の客数では月間利益がほぼ0になる
+        break_even_customers = grid.results['break_even_customers'][grid.base_index()]
+        break_even_change = (break_even_customers / 65 - 1) * 100
+        check = simulate_plan_scenarios(plan, IzakayaScenarioDrivers(customer_change=[break_even_change]))
+        self.assertLess(abs(check.rows()[0]['monthly_profit']), 10)
+
+        distribution = grid.payback_distribution()
+        self.assertEqual(sum(bucket['count'] for bucket in distribution), 27)
+        self.assertEqual(distribution[-1]['label'], '回収不可能')
+        self.assertEqual(distribution[-1]['count'], sum(1 for row in rows if row['monthly_profit'] <= 0))
+
+    def test_legacy_plan_rejected(self):
+        plan = create_plan(
+            self.company, self.user, lunch_customer_count=0, dinner_customer_count=0,
+            opening_hours_start='17:00', opening_hours_end='23:00',
+        )
+        with self.assertRaises(ValueError):
+            simulate_plan_scenarios(plan, IzakayaScenarioDrivers())
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class IzakayaPlanScenarioViewTest(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        firm = create_firm(self.user)
+        self.company = create_company()
+        add_company_to_firm(firm, self.company, user=self.user, is_selected=True)
+        self.plan = create_plan(self.company, self.user)
+        self.client.force_login(self.user)
+
+    def test_scenarios_rendered(self):
+        url = reverse('izakaya_plan_scenario', kwargs={'pk': self.plan.pk})
+        response = self.client.post(url, {
+            'price_change': '-10, 0, 10',
+            'customer_change': '-20, 0, 20',
+            'operating_days_change': '0',
+            'monthly_rent': '',
+            'cost_rate_change': '0',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['grid']), 9)
+        self.assertContains(response, '回収期間の分布')
+
+    def test_non_finite_values_rejected(self):
+        url = reverse('izakaya_plan_scenario', kwargs={'pk': self.plan.pk})
+        for value in ('nan', 'inf', '-inf', '1e999'):
+            with self.subTest(value=value):
+                response = self.client.post(url, {
+                    'price_change': '0',
+                    'customer_change': '0',
+                    'operating_days_change': '0',
+                    'monthly_rent': value,
+                    'cost_rate_change': f'0, {value}',
+                })
+
+                self.assertEqual(response.status_code, 200)
+                self.assertIsNone(response.context.get('grid'))
+                self.assertIn('monthly_rent', response.context['form'].errors)
+                self.assertIn('cost_rate_change', response.context['form'].errors)
+
+    def test_other_company_plan_not_found(self):
+        other_plan = create_plan(create_company(), self.user)
+        response = self.client.get(reverse('izakaya_plan_scenario', kwargs={'pk': other_plan.pk}))
+        self.assertEqual(response.status_code, 404)
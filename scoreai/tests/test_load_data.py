@@ -0,0 +1,85 @@
+"""
+負荷検証データ生成とベンチマークのテスト
+"""
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Company, Debt, FiscalSummary_Month, FiscalSummary_Year, UploadedDocument
+from ..services.load_data_service import LoadDataGenerator, LoadScale
+from ..utils.benchmark import BENCHMARKS
+
+SCALE = LoadScale(firms=1, companies_per_firm=2, years=3, debts_per_company=4, ai_history_per_company=3, documents_per_company=2)
+
+
+def _snapshot(seed):
+    """生成データの内容（IDと作成日時を除く）"""
+    companies = Company.objects.filter(code__startswith=f'LD{seed}-').order_by('code')
+    return {
+        'companies': list(companies.values_list('code', 'fiscal_month', 'company_size')),
+        'years': list(FiscalSummary_Year.objects.filter(company__in=companies).order_by(
+            'company__code', 'year', 'is_budget'
+        ).values_list('year', 'sales', 'operating_profit', 'total_assets')),
+        'debts': sorted(Debt.objects.filter(company__in=companies).values_list(
+            'principal', 'debt_type', 'interest_rate', 'issue_date'
+        )),
+    }
+
+
+class LoadDataGeneratorTest(TestCase):
+    def test_generate_counts_and_clear(self):
+        counts = LoadDataGenerator(seed=1, scale=SCALE, last_year=2024).generate()
+
+        self.assertEqual(counts['Company'], 2)
+        # 実績3年 + 予算1年
+        self.assertEqual(counts['FiscalSummary_Year'], 2 * 4)
+        self.assertEqual(counts['FiscalSummary_Month'], 2 * (3 * 13 + 12))
+        self.assertEqual(counts['Debt'], 8)
+        self.assertEqual(counts['AIConsultationHistory'], 6)
+        self.assertEqual(counts['UploadedDocument'], 4)
+
+        LoadDataGenerator(seed=1).clear()
+        self.assertFalse(Company.objects.filter(code__startswith='LD1-').exists())
+        self.assertFalse(FiscalSummary_Month.objects.exists())
+        self.assertFalse(UploadedDocument.objects.exists())
+
+    def test_same_seed_generates_same_data(self):
+        LoadDataGenerator(seed=5, scale=SCALE, last_year=2024).generate()
+        first = _snapshot(5)
+        LoadDataGenerator(seed=5).clear()
+        LoadDataGenerator(seed=5, scale=SCALE, last_year=2024).generate()
+
+        self.assertEqual(_snapshot(5), first)
+
+        LoadDataGenerator(seed=6, scale=SCALE, last_year=2024).generate()
+        self.assertNotEqual(_snapshot(6)['debts'], first['debts'])
+
+
+class RunBenchmarksCommandTest(TestCase):
+    def test_writes_machine_readable_results(self):
+        LoadDataGenerator(seed=9, scale=SCALE, last_year=2024).generate()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / 'result.json'
+            call_command('run_benchmarks', seed=9, repeat=1, output=str(output), stdout=StringIO())
+            report = json.loads(output.read_text(encoding='utf-8'))
+
+            compare_out = StringIO()
+            call_command(
+                'run_benchmarks', seed=9, repeat=1, only=['debt_schedule'],
+                output=str(Path(tmp) / 'second.json'), compare=str(output), stdout=compare_out,
+            )
+
+        self.assertEqual([result['name'] for result in report['results']], list(BENCHMARKS))
+        for result in report['results']:
+            self.assertNotIn('error', result, result.get('error'))
+            self.assertEqual(result['runs'], 1)
+            self.assertGreaterEqual(result['median_ms'], 0)
+        self.assertEqual(report['meta']['company_code'], 'LD9-000-0000')
+        self.assertIn('debt_schedule', compare_out.getvalue())
+        # ベンチマークの書き込み（CSVインポート）はロールバックされる
+        self.assertEqual(FiscalSummary_Month.objects.count(), 2 * (3 * 13 + 12))
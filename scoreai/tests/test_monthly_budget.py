@@ -0,0 +1,131 @@
+"""
+年次予算からの月次予算作成（monthly_budget_service）のテスト
+"""
+from decimal import ROUND_DOWN, Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import FiscalSummary_Month
+from ..services.monthly_budget_service import build_monthly_budgets, generate_monthly_budgets
+from .factories import (
+    add_company_to_firm,
+    create_company,
+    create_firm,
+    create_fiscal_years,
+    create_monthly_summaries,
+    create_user,
+)
+
+
+def create_budget(company, year=2025, **values):
+    budget_year = create_fiscal_years(company, years=1, last_year=year, is_budget=True)[0]
+    for name, value in values.items():
+        setattr(budget_year, name, value)
+    budget_year.save()
+    return budget_year
+
+
+class MonthlyBudgetServiceTest(TestCase):
+    def setUp(self):
+        self.company = create_company()
+
+    def test_equal_truncates_like_decimal(self):
+        budget_year = create_budget(self.company, sales=100001, operating_profit=-1001)
+
+        months = build_monthly_budgets([budget_year])[str(budget_year.pk)]
+
+        self.assertEqual(len(months), 12)
+        for name, annual in (('sales', 100001), ('operating_profit', -1001)):
+            expected = (Decimal(annual) / 12).quantize(Decimal('0.01'), rounding=ROUND_DOWN)
+            self.assertTrue(all(month[name] == expected for month in months))
+
+    def test_previous_ratio_averages_prior_years(self):
+        actual_years = create_fiscal_years(self.company, years=2, last_year=2024)
+        create_monthly_summaries(actual_years, periods=12)
+        # 2024年は1月度に1年分の売上（他の月の12倍）、2023年は均等
+        FiscalSummary_Month.objects.filter(fiscal_summary_year=actual_years[1], period=1).update(
+            sales=actual_years[1].sales,
+        )
+        budget_year = create_budget(self.company, sales=120000)
+
+        months = build_monthly_budgets([budget_year], method='previous_ratio', reference_years=2)[str(budget_year.pk)]
+
+        # 2024年の1月度の割合 12/23 と 2023年の 1/12 の平均
+        first_share = (Decimal(12) / 23 + Decimal(1) / 12) / 2
+        self.assertAlmostEqual(float(months[0]['sales']), float(120000 * first_share), places=1)
+        self.assertAlmostEqual(float(sum(month['sales'] for month in months)), 120000, delta=0.12)
+
+    def test_previous_ratio_without_actuals(self):
+        budget_year = create_budget(self.company)
+
+        result = generate_monthly_budgets([budget_year], method='previous_ratio')
+
+        self.assertEqual(result.missing_actuals, [budget_year])
+        self.assertFalse(FiscalSummary_Month.objects.filter(fiscal_summary_year=budget_year).exists())
+
+    def test_override_upserts_budget_months_only(self):
+        budget_year = create_budget(self.company, sales=1200)
+        create_monthly_summaries([budget_year], periods=13)
+        FiscalSummary_Month.objects.create(
+            fiscal_summary_year=budget_year, period=1, is_budget=False,
+            sales=1, gross_profit=1, operating_profit=1, ordinary_profit=1,
+        )
+
+        result = generate_monthly_budgets([budget_year])
+        self.assertEqual(result.skipped, [budget_year])
+
+        generate_monthly_budgets([budget_year], override=True)
+        budget_months = FiscalSummary_Month.objects.filter(fiscal_summary_year=budget_year, is_budget=True)
+        self.assertEqual(sorted(budget_months.values_list('period', flat=True)), list(range(1, 13)))
+        self.assertTrue(all(month.sales == Decimal('100.00') for month in budget_months))
+        self.assertTrue(FiscalSummary_Month.objects.filter(fiscal_summary_year=budget_year, is_budget=False).exists())
+
+    def test_many_companies_in_constant_queries(self):
+        budget_years = []
+        for _ in range(5):
+            company = create_company()
+            create_monthly_summaries(create_fiscal_years(company, years=3, last_year=2024))
+            budget_years.append(create_budget(company))
+
+        # 既存データの確認・過去の月次実績の取得・保存（トランザクションのSAVEPOINTを含む）
+        with self.assertNumQueries(5):
+            result = generate_monthly_budgets(budget_years, method='previous_ratio')
+
+        self.assertEqual(len(result.generated), 5)
+        self.assertEqual(FiscalSummary_Month.objects.filter(is_budget=True).count(), 60)
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class MonthlyBudgetGenerationTest(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.firm = create_firm(self.user)
+        self.companies = [create_company() for _ in range(3)]
+        for index, company in enumerate(self.companies):
+            add_company_to_firm(self.firm, company, user=self.user, is_selected=index == 0)
+            create_monthly_summaries(create_fiscal_years(company, years=2, last_year=2024))
+        self.budget_years = [create_budget(company) for company in self.companies]
+
+    def test_view_creates_monthly_budget(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('budget_suggest_month'), {
+            'budget_year': self.budget_years[0].id,
+            'method': 'previous_ratio',
+            'reference_years': 2,
+        })
+
+        self.assertRedirects(response, reverse('fiscal_summary_month_list'), fetch_redirect_response=False)
+        self.assertEqual(
+            FiscalSummary_Month.objects.filter(fiscal_summary_year=self.budget_years[0], is_budget=True).count(), 12
+        )
+
+    def test_command_generates_for_all_clients(self):
+        call_command('generate_monthly_budgets', firm=self.firm.id, year=2025, stdout=StringIO())
+
+        for budget_year in self.budget_years:
+            self.assertEqual(
+                FiscalSummary_Month.objects.filter(fiscal_summary_year=budget_year, is_budget=True).count(), 12
+            )
@@ -0,0 +1,82 @@
+"""
+ナビゲーションのコンテキストと未読通知数キャッシュのテスト
+"""
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import RequestContext, Template
+from django.test import RequestFactory, TestCase
+
+from ..models import Company, Firm, FirmCompany, FirmNotification, UserCompany, UserFirm
+from ..utils.notifications import (
+    create_notification,
+    get_unread_notification_count,
+    mark_all_notifications_read,
+    mark_notification_read,
+)
+
+User = get_user_model()
+
+
+class NavigationContextTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='testpass123')
+        self.firm = Firm.objects.create(name='テスト事務所', owner=self.user)
+        UserFirm.objects.create(user=self.user, firm=self.firm, is_owner=True, is_selected=True)
+        self.company = Company.objects.create(name='テスト会社', code='C0001', fiscal_month=3)
+        UserCompany.objects.create(user=self.user, company=self.company, is_selected=True)
+        FirmCompany.objects.create(firm=self.firm, company=self.company, start_date=datetime.date(2025, 1, 1))
+
+    def test_tags_share_request_level_queries(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        template = Template(
+            '{% load custom_tags %}'
+            '{% get_user_firm_owner user as owner1 %}{% get_user_firm_owner user as owner2 %}'
+            '{% get_user_selected_company user as company %}{% get_user_selected_company user as company2 %}'
+            '{% get_user_selected_firm user as firm %}'
+            '{% get_company_firm_for_plan_check company as company_firm %}'
+            '{% get_company_firm_for_plan_check company as company_firm2 %}'
+            '{{ owner2.firm.name }}/{{ company2.name }}/{{ firm.name }}/{{ company_firm2.name }}'
+        )
+
+        # オーナーのFirm、選択中のCompany、選択中のFirm、CompanyのFirm をそれぞれ1回だけ取得
+        with self.assertNumQueries(4):
+            rendered = template.render(RequestContext(request, {'user': self.user}))
+
+        self.assertEqual(rendered, 'テスト事務所/テスト会社/テスト事務所/テスト事務所')
+
+
+class UnreadNotificationCountTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='testpass123')
+        self.firm = Firm.objects.create(name='テスト事務所', owner=self.user)
+
+    def _create(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_notification(self.firm, 'member_invited', 'タイトル', 'メッセージ')
+
+    def test_count_is_cached(self):
+        self._create()
+        self.assertEqual(get_unread_notification_count(self.firm.id), 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_notification_count(self.firm.id), 1)
+
+    def test_counter_follows_create_and_read(self):
+        get_unread_notification_count(self.firm.id)
+        first = self._create()
+        self._create()
+        self.assertEqual(get_unread_notification_count(self.firm.id), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(mark_notification_read(first))
+            # 既読の通知を再度既読にしても減らさない
+            self.assertFalse(mark_notification_read(FirmNotification.objects.get(pk=first.pk)))
+        self.assertEqual(get_unread_notification_count(self.firm.id), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_all_notifications_read(self.firm)
+        self.assertEqual(get_unread_notification_count(self.firm.id), 0)
@@ -0,0 +1,70 @@
+"""
+OCR結果キャッシュのテスト
+"""
+from io import BytesIO
+from unittest import mock
+
+from django.test import TestCase
+
+from ..models import OcrResult
+from ..utils.ocr_cache import extract_text_cached, get_backend_version, get_or_parse
+
+
+class OcrCacheTest(TestCase):
+    """同じファイルの再処理でOCRを再実行しないことのテスト"""
+
+    def setUp(self):
+        self.file = BytesIO(b'dummy image bytes')
+        self.file.name = 'statement.png'
+
+    @mock.patch('scoreai.utils.ocr.extract_text_from_image', return_value='売上高 1,000,000')
+    def test_second_extraction_uses_cache(self, mock_extract):
+        """2回目の抽出ではVision APIを呼び出さない"""
+        text1, result1 = extract_text_cached(self.file, 'image')
+        text2, result2 = extract_text_cached(self.file, 'image')
+
+        self.assertEqual(text1, '売上高 1,000,000')
+        self.assertEqual(text2, text1)
+        self.assertEqual(result1.pk, result2.pk)
+        self.assertEqual(mock_extract.call_count, 1)
+        result1.refresh_from_db()
+        self.assertEqual(result1.hit_count, 1)
+
+    @mock.patch('scoreai.utils.ocr.extract_text_from_image', return_value='テキスト')
+    def test_backend_version_is_part_of_key(self, mock_extract):
+        """OCRオプションが異なる場合は別のキャッシュになる"""
+        extract_text_cached(self.file, 'image', preprocess=True)
+        extract_text_cached(self.file, 'image', preprocess=False)
+
+        self.assertEqual(mock_extract.call_count, 2)
+        self.assertEqual(OcrResult.objects.count(), 2)
+        self.assertNotEqual(get_backend_version(preprocess=True), get_backend_version(preprocess=False))
+
+    @mock.patch('scoreai.utils.ocr.extract_text_from_image', return_value=None)
+    def test_failed_extraction_is_not_cached(self, mock_extract):
+        """抽出に失敗した結果は保存しない"""
+        text, result = extract_text_cached(self.file, 'image')
+
+        self.assertIsNone(text)
+        self.assertIsNone(result)
+        self.assertFalse(OcrResult.objects.exists())
+
+    def test_parsed_results_are_reused(self):
+        """パース結果を保存し、日付フィールドを復元して返す"""
+        from datetime import date
+
+        ocr_result = OcrResult.objects.create(
+            content_hash='a' * 64,
+            backend_version=get_backend_version(),
+            file_type='pdf',
+            extracted_text='text',
+        )
+        parser = mock.Mock(return_value={'principal': 1000, 'issue_date': date(2024, 4, 1)})
+
+        first = get_or_parse(ocr_result, 'loan_contract', parser, 'text')
+        ocr_result.refresh_from_db()
+        second = get_or_parse(ocr_result, 'loan_contract', parser, 'text')
+
+        self.assertEqual(parser.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(second['issue_date'], date(2024, 4, 1))
@@ -0,0 +1,164 @@
+"""
+OCRパーサーのテスト
+
+fixtures/ocr/ 以下の匿名化したOCR出力（*.txt）と期待値（*.json）を比較する。
+ベンチマークは RUN_BENCHMARKS=1 を指定した場合のみ実行する。
+"""
+import json
+import os
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..utils.ocr_parser import (
+    FISCAL_SUMMARY_FIELDS,
+    normalize_ocr_text,
+    parse_financial_statement,
+    parse_loan_contract,
+)
+
+FIXTURE_DIR = Path(__file__).resolve().parent / 'fixtures' / 'ocr'
+
+
+def load_corpus(prefix):
+    """(ファイル名, OCRテキスト, 期待値) のリストを返す"""
+    corpus = []
+    for text_path in sorted(FIXTURE_DIR.glob(f'{prefix}*.txt')):
+        expected = json.loads(text_path.with_suffix('.json').read_text(encoding='utf-8'))
+        corpus.append((text_path.name, text_path.read_text(encoding='utf-8'), expected))
+    return corpus
+
+
+def _comparable(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+class OcrParserGoldenTest(SimpleTestCase):
+    """ゴールデンファイルとの比較"""
+
+    def assert_matches_golden(self, parser, prefix):
+        corpus = load_corpus(prefix)
+        self.assertTrue(corpus, f'{prefix}のフィクスチャがありません')
+        for name, text, expected in corpus:
+            parsed = parser(text)
+            for field, value in expected.items():
+                with self.subTest(file=name, field=field):
+                    self.assertEqual(_comparable(parsed.get(field)), value)
+                    self.assertIn(field, parsed['confidence'])
+
+    def test_financial_statements(self):
+        self.assert_matches_golden(parse_financial_statement, 'statement_')
+
+    def test_loan_contracts(self):
+        self.assert_matches_golden(parse_loan_contract, 'loan_contract_')
+
+    def test_extraction_accuracy(self):
+        """期待値に対する項目単位の正解率（回帰の検知用）"""
+        total = correct = 0
+        for parser, prefix in ((parse_financial_statement, 'statement_'), (parse_loan_contract, 'loan_contract_')):
+            for _, text, expected in load_corpus(prefix):
+                parsed = parser(text)
+                total += len(expected)
+                correct += sum(
+                    1 for field, value in expected.items()
+                    if _comparable(parsed.get(field)) == value
+                )
+        self.assertEqual(correct, total)
+
+
+class OcrParserTest(SimpleTestCase):
+    """パーサーの個別動作"""
+
+    def test_fullwidth_normalization(self):
+        self.assertEqual(normalize_ocr_text('売上高：１，２３４'), '売上高:1,234')
+
+    def test_mapped_fields_exist_on_model(self):
+        from ..models import FiscalSummary_Year
+
+        model_fields = {field.name for field in FiscalSummary_Year._meta.get_fields()}
+        self.assertTrue(set(FISCAL_SUMMARY_FIELDS) <= model_fields)
+
+    def test_inconsistent_balance_sheet_lowers_confidence(self):
+        text = '貸借対照表\n(単位:千円)\n資産合計 1,000\n負債合計 300\n純資産合計 500\n'
+        parsed = parse_financial_statement(text)
+        self.assertEqual(parsed['total_assets'], 1000)
+        self.assertLess(parsed['confidence']['total_assets'], 1.0)
+
+    def test_pretax_profit_is_not_net_profit(self):
+        parsed = parse_financial_statement('損益計算書\n(単位:千円)\n税引前当期純利益 900\n当期純利益 600\n')
+        self.assertEqual(parsed['net_profit'], 600)
+
+    def test_without_guarantee(self):
+        parsed = parse_loan_contract('経営者保証なし')
+        self.assertFalse(parsed['is_securedby_management'])
+
+
+class OcrAiFallbackTest(SimpleTestCase):
+    """正規表現で抽出できなかった項目のAI補完"""
+
+    text = (
+        '貸借対照表\n(単位:千円)\n資産合計 1,000\n負債合計 400\n純資産 ?\n'
+        '損益計算書\n(単位:千円)\n売上高 5,000\n'
+    )
+
+    def _gemini(self, values):
+        def respond(prompt, **kwargs):
+            fields = kwargs['response_schema']['properties']
+            return {'text': json.dumps({field: values.get(field) for field in fields})}
+        return respond
+
+    def test_only_missing_fields_are_requested_per_section(self):
+        from ..utils.ocr import parse_financial_statement_with_ai
+
+        with mock.patch('scoreai.utils.gemini.get_gemini_response_with_tokens') as gemini:
+            gemini.side_effect = self._gemini({'total_net_assets': 600, 'net_profit': 200})
+            parsed = parse_financial_statement_with_ai(self.text)
+
+        requested = [set(call.kwargs['response_schema']['properties']) for call in gemini.call_args_list]
+        self.assertTrue(all('sales' not in fields and 'total_assets' not in fields for fields in requested))
+        self.assertEqual(parsed['sales'], 5000)
+        self.assertEqual(parsed['total_net_assets'], 600)
+        self.assertEqual(parsed['net_profit'], 200)
+        self.assertIn('total_net_assets', parsed['ai_fields'])
+
+    def test_inconsistent_ai_value_is_replaced_by_identity(self):
+        from ..utils.ocr import parse_financial_statement_with_ai
+
+        with mock.patch('scoreai.utils.gemini.get_gemini_response_with_tokens') as gemini:
+            gemini.side_effect = self._gemini({'total_net_assets': 6000})
+            parsed = parse_financial_statement_with_ai(self.text)
+
+        self.assertEqual(parsed['total_net_assets'], 600)
+
+    def test_ai_failure_falls_back_to_regex_result(self):
+        from ..utils.ocr import parse_financial_statement_with_ai
+
+        with mock.patch('scoreai.utils.gemini.get_gemini_response_with_tokens', side_effect=ValueError('API error')):
+            parsed = parse_financial_statement_with_ai(self.text)
+
+        self.assertEqual(parsed['sales'], 5000)
+        self.assertIsNone(parsed.get('total_net_assets'))
+        self.assertEqual(parsed['ai_fields'], [])
+
+
+@unittest.skipUnless(os.environ.get('RUN_BENCHMARKS'), 'RUN_BENCHMARKS=1 の場合のみ実行')
+class OcrParserBenchmark(SimpleTestCase):
+    """パーサーのスループット計測"""
+
+    iterations = 500
+
+    def test_throughput(self):
+        corpus = load_corpus('statement_') + load_corpus('loan_contract_')
+        start = time.perf_counter()
+        for _ in range(self.iterations):
+            for name, text, _ in corpus:
+                if name.startswith('loan_contract_'):
+                    parse_loan_contract(text)
+                else:
+                    parse_financial_statement(text)
+        elapsed = time.perf_counter() - start
+        documents = self.iterations * len(corpus)
+        print(f'\nOCR parser throughput: {documents / elapsed:,.0f} docs/sec ({documents} docs, {elapsed:.3f}s)')
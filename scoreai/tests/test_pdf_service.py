@@ -0,0 +1,65 @@
+"""
+PDF出力の共通サービス（pdf_service）のテスト
+"""
+import re
+from unittest import mock
+
+from django.test import SimpleTestCase
+from reportlab.platypus import Table
+
+from ..services import pdf_service
+from ..services.export_service import ExportService
+
+
+def text_offsets(pdf_bytes):
+    """非圧縮のPDFから、各文字列の描画開始位置（セル内の横方向の位置）を取り出す"""
+    return [float(offset or 0) for offset in re.findall(rb'Tm /\S+ [\d.]+ Tf [\d.]+ TL (?:([\d.]+) 0 Td )?\(', pdf_bytes)]
+
+
+class PdfServiceTest(SimpleTestCase):
+    def test_fonts_and_styles_created_once(self):
+        self.assertIs(pdf_service.get_styles(), pdf_service.get_styles())
+        self.assertIs(pdf_service.get_table_style('CENTER'), pdf_service.get_table_style('CENTER'))
+        self.assertIs(pdf_service.get_cell_style('cell', 'CENTER'), pdf_service.get_cell_style('cell', 'CENTER'))
+
+        with mock.patch.object(pdf_service.pdfmetrics, 'registerFont') as register:
+            pdf_service.register_fonts()
+            pdf_service.PdfDocument().title('タイトル')
+        register.assert_not_called()
+
+    def test_large_table_split_with_repeated_header(self):
+        headers = ['金融機関', '元本']
+        rows = [[f'銀行{i}', i * 1000] for i in range(450)]
+
+        pdf = pdf_service.PdfDocument().table(headers, rows)
+
+        tables = [flowable for flowable in pdf.story if isinstance(flowable, Table)]
+        self.assertEqual(len(tables), 3)
+        self.assertEqual([len(table._cellvalues) for table in tables], [201, 201, 51])
+        self.assertTrue(pdf.to_bytes().startswith(b'%PDF'))
+
+    def test_align_moves_wrapped_cells(self):
+        def render(align):
+            pdf = pdf_service.PdfDocument(pageCompression=0)
+            return text_offsets(pdf.table(['Item', 'Value'], [['a', 'b']], col_widths=[2, 2], align=align).to_bytes())
+
+        left, center, right = render('LEFT'), render('CENTER'), render('RIGHT')
+
+        self.assertEqual(len(left), 4)
+        self.assertEqual(left, [0.0] * 4)
+        # 見出し行・本文の両方のセルが配置に従って右へ移動する
+        self.assertTrue(all(0 < c < r for c, r in zip(center, right)), (center, right))
+
+    def test_text_is_escaped(self):
+        pdf = pdf_service.PdfDocument().paragraph('売上 < 経費 & 赤字').table(['項目'], [['<b>太字ではない</b>']])
+
+        self.assertTrue(pdf.to_bytes().startswith(b'%PDF'))
+
+    def test_export_service_writes_to_response(self):
+        response = ExportService.export_to_pdf(
+            '借入一覧', ['金融機関', '元本'], [['テスト銀行', 1000]], 'debts.pdf', {'件数': 1},
+        )
+
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="debts.pdf"')
+        self.assertTrue(response.content.startswith(b'%PDF'))
@@ -0,0 +1,90 @@
+"""
+プラン制限通知のテスト
+"""
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..models import Company, Firm, FirmCompany, FirmNotification, FirmPlan, FirmSubscription, FirmUsageTracking
+from ..utils.notifications import check_and_notify_plan_limits, notify_plan_limits
+
+User = get_user_model()
+
+
+class PlanLimitNotificationTest(TestCase):
+    def setUp(self):
+        self.plan = FirmPlan.objects.create(
+            plan_type='starter', name='Starter', max_companies=5,
+            max_ai_consultations_per_month=10, max_ocr_per_month=10,
+        )
+        self.firm = self._create_firm('事務所')
+        self.now = timezone.now()
+
+    def _create_firm(self, name):
+        owner = User.objects.create_user(username=name, email=f'{name}@example.com', password='testpass123')
+        firm = Firm.objects.create(name=name, owner=owner)
+        subscription = FirmSubscription.objects.create(firm=firm, plan=self.plan, status='active')
+        FirmUsageTracking.objects.create(
+            firm=firm, subscription=subscription,
+            year=timezone.now().year, month=timezone.now().month,
+        )
+        return firm
+
+    def _set_usage(self, firm=None, **counts):
+        FirmUsageTracking.objects.filter(firm=firm or self.firm).update(**counts)
+
+    def _titles(self):
+        return list(FirmNotification.objects.filter(firm=self.firm).order_by('created_at').values_list('title', flat=True))
+
+    def test_notifies_once_per_threshold(self):
+        self._set_usage(ocr_count=8)
+        self.assertEqual(notify_plan_limits(), 1)
+
+        # 同じしきい値のままでは再度通知しない
+        self._set_usage(ocr_count=9)
+        self.assertEqual(notify_plan_limits(), 0)
+
+        self._set_usage(ocr_count=10)
+        self.assertEqual(notify_plan_limits(), 1)
+        self.assertEqual(self._titles(), ['OCR読み込み回数制限に近づいています', 'OCR読み込み回数が上限に達しました'])
+
+    def test_notifies_again_after_dropping_below_threshold(self):
+        for index in range(4):
+            company = Company.objects.create(name=f'会社{index}', code=f'C{index:04d}', fiscal_month=3)
+            FirmCompany.objects.create(firm=self.firm, company=company, start_date=datetime.date(2025, 1, 1))
+        self.assertEqual(notify_plan_limits(), 1)
+
+        FirmCompany.objects.filter(firm=self.firm).first().delete()
+        self.assertEqual(notify_plan_limits(), 0)
+        company = Company.objects.create(name='会社4', code='C0004', fiscal_month=3)
+        FirmCompany.objects.create(firm=self.firm, company=company, start_date=datetime.date(2025, 1, 1))
+
+        self.assertEqual(notify_plan_limits(), 1)
+
+    def test_single_firm_check(self):
+        other = self._create_firm('他の事務所')
+        self._set_usage(ai_consultation_count=9)
+        self._set_usage(other, ai_consultation_count=9)
+
+        check_and_notify_plan_limits(self.firm)
+        check_and_notify_plan_limits(self.firm)
+
+        self.assertEqual(self._titles(), ['AI相談回数制限に近づいています'])
+        self.assertFalse(FirmNotification.objects.filter(firm=other).exists())
+
+    def test_query_count_does_not_grow_with_firms(self):
+        self._set_usage(ocr_count=8)
+        with CaptureQueriesContext(connection) as small:
+            notify_plan_limits()
+
+        for index in range(5):
+            firm = self._create_firm(f'事務所{index}')
+            self._set_usage(firm, ocr_count=8, ai_consultation_count=9)
+        with CaptureQueriesContext(connection) as large:
+            notify_plan_limits()
+
+        self.assertEqual(len(small), len(large))
@@ -0,0 +1,80 @@
+"""
+リクエストのプロファイリングのテスト
+"""
+import json
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..utils.profiling import external_call, fingerprint_sql, read_samples, start_profile, end_profile, get_current_profile
+
+User = get_user_model()
+
+
+class FingerprintTest(TestCase):
+    def test_parameters_are_removed(self):
+        self.assertEqual(
+            fingerprint_sql('SELECT * FROM "t" WHERE "id" IN (%s, %s, %s) AND "year" = 2024'),
+            fingerprint_sql('SELECT * FROM "t" WHERE "id" IN (%s) AND "year" = 2025'),
+        )
+
+    def test_nested_external_calls_are_counted_once(self):
+        token = start_profile()
+        try:
+            with external_call('storage'):
+                with external_call('storage'):
+                    pass
+            profile = get_current_profile()
+        finally:
+            end_profile(token)
+
+        self.assertEqual(profile.external_calls, {'storage': 1})
+
+
+class RequestProfilingMiddlewareTest(TestCase):
+    def setUp(self):
+        self.profiling_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profiling_dir, ignore_errors=True)
+        settings_override = override_settings(PROFILING_ENABLED=True, PROFILING_DIR=self.profiling_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_request_is_recorded(self):
+        self.client.get(reverse('login'))
+
+        samples = read_samples()
+        self.assertEqual(len(samples), 1)
+        self.assertEqual(samples[0]['url_name'], 'login')
+        self.assertEqual(samples[0]['status'], 200)
+        self.assertIn('sql_count', samples[0])
+
+    async def test_async_request_is_recorded(self):
+        # ASGIではORMを実行するスレッドのDB接続でSQLを記録する
+        await self.async_client.post(reverse('login'), {'username': 'nobody@example.com', 'password': 'wrong'})
+
+        samples = read_samples()
+        self.assertEqual(len(samples), 1)
+        self.assertEqual(samples[0]['url_name'], 'login')
+        self.assertGreater(samples[0]['sql_count'], 0)
+
+    def test_report_ranks_url_names(self):
+        self.client.get(reverse('login'))
+        self.client.get(reverse('login'))
+
+        out = StringIO()
+        call_command('profiling_report', '--json', stdout=out)
+
+        rows = json.loads(out.getvalue())
+        self.assertEqual(rows[0]['url_name'], 'login')
+        self.assertEqual(rows[0]['requests'], 2)
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled_by_default(self):
+        self.client.get(reverse('login'))
+
+        self.assertEqual(read_samples(), [])
@@ -0,0 +1,109 @@
+"""
+プロンプトのトークン予算（utils.prompt_budget）のテスト
+"""
+from django.test import SimpleTestCase, TestCase
+
+from ..models import AIConsultationType
+from ..utils.ai_consultation_data import build_consultation_prompt, get_consultation_data
+from ..utils.fiscal_ai_diagnosis import build_ai_diagnosis_prompt, collect_fiscal_data_for_diagnosis
+from ..utils.gemini import estimate_tokens
+from ..utils.prompt_budget import OMITTED_TEXT, PromptSection, fit_sections, summarize_debts_by_bank
+from .factories import create_company, create_debts, create_fiscal_years
+
+ALL_DATA_TYPES = ['fiscal_summary', 'debt_info', 'monthly_data', 'meeting_minutes', 'stakeholder_name']
+
+
+class FitSectionsTest(SimpleTestCase):
+    def setUp(self):
+        self.sections = [
+            PromptSection('a', 'あ' * 100, summarize=lambda: 'あ' * 10, required=True),
+            PromptSection('b', 'い' * 100, summarize=lambda: 'い' * 10),
+            PromptSection('c', 'う' * 100),
+        ]
+
+    def test_within_budget_keeps_everything(self):
+        result = fit_sections(self.sections, 1000, fixed_tokens=50)
+
+        self.assertEqual(result.texts, {section.name: section.text for section in self.sections})
+        self.assertEqual(result.tokens, 350)
+        self.assertEqual((result.summarized, result.dropped), ([], []))
+
+    def test_summarizes_then_drops_least_relevant_first(self):
+        # b を要約すれば収まる
+        result = fit_sections(self.sections, 220)
+        self.assertEqual((result.summarized, result.dropped), (['b'], []))
+        self.assertEqual(result.texts['a'], 'あ' * 100)
+
+        # a・b を要約しても収まらないので c を省略する（a は省略しない）
+        result = fit_sections(self.sections, 30)
+        self.assertEqual((result.summarized, result.dropped), (['a'], ['c', 'b']))
+        self.assertEqual(result.texts['c'], OMITTED_TEXT)
+        self.assertEqual(result.texts['a'], 'あ' * 10)
+        self.assertTrue(result.is_over_budget)
+
+    def test_debts_aggregated_by_bank(self):
+        debts = [
+            {'financial_institution': 'A銀行', 'principal': 1000, 'interest_rate': 1.0, 'monthly_repayment': 10, 'remaining_months': 12},
+            {'financial_institution': 'A銀行', 'principal': 3000, 'interest_rate': 2.0, 'monthly_repayment': 30, 'remaining_months': 48},
+            {'financial_institution': 'B銀行', 'principal': 500, 'interest_rate': 1.5, 'monthly_repayment': 5, 'remaining_months': 24},
+        ]
+
+        summary = summarize_debts_by_bank(debts)
+
+        self.assertEqual(summary[0], {
+            'financial_institution': 'A銀行', 'count': 2, 'principal': 4000, 'interest_rate': 1.75,
+            'monthly_repayment': 40, 'max_remaining_months': 48,
+        })
+        self.assertEqual(summary[1]['financial_institution'], 'B銀行')
+
+
+class PromptBudgetTest(TestCase):
+    def setUp(self):
+        self.company = create_company()
+        create_fiscal_years(self.company, years=3, last_year=2024)
+        create_debts(self.company, count=40)
+
+    def build(self, type_name, template, token_budget):
+        consultation_type, _ = AIConsultationType.objects.get_or_create(name=type_name)
+        data = get_consultation_data(consultation_type, self.company, selected_data_types=ALL_DATA_TYPES)
+
+        class Script:
+            system_instruction = 'system'
+            prompt_template = template
+
+        prompt, _ = build_consultation_prompt(consultation_type, '質問', data, user_script=Script, token_budget=token_budget)
+        return prompt, data
+
+    def test_debts_summarized_by_bank(self):
+        full_prompt, _ = self.build('財務相談', '{fiscal_summary}\n{debt_info}', 100000)
+
+        prompt, data = self.build('財務相談', '{fiscal_summary}\n{debt_info}', estimate_tokens(full_prompt) - 1)
+
+        self.assertEqual(data.prompt_budget['summarized'], ['debt_info'])
+        self.assertEqual(data.prompt_budget['dropped'], [])
+        self.assertIn('"max_remaining_months"', prompt)
+        self.assertLess(estimate_tokens(prompt), estimate_tokens(full_prompt) // 3)
+
+    def test_sections_ranked_by_consultation_type(self):
+        prompt, data = self.build('税務相談', '{fiscal_summary}\n{stakeholder_name}\n{debt_info}', 1)
+
+        # 税務相談では借入・株主の順に省略し、決算書は要約しても残す
+        self.assertEqual(data.prompt_budget['dropped'], ['debt_info', 'stakeholder_name'])
+        self.assertEqual(data.prompt_budget['summarized'], ['fiscal_summary'])
+        self.assertIn('"sales": 110250', prompt)
+        self.assertNotIn('"capital_stock"', prompt)
+
+    def test_diagnosis_prompt_keeps_target_year(self):
+        fiscal_data = collect_fiscal_data_for_diagnosis(self.company, 2024)
+        full_prompt = build_ai_diagnosis_prompt(fiscal_data, token_budget=100000)
+
+        prompt = build_ai_diagnosis_prompt(fiscal_data, token_budget=estimate_tokens(full_prompt) - 100)
+        self.assertIn('### 2024年度\n', prompt)
+        self.assertIn('### 2022年度（要約）', prompt)
+        self.assertIn('### 2023年度\n', prompt)
+
+        # 対象年度は要約しても残す
+        prompt = build_ai_diagnosis_prompt(fiscal_data, token_budget=1)
+        self.assertIn('### 2024年度（要約）', prompt)
+        self.assertNotIn('### 2023年度', prompt)
+        self.assertIn('（データ量が多いため省略: 2022年度、2023年度）', prompt)
@@ -0,0 +1,136 @@
+"""
+主要なビューのSQL件数の上限（クエリバジェット）のテスト
+
+実際の利用に近いテナント（factories.create_tenant）で各ビューを表示し、実行されたSQLの件数が
+QUERY_BUDGETS の上限を超えたら失敗する。N+1を持ち込んだ変更はここで検出される。
+改善によって件数が減った場合は、QUERY_BUDGETS の値も下げて改善を固定すること。
+
+SIZE_INDEPENDENT_VIEWS のビューは、データ件数が少ないテナントでも件数が変わらないこと
+（借入や決算の件数に比例してSQLが増えないこと）も確認する。
+"""
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..utils.profiling import fingerprint_sql
+from .factories import create_tenant
+
+# ビューごとのSQL件数の上限（標準のテナント: 20社・10年分の決算・借入50件、キャッシュなし）
+QUERY_BUDGETS = {
+    'index': 37,
+    'debts_all': 11,
+    'debts_overview': 9,
+    'fiscal_summary_year_list': 20,
+    # 利用状況レポート・クライアント一覧は現状Companyの数に比例してSQLが増える
+    'usage_report': 141,
+    'firm_clientslist': 81,
+    'ai_consultation': 29,
+    'export_debts': 4,
+    'export_fiscal_summary_year': 4,
+    'usage_report_export': 131,
+    'budget_vs_actual_comparison': 12,
+    'budget_vs_actual_yearly': 12,
+    'budget_vs_actual_monthly': 12,
+}
+
+# データ件数に比例してSQLが増えてはいけないビュー
+SIZE_INDEPENDENT_VIEWS = [
+    'index',
+    'debts_all',
+    'debts_overview',
+    'fiscal_summary_year_list',
+    'ai_consultation',
+    'export_debts',
+    'export_fiscal_summary_year',
+    'budget_vs_actual_comparison',
+    'budget_vs_actual_yearly',
+    'budget_vs_actual_monthly',
+]
+
+EXPORT_FORMATS = ['csv', 'excel', 'pdf']
+
+
+def get_view_urls(tenant):
+    """URL名ごとの計測対象のURL（エクスポートは形式ごと）"""
+    return {
+        'index': [reverse('index')],
+        'debts_all': [reverse('debts_all')],
+        'debts_overview': [reverse('debts_overview')],
+        'fiscal_summary_year_list': [reverse('fiscal_summary_year_list')],
+        'usage_report': [reverse('usage_report', args=[tenant.firm.id])],
+        'firm_clientslist': [reverse('firm_clientslist')],
+        'ai_consultation': [reverse('ai_consultation', args=[tenant.consultation_type.id])],
+        'export_debts': [reverse('export_debts', args=[fmt]) for fmt in EXPORT_FORMATS],
+        'export_fiscal_summary_year': [reverse('export_fiscal_summary_year', args=[fmt]) for fmt in EXPORT_FORMATS],
+        'budget_vs_actual_comparison': [reverse('budget_vs_actual_comparison')],
+        'budget_vs_actual_yearly': [reverse('budget_vs_actual_yearly')],
+        'budget_vs_actual_monthly': [reverse('budget_vs_actual_monthly')],
+        'usage_report_export': [
+            f"{reverse('usage_report_export', args=[tenant.firm.id])}?format={fmt}" for fmt in EXPORT_FORMATS
+        ],
+    }
+
+
+class QueryBudgetMixin:
+    """SQL件数を計測してバジェットと比較するヘルパー"""
+
+    def count_queries(self, url):
+        """キャッシュを空にした状態でURLを表示し、(レスポンス, 実行されたSQL) を返す"""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, f'{url} returned {response.status_code}')
+        return response, queries.captured_queries
+
+    def assertWithinBudget(self, url, queries, budget):
+        if len(queries) <= budget:
+            return
+        repeated = Counter(fingerprint_sql(query['sql']) for query in queries).most_common(5)
+        details = '\n'.join(f'  x{count}: {fingerprint}' for fingerprint, count in repeated)
+        self.fail(
+            f'{url} executed {len(queries)} queries (budget: {budget}).\n'
+            f'Most repeated queries:\n{details}'
+        )
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = create_tenant()
+
+    def setUp(self):
+        self.client.force_login(self.tenant.owner)
+
+    def test_views_within_budget(self):
+        for url_name, urls in get_view_urls(self.tenant).items():
+            for url in urls:
+                with self.subTest(url=url):
+                    _, queries = self.count_queries(url)
+                    self.assertWithinBudget(url, queries, QUERY_BUDGETS[url_name])
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class QueryCountScalingTest(QueryBudgetMixin, TestCase):
+    """データ件数が少ないテナントと標準のテナントでSQL件数が同じであること"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.small = create_tenant(companies=2, years=3, debts=5, todos=2)
+        cls.large = create_tenant()
+
+    def test_query_count_does_not_grow_with_data(self):
+        small_urls = get_view_urls(self.small)
+        large_urls = get_view_urls(self.large)
+        for url_name in SIZE_INDEPENDENT_VIEWS:
+            for small_url, large_url in zip(small_urls[url_name], large_urls[url_name]):
+                with self.subTest(url=large_url):
+                    self.client.force_login(self.small.owner)
+                    _, small_queries = self.count_queries(small_url)
+                    self.client.force_login(self.large.owner)
+                    _, large_queries = self.count_queries(large_url)
+                    self.assertEqual(len(small_queries), len(large_queries))
@@ -0,0 +1,137 @@
+"""
+レート制限のテスト
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Firm, RateLimitCounter, UserFirm
+from ..utils import rate_limit as rate_limit_module
+from ..utils.rate_limit import (
+    CacheCounterStore,
+    DatabaseCounterStore,
+    check_rate_limits,
+    get_counter_store,
+    hit,
+    parse_rate,
+    rate_limit,
+)
+from ..utils.security import check_rate_limit
+
+User = get_user_model()
+
+
+class RateLimitTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username='user', email='user@example.com', password='testpass123')
+        self.firm = Firm.objects.create(name='テスト事務所', owner=self.user)
+        UserFirm.objects.create(user=self.user, firm=self.firm, is_selected=True)
+        self.now = 1_000_000 * 60.0
+        patcher = mock.patch.object(rate_limit_module, '_now', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _request(self, user=None, method='post', **extra):
+        request = getattr(self.factory, method)('/', **extra)
+        request.user = user or self.user
+        return request
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('10/m'), (10, 60))
+        self.assertEqual(parse_rate('100/h'), (100, 3600))
+        self.assertEqual(parse_rate('5/30s'), (5, 30))
+
+    def test_database_store_counts_atomically(self):
+        store = DatabaseCounterStore()
+
+        self.assertEqual([store.incr('key', 60) for _ in range(3)], [1, 2, 3])
+        self.assertEqual(store.get('key'), 3)
+        store.delete('key')
+        self.assertEqual(store.get('key'), 0)
+
+    def test_database_store_restarts_expired_counter(self):
+        store = DatabaseCounterStore()
+        store.incr('key', 60)
+        RateLimitCounter.objects.update(expires_at='2000-01-01T00:00:00Z')
+
+        self.assertEqual(store.incr('key', 60), 1)
+
+    def test_sliding_window_weights_previous_window(self):
+        store = DatabaseCounterStore()
+        for _ in range(10):
+            self.assertIsNone(hit(store, 'k', limit=10, period=60))
+        self.assertIsNotNone(hit(store, 'k', limit=10, period=60))
+
+        # 次のウィンドウの開始直後は前のウィンドウの回数がほぼそのまま残る
+        self.now += 60
+        self.assertIsNotNone(hit(store, 'k', limit=10, period=60))
+
+        # ウィンドウの半ばでは前のウィンドウの回数が半分になる
+        self.now += 30
+        self.assertIsNone(hit(store, 'k', limit=10, period=60))
+
+    def test_user_and_firm_scopes(self):
+        colleague = User.objects.create_user(username='colleague', email='colleague@example.com', password='testpass123')
+        UserFirm.objects.create(user=colleague, firm=self.firm, is_selected=True)
+        rates = {'user': '2/m', 'firm': '3/m'}
+
+        self.assertIsNone(check_rate_limits(self._request(), 'ai', rates))
+        self.assertIsNone(check_rate_limits(self._request(), 'ai', rates))
+        self.assertIsNotNone(check_rate_limits(self._request(), 'ai', rates))
+        # 同じFirmの別ユーザーはFirm単位の上限まで
+        self.assertIsNone(check_rate_limits(self._request(colleague), 'ai', rates))
+        self.assertIsNotNone(check_rate_limits(self._request(colleague), 'ai', rates))
+
+    def test_decorator_returns_429(self):
+        @rate_limit('export', {'user': '1/m'}, methods=('GET',))
+        def view(request):
+            return HttpResponse('ok')
+
+        self.assertEqual(view(self._request(method='get')).status_code, 200)
+        response = view(self._request(method='get', HTTP_ACCEPT='application/json'))
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        # 対象外のメソッドは制限しない
+        self.assertEqual(view(self._request()).status_code, 200)
+
+    def test_backend_selection(self):
+        self.assertIsInstance(get_counter_store(), DatabaseCounterStore)
+        with override_settings(RATE_LIMIT_BACKEND='cache'):
+            self.assertIsInstance(get_counter_store(), CacheCounterStore)
+
+    @override_settings(RATE_LIMIT_BACKEND='cache')
+    def test_cache_store(self):
+        cache.clear()
+        store = CacheCounterStore()
+
+        self.assertEqual([store.incr('key', 60) for _ in range(3)], [1, 2, 3])
+
+    def test_auth_rate_limit_blocks_after_max_attempts(self):
+        request = self._request()
+        for _ in range(3):
+            self.assertTrue(check_rate_limit(request, 'login', max_attempts=3)[0])
+
+        self.assertFalse(check_rate_limit(request, 'login', max_attempts=3)[0])
+        # ブロック中は試行回数に関わらず拒否する
+        self.assertFalse(check_rate_limit(request, 'login', max_attempts=3)[0])
+
+
+@override_settings(RATE_LIMITS={
+    'export': {'url_names': ['export_debts'], 'methods': ['GET'], 'rates': {'user': '1/m'}},
+})
+class RateLimitMiddlewareTest(TestCase):
+    def test_registered_url_is_limited(self):
+        user = User.objects.create_user(username='user', email='user@example.com', password='testpass123')
+        self.client.force_login(user)
+        url = reverse('export_debts', kwargs={'format_type': 'csv'})
+
+        self.client.get(url)
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertTemplateUsed(response, '429.html')
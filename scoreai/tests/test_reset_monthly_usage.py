@@ -0,0 +1,77 @@
+"""
+月次利用状況リセットコマンドのテスト
+"""
+import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..models import Company, CompanyUsageTracking, Firm, FirmCompany, FirmPlan, FirmSubscription, FirmUsageTracking
+
+User = get_user_model()
+
+
+class ResetMonthlyUsageTest(TestCase):
+    def setUp(self):
+        self.plan = FirmPlan.objects.create(plan_type='starter', name='Starter', max_companies=3)
+        self.now = timezone.now()
+        for index in range(3):
+            self._create_firm(index)
+
+    def _create_firm(self, index):
+        owner = User.objects.create_user(username=f'owner{index}', email=f'owner{index}@example.com', password='testpass123')
+        firm = Firm.objects.create(name=f'事務所{index}', owner=owner)
+        FirmSubscription.objects.create(firm=firm, plan=self.plan, status='active')
+        for company_index in range(2):
+            company = Company.objects.create(name=f'会社{index}-{company_index}', code=f'C{index:03d}{company_index}', fiscal_month=3)
+            FirmCompany.objects.create(firm=firm, company=company, start_date=datetime.date(2025, 1, 1))
+        return firm
+
+    def _run(self, *args):
+        call_command('reset_monthly_usage', *args, stdout=StringIO())
+
+    def test_creates_current_month_rows(self):
+        self._run()
+
+        self.assertEqual(FirmUsageTracking.objects.filter(year=self.now.year, month=self.now.month).count(), 3)
+        self.assertEqual(CompanyUsageTracking.objects.filter(year=self.now.year, month=self.now.month).count(), 6)
+
+    def test_second_run_keeps_usage(self):
+        """2回目の実行では作成済みのレコード（当月の利用分）を変更しない"""
+        self._run()
+        FirmUsageTracking.objects.update(ocr_count=5)
+
+        self._run()
+
+        self.assertEqual(FirmUsageTracking.objects.count(), 3)
+        self.assertEqual(CompanyUsageTracking.objects.count(), 6)
+        self.assertEqual(set(FirmUsageTracking.objects.values_list('ocr_count', flat=True)), {5})
+
+    def test_force_resets_counts(self):
+        self._run()
+        FirmUsageTracking.objects.update(ocr_count=5)
+
+        self._run('--force')
+
+        self.assertEqual(set(FirmUsageTracking.objects.values_list('ocr_count', flat=True)), {0})
+
+    def test_dry_run_creates_nothing(self):
+        self._run('--dry-run')
+
+        self.assertFalse(FirmUsageTracking.objects.exists())
+        self.assertFalse(CompanyUsageTracking.objects.exists())
+
+    def test_query_count_does_not_grow_with_firms(self):
+        with CaptureQueriesContext(connection) as small:
+            self._run('--dry-run')
+        for index in range(3, 10):
+            self._create_firm(index)
+        with CaptureQueriesContext(connection) as large:
+            self._run('--dry-run')
+
+        self.assertEqual(len(small), len(large))
@@ -0,0 +1,140 @@
+"""
+外部API呼び出しの耐障害性（utils.resilience）のテスト
+
+ローカルに立てたHTTPサーバーで遅延・503を発生させ、再試行・タイムアウト・サーキットブレーカーを確認する。
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import requests
+import stripe
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from ..utils import resilience
+from ..utils.storage.google_drive import GoogleDriveAdapter
+from ..utils.stripe_client import ResilientRequestsClient
+
+TEST_POLICIES = {
+    'storage': {
+        'timeout': 0.2, 'max_attempts': 3, 'backoff_base': 0.01, 'backoff_max': 0.02, 'deadline': 5,
+        'failure_threshold': 2, 'recovery_timeout': 1,
+    },
+    'stripe': {'timeout': 0.2, 'failure_threshold': 1, 'recovery_timeout': 30},
+}
+
+
+class FakeServiceHandler(BaseHTTPRequestHandler):
+    """server.responses の先頭から順に応答する（'slow' は応答を遅らせる。空の場合は200）"""
+
+    def do_GET(self):
+        self.server.hits += 1
+        behavior = self.server.responses.pop(0) if self.server.responses else 200
+        if behavior == 'slow':
+            time.sleep(0.5)
+            behavior = 200
+        try:
+            self.send_response(behavior)
+            self.end_headers()
+            self.wfile.write(b'{}')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    do_POST = do_GET
+
+    def log_message(self, format, *args):
+        pass
+
+
+def fetch(url):
+    response = requests.get(url, timeout=resilience.get_timeout('storage'))
+    response.raise_for_status()
+    return response.status_code
+
+
+@override_settings(EXTERNAL_SERVICE_POLICIES=TEST_POLICIES)
+class ResilienceTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeServiceHandler)
+        cls.server.daemon_threads = True
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.server.hits = 0
+        self.server.responses = []
+
+    def test_retries_transient_errors_and_timeouts(self):
+        self.server.responses = [503, 'slow', 200]
+
+        self.assertEqual(resilience.call('storage', fetch, self.url), 200)
+        self.assertEqual(self.server.hits, 3)
+        self.assertEqual(resilience.CircuitBreaker('storage').state, 'closed')
+
+    def test_non_idempotent_and_client_errors_are_not_retried(self):
+        self.server.responses = [503]
+        with self.assertRaises(requests.HTTPError):
+            resilience.call('storage', fetch, self.url, idempotent=False)
+
+        self.server.responses = [404]
+        with self.assertRaises(requests.HTTPError):
+            resilience.call('storage', fetch, self.url)
+        self.assertEqual(self.server.hits, 2)
+
+    def test_circuit_opens_fails_fast_and_recovers(self):
+        self.server.responses = [503] * 6
+        for _ in range(2):
+            with self.assertRaises(requests.HTTPError):
+                resilience.call('storage', fetch, self.url)
+        self.assertEqual(self.server.hits, 6)
+
+        # 開いている間はサーバーを呼び出さない
+        started = time.monotonic()
+        with self.assertRaises(resilience.CircuitOpenError):
+            resilience.call('storage', fetch, self.url)
+        self.assertLess(time.monotonic() - started, 0.1)
+        self.assertEqual(self.server.hits, 6)
+
+        # recovery_timeout の後は1回だけ試し、成功すれば元に戻る
+        time.sleep(1.1)
+        self.assertEqual(resilience.CircuitBreaker('storage').state, 'half_open')
+        self.assertEqual(resilience.call('storage', fetch, self.url), 200)
+        self.assertEqual(resilience.CircuitBreaker('storage').state, 'closed')
+
+    def test_stripe_client_uses_circuit_breaker(self):
+        client = ResilientRequestsClient(timeout=resilience.get_timeout('stripe'))
+        self.server.responses = [503]
+
+        _, status_code, _ = client.request_with_retries('get', self.url, {}, max_network_retries=0)
+        self.assertEqual(status_code, 503)
+
+        # 各ビューの except stripe.error.StripeError で扱える例外になる
+        with self.assertRaises(stripe.APIConnectionError):
+            client.request_with_retries('get', self.url, {}, max_network_retries=0)
+        self.assertEqual(self.server.hits, 1)
+
+    def test_get_or_create_folder_does_not_multiply_retries(self):
+        adapter = GoogleDriveAdapter.__new__(GoogleDriveAdapter)
+        adapter._client = mock.Mock()
+        files = adapter._client.files.return_value
+        files.list.return_value.execute.side_effect = [TimeoutError(), {'files': []}]
+        files.create.return_value.execute.side_effect = TimeoutError()
+
+        with self.assertRaises(TimeoutError):
+            adapter.get_or_create_folder('reports')
+
+        # 再試行は検索（冪等）だけ。作成は1回だけ呼び出し、失敗も1回だけ数える
+        self.assertEqual(files.list.return_value.execute.call_count, 2)
+        self.assertEqual(files.create.return_value.execute.call_count, 1)
+        self.assertEqual(resilience.CircuitBreaker('storage').state, 'closed')
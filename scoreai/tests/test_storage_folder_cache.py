@@ -0,0 +1,154 @@
+"""
+クラウドストレージのフォルダIDキャッシュのテスト
+"""
+from io import BytesIO
+
+import ulid
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from ..models import CloudStorageSetting, Company
+from ..utils.storage.base import StorageAdapter
+from ..utils.storage.folder_cache import FolderIdCache
+
+User = get_user_model()
+
+
+class NotFoundError(Exception):
+    """APIの404エラー"""
+    status = 404
+
+
+class FakeStorageAdapter(StorageAdapter):
+    """メモリ上のフォルダ構造を操作するストレージアダプター（API呼び出し回数を記録する）"""
+
+    ROOT_ID = 'root'
+
+    def __init__(self, user=None):
+        super().__init__(user, access_token='token')
+        self.folders = {self.ROOT_ID: {'name': 'root', 'parent': None}}
+        self.files = {}
+        self.api_calls = 0
+
+    def _check_folder(self, folder_id):
+        if folder_id not in self.folders:
+            raise NotFoundError(folder_id)
+
+    def create_folder(self, folder_name, parent_folder_id=None):
+        self.api_calls += 1
+        parent_id = parent_folder_id or self.ROOT_ID
+        self._check_folder(parent_id)
+        folder_id = str(ulid.new())
+        self.folders[folder_id] = {'name': folder_name, 'parent': parent_id}
+        return {'id': folder_id, 'name': folder_name, 'webViewLink': ''}
+
+    def get_or_create_folder(self, folder_path, root_folder_id=None):
+        current_id = root_folder_id or self.ROOT_ID
+        for folder_name in [name for name in folder_path.split('/') if name.strip()]:
+            self.api_calls += 1
+            self._check_folder(current_id)
+            found = [
+                folder_id for folder_id, folder in self.folders.items()
+                if folder['parent'] == current_id and folder['name'] == folder_name
+            ]
+            current_id = found[0] if found else self.create_folder(folder_name, current_id)['id']
+        return {'id': current_id, 'name': self.folders[current_id]['name'], 'webViewLink': ''}
+
+    def upload_file(self, file_content, filename, folder_id, mime_type=None):
+        self.api_calls += 1
+        self._check_folder(folder_id)
+        file_id = str(ulid.new())
+        self.files[file_id] = {'name': filename, 'parent': folder_id, 'content': file_content.read()}
+        return {'id': file_id, 'name': filename, 'webViewLink': ''}
+
+    def download_file(self, file_id):
+        return self.files[file_id]['content']
+
+    def get_file_info(self, file_id):
+        return {'id': file_id, 'name': self.files[file_id]['name']}
+
+    def refresh_access_token(self):
+        return True
+
+    def test_connection(self):
+        return True
+
+    def delete_folder(self, folder_id):
+        """フォルダを配下ごと削除（ユーザーがストレージ側で削除した状態を再現）"""
+        children = [child_id for child_id, folder in self.folders.items() if folder['parent'] == folder_id]
+        for child_id in children:
+            self.delete_folder(child_id)
+        del self.folders[folder_id]
+
+
+class FolderIdCacheTest(TestCase):
+    """フォルダIDキャッシュのテスト"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='storage', email='storage@example.com', password='testpass123')
+        self.company = Company.objects.create(name='テスト会社', fiscal_month=4)
+        self.adapter = FakeStorageAdapter(self.user)
+        root = self.adapter.create_folder('S-CoreAI')
+        self.storage_setting = CloudStorageSetting.objects.create(
+            user=self.user,
+            company=self.company,
+            storage_type='google_drive',
+            root_folder_id=root['id'],
+        )
+        self.adapter.api_calls = 0
+
+    def _cache(self):
+        """DBから読み直したCloudStorageSettingでキャッシュを作成（リクエストごとの状態を再現）"""
+        return FolderIdCache(CloudStorageSetting.objects.get(pk=self.storage_setting.pk), self.adapter)
+
+    def test_cached_path_needs_no_api_calls(self):
+        """2回目以降の解決ではAPIを呼び出さない"""
+        folder_id = self._cache().resolve('試算表/貸借対照表')
+        calls = self.adapter.api_calls
+
+        self.assertEqual(self._cache().resolve('試算表/貸借対照表'), folder_id)
+        self.assertEqual(self.adapter.api_calls, calls)
+
+    def test_sibling_path_reuses_cached_parent(self):
+        """親フォルダがキャッシュ済みの場合は未解決の階層だけを解決する"""
+        self._cache().resolve('試算表/貸借対照表')
+        self.adapter.api_calls = 0
+
+        self._cache().resolve('試算表/損益計算書')
+
+        # 「損益計算書」の検索と作成のみ
+        self.assertEqual(self.adapter.api_calls, 2)
+
+    def test_upload_re_resolves_deleted_folder(self):
+        """キャッシュしたフォルダが削除されていた場合は再解決してアップロードする"""
+        cache = self._cache()
+        stale_id = cache.resolve('決算書/貸借対照表')
+        self.adapter.delete_folder(cache.get('決算書'))
+
+        file_info, folder_id = self._cache().upload_file(BytesIO(b'pdf'), 'bs.pdf', '決算書/貸借対照表')
+
+        self.assertNotEqual(folder_id, stale_id)
+        self.assertEqual(self.adapter.files[file_info['id']]['parent'], folder_id)
+        self.assertEqual(self.adapter.files[file_info['id']]['content'], b'pdf')
+        self.assertEqual(self._cache().get('決算書/貸借対照表'), folder_id)
+
+    def test_root_folder_change_discards_cache(self):
+        """ルートフォルダが変更された場合は既存のキャッシュを使用しない"""
+        self._cache().resolve('契約書')
+        new_root = self.adapter.create_folder('S-CoreAI-2')
+        self.storage_setting.root_folder_id = new_root['id']
+        self.storage_setting.save()
+
+        folder_id = self._cache().resolve('契約書')
+
+        self.assertEqual(self.adapter.folders[folder_id]['parent'], new_root['id'])
+
+    def test_prewarm(self):
+        """事前に解決したパスはアップロード時にAPIを呼び出さない"""
+        self._cache().prewarm(['決算書', '決算書/貸借対照表', '決算書/損益計算書'])
+        self.adapter.api_calls = 0
+
+        self._cache().upload_file(BytesIO(b'pdf'), 'pl.pdf', '決算書/損益計算書')
+
+        # アップロードのみ
+        self.assertEqual(self.adapter.api_calls, 1)
@@ -0,0 +1,154 @@
+"""
+クラウドストレージへのバックグラウンドアップロードのテスト
+"""
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from ..models import CloudStorageSetting, Company, UploadedDocument
+from ..services import storage_upload_service
+from ..services.storage_upload_service import MAX_UPLOAD_ATTEMPTS, enqueue_upload, process_pending_uploads, process_upload
+from .test_storage_folder_cache import FakeStorageAdapter
+
+User = get_user_model()
+
+
+class UnauthorizedError(Exception):
+    """APIの401エラー"""
+    status = 401
+
+
+class FlakyStorageAdapter(FakeStorageAdapter):
+    """指定した例外を順に発生させてからアップロードするストレージアダプター"""
+
+    def __init__(self, user=None, errors=()):
+        super().__init__(user)
+        self.errors = list(errors)
+        self.refreshed = 0
+
+    def upload_file(self, file_content, filename, folder_id, mime_type=None):
+        if self.errors:
+            raise self.errors.pop(0)
+        return super().upload_file(file_content, filename, folder_id, mime_type)
+
+    def refresh_access_token(self):
+        self.refreshed += 1
+        self.access_token = 'refreshed-token'
+        return True
+
+
+@override_settings(BACKGROUND_TASK_WORKERS=0)
+class StorageUploadTest(TestCase):
+    """スプールからのアップロードと再試行"""
+
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spool_dir, ignore_errors=True)
+        settings_override = override_settings(STORAGE_UPLOAD_SPOOL_DIR=self.spool_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='storage', email='storage@example.com', password='testpass123')
+        self.company = Company.objects.create(name='テスト会社', fiscal_month=4)
+        self.storage_setting = CloudStorageSetting.objects.create(
+            user=self.user,
+            company=self.company,
+            storage_type='google_drive',
+            access_token='token',
+            refresh_token='refresh',
+        )
+
+    def _enqueue(self):
+        return enqueue_upload(
+            storage_setting=self.storage_setting,
+            file_content=b'%PDF-1.4 test',
+            original_filename='決算書.pdf',
+            stored_filename='20250331_決算書.pdf',
+            document_type='financial_statement',
+            subfolder_type='balance_sheet',
+            mime_type='application/pdf',
+        )
+
+    def _process(self, adapter, uploaded_doc):
+        with mock.patch.object(storage_upload_service, 'get_storage_adapter', return_value=adapter):
+            return process_upload(uploaded_doc.pk)
+
+    def _make_due(self, uploaded_doc):
+        UploadedDocument.objects.filter(pk=uploaded_doc.pk).update(next_upload_at=None)
+
+    def test_enqueue_does_not_upload(self):
+        """リクエスト中はスプールに保存するだけ"""
+        uploaded_doc = self._enqueue()
+
+        self.assertEqual(uploaded_doc.upload_status, 'pending')
+        self.assertTrue(os.path.exists(uploaded_doc.spool_path))
+        self.assertEqual(uploaded_doc.file_size, len(b'%PDF-1.4 test'))
+
+    def test_upload_removes_spool_file(self):
+        adapter = FlakyStorageAdapter(self.user)
+        uploaded_doc = self._enqueue()
+
+        self.assertTrue(self._process(adapter, uploaded_doc))
+
+        uploaded_doc.refresh_from_db()
+        self.assertEqual(uploaded_doc.upload_status, 'uploaded')
+        self.assertEqual(adapter.files[uploaded_doc.file_id]['content'], b'%PDF-1.4 test')
+        self.assertEqual(uploaded_doc.spool_path, '')
+        self.assertFalse(os.listdir(self.spool_dir))
+
+    def test_expired_token_is_refreshed(self):
+        """認証エラーの場合はトークンを更新して保存し、すぐに再試行する"""
+        adapter = FlakyStorageAdapter(self.user, errors=[UnauthorizedError('expired')])
+        uploaded_doc = self._enqueue()
+
+        self.assertTrue(self._process(adapter, uploaded_doc))
+
+        self.assertEqual(adapter.refreshed, 1)
+        self.storage_setting.refresh_from_db()
+        self.assertEqual(self.storage_setting.access_token, 'refreshed-token')
+        self.assertEqual(UploadedDocument.objects.get(pk=uploaded_doc.pk).upload_attempts, 1)
+
+    def test_transient_error_schedules_retry(self):
+        adapter = FlakyStorageAdapter(self.user, errors=[ConnectionError('timeout')])
+        uploaded_doc = self._enqueue()
+
+        self.assertFalse(self._process(adapter, uploaded_doc))
+
+        uploaded_doc.refresh_from_db()
+        self.assertEqual(uploaded_doc.upload_status, 'pending')
+        self.assertEqual(uploaded_doc.upload_error, 'timeout')
+        self.assertIsNotNone(uploaded_doc.next_upload_at)
+        self.assertTrue(os.path.exists(uploaded_doc.spool_path))
+        # 再試行の時刻まではアップロードしない
+        self.assertFalse(self._process(adapter, uploaded_doc))
+        self.assertEqual(UploadedDocument.objects.get(pk=uploaded_doc.pk).upload_attempts, 1)
+
+    def test_gives_up_after_max_attempts(self):
+        adapter = FlakyStorageAdapter(self.user, errors=[ConnectionError('timeout')] * MAX_UPLOAD_ATTEMPTS)
+        uploaded_doc = self._enqueue()
+
+        for _ in range(MAX_UPLOAD_ATTEMPTS):
+            self._make_due(uploaded_doc)
+            self._process(adapter, uploaded_doc)
+
+        uploaded_doc.refresh_from_db()
+        self.assertEqual(uploaded_doc.upload_status, 'failed')
+        self.assertEqual(uploaded_doc.upload_attempts, MAX_UPLOAD_ATTEMPTS)
+        # 手動で再試行できるようにスプールファイルは残す
+        self.assertTrue(os.path.exists(uploaded_doc.spool_path))
+
+    def test_process_pending_uploads(self):
+        adapter = FlakyStorageAdapter(self.user)
+        self._enqueue()
+        self._enqueue()
+
+        with mock.patch.object(storage_upload_service, 'get_storage_adapter', return_value=adapter) as factory:
+            result = process_pending_uploads()
+
+        self.assertEqual(result, {'uploaded': 2, 'retrying': 0})
+        # 同じストレージ設定のアダプターは再利用する
+        self.assertEqual(factory.call_count, 1)
@@ -0,0 +1,223 @@
+"""
+Stripe Webhookイベントの受信箱と処理のテスト
+
+fixtures/stripe/ の記録済みイベントと、ローカルのフェイクStripe APIを使用する。
+"""
+import copy
+import hashlib
+import hmac
+import json
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Firm, FirmNotification, FirmPlan, FirmSubscription, StripeEvent, SubscriptionHistory
+from ..services.stripe_event_service import (
+    MAX_EVENT_ATTEMPTS,
+    StripeEventHandler,
+    process_customer_events,
+    process_pending_stripe_events,
+    record_stripe_event,
+    retry_failed_events,
+    skip_failed_events,
+)
+
+User = get_user_model()
+
+FIXTURE_DIR = Path(__file__).resolve().parent / 'fixtures' / 'stripe'
+WEBHOOK_SECRET = 'whsec_test_secret'
+
+
+def load_event(name):
+    return json.loads((FIXTURE_DIR / f'{name}.json').read_text(encoding='utf-8'))
+
+
+class FakeStripeAPI:
+    """Subscription.retrieve / Customer.retrieve だけを持つローカルのStripe API"""
+
+    class _Resource:
+        def __init__(self, objects):
+            self.objects = objects
+            self.calls = []
+
+        def retrieve(self, object_id):
+            self.calls.append(object_id)
+            if object_id not in self.objects:
+                raise LookupError(f'No such object: {object_id}')
+            return copy.deepcopy(self.objects[object_id])
+
+    def __init__(self, subscriptions=None, customers=None):
+        self.Subscription = self._Resource(subscriptions or {})
+        self.Customer = self._Resource(customers or {})
+
+
+def sign(payload: bytes, secret: str = WEBHOOK_SECRET) -> str:
+    """Stripe-Signatureヘッダーを作成"""
+    timestamp = int(time.time())
+    signature = hmac.new(secret.encode(), f'{timestamp}.'.encode() + payload, hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={signature}'
+
+
+class StripeEventTestCase(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(username='owner', email='owner@example.com', password='testpass123')
+        self.firm = Firm.objects.create(id='01JFIRM0000000000000000001', name='テスト事務所', owner=owner)
+        self.starter = FirmPlan.objects.create(
+            id='01JPLANSTARTER000000000001', plan_type='starter', name='Starter',
+            max_companies=3, stripe_price_id_monthly='price_starter_monthly',
+        )
+        self.professional = FirmPlan.objects.create(
+            id='01JPLANPRO0000000000000001', plan_type='professional', name='Professional',
+            max_companies=10, stripe_price_id_monthly='price_professional_monthly',
+        )
+        self.stripe_api = FakeStripeAPI(
+            subscriptions={'sub_Test000001': load_event('subscription_test000001')},
+            customers={'cus_Test000001': {'id': 'cus_Test000001', 'metadata': {'firm_id': self.firm.id}}},
+        )
+        self.handler = StripeEventHandler(stripe_api=self.stripe_api)
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET, BACKGROUND_TASK_WORKERS=0)
+class StripeWebhookViewTest(StripeEventTestCase):
+    """エンドポイントは検証して記録するだけ"""
+
+    def post_event(self, event, signature=None):
+        payload = json.dumps(event).encode()
+        return self.client.post(
+            reverse('stripe_webhook'),
+            data=payload,
+            content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=signature or sign(payload),
+        )
+
+    def test_event_is_recorded_without_processing(self):
+        response = self.post_event(load_event('checkout_session_completed'))
+
+        self.assertEqual(response.status_code, 200)
+        stripe_event = StripeEvent.objects.get()
+        self.assertEqual(stripe_event.status, 'pending')
+        self.assertEqual(stripe_event.customer_id, 'cus_Test000001')
+        self.assertFalse(FirmSubscription.objects.exists())
+
+    def test_redelivery_is_ignored(self):
+        event = load_event('checkout_session_completed')
+        self.post_event(event)
+        response = self.post_event(event)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(StripeEvent.objects.count(), 1)
+
+    def test_invalid_signature_is_rejected(self):
+        response = self.post_event(load_event('checkout_session_completed'), signature='t=1,v1=invalid')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(StripeEvent.objects.exists())
+
+
+class StripeEventProcessingTest(StripeEventTestCase):
+    """受信箱のイベントの適用"""
+
+    def test_checkout_creates_subscription(self):
+        record_stripe_event(load_event('checkout_session_completed'))
+
+        self.assertEqual(process_customer_events('cus_Test000001', self.handler), 1)
+
+        subscription = FirmSubscription.objects.get(firm=self.firm)
+        self.assertEqual(subscription.plan, self.starter)
+        self.assertEqual(subscription.stripe_subscription_id, 'sub_Test000001')
+        self.assertIsNotNone(subscription.current_period_end)
+        self.assertEqual(StripeEvent.objects.get().status, 'processed')
+
+    def test_replayed_event_is_noop(self):
+        """処理済みのイベントを再度受信しても適用しない"""
+        event = load_event('customer_subscription_updated')
+        record_stripe_event(load_event('checkout_session_completed'))
+        record_stripe_event(event)
+        process_pending_stripe_events(self.handler)
+
+        self.assertIsNone(record_stripe_event(event))
+        self.assertEqual(process_pending_stripe_events(self.handler)['processed'], 0)
+        self.assertEqual(SubscriptionHistory.objects.count(), 1)
+        self.assertEqual(FirmNotification.objects.filter(notification_type='subscription_updated').count(), 1)
+
+    def test_events_are_applied_in_order_per_customer(self):
+        """後から届いた古いイベントも発生順に適用する"""
+        record_stripe_event(load_event('invoice_payment_failed'))
+        record_stripe_event(load_event('customer_subscription_updated'))
+        record_stripe_event(load_event('checkout_session_completed'))
+
+        self.assertEqual(process_customer_events('cus_Test000001', self.handler), 3)
+
+        subscription = FirmSubscription.objects.get(firm=self.firm)
+        self.assertEqual(subscription.plan, self.professional)
+        self.assertEqual(subscription.status, 'past_due')
+
+    def test_failure_blocks_later_events_until_retry(self):
+        """失敗したイベントは再試行を予約し、同じ顧客の後続イベントを適用しない"""
+        self.stripe_api.Subscription.objects.clear()
+        record_stripe_event(load_event('checkout_session_completed'))
+        record_stripe_event(load_event('customer_subscription_updated'))
+
+        self.assertEqual(process_customer_events('cus_Test000001', self.handler), 0)
+
+        failed = StripeEvent.objects.get(event_type='checkout.session.completed')
+        self.assertEqual(failed.status, 'pending')
+        self.assertEqual(failed.attempts, 1)
+        self.assertIsNotNone(failed.next_attempt_at)
+        self.assertEqual(StripeEvent.objects.get(event_type='customer.subscription.updated').attempts, 0)
+        self.assertEqual(process_pending_stripe_events(self.handler)['processed'], 0)
+
+    def test_failed_event_blocks_customer_until_released(self):
+        """再試行の上限に達したイベントは、再試行またはスキップされるまで後続のイベントを止める"""
+        subscriptions = dict(self.stripe_api.Subscription.objects)
+        self.stripe_api.Subscription.objects.clear()
+        record_stripe_event(load_event('checkout_session_completed'))
+        record_stripe_event(load_event('customer_subscription_updated'))
+        StripeEvent.objects.filter(event_type='checkout.session.completed').update(attempts=MAX_EVENT_ATTEMPTS - 1)
+
+        self.assertEqual(process_customer_events('cus_Test000001', self.handler), 0)
+        self.assertEqual(StripeEvent.objects.get(event_type='checkout.session.completed').status, 'failed')
+
+        # 失敗したイベントの後続は適用しない
+        self.assertEqual(process_customer_events('cus_Test000001', self.handler), 0)
+        self.assertEqual(process_pending_stripe_events(self.handler), {'customers': 0, 'processed': 0})
+        later = StripeEvent.objects.get(event_type='customer.subscription.updated')
+        self.assertEqual((later.status, later.attempts), ('pending', 0))
+
+        # 再試行すると発生順に適用される
+        self.stripe_api.Subscription.objects.update(subscriptions)
+        self.assertEqual(retry_failed_events(StripeEvent.objects.all()), 1)
+        self.assertEqual(process_customer_events('cus_Test000001', self.handler), 2)
+        self.assertEqual(FirmSubscription.objects.get(firm=self.firm).plan, self.professional)
+
+    def test_skipped_event_releases_customer(self):
+        self.stripe_api.Subscription.objects.clear()
+        record_stripe_event(load_event('checkout_session_completed'))
+        record_stripe_event(load_event('invoice_payment_failed'))
+        StripeEvent.objects.filter(event_type='checkout.session.completed').update(attempts=MAX_EVENT_ATTEMPTS - 1)
+        process_customer_events('cus_Test000001', self.handler)
+
+        self.assertEqual(skip_failed_events(StripeEvent.objects.all()), 1)
+
+        self.assertEqual(process_customer_events('cus_Test000001', self.handler), 1)
+        self.assertEqual(StripeEvent.objects.get(event_type='checkout.session.completed').status, 'skipped')
+
+    def test_stripe_api_called_outside_transaction(self):
+        """Stripe APIの呼び出し中はイベントの行ロック・トランザクションを保持しない"""
+        depths = []
+        retrieve = self.stripe_api.Subscription.retrieve
+
+        def retrieve_and_record_depth(object_id):
+            depths.append(len(connection.savepoint_ids))
+            return retrieve(object_id)
+
+        self.stripe_api.Subscription.retrieve = retrieve_and_record_depth
+        record_stripe_event(load_event('checkout_session_completed'))
+        baseline = len(connection.savepoint_ids)
+
+        self.assertEqual(process_customer_events('cus_Test000001', self.handler), 1)
+        self.assertEqual(depths, [baseline])
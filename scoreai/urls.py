@@ -40,6 +40,7 @@ from .views.industry_consultation_views import (
     IzakayaPlanCreateView,
     IzakayaPlanUpdateView,
     IzakayaPlanPreviewView,
+    IzakayaPlanScenarioView,
     IzakayaPlanListView,
     IzakayaPlanDeleteView,
 )
@@ -160,6 +161,7 @@ from .views.budget_views import (
     FiscalSummary_MonthBudgetUpdateView,
     BudgetSuggestView,
     BudgetSuggest_MonthView,
+    BudgetScenarioView,
     BudgetVsActualComparisonView,
     BudgetVsActualYearlyComparisonView,
     BudgetVsActualMonthlyComparisonView,
@@ -307,6 +309,7 @@ urlpatterns = [
     path('fiscal_summary_month/budget/<str:pk>/update/', FiscalSummary_MonthBudgetUpdateView.as_view(), name='fiscal_summary_month_budget_update'),
     path('budget/suggest/', BudgetSuggestView.as_view(), name='budget_suggest'),
     path('budget/suggest-month/', BudgetSuggest_MonthView.as_view(), name='budget_suggest_month'),
+    path('budget/scenario/', BudgetScenarioView.as_view(), name='budget_scenario'),
     path('budget/vs-actual/', BudgetVsActualComparisonView.as_view(), name='budget_vs_actual_comparison'),
     path('budget/vs-actual-yearly/', BudgetVsActualYearlyComparisonView.as_view(), name='budget_vs_actual_yearly'),
     path('budget/vs-actual-monthly/', BudgetVsActualMonthlyComparisonView.as_view(), name='budget_vs_actual_monthly'),
@@ -419,6 +422,7 @@ urlpatterns = [
     path('ai-consultation/industry/<int:classification_id>/izakaya-plan/create/', IzakayaPlanCreateView.as_view(), name='izakaya_plan_create'),
     path('ai-consultation/industry/izakaya-plan/<str:pk>/update/', IzakayaPlanUpdateView.as_view(), name='izakaya_plan_update'),
     path('ai-consultation/industry/izakaya-plan/<str:pk>/preview/', IzakayaPlanPreviewView.as_view(), name='izakaya_plan_preview'),
+    path('ai-consultation/industry/izakaya-plan/<str:pk>/scenario/', IzakayaPlanScenarioView.as_view(), name='izakaya_plan_scenario'),
     path('ai-consultation/industry/izakaya-plan/<str:pk>/delete/', IzakayaPlanDeleteView.as_view(), name='izakaya_plan_delete'),
     path('ai-consultation/industry/izakaya-plan/<str:plan_id>/export/<str:format_type>/', IzakayaPlanExportView.as_view(), name='izakaya_plan_export'),
     path('ai-consultation/industry/izakaya-plan/list/', IzakayaPlanListView.as_view(), name='izakaya_plan_list'),
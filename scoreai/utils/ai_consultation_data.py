@@ -1,7 +1,14 @@
 """
 AI相談に必要なデータを収集するユーティリティ関数
+
+相談に使うCompanyのデータ（決算書・月次推移・借入・議事録・株主・会社情報）は
+get_consultation_context でまとめて1回だけ収集し、プロンプト用にシリアライズした文字列とともに
+Companyごとのキャッシュ（utils.company_cache）に保存する。
+これらのモデルの保存・削除でCompanyのキャッシュのバージョンが更新されるため、
+データが変わらない限り、追加の質問ではデータの収集とシリアライズを省略できる。
 """
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
+from string import Formatter
 import json
 import logging
 
@@ -36,6 +43,11 @@ def make_json_serializable_for_prompt(obj):
     except (TypeError, ValueError):
         return None
 
+
+def serialize_for_prompt(value: Any) -> str:
+    """プロンプトに埋め込むJSON文字列（ULIDなどのシリアライズできないオブジェクトは文字列に変換）"""
+    return json.dumps(make_json_serializable_for_prompt(value), default=str, ensure_ascii=False, indent=2)
+
 from ..models import (
     AIConsultationType,
     AIConsultationScript,
@@ -47,51 +59,237 @@ from ..models import (
     MeetingMinutes,
     Stakeholder_name,
 )
+from . import company_cache
+from .gemini import estimate_tokens
+from .prompt_budget import (
+    PromptSection,
+    fit_sections,
+    get_prompt_token_budget,
+    summarize_debts_by_bank,
+    summarize_meeting_minutes,
+    summarize_monthly_by_year,
+)
 
 logger = logging.getLogger(__name__)
 
+# 相談用データのキャッシュの有効期間（借入の残り月数など日付で変わる値があるため1時間）
+CONSULTATION_CONTEXT_TIMEOUT = 3600
 
-def get_fiscal_summary_data(company: Company, year: Optional[int] = None, is_budget: Optional[bool] = None) -> Dict[str, Any]:
-    """決算書データを取得
-    
-    Args:
-        company: 会社
-        year: 年度（指定がない場合は最新の実績データ）
-        is_budget: 予算か実績か（指定がない場合は実績データ）
+# プロンプトに埋め込むデータの種類（テンプレート変数名）
+PROMPT_SECTIONS = ['fiscal_summary', 'debt_info', 'monthly_data', 'meeting_minutes', 'stakeholder_name']
+
+# 相談タイプ名に含まれる語 → データの関連度の高い順（トークン予算を超えたら低い順に要約・省略する）
+SECTION_RELEVANCE = {
+    '財務': ['fiscal_summary', 'debt_info', 'monthly_data', 'meeting_minutes', 'stakeholder_name'],
+    '補助金': ['fiscal_summary', 'meeting_minutes', 'monthly_data', 'stakeholder_name', 'debt_info'],
+    '税務': ['fiscal_summary', 'stakeholder_name', 'monthly_data', 'meeting_minutes', 'debt_info'],
+    '法律': ['stakeholder_name', 'meeting_minutes', 'debt_info', 'fiscal_summary', 'monthly_data'],
+    '人事': ['stakeholder_name', 'meeting_minutes', 'fiscal_summary', 'monthly_data', 'debt_info'],
+    'DX': ['meeting_minutes', 'fiscal_summary', 'monthly_data', 'stakeholder_name', 'debt_info'],
+    '戦略': ['fiscal_summary', 'meeting_minutes', 'monthly_data', 'debt_info', 'stakeholder_name'],
+}
+
+# 要約版の決算書データに残す項目
+FISCAL_SUMMARY_KEY_ITEMS = ['year', 'is_budget', 'sales', 'operating_profit', 'ordinary_profit', 'net_profit', 'total_assets', 'total_net_assets']
+
+
+class ConsultationData(dict):
+    """
+    get_consultation_data の戻り値
+
+    fragments には、キャッシュ済みのシリアライズ結果（テンプレート変数名 → JSON文字列）を持つ。
+    build_consultation_prompt はこれがあるデータのシリアライズを省略し、
+    トークン予算に収めるために要約・省略したデータを prompt_budget に記録する。
     """
-    query = FiscalSummary_Year.objects.filter(
+
+    def __init__(self, *args, fragments: Optional[Dict[str, str]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fragments = fragments or {}
+        self.prompt_budget: Dict[str, Any] = {}
+
+
+def _load_fiscal_summaries(company: Company) -> List[Dict[str, Any]]:
+    """下書きを除く年次決算（年度の降順、同じ年度は予算が先）"""
+    fiscal_years = FiscalSummary_Year.objects.filter(
         company=company,
         is_draft=False
-    )
-    
-    if year is not None:
-        query = query.filter(year=year)
-    if is_budget is not None:
-        query = query.filter(is_budget=is_budget)
+    ).order_by('-year', '-is_budget')
+    return [
+        {
+            'id': str(fiscal.id),
+            'year': fiscal.year,
+            'is_budget': fiscal.is_budget,
+            'sales': fiscal.sales,
+            'gross_profit': fiscal.gross_profit,
+            'operating_profit': fiscal.operating_profit,
+            'ordinary_profit': fiscal.ordinary_profit,
+            'net_profit': fiscal.net_profit,
+            'total_assets': fiscal.total_assets,
+            'total_liabilities': fiscal.total_liabilities,
+            'total_net_assets': fiscal.total_net_assets,
+            'capital_stock': fiscal.capital_stock,
+            'retained_earnings': fiscal.retained_earnings,
+        }
+        for fiscal in fiscal_years
+    ]
+
+
+def _load_monthly_data(company: Company) -> List[Dict[str, Any]]:
+    """下書きを除く年次決算の月次推移（年度・月度の降順）"""
+    monthly_data = FiscalSummary_Month.objects.filter(
+        fiscal_summary_year__company=company,
+        fiscal_summary_year__is_draft=False
+    ).values(
+        'fiscal_summary_year_id', 'fiscal_summary_year__year', 'fiscal_summary_year__is_budget',
+        'is_budget', 'period', 'sales', 'gross_profit', 'operating_profit', 'ordinary_profit',
+    ).order_by('-fiscal_summary_year__year', '-period')
+    return [
+        {
+            'fiscal_summary_year_id': str(m['fiscal_summary_year_id']),
+            'fiscal_is_budget': m['fiscal_summary_year__is_budget'],
+            'year': m['fiscal_summary_year__year'],
+            'is_budget': m['is_budget'],
+            'period': m['period'],
+            'sales': m['sales'],
+            'gross_profit': m['gross_profit'],
+            'operating_profit': m['operating_profit'],
+            'ordinary_profit': m['ordinary_profit'],
+        }
+        for m in monthly_data
+    ]
+
+
+def _load_debt_data(company: Company) -> list:
+    """借入情報（remaining_months > 0 かつ is_nodisplay=False かつ is_rescheduled=False）"""
+    debts = Debt.objects.filter(
+        company=company,
+        is_nodisplay=False,
+        is_rescheduled=False
+    ).select_related('company', 'financial_institution', 'secured_type')
     
-    if year is None and is_budget is None:
-        # デフォルトは最新の実績データ
-        query = query.filter(is_budget=False)
+    # remaining_months > 0 の条件をPythonでフィルタリング（プロパティのため）
+    result = []
+    for debt in debts:
+        if debt.remaining_months > 0:
+            result.append({
+                'financial_institution': debt.financial_institution.name,
+                'principal': debt.principal,
+                'interest_rate': float(debt.interest_rate),
+                'monthly_repayment': debt.monthly_repayment,
+                'remaining_months': debt.remaining_months,
+                'is_securedby_management': debt.is_securedby_management,
+                'is_collateraled': debt.is_collateraled,
+            })
     
-    fiscal = query.order_by('-year', '-is_budget').first()
+    return result
+
+
+def _load_meeting_minutes_data(company: Company) -> list:
+    """議事録データ（直近10件）"""
+    meeting_minutes = MeetingMinutes.objects.filter(
+        company=company
+    ).order_by('-meeting_date', '-created_at')[:10]
     
-    if not fiscal:
-        return {}
+    return [
+        {
+            'meeting_date': str(mm.meeting_date),
+            'category': mm.get_category_display(),
+            'notes': mm.notes[:500] if len(mm.notes) > 500 else mm.notes,  # 最初の500文字のみ
+        }
+        for mm in meeting_minutes
+    ]
+
+
+def _load_stakeholder_data(company: Company) -> list:
+    """株主情報"""
+    stakeholders = Stakeholder_name.objects.filter(
+        company=company
+    ).order_by('name')
     
-    return {
-        'year': fiscal.year,
-        'is_budget': fiscal.is_budget,
-        'sales': fiscal.sales,
-        'gross_profit': fiscal.gross_profit,
-        'operating_profit': fiscal.operating_profit,
-        'ordinary_profit': fiscal.ordinary_profit,
-        'net_profit': fiscal.net_profit,
-        'total_assets': fiscal.total_assets,
-        'total_liabilities': fiscal.total_liabilities,
-        'total_net_assets': fiscal.total_net_assets,
-        'capital_stock': fiscal.capital_stock,
-        'retained_earnings': fiscal.retained_earnings,
+    return [
+        {
+            'name': sh.name,
+            'is_representative': sh.is_representative,
+            'is_board_member': sh.is_board_member,
+            'is_related_person': sh.is_related_person,
+            'is_employee': sh.is_employee,
+            'memo': sh.memo,
+        }
+        for sh in stakeholders
+    ]
+
+
+def _build_consultation_context(company: Company) -> Dict[str, Any]:
+    """相談用データを収集し、よく使う組み合わせのプロンプト用の文字列を作成"""
+    context = {
+        'company_info': get_company_info(company),
+        'fiscal_summaries': _load_fiscal_summaries(company),
+        'monthly_data': _load_monthly_data(company),
+        'debt_info': _load_debt_data(company),
+        'meeting_minutes': _load_meeting_minutes_data(company),
+        'stakeholder_name': _load_stakeholder_data(company),
     }
+    latest_fiscal_summary = _select_fiscal_summary(context['fiscal_summaries'])
+    context['fragments'] = {
+        # 年度を指定しない場合の決算書データ・月次データ
+        'fiscal_summary': serialize_for_prompt([latest_fiscal_summary]),
+        'monthly_data': serialize_for_prompt(_select_monthly_data(context['monthly_data'])),
+        'debt_info': serialize_for_prompt(context['debt_info']),
+        'meeting_minutes': serialize_for_prompt(context['meeting_minutes']),
+        'stakeholder_name': serialize_for_prompt(context['stakeholder_name']),
+    }
+    return context
+
+
+def get_consultation_context(company: Company) -> Dict[str, Any]:
+    """Companyの相談用データ（Companyのデータが変わるまでキャッシュを使う）"""
+    return company_cache.get_or_set(
+        company.id,
+        'consultation_context',
+        lambda: _build_consultation_context(company),
+        CONSULTATION_CONTEXT_TIMEOUT,
+    )
+
+
+def _select_fiscal_summary(
+    fiscal_summaries: List[Dict[str, Any]],
+    year: Optional[int] = None,
+    is_budget: Optional[bool] = None,
+) -> Dict[str, Any]:
+    if year is None and is_budget is None:
+        # デフォルトは最新の実績データ
+        is_budget = False
+    for fiscal in fiscal_summaries:
+        if (year is None or fiscal['year'] == year) and (is_budget is None or fiscal['is_budget'] == is_budget):
+            return {key: value for key, value in fiscal.items() if key != 'id'}
+    return {}
+
+
+def _select_monthly_data(
+    monthly_data: List[Dict[str, Any]],
+    year: Optional[int] = None,
+    is_budget: Optional[bool] = None,
+) -> list:
+    if year is None and is_budget is None:
+        # デフォルトは実績データ
+        is_budget = False
+    return [
+        {key: value for key, value in m.items() if key not in ('fiscal_summary_year_id', 'fiscal_is_budget')}
+        for m in monthly_data
+        if (year is None or m['year'] == year)
+        and (is_budget is None or (m['fiscal_is_budget'] == is_budget and m['is_budget'] == is_budget))
+    ]
+
+
+def get_fiscal_summary_data(company: Company, year: Optional[int] = None, is_budget: Optional[bool] = None) -> Dict[str, Any]:
+    """決算書データを取得
+    
+    Args:
+        company: 会社
+        year: 年度（指定がない場合は最新の実績データ）
+        is_budget: 予算か実績か（指定がない場合は実績データ）
+    """
+    return _select_fiscal_summary(get_consultation_context(company)['fiscal_summaries'], year, is_budget)
 
 
 def get_available_fiscal_summaries(company: Company) -> Dict[str, list]:
@@ -106,26 +304,21 @@ def get_available_fiscal_summaries(company: Company) -> Dict[str, list]:
     """
     from django.utils import timezone
     current_year = timezone.now().year
-    
-    # 直近3年の実績データ
-    actual_summaries = FiscalSummary_Year.objects.filter(
-        company=company,
-        is_draft=False,
-        is_budget=False,
-        year__gte=current_year - 2
-    ).order_by('-year').values('id', 'year')
-    
-    # 直近1年の予算データ
-    budget_summaries = FiscalSummary_Year.objects.filter(
-        company=company,
-        is_draft=False,
-        is_budget=True,
-        year__gte=current_year
-    ).order_by('-year').values('id', 'year')
+    fiscal_summaries = get_consultation_context(company)['fiscal_summaries']
     
     return {
-        'actual': list(actual_summaries),
-        'budget': list(budget_summaries),
+        # 直近3年の実績データ
+        'actual': [
+            {'id': fiscal['id'], 'year': fiscal['year']}
+            for fiscal in fiscal_summaries
+            if not fiscal['is_budget'] and fiscal['year'] >= current_year - 2
+        ],
+        # 直近1年の予算データ
+        'budget': [
+            {'id': fiscal['id'], 'year': fiscal['year']}
+            for fiscal in fiscal_summaries
+            if fiscal['is_budget'] and fiscal['year'] >= current_year
+        ],
     }
 
 
@@ -133,27 +326,7 @@ def get_debt_data(company: Company) -> list:
     """借入情報を取得
     条件: remaining_months > 0 かつ is_nodisplay=False かつ is_rescheduled=False
     """
-    debts = Debt.objects.filter(
-        company=company,
-        is_nodisplay=False,
-        is_rescheduled=False
-    ).select_related('financial_institution', 'secured_type')
-    
-    # remaining_months > 0 の条件をPythonでフィルタリング（プロパティのため）
-    result = []
-    for debt in debts:
-        if debt.remaining_months > 0:
-            result.append({
-                'financial_institution': debt.financial_institution.name,
-                'principal': debt.principal,
-                'interest_rate': float(debt.interest_rate),
-                'monthly_repayment': debt.monthly_repayment,
-                'remaining_months': debt.remaining_months,
-                'is_securedby_management': debt.is_securedby_management,
-                'is_collateraled': debt.is_collateraled,
-            })
-    
-    return result
+    return get_consultation_context(company)['debt_info']
 
 
 def get_monthly_data(company: Company, year: Optional[int] = None, is_budget: Optional[bool] = None) -> list:
@@ -164,36 +337,7 @@ def get_monthly_data(company: Company, year: Optional[int] = None, is_budget: Op
         year: 年度（指定がない場合は最新の実績データ）
         is_budget: 予算か実績か（指定がない場合は実績データ）
     """
-    query = FiscalSummary_Month.objects.filter(
-        fiscal_summary_year__company=company,
-        fiscal_summary_year__is_draft=False
-    ).select_related('fiscal_summary_year')
-    
-    if year is not None:
-        query = query.filter(fiscal_summary_year__year=year)
-    if is_budget is not None:
-        query = query.filter(fiscal_summary_year__is_budget=is_budget, is_budget=is_budget)
-    
-    if year is None and is_budget is None:
-        # デフォルトは最新の実績データ
-        query = query.filter(fiscal_summary_year__is_budget=False, is_budget=False)
-    
-    monthly_data = query.order_by(
-        '-fiscal_summary_year__year', '-period'
-    )
-    
-    return [
-        {
-            'year': m.fiscal_summary_year.year,
-            'is_budget': m.is_budget,
-            'period': m.period,
-            'sales': m.sales,
-            'gross_profit': m.gross_profit,
-            'operating_profit': m.operating_profit,
-            'ordinary_profit': m.ordinary_profit,
-        }
-        for m in monthly_data
-    ]
+    return _select_monthly_data(get_consultation_context(company)['monthly_data'], year, is_budget)
 
 
 def get_available_monthly_summaries(company: Company) -> Dict[str, list]:
@@ -207,84 +351,43 @@ def get_available_monthly_summaries(company: Company) -> Dict[str, list]:
         }
     """
     from django.utils import timezone
-    from django.db.models import Max
     current_year = timezone.now().year
     
-    # 直近3年の実績データ（年度ごとにグループ化）
-    actual_summaries = FiscalSummary_Month.objects.filter(
-        fiscal_summary_year__company=company,
-        fiscal_summary_year__is_draft=False,
-        fiscal_summary_year__is_budget=False,
-        is_budget=False,
-        fiscal_summary_year__year__gte=current_year - 2
-    ).values('fiscal_summary_year__year', 'fiscal_summary_year__id').annotate(
-        max_period=Max('period')
-    ).order_by('-fiscal_summary_year__year')
-    
-    # 直近1年の予算データ（年度ごとにグループ化）
-    budget_summaries = FiscalSummary_Month.objects.filter(
-        fiscal_summary_year__company=company,
-        fiscal_summary_year__is_draft=False,
-        fiscal_summary_year__is_budget=True,
-        is_budget=True,
-        fiscal_summary_year__year__gte=current_year
-    ).values('fiscal_summary_year__year', 'fiscal_summary_year__id').annotate(
-        max_period=Max('period')
-    ).order_by('-fiscal_summary_year__year')
+    summaries = {'actual': {}, 'budget': {}}
+    for m in get_consultation_context(company)['monthly_data']:
+        if m['fiscal_is_budget'] != m['is_budget']:
+            continue
+        if m['is_budget']:
+            # 直近1年の予算データ（年度ごとにグループ化）
+            if m['year'] < current_year:
+                continue
+            group = summaries['budget']
+        else:
+            # 直近3年の実績データ（年度ごとにグループ化）
+            if m['year'] < current_year - 2:
+                continue
+            group = summaries['actual']
+        item = group.setdefault(m['fiscal_summary_year_id'], {
+            'year': m['year'],
+            'fiscal_summary_year_id': m['fiscal_summary_year_id'],
+            'max_period': m['period'],
+        })
+        item['max_period'] = max(item['max_period'], m['period'])
     
     return {
-        'actual': [
-            {
-                'year': item['fiscal_summary_year__year'],
-                'fiscal_summary_year_id': item['fiscal_summary_year__id'],
-                'max_period': item['max_period']
-            }
-            for item in actual_summaries
-        ],
-        'budget': [
-            {
-                'year': item['fiscal_summary_year__year'],
-                'fiscal_summary_year_id': item['fiscal_summary_year__id'],
-                'max_period': item['max_period']
-            }
-            for item in budget_summaries
-        ],
+        key: sorted(group.values(), key=lambda item: item['year'], reverse=True)
+        for key, group in summaries.items()
     }
 
 
 def get_meeting_minutes_data(company: Company) -> list:
     """議事録データを取得（直近10件）"""
-    meeting_minutes = MeetingMinutes.objects.filter(
-        company=company
-    ).order_by('-meeting_date', '-created_at')[:10]
-    
-    return [
-        {
-            'meeting_date': str(mm.meeting_date),
-            'category': mm.get_category_display(),
-            'notes': mm.notes[:500] if len(mm.notes) > 500 else mm.notes,  # 最初の500文字のみ
-        }
-        for mm in meeting_minutes
-    ]
+    return get_consultation_context(company)['meeting_minutes']
 
 
 def get_stakeholder_data(company: Company) -> list:
     """株主情報を取得"""
-    stakeholders = Stakeholder_name.objects.filter(
-        company=company
-    ).order_by('name')
-    
-    return [
-        {
-            'name': sh.name,
-            'is_representative': sh.is_representative,
-            'is_board_member': sh.is_board_member,
-            'is_related_person': sh.is_related_person,
-            'is_employee': sh.is_employee,
-            'memo': sh.memo,
-        }
-        for sh in stakeholders
-    ]
+    return get_consultation_context(company)['stakeholder_name']
 
 
 def get_company_info(company: Company) -> Dict[str, Any]:
@@ -304,7 +407,7 @@ def get_consultation_data(
     selected_data_types: Optional[list] = None,
     selected_fiscal_years: Optional[list] = None,
     selected_monthly_years: Optional[list] = None
-) -> Dict[str, Any]:
+) -> ConsultationData:
     """相談タイプに応じたデータを収集
     
     Args:
@@ -314,9 +417,20 @@ def get_consultation_data(
         selected_fiscal_years: 選択された決算書データのリスト [{'year': 2025, 'is_budget': False}, ...]
         selected_monthly_years: 選択された月次データのリスト [{'year': 2025, 'is_budget': False}, ...]
     """
-    data = {
-        'company_info': get_company_info(company),
-    }
+    context = get_consultation_context(company)
+    data = ConsultationData({
+        'company_info': context['company_info'],
+    })
+    
+    def use_default(name: str) -> None:
+        """キャッシュ済みのデータとシリアライズ結果をそのまま使う"""
+        if name == 'fiscal_summary':
+            data[name] = _select_fiscal_summary(context['fiscal_summaries'])
+        elif name == 'monthly_data':
+            data[name] = _select_monthly_data(context['monthly_data'])
+        else:
+            data[name] = list(context[name])
+        data.fragments[name] = context['fragments'][name]
     
     # 選択されたデータタイプが指定されている場合のみ、それらを取得
     if selected_data_types is not None:
@@ -325,8 +439,8 @@ def get_consultation_data(
             if selected_fiscal_years:
                 fiscal_summaries = []
                 for item in selected_fiscal_years:
-                    fiscal_data = get_fiscal_summary_data(
-                        company, 
+                    fiscal_data = _select_fiscal_summary(
+                        context['fiscal_summaries'],
                         year=item.get('year'),
                         is_budget=item.get('is_budget')
                     )
@@ -336,18 +450,18 @@ def get_consultation_data(
                     data['fiscal_summary'] = fiscal_summaries if len(fiscal_summaries) > 1 else fiscal_summaries[0]
             else:
                 # デフォルトは最新の実績データ
-                data['fiscal_summary'] = get_fiscal_summary_data(company)
+                use_default('fiscal_summary')
         
         if 'debt_info' in selected_data_types:
-            data['debt_info'] = get_debt_data(company)
+            use_default('debt_info')
         
         if 'monthly_data' in selected_data_types:
             # 選択された年度の月次データを取得
             if selected_monthly_years:
                 monthly_data_list = []
                 for item in selected_monthly_years:
-                    monthly_data = get_monthly_data(
-                        company,
+                    monthly_data = _select_monthly_data(
+                        context['monthly_data'],
                         year=item.get('year'),
                         is_budget=item.get('is_budget')
                     )
@@ -357,49 +471,110 @@ def get_consultation_data(
                     data['monthly_data'] = monthly_data_list
             else:
                 # デフォルトは最新の実績データ
-                data['monthly_data'] = get_monthly_data(company)
+                use_default('monthly_data')
         
         if 'meeting_minutes' in selected_data_types:
-            data['meeting_minutes'] = get_meeting_minutes_data(company)
+            use_default('meeting_minutes')
         
         if 'stakeholder_name' in selected_data_types:
-            data['stakeholder_name'] = get_stakeholder_data(company)
+            use_default('stakeholder_name')
     else:
         # 後方互換性のため、相談タイプに応じたデータを取得
         consultation_type_name = consultation_type.name
         
         if '財務' in consultation_type_name:
-            data['fiscal_summary'] = get_fiscal_summary_data(company)
-            data['debt_info'] = get_debt_data(company)
-            data['monthly_data'] = get_monthly_data(company)
+            use_default('fiscal_summary')
+            use_default('debt_info')
+            use_default('monthly_data')
         # 補助金・助成金相談（後方互換性のため「補助金」もチェック）
         elif '補助金・助成金' in consultation_type_name or '補助金' in consultation_type_name:
-            data['fiscal_summary'] = get_fiscal_summary_data(company)
-            data['company_info'] = get_company_info(company)
+            use_default('fiscal_summary')
         elif '税務' in consultation_type_name:
-            data['fiscal_summary'] = get_fiscal_summary_data(company)
-            data['company_info'] = get_company_info(company)
-        elif '法律' in consultation_type_name:
-            data['company_info'] = get_company_info(company)
+            use_default('fiscal_summary')
     
     return data
 
 
+def rank_prompt_sections(consultation_type: AIConsultationType) -> List[str]:
+    """相談タイプに応じた、データの関連度の高い順"""
+    for keyword, sections in SECTION_RELEVANCE.items():
+        if keyword in consultation_type.name:
+            return sections
+    return PROMPT_SECTIONS
+
+
+def summarize_section(name: str, value: Any) -> Any:
+    """トークン予算を超えたときに使う要約版のデータ"""
+    if name == 'fiscal_summary':
+        values = value if isinstance(value, list) else [value]
+        return [{key: fiscal.get(key) for key in FISCAL_SUMMARY_KEY_ITEMS} for fiscal in values]
+    if name == 'debt_info':
+        return summarize_debts_by_bank(value)
+    if name == 'monthly_data':
+        return summarize_monthly_by_year(value)
+    if name == 'meeting_minutes':
+        return summarize_meeting_minutes(value)
+    if name == 'stakeholder_name':
+        return [{key: item for key, item in stakeholder.items() if key != 'memo'} for stakeholder in value]
+    return value
+
+
+def _fit_to_token_budget(
+    consultation_type: AIConsultationType,
+    template: str,
+    system_instruction: Optional[str],
+    template_vars: Dict[str, Any],
+    company_data: Dict[str, Any],
+    token_budget: int,
+) -> Dict[str, Any]:
+    """テンプレートで使うデータを、関連度の低い順に要約・省略してトークン予算に収める"""
+    used_names = {field_name for _, field_name, _, _ in Formatter().parse(template) if field_name}
+    names = [name for name in rank_prompt_sections(consultation_type) if name in used_names and name in template_vars]
+    if not names:
+        return {}
+
+    fixed_vars = {**template_vars, **{name: '' for name in names}}
+    fixed_tokens = estimate_tokens(template.format(**fixed_vars)) + estimate_tokens(system_instruction)
+    sections = [
+        PromptSection(
+            name,
+            template_vars[name],
+            summarize=lambda name=name: serialize_for_prompt(summarize_section(name, company_data[name])),
+            # 最も関連度の高いデータは要約しても省略しない
+            required=index == 0,
+        )
+        for index, name in enumerate(names)
+    ]
+    result = fit_sections(sections, token_budget, fixed_tokens=fixed_tokens)
+    template_vars.update(result.texts)
+    if result.summarized or result.dropped:
+        logger.info(
+            f"Consultation prompt fitted to {token_budget} tokens: "
+            f"summarized={result.summarized}, dropped={result.dropped}"
+        )
+    return result.as_dict()
+
+
 def build_consultation_prompt(
     consultation_type: AIConsultationType,
     user_message: str,
     company_data: Dict[str, Any],
     user_script: Optional[UserAIConsultationScript] = None,
-    faq_script: Optional[str] = None
+    faq_script: Optional[str] = None,
+    token_budget: Optional[int] = None
 ) -> Tuple[str, Optional[str]]:
     """相談タイプに応じたプロンプトを構築
     
+    プロンプトがトークン予算を超える場合は、関連度の低いデータから要約版に置き換え、
+    それでも収まらなければ省略する（内容は company_data.prompt_budget に記録）。
+    
     Args:
         consultation_type: 相談タイプ
         user_message: ユーザーのメッセージ
         company_data: 会社データ
         user_script: ユーザー用スクリプト（オプション）
         faq_script: FAQ用スクリプト（オプション、最優先）
+        token_budget: プロンプト全体のトークン数の上限（省略時は settings.AI_PROMPT_TOKEN_BUDGET）
     
     Returns:
         (prompt, system_instruction)のタプル
@@ -465,61 +640,36 @@ def build_consultation_prompt(
             'size': company_info.get('size', ''),
         }
         
-        # 決算書データがある場合（ULIDを文字列に変換してからJSON化）
-        if 'fiscal_summary' in company_data:
+        # 各データをJSON化（キャッシュ済みのシリアライズ結果があればそれを使う）
+        fragments = getattr(company_data, 'fragments', {})
+        for name in PROMPT_SECTIONS:
+            if name not in company_data:
+                continue
+            if name in fragments:
+                template_vars[name] = fragments[name]
+                continue
             try:
-                fiscal_summary = company_data['fiscal_summary']
-                # リストの場合はそのまま、単一の場合はリストに変換
-                if isinstance(fiscal_summary, list):
-                    fiscal_summary_serialized = make_json_serializable_for_prompt(fiscal_summary)
-                else:
-                    fiscal_summary_serialized = make_json_serializable_for_prompt([fiscal_summary])
-                # default=strを追加して、ULIDなどのシリアライズできないオブジェクトを確実に文字列に変換
-                template_vars['fiscal_summary'] = json.dumps(fiscal_summary_serialized, default=str, ensure_ascii=False, indent=2)
+                value = company_data[name]
+                # 決算書データは単一の場合もリストに変換
+                if name == 'fiscal_summary' and not isinstance(value, list):
+                    value = [value]
+                template_vars[name] = serialize_for_prompt(value)
             except Exception as e:
-                logger.warning(f"Failed to serialize fiscal_summary: {e}")
+                logger.warning(f"Failed to serialize {name}: {e}")
                 # エラーが発生した場合は空のJSON配列を設定
-                template_vars['fiscal_summary'] = "[]"
+                template_vars[name] = "[]"
         
-        # 借入情報がある場合（ULIDを文字列に変換してからJSON化）
-        if 'debt_info' in company_data:
-            try:
-                debt_info = make_json_serializable_for_prompt(company_data['debt_info'])
-                # default=strを追加して、ULIDなどのシリアライズできないオブジェクトを確実に文字列に変換
-                template_vars['debt_info'] = json.dumps(debt_info, default=str, ensure_ascii=False, indent=2)
-            except Exception as e:
-                logger.warning(f"Failed to serialize debt_info: {e}")
-                # エラーが発生した場合は空のJSON配列を設定
-                template_vars['debt_info'] = "[]"
-        
-        # 月次データがある場合（ULIDを文字列に変換してからJSON化）
-        if 'monthly_data' in company_data:
-            try:
-                monthly_data = make_json_serializable_for_prompt(company_data['monthly_data'])
-                # default=strを追加して、ULIDなどのシリアライズできないオブジェクトを確実に文字列に変換
-                template_vars['monthly_data'] = json.dumps(monthly_data, default=str, ensure_ascii=False, indent=2)
-            except Exception as e:
-                logger.warning(f"Failed to serialize monthly_data: {e}")
-                # エラーが発生した場合は空のJSON配列を設定
-                template_vars['monthly_data'] = "[]"
-        
-        # 議事録データがある場合（ULIDを文字列に変換してからJSON化）
-        if 'meeting_minutes' in company_data:
-            try:
-                meeting_minutes = make_json_serializable_for_prompt(company_data['meeting_minutes'])
-                template_vars['meeting_minutes'] = json.dumps(meeting_minutes, default=str, ensure_ascii=False, indent=2)
-            except Exception as e:
-                logger.warning(f"Failed to serialize meeting_minutes: {e}")
-                template_vars['meeting_minutes'] = "[]"
-        
-        # 株主情報がある場合（ULIDを文字列に変換してからJSON化）
-        if 'stakeholder_name' in company_data:
-            try:
-                stakeholder_name = make_json_serializable_for_prompt(company_data['stakeholder_name'])
-                template_vars['stakeholder_name'] = json.dumps(stakeholder_name, default=str, ensure_ascii=False, indent=2)
-            except Exception as e:
-                logger.warning(f"Failed to serialize stakeholder_name: {e}")
-                template_vars['stakeholder_name'] = "[]"
+        # トークン予算に収める
+        prompt_budget = _fit_to_token_budget(
+            consultation_type,
+            template,
+            system_instruction,
+            template_vars,
+            company_data,
+            token_budget if token_budget is not None else get_prompt_token_budget(),
+        )
+        if isinstance(company_data, ConsultationData):
+            company_data.prompt_budget = prompt_budget
         
         # テンプレートをフォーマット
         prompt = template.format(**template_vars)
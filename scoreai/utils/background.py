@@ -0,0 +1,64 @@
+"""
+リクエスト外でのバックグラウンド処理
+
+クラウドストレージへのアップロードやStripe Webhookイベントの適用など、
+ユーザーを待たせる必要のない処理をプロセス内のスレッドプールで実行する。
+
+処理対象はDBのキュー（UploadedDocument.upload_status、StripeEvent.status）に記録されているため、
+プロセスの再起動などで実行されなかった処理は管理コマンド
+（process_storage_uploads、process_stripe_events）で再実行できる。
+BACKGROUND_TASK_WORKERS = 0 の場合はプロセス内では実行せず、管理コマンドに任せる。
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> Optional[ThreadPoolExecutor]:
+    """スレッドプールを取得（初回呼び出し時に作成）"""
+    global _executor
+    max_workers = getattr(settings, 'BACKGROUND_TASK_WORKERS', 2)
+    if max_workers <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scoreai-background')
+    return _executor
+
+
+def _run(func: Callable, args, kwargs) -> None:
+    """DB接続を管理しながら処理を実行（例外はログに記録する）"""
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception as e:
+        logger.error(f"Background task {getattr(func, '__name__', func)} failed: {e}", exc_info=True)
+    finally:
+        close_old_connections()
+
+
+def run_in_background(func: Callable, *args, **kwargs) -> bool:
+    """
+    トランザクションのコミット後に処理をバックグラウンドで実行
+
+    Args:
+        func: 実行する関数
+        *args, **kwargs: 関数の引数
+
+    Returns:
+        プロセス内で実行を予約した場合True（BACKGROUND_TASK_WORKERS = 0 の場合はFalse）
+    """
+    executor = _get_executor()
+    if executor is None:
+        return False
+    transaction.on_commit(lambda: executor.submit(_run, func, args, kwargs))
+    return True
@@ -0,0 +1,347 @@
+"""
+主要な処理のベンチマーク
+
+負荷検証用のデータ（管理コマンド generate_load_data）に対して、重い処理の実行時間とSQL件数を計測する。
+結果はJSONで保存し、同じマシンでの過去の結果と比較できる（管理コマンド run_benchmarks）。
+
+ベンチマークは @register で登録する。setup の戻り値が本体の引数になり、setup の時間は計測しない。
+書き込みを伴う処理もあるため、各回の実行はトランザクション内で行い最後にロールバックする。
+"""
+import csv
+import io
+import platform
+import statistics
+import subprocess
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import django
+from django.conf import settings
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.base import SessionBase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Company, Debt, FiscalSummary_Month, FiscalSummary_Year, UserCompany
+from .company_cache import invalidate_company
+
+RESULT_FORMAT_VERSION = 1
+
+
+@dataclass
+class BenchmarkContext:
+    """ベンチマークの対象（Companyと、そのCompanyを選択中のユーザー）"""
+    company: Company
+    user: Any
+
+
+@dataclass
+class Benchmark:
+    name: str
+    description: str
+    func: Callable[[BenchmarkContext, Any], Any]
+    setup: Optional[Callable[[BenchmarkContext], Any]] = None
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def register(name: str, description: str, setup: Optional[Callable[[BenchmarkContext], Any]] = None):
+    """ベンチマークを登録するデコレーター"""
+    def decorator(func):
+        BENCHMARKS[name] = Benchmark(name=name, description=description, func=func, setup=setup)
+        return func
+    return decorator
+
+
+def get_benchmark_context(company: Company) -> BenchmarkContext:
+    """Companyを選択中のユーザーを探してコンテキストを作成"""
+    user_company = UserCompany.objects.filter(
+        company=company,
+        is_selected=True,
+        active=True
+    ).select_related('user').first()
+    if not user_company:
+        raise ValueError(f'{company.name} を選択中のユーザーがいません。')
+    return BenchmarkContext(company=company, user=user_company.user)
+
+
+def _request(method: str, path: str, user, data=None):
+    factory = RequestFactory()
+    request = factory.post(path, data=data) if method == 'POST' else factory.get(path, data=data)
+    request.user = user
+    request.session = SessionBase()
+    request._messages = FallbackStorage(request)
+    return request
+
+
+def _latest_actual_year(company: Company, offset: int = 0) -> Optional[FiscalSummary_Year]:
+    years = FiscalSummary_Year.objects.filter(company=company, is_budget=False).order_by('-year')
+    return years[offset] if years.count() > offset else None
+
+
+def build_monthly_pl_csv(fiscal_year: FiscalSummary_Year) -> bytes:
+    """月次推移損益計算書のCSV（マネーフォワードの月次推移表と同じ列構成、金額は円）"""
+    months = {
+        month.period: month
+        for month in FiscalSummary_Month.objects.filter(fiscal_summary_year=fiscal_year, is_budget=fiscal_year.is_budget)
+    }
+    fiscal_month = fiscal_year.company.fiscal_month
+    labels = [f'{((fiscal_month + i) % 12) or 12}月' for i in range(1, 13)]
+    header = ['勘定科目', '補助科目', *labels, '決算整理', '合計']
+
+    def row(label, getter):
+        values = [int(getter(months[period]) * 1000) if period in months else 0 for period in range(1, 14)]
+        return [label, '', *values, sum(values)]
+
+    rows = [
+        header,
+        row('売上高合計', lambda m: m.sales),
+        row('売上原価合計', lambda m: m.sales - m.gross_profit),
+        row('売上総利益', lambda m: m.gross_profit),
+        row('販売費及び一般管理費合計', lambda m: m.gross_profit - m.operating_profit),
+        row('営業利益', lambda m: m.operating_profit),
+        row('経常利益', lambda m: m.ordinary_profit),
+        row('当期純利益', lambda m: m.ordinary_profit),
+    ]
+    output = io.StringIO()
+    csv.writer(output).writerows(rows)
+    return output.getvalue().encode('cp932')
+
+
+def build_balance_sheet_csv(fiscal_year: FiscalSummary_Year) -> bytes:
+    """貸借対照表のCSV（金額は円）"""
+    items = [
+        ('現金及び預金合計', fiscal_year.cash_and_deposits),
+        ('流動資産合計', fiscal_year.total_current_assets),
+        ('固定資産合計', fiscal_year.total_fixed_assets),
+        ('資産の部合計', fiscal_year.total_assets),
+        ('流動負債合計', fiscal_year.total_current_liabilities),
+        ('固定負債合計', fiscal_year.total_long_term_liabilities),
+        ('負債の部合計', fiscal_year.total_liabilities),
+        ('純資産の部合計', fiscal_year.total_net_assets),
+    ]
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['勘定科目', '補助科目', '金額'])
+    for label, value in items:
+        writer.writerow([label, '', value * 1000])
+    return output.getvalue().encode('cp932')
+
+
+# ----------------------------------------------------------------------
+# ベンチマーク
+# ----------------------------------------------------------------------
+
+def _setup_debts(ctx: BenchmarkContext) -> List[Debt]:
+    debts = list(Debt.objects.filter(company=ctx.company).select_related('company'))
+    # 月次残高のキャッシュを無効化して毎回計算させる
+    invalidate_company(ctx.company.id)
+    return debts
+
+
+@register('debt_schedule', '借入の返済スケジュール（月次残高・利息・決算期残高）', setup=_setup_debts)
+def bench_debt_schedule(ctx, debts):
+    for debt in debts:
+        debt.balances_monthly
+        debt.interest_amount_monthly
+        debt.balances_fiscalyears
+
+
+def _setup_fiscal_years(ctx: BenchmarkContext) -> List[FiscalSummary_Year]:
+    return list(FiscalSummary_Year.objects.filter(company=ctx.company, is_budget=False).select_related('company'))
+
+
+@register('benchmark_scoring', '業界指標との比較による財務スコア（全年度 × 6指標）', setup=_setup_fiscal_years)
+def bench_benchmark_scoring(ctx, fiscal_years):
+    from ..services.load_data_service import BENCHMARK_INDICATORS
+    from ..views.utils import get_finance_score
+
+    company = ctx.company
+    for fiscal_year in fiscal_years:
+        for indicator in BENCHMARK_INDICATORS:
+            value = getattr(fiscal_year, indicator)
+            if value is None:
+                continue
+            get_finance_score(
+                fiscal_year.year,
+                company.industry_classification,
+                company.industry_subclassification,
+                company.company_size,
+                indicator,
+                value,
+            )
+
+
+@register('dashboard_context', 'ダッシュボード（IndexView）のコンテキスト作成')
+def bench_dashboard_context(ctx, _):
+    from ..views.index_views import IndexView
+
+    view = IndexView()
+    view.setup(_request('GET', '/', ctx.user))
+    view.get_context_data()
+
+
+def _setup_csv_import(ctx: BenchmarkContext):
+    fiscal_year = _latest_actual_year(ctx.company)
+    return fiscal_year, build_monthly_pl_csv(fiscal_year)
+
+
+@register('csv_import', '月次推移表CSV（マネーフォワード形式）のインポート', setup=_setup_csv_import)
+def bench_csv_import(ctx, args):
+    from ..views.fiscal_month_views import ImportFiscalSummary_Month_FromMoneyforward
+
+    fiscal_year, content = args
+    request = _request('POST', '/import_fiscal_summary_month_MF/', ctx.user, data={
+        'fiscal_year': fiscal_year.pk,
+        'override_flag': 'on',
+        'file': SimpleUploadedFile('monthly.csv', content, content_type='text/csv'),
+    })
+    response = ImportFiscalSummary_Month_FromMoneyforward.as_view()(request)
+    if response.status_code != 302:
+        raise RuntimeError(f'CSV import failed (status {response.status_code})')
+
+
+@register('excel_export', '借入一覧のExcelエクスポート')
+def bench_excel_export(ctx, _):
+    from ..views.export_views import export_debts
+
+    response = export_debts(_request('GET', '/debts_all/export/excel/', ctx.user), format_type='excel')
+    if response.status_code != 200:
+        raise RuntimeError(f'Excel export failed (status {response.status_code})')
+
+
+def _setup_report(ctx: BenchmarkContext):
+    current, previous = _latest_actual_year(ctx.company), _latest_actual_year(ctx.company, offset=1)
+    return {
+        'year': current.year,
+        'pl_suii_file': build_monthly_pl_csv(current),
+        'pl_suii_zenki_file': build_monthly_pl_csv(previous) if previous else None,
+        'bs_file': build_balance_sheet_csv(current),
+    }
+
+
+@register('report_generation', '財務会議資料（Excel）の生成', setup=_setup_report)
+def bench_report_generation(ctx, files):
+    from ..services.financial_report_generator import FinancialReportGenerator, ReportConfig
+
+    generator = FinancialReportGenerator(ReportConfig(
+        company_name=ctx.company.name,
+        target_month=ctx.company.fiscal_month,
+        target_year=files['year'],
+    ))
+    generator.load_data(
+        pl_suii_file=files['pl_suii_file'],
+        pl_suii_zenki_file=files['pl_suii_zenki_file'],
+        bs_file=files['bs_file'],
+    )
+    generator.generate()
+
+
+# ----------------------------------------------------------------------
+# 実行と結果
+# ----------------------------------------------------------------------
+
+def _run_once(benchmark: Benchmark, ctx: BenchmarkContext, capture_queries: bool = False):
+    """1回実行して (経過秒, SQL件数) を返す（変更はロールバックする）"""
+    with transaction.atomic():
+        arg = benchmark.setup(ctx) if benchmark.setup else None
+        if capture_queries:
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                benchmark.func(ctx, arg)
+                elapsed = time.perf_counter() - started
+            query_count = len(queries)
+        else:
+            started = time.perf_counter()
+            benchmark.func(ctx, arg)
+            elapsed = time.perf_counter() - started
+            query_count = None
+        transaction.set_rollback(True)
+    return elapsed, query_count
+
+
+def run_benchmark(benchmark: Benchmark, ctx: BenchmarkContext, repeat: int = 5) -> Dict[str, Any]:
+    """ウォームアップ（SQL件数の計測を兼ねる）の後に repeat 回実行して統計を返す"""
+    result = {'name': benchmark.name, 'description': benchmark.description}
+    try:
+        _, query_count = _run_once(benchmark, ctx, capture_queries=True)
+        timings = [_run_once(benchmark, ctx)[0] * 1000 for _ in range(repeat)]
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+        return result
+
+    ordered = sorted(timings)
+    result.update({
+        'runs': len(timings),
+        'queries': query_count,
+        'min_ms': round(ordered[0], 2),
+        'median_ms': round(statistics.median(ordered), 2),
+        'mean_ms': round(statistics.fmean(ordered), 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))], 2),
+        'max_ms': round(ordered[-1], 2),
+        'stdev_ms': round(statistics.stdev(ordered), 2) if len(ordered) > 1 else 0.0,
+    })
+    return result
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            timeout=5,
+            check=True,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmarks(ctx: BenchmarkContext, names: Optional[List[str]] = None, repeat: int = 5) -> Dict[str, Any]:
+    """ベンチマークを実行して、環境情報と結果をまとめたJSON互換の辞書を返す"""
+    names = names or list(BENCHMARKS)
+    results = [run_benchmark(BENCHMARKS[name], ctx, repeat=repeat) for name in names]
+    return {
+        'format_version': RESULT_FORMAT_VERSION,
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': _git_revision(),
+            'hostname': platform.node(),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'company_id': ctx.company.pk,
+            'company_code': ctx.company.code,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """同じ名前のベンチマークの中央値とSQL件数を比較（change_pct は正なら遅くなった）"""
+    baseline_by_name = {result['name']: result for result in baseline.get('results', [])}
+    rows = []
+    for result in current.get('results', []):
+        previous = baseline_by_name.get(result['name'])
+        if not previous or 'median_ms' not in result or 'median_ms' not in previous:
+            continue
+        change = None
+        if previous['median_ms']:
+            change = round((result['median_ms'] - previous['median_ms']) / previous['median_ms'] * 100, 1)
+        rows.append({
+            'name': result['name'],
+            'baseline_median_ms': previous['median_ms'],
+            'median_ms': result['median_ms'],
+            'change_pct': change,
+            'baseline_queries': previous.get('queries'),
+            'queries': result.get('queries'),
+        })
+    return rows
@@ -6,6 +6,7 @@ import logging
 from typing import Dict, Any, Optional, Tuple
 from decimal import Decimal
 from datetime import datetime
+from string import Formatter
 
 from django.utils import timezone
 from ..models import (
@@ -16,8 +17,9 @@ from ..models import (
     AIConsultationScript,
     UserAIConsultationScript,
 )
-from .gemini import get_gemini_response
+from .gemini import estimate_tokens, get_gemini_response
 from .ai_consultation_data import get_company_info, make_json_serializable_for_prompt
+from .prompt_budget import PromptSection, fit_sections, get_prompt_token_budget, summarize_debts_by_bank
 
 logger = logging.getLogger(__name__)
 
@@ -205,11 +207,14 @@ def build_budget_prompt(
     borrowing_amount: int,
     capital_increase: int,
     previous_actual: FiscalSummary_Year,
-    user_script: Optional[UserAIConsultationScript] = None
+    user_script: Optional[UserAIConsultationScript] = None,
+    token_budget: Optional[int] = None
 ) -> Tuple[str, Optional[str]]:
     """
     予算策定用のプロンプトを構築
     
+    トークン予算を超える場合は、借入金情報の借入一覧を金融機関ごとの集計に置き換える。
+    
     Args:
         company: 会社オブジェクト
         target_year: 予算対象年度
@@ -219,6 +224,7 @@ def build_budget_prompt(
         capital_increase: 資本金増加予定額（千円）
         previous_actual: 前期実績
         user_script: ユーザー用スクリプト（オプション）
+        token_budget: プロンプト全体のトークン数の上限（省略時は settings.AI_PROMPT_TOKEN_BUDGET）
         
     Returns:
         (prompt, system_instruction)のタプル
@@ -387,6 +393,30 @@ JSONのみを返してください。説明文は不要です。"""
         'debt_info': json.dumps(budget_data['debt_info'], default=str, ensure_ascii=False, indent=2),
     }
     
+    # トークン予算を超える場合は、借入の一覧を金融機関ごとの集計に置き換える
+    used_names = {field_name for _, field_name, _, _ in Formatter().parse(template) if field_name}
+    if 'debt_info' in used_names:
+        debt_info = budget_data['debt_info']
+        fixed_tokens = estimate_tokens(template.format(**{**template_vars, 'debt_info': ''})) + estimate_tokens(system_instruction)
+        result = fit_sections(
+            [
+                PromptSection(
+                    'debt_info',
+                    template_vars['debt_info'],
+                    summarize=lambda: json.dumps(
+                        {**debt_info, 'debt_list': summarize_debts_by_bank(debt_info['debt_list'])},
+                        default=str, ensure_ascii=False, indent=2,
+                    ),
+                    required=True,
+                ),
+            ],
+            token_budget if token_budget is not None else get_prompt_token_budget(),
+            fixed_tokens=fixed_tokens,
+        )
+        template_vars.update(result.texts)
+        if result.summarized:
+            logger.info(f"Budget prompt fitted to token budget: summarized={result.summarized}")
+    
     # テンプレートを展開
     prompt = template.format(**template_vars)
     
@@ -0,0 +1,221 @@
+"""
+Companyごとのキャッシュ
+
+計算結果をCompanyごとのバージョン付きキーで共有キャッシュ（settings.CACHES['default']）に保存し、
+各ワーカープロセスではさらにメモリ上のLRUにも保持する。
+
+- キーにCompanyのバージョンを含めるため、invalidate_company でバージョンを更新すると
+  すべてのワーカーのそのCompanyのキャッシュ（LRUを含む）がまとめて無効になる
+- バージョンは共有キャッシュに保存し、ワーカーでは COMPANY_CACHE_VERSION_TIMEOUT 秒だけ保持する
+  （他のワーカーでの無効化は最大でこの秒数遅れて反映される）
+- 値は LRU → 共有キャッシュの順に探す
+- 同じキーの計算が同時に走らないよう、共有キャッシュの add でロックを取得する。
+  ロックを取得できなかったワーカーは、計算結果が保存されるまで短時間待つ
+
+共有キャッシュは REDIS_URL がある場合はRedis、ない場合（Dockerイメージ単体など）はファイルキャッシュ。
+開発環境（DEBUG）のLocMemCacheでもそのまま動作する。
+
+使い方:
+    balances = get_or_set(debt.company_id, f'debt_balances_monthly:{debt.id}', debt.compute_balances, 3600)
+
+    # Companyのデータを変更した場合
+    invalidate_company(company_id)
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Hashable, Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# 値が None の場合も「キャッシュあり」と区別するための印
+_MISSING = object()
+
+# ロックの有効期間（計算が失敗・中断した場合に他のワーカーが待ち続けないようにする）
+LOCK_TIMEOUT = 30
+# ロックを取得できなかった場合に、他のワーカーの計算結果を待つ時間
+LOCK_WAIT = 5.0
+LOCK_POLL_INTERVAL = 0.05
+
+
+class LocalLRUCache:
+    """ワーカープロセス内のLRUキャッシュ（有効期限付き、スレッドセーフ）"""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, timeout: float) -> None:
+        if self.max_entries <= 0 or timeout <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+local_cache = LocalLRUCache(getattr(settings, 'COMPANY_CACHE_LOCAL_MAX_ENTRIES', 1000))
+# 1リクエストで多数のキーを参照する場合に共有キャッシュへの問い合わせを減らすため、バージョンも短時間保持する
+_local_versions = LocalLRUCache(getattr(settings, 'COMPANY_CACHE_LOCAL_MAX_ENTRIES', 1000))
+
+
+@contextmanager
+def _file_cache_lock() -> Iterator[None]:
+    """ファイルキャッシュの add を原子的にするためのプロセス間ロック（他のバックエンドでは何もしない）"""
+    backend = caches['default']
+    if not isinstance(backend, FileBasedCache):
+        yield
+        return
+    import fcntl
+    os.makedirs(backend._dir, exist_ok=True)
+    with open(os.path.join(backend._dir, '.company_cache.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _add(key: str, value: Any, timeout: Optional[int]) -> bool:
+    """キーがない場合のみ保存（FileBasedCache.add は存在確認と保存の間に競合するためロックする）"""
+    with _file_cache_lock():
+        return cache.add(key, value, timeout)
+
+
+def _version_key(company_id: str) -> str:
+    return f'company_cache_version:{company_id}'
+
+
+def get_company_version(company_id: str) -> int:
+    """Companyのキャッシュのバージョン（ない場合は現在時刻から作成）"""
+    key = _version_key(company_id)
+    version = _local_versions.get(key)
+    if version is not None:
+        return version
+    version = cache.get(key)
+    if version is None:
+        # 期限切れ・削除後に以前のバージョンと重ならないよう、時刻をバージョンにする
+        _add(key, time.time_ns(), None)
+        version = cache.get(key)
+    _local_versions.set(key, version, getattr(settings, 'COMPANY_CACHE_VERSION_TIMEOUT', 2))
+    return version
+
+
+def invalidate_company(company_id: str) -> None:
+    """
+    Companyのキャッシュをまとめて無効化
+
+    古いバージョンのエントリは参照されなくなり、有効期限で削除される。
+    同じトランザクション内の読み込みに反映するためすぐに更新し、
+    コミット前に他のワーカーが古いデータで作り直したキャッシュを捨てるためコミット後にも更新する。
+    """
+    if not company_id:
+        return
+
+    def _bump():
+        cache.set(_version_key(company_id), time.time_ns(), None)
+        _local_versions.delete(_version_key(company_id))
+
+    _bump()
+    transaction.on_commit(_bump)
+
+
+def company_cache_key(company_id: str, name: str, version: Optional[int] = None) -> str:
+    """バージョン付きのキャッシュキー"""
+    if version is None:
+        version = get_company_version(company_id)
+    return f'company:{company_id}:v{version}:{name}'
+
+
+def get_or_set(company_id: str, name: str, compute: Callable[[], Any], timeout: int = 3600) -> Any:
+    """
+    キャッシュした値を返す。ない場合は compute() の結果を保存して返す
+
+    同じキーを複数のワーカーが同時に計算しないよう、最初のワーカーだけが計算し、
+    他のワーカーは結果が保存されるまで待つ（LOCK_WAIT 秒を過ぎた場合は自分で計算する）。
+    """
+    key = company_cache_key(company_id, name)
+    value = _get(key)
+    if value is not _MISSING:
+        return value
+
+    lock_key = f'{key}:lock'
+    if not _add(lock_key, 1, LOCK_TIMEOUT):
+        value = _wait_for(key)
+        if value is not _MISSING:
+            return value
+        logger.warning(f"Company cache lock wait timed out: {key}")
+        value = compute()
+        _set(key, value, timeout)
+        return value
+
+    try:
+        value = compute()
+        _set(key, value, timeout)
+        return value
+    finally:
+        cache.delete(lock_key)
+
+
+def _get(key: str) -> Any:
+    value = local_cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        local_cache.set(key, value, _local_timeout())
+    return value
+
+
+def _set(key: str, value: Any, timeout: int) -> None:
+    cache.set(key, value, timeout)
+    local_cache.set(key, value, min(timeout, _local_timeout()))
+
+
+def _local_timeout() -> int:
+    return getattr(settings, 'COMPANY_CACHE_LOCAL_TIMEOUT', 300)
+
+
+def _wait_for(key: str) -> Any:
+    """他のワーカーが計算した値が保存されるまで待つ"""
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            local_cache.set(key, value, _local_timeout())
+            return value
+    return _MISSING
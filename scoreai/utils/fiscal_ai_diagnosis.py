@@ -12,6 +12,8 @@ from ..models import (
     IndustryIndicator,
     Company,
 )
+from .gemini import estimate_tokens
+from .prompt_budget import PromptSection, fit_sections, get_prompt_token_budget
 
 logger = logging.getLogger(__name__)
 
@@ -142,16 +144,117 @@ def collect_fiscal_data_for_diagnosis(
     }
 
 
+def _format_fiscal_year(data: Dict[str, Any]) -> str:
+    """1期分の財務データ（プロンプト用）"""
+    prompt_parts = [f"\n### {data['year']}年度"]
+    
+    # 損益計算書情報
+    prompt_parts.append("\n#### 損益計算書")
+    prompt_parts.append(f"- 売上高: {data['sales']:,}千円")
+    prompt_parts.append(f"- 売上総利益: {data['gross_profit']:,}千円")
+    prompt_parts.append(f"- 営業利益: {data['operating_profit']:,}千円")
+    prompt_parts.append(f"- 経常利益: {data['ordinary_profit']:,}千円")
+    prompt_parts.append(f"- 当期純利益: {data['net_profit']:,}千円")
+    
+    # 貸借対照表情報
+    prompt_parts.append("\n#### 貸借対照表")
+    prompt_parts.append("【資産の部】")
+    prompt_parts.append(f"- 現金及び預金: {data['cash_and_deposits']:,}千円")
+    prompt_parts.append(f"- 売掛金: {data['accounts_receivable']:,}千円")
+    prompt_parts.append(f"- 棚卸資産: {data['inventory']:,}千円")
+    prompt_parts.append(f"- 流動資産合計: {data['total_current_assets']:,}千円")
+    prompt_parts.append(f"- 有形固定資産合計: {data['total_tangible_fixed_assets']:,}千円")
+    prompt_parts.append(f"- 無形固定資産合計: {data['total_intangible_assets']:,}千円")
+    prompt_parts.append(f"- 固定資産合計: {data['total_fixed_assets']:,}千円")
+    prompt_parts.append(f"- 資産合計: {data['total_assets']:,}千円")
+    prompt_parts.append("【負債の部】")
+    prompt_parts.append(f"- 買掛金: {data['accounts_payable']:,}千円")
+    prompt_parts.append(f"- 短期借入金: {data['short_term_borrowings']:,}千円")
+    prompt_parts.append(f"- 流動負債合計: {data['total_current_liabilities']:,}千円")
+    prompt_parts.append(f"- 長期借入金: {data['long_term_borrowings']:,}千円")
+    prompt_parts.append(f"- 固定負債合計: {data['total_long_term_liabilities']:,}千円")
+    prompt_parts.append(f"- 負債合計: {data['total_liabilities']:,}千円")
+    prompt_parts.append("【純資産の部】")
+    prompt_parts.append(f"- 資本金: {data['capital_stock']:,}千円")
+    prompt_parts.append(f"- 資本剰余金: {data['capital_surplus']:,}千円")
+    prompt_parts.append(f"- 利益剰余金: {data['retained_earnings']:,}千円")
+    prompt_parts.append(f"- 純資産合計: {data['total_net_assets']:,}千円")
+    
+    # 税務申告情報
+    prompt_parts.append("\n#### 税務申告情報")
+    prompt_parts.append(f"- 法人税等: {data['income_taxes']:,}千円" if data.get('income_taxes') else "- 法人税等: データなし")
+    
+    # 決算留意事項
+    if data.get('financial_statement_notes'):
+        prompt_parts.append("\n#### 決算留意事項")
+        prompt_parts.append(data['financial_statement_notes'])
+    
+    # 主要指標
+    prompt_parts.append("\n#### 主要指標")
+    prompt_parts.append(f"- 売上高成長率: {data['sales_growth_rate']:.2f}%" if data['sales_growth_rate'] else "- 売上高成長率: データなし")
+    prompt_parts.append(f"- 営業利益率: {data['operating_profit_margin']:.2f}%" if data['operating_profit_margin'] else "- 営業利益率: データなし")
+    prompt_parts.append(f"- 労働生産性: {data['labor_productivity']:.2f}千円/人" if data['labor_productivity'] else "- 労働生産性: データなし")
+    prompt_parts.append(f"- 自己資本比率: {data['equity_ratio']:.2f}%" if data['equity_ratio'] else "- 自己資本比率: データなし")
+    prompt_parts.append(f"- 運転資本回転期間: {data['operating_working_capital_turnover_period']:.2f}日" if data['operating_working_capital_turnover_period'] else "- 運転資本回転期間: データなし")
+    prompt_parts.append(f"- EBITDA有利子負債倍率: {data['EBITDA_interest_bearing_debt_ratio']:.2f}" if data['EBITDA_interest_bearing_debt_ratio'] else "- EBITDA有利子負債倍率: データなし")
+    
+    # スコア
+    prompt_parts.append("\n#### スコア（業界内での位置）")
+    prompt_parts.append(f"- 売上高成長率スコア: {data['score_sales_growth_rate']}/5" if data['score_sales_growth_rate'] else "- 売上高成長率スコア: データなし")
+    prompt_parts.append(f"- 営業利益率スコア: {data['score_operating_profit_margin']}/5" if data['score_operating_profit_margin'] else "- 営業利益率スコア: データなし")
+    prompt_parts.append(f"- 労働生産性スコア: {data['score_labor_productivity']}/5" if data['score_labor_productivity'] else "- 労働生産性スコア: データなし")
+    prompt_parts.append(f"- 自己資本比率スコア: {data['score_equity_ratio']}/5" if data['score_equity_ratio'] else "- 自己資本比率スコア: データなし")
+    
+    return "\n".join(prompt_parts)
+
+
+def _format_fiscal_year_summary(data: Dict[str, Any]) -> str:
+    """1期分の財務データの要約版（損益と主要指標のみ。トークン予算を超えたときに使う）"""
+    prompt_parts = [f"\n### {data['year']}年度（要約）"]
+    prompt_parts.append(
+        f"- 売上高: {data['sales']:,}千円 / 営業利益: {data['operating_profit']:,}千円 / "
+        f"経常利益: {data['ordinary_profit']:,}千円 / 当期純利益: {data['net_profit']:,}千円"
+    )
+    prompt_parts.append(
+        f"- 資産合計: {data['total_assets']:,}千円 / 負債合計: {data['total_liabilities']:,}千円 / "
+        f"純資産合計: {data['total_net_assets']:,}千円"
+    )
+    if data['equity_ratio']:
+        prompt_parts.append(f"- 自己資本比率: {data['equity_ratio']:.2f}%")
+    if data.get('financial_statement_notes'):
+        prompt_parts.append(f"- 決算留意事項: {data['financial_statement_notes'][:200]}")
+    return "\n".join(prompt_parts)
+
+
+def _format_benchmarks(benchmark_data: Dict[str, Any]) -> str:
+    """ローカルベンチマークデータ（プロンプト用）"""
+    prompt_parts = ["\n## ローカルベンチマークデータ"]
+    for indicator_name, benchmark in benchmark_data.items():
+        prompt_parts.append(f"\n### {indicator_name}")
+        prompt_parts.append(f"- 中央値: {benchmark['median']:.2f}")
+        prompt_parts.append(f"- 標準偏差: {benchmark['standard_deviation']:.2f}")
+        prompt_parts.append(f"- 範囲I（最上位）: {benchmark['range_i']:.2f}")
+        prompt_parts.append(f"- 範囲II: {benchmark['range_ii']:.2f}")
+        prompt_parts.append(f"- 範囲III: {benchmark['range_iii']:.2f}")
+        prompt_parts.append(f"- 範囲IV（最下位）: {benchmark['range_iv']:.2f}")
+    return "\n".join(prompt_parts)
+
+
 def build_ai_diagnosis_prompt(
     fiscal_data: Dict[str, Any],
-    missing_info: Optional[List[str]] = None
+    missing_info: Optional[List[str]] = None,
+    token_budget: Optional[int] = None
 ) -> str:
     """
     AI診断用のプロンプトを構築
     
+    トークン予算を超える場合は、前々期・前期の財務データを要約版に置き換え、
+    それでも収まらなければ省略する。
+    
     Args:
         fiscal_data: 収集した財務データ
         missing_info: 不足している情報のリスト
+        token_budget: プロンプトのトークン数の上限（省略時は settings.AI_PROMPT_TOKEN_BUDGET）
         
     Returns:
         プロンプト文字列
@@ -170,80 +273,9 @@ def build_ai_diagnosis_prompt(
     prompt_parts.append("同じ業界・規模の企業と比較し、業界平均との差異を明確に示してください。")
     prompt_parts.append("")
     
-    # 財務データ（3期分）
+    # 財務データ（3期分）とベンチマークデータは、トークン予算に収めてから差し込む
     prompt_parts.append("## 財務データ（3期分）")
-    for key, data in fiscal_data['fiscal_data'].items():
-        year = data['year']
-        prompt_parts.append(f"\n### {year}年度")
-        
-        # 損益計算書情報
-        prompt_parts.append("\n#### 損益計算書")
-        prompt_parts.append(f"- 売上高: {data['sales']:,}千円")
-        prompt_parts.append(f"- 売上総利益: {data['gross_profit']:,}千円")
-        prompt_parts.append(f"- 営業利益: {data['operating_profit']:,}千円")
-        prompt_parts.append(f"- 経常利益: {data['ordinary_profit']:,}千円")
-        prompt_parts.append(f"- 当期純利益: {data['net_profit']:,}千円")
-        
-        # 貸借対照表情報
-        prompt_parts.append("\n#### 貸借対照表")
-        prompt_parts.append("【資産の部】")
-        prompt_parts.append(f"- 現金及び預金: {data['cash_and_deposits']:,}千円")
-        prompt_parts.append(f"- 売掛金: {data['accounts_receivable']:,}千円")
-        prompt_parts.append(f"- 棚卸資産: {data['inventory']:,}千円")
-        prompt_parts.append(f"- 流動資産合計: {data['total_current_assets']:,}千円")
-        prompt_parts.append(f"- 有形固定資産合計: {data['total_tangible_fixed_assets']:,}千円")
-        prompt_parts.append(f"- 無形固定資産合計: {data['total_intangible_assets']:,}千円")
-        prompt_parts.append(f"- 固定資産合計: {data['total_fixed_assets']:,}千円")
-        prompt_parts.append(f"- 資産合計: {data['total_assets']:,}千円")
-        prompt_parts.append("【負債の部】")
-        prompt_parts.append(f"- 買掛金: {data['accounts_payable']:,}千円")
-        prompt_parts.append(f"- 短期借入金: {data['short_term_borrowings']:,}千円")
-        prompt_parts.append(f"- 流動負債合計: {data['total_current_liabilities']:,}千円")
-        prompt_parts.append(f"- 長期借入金: {data['long_term_borrowings']:,}千円")
-        prompt_parts.append(f"- 固定負債合計: {data['total_long_term_liabilities']:,}千円")
-        prompt_parts.append(f"- 負債合計: {data['total_liabilities']:,}千円")
-        prompt_parts.append("【純資産の部】")
-        prompt_parts.append(f"- 資本金: {data['capital_stock']:,}千円")
-        prompt_parts.append(f"- 資本剰余金: {data['capital_surplus']:,}千円")
-        prompt_parts.append(f"- 利益剰余金: {data['retained_earnings']:,}千円")
-        prompt_parts.append(f"- 純資産合計: {data['total_net_assets']:,}千円")
-        
-        # 税務申告情報
-        prompt_parts.append("\n#### 税務申告情報")
-        prompt_parts.append(f"- 法人税等: {data['income_taxes']:,}千円" if data.get('income_taxes') else "- 法人税等: データなし")
-        
-        # 決算留意事項
-        if data.get('financial_statement_notes'):
-            prompt_parts.append("\n#### 決算留意事項")
-            prompt_parts.append(data['financial_statement_notes'])
-        
-        # 主要指標
-        prompt_parts.append("\n#### 主要指標")
-        prompt_parts.append(f"- 売上高成長率: {data['sales_growth_rate']:.2f}%" if data['sales_growth_rate'] else "- 売上高成長率: データなし")
-        prompt_parts.append(f"- 営業利益率: {data['operating_profit_margin']:.2f}%" if data['operating_profit_margin'] else "- 営業利益率: データなし")
-        prompt_parts.append(f"- 労働生産性: {data['labor_productivity']:.2f}千円/人" if data['labor_productivity'] else "- 労働生産性: データなし")
-        prompt_parts.append(f"- 自己資本比率: {data['equity_ratio']:.2f}%" if data['equity_ratio'] else "- 自己資本比率: データなし")
-        prompt_parts.append(f"- 運転資本回転期間: {data['operating_working_capital_turnover_period']:.2f}日" if data['operating_working_capital_turnover_period'] else "- 運転資本回転期間: データなし")
-        prompt_parts.append(f"- EBITDA有利子負債倍率: {data['EBITDA_interest_bearing_debt_ratio']:.2f}" if data['EBITDA_interest_bearing_debt_ratio'] else "- EBITDA有利子負債倍率: データなし")
-        
-        # スコア
-        prompt_parts.append("\n#### スコア（業界内での位置）")
-        prompt_parts.append(f"- 売上高成長率スコア: {data['score_sales_growth_rate']}/5" if data['score_sales_growth_rate'] else "- 売上高成長率スコア: データなし")
-        prompt_parts.append(f"- 営業利益率スコア: {data['score_operating_profit_margin']}/5" if data['score_operating_profit_margin'] else "- 営業利益率スコア: データなし")
-        prompt_parts.append(f"- 労働生産性スコア: {data['score_labor_productivity']}/5" if data['score_labor_productivity'] else "- 労働生産性スコア: データなし")
-        prompt_parts.append(f"- 自己資本比率スコア: {data['score_equity_ratio']}/5" if data['score_equity_ratio'] else "- 自己資本比率スコア: データなし")
-    
-    # ベンチマークデータ
-    if fiscal_data['benchmark_data']:
-        prompt_parts.append("\n## ローカルベンチマークデータ")
-        for indicator_name, benchmark in fiscal_data['benchmark_data'].items():
-            prompt_parts.append(f"\n### {indicator_name}")
-            prompt_parts.append(f"- 中央値: {benchmark['median']:.2f}")
-            prompt_parts.append(f"- 標準偏差: {benchmark['standard_deviation']:.2f}")
-            prompt_parts.append(f"- 範囲I（最上位）: {benchmark['range_i']:.2f}")
-            prompt_parts.append(f"- 範囲II: {benchmark['range_ii']:.2f}")
-            prompt_parts.append(f"- 範囲III: {benchmark['range_iii']:.2f}")
-            prompt_parts.append(f"- 範囲IV（最下位）: {benchmark['range_iv']:.2f}")
+    data_index = len(prompt_parts)
     
     # 不足情報
     if missing_info:
@@ -322,5 +354,34 @@ def build_ai_diagnosis_prompt(
 データが不足している場合は、その点を明記し、必要な情報を質問形式で提示してください。
 """)
     
+    # 対象年度 → ベンチマーク → 前期 → 前々期の順に重視し、予算を超えたら重視しないものから要約・省略する
+    years = list(fiscal_data['fiscal_data'].values())
+    sections = [
+        PromptSection(f"year_{data['year']}", _format_fiscal_year(data), summarize=lambda data=data: _format_fiscal_year_summary(data))
+        for data in years
+    ]
+    if sections:
+        sections[0].required = True
+    if fiscal_data['benchmark_data']:
+        sections.insert(1, PromptSection('benchmark_data', _format_benchmarks(fiscal_data['benchmark_data'])))
+    result = fit_sections(
+        sections,
+        token_budget if token_budget is not None else get_prompt_token_budget(),
+        fixed_tokens=estimate_tokens("\n".join(prompt_parts)),
+        omitted_text='',
+    )
+    if result.summarized or result.dropped:
+        logger.info(f"Diagnosis prompt fitted to token budget: summarized={result.summarized}, dropped={result.dropped}")
+    
+    data_parts = [result.texts[f"year_{data['year']}"] for data in years]
+    if fiscal_data['benchmark_data']:
+        data_parts.append(result.texts['benchmark_data'])
+    data_parts = [text for text in data_parts if text]
+    if result.dropped:
+        labels = {f"year_{data['year']}": f"{data['year']}年度" for data in years}
+        labels['benchmark_data'] = 'ローカルベンチマークデータ'
+        data_parts.append(f"\n（データ量が多いため省略: {'、'.join(labels[name] for name in result.dropped)}）")
+    prompt_parts[data_index:data_index] = data_parts
+    
     return "\n".join(prompt_parts)
 
@@ -4,10 +4,14 @@ Google Gemini API ユーティリティ関数
 google.genaiパッケージを使用（google.generativeaiは非推奨）
 """
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, NoReturn, Tuple
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 
+from . import resilience
+from .profiling import external_call, profile_external
+
 logger = logging.getLogger(__name__)
 
 # 遅延インポート: google.genaiがインストールされていない場合でも
@@ -23,6 +27,19 @@ except ImportError:
     )
 
 
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    テキストのおおよそのトークン数（APIを呼ばずに見積もる）
+
+    Geminiのトークナイザでは、日本語などの非ASCII文字はおおむね1文字1トークン、
+    英数字・記号は約4文字で1トークンになるため、その比率で数える。
+    """
+    if not text:
+        return 0
+    ascii_count = sum(1 for char in text if ord(char) < 128)
+    return (len(text) - ascii_count) + (ascii_count + 3) // 4
+
+
 def _check_genai_installed():
     """google.genaiがインストールされているかチェック"""
     if genai is None:
@@ -44,6 +61,7 @@ def initialize_gemini() -> None:
         os.environ['GOOGLE_API_KEY'] = settings.GEMINI_API_KEY
 
 
+@profile_external('gemini')
 def get_available_models() -> list:
     """
     利用可能なGeminiモデルのリストを取得（テキスト生成用のみ）
@@ -61,11 +79,11 @@ def get_available_models() -> list:
         # Clientを作成してモデルリストを取得
         import os
         api_key = os.environ.get('GOOGLE_API_KEY') or settings.GEMINI_API_KEY
-        client = genai.Client(api_key=api_key)
+        client = genai.Client(api_key=api_key, http_options=_http_options())
         
-        # 利用可能なモデルを取得
+        # 利用可能なモデルを取得（失敗してもデフォルトのリストを使うため再試行しない）
         try:
-            models = client.models.list()
+            models = resilience.call('gemini', client.models.list, idempotent=False)
             available = []
             for m in models:
                 # モデル名を取得
@@ -121,11 +139,181 @@ def get_gemini_response(
     return None
 
 
+FALLBACK_MODELS = ["gemini-2.0-flash-exp", "gemini-1.5-flash", "gemini-1.5-pro", "gemini-pro"]
+
+
+def _http_options() -> Dict[str, Any]:
+    """1回の呼び出しのタイムアウト（ミリ秒、utils.resilience のGeminiの設定）"""
+    return {'timeout': int(resilience.get_timeout('gemini') * 1000)}
+
+
+def _create_client(api_key: Optional[str] = None):
+    """APIキーを設定してClientを作成"""
+    if api_key:
+        import os
+        os.environ['GOOGLE_API_KEY'] = api_key
+    else:
+        initialize_gemini()
+    return genai.Client(api_key=api_key or settings.GEMINI_API_KEY, http_options=_http_options())
+
+
+def _build_request(
+    prompt: str,
+    system_instruction: Optional[str] = None,
+    response_schema: Optional[Dict[str, Any]] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """プロンプトと生成設定を作成"""
+    generation_config = {
+        "temperature": 0.7,
+        "top_p": 0.95,
+        "top_k": 40,
+        "max_output_tokens": 8192,  # 回答文字数を増加（2048 → 8192）
+    }
+    if response_schema:
+        # 構造化出力（抽出タスク向けに揺らぎを抑える）
+        generation_config.update({
+            "temperature": 0.0,
+            "response_mime_type": "application/json",
+            "response_schema": response_schema,
+        })
+
+    # system_instructionはモデルによってサポートされていない場合があるため、プロンプトに含める
+    if system_instruction:
+        full_prompt = f"{system_instruction}\n\n{prompt}"
+    else:
+        full_prompt = prompt
+    return full_prompt, generation_config
+
+
+def _with_fallback_models(models: List[str]) -> List[str]:
+    """試行するモデルの順番（指定・利用可能なモデルの後にフォールバック用のモデルを追加）"""
+    candidates = list(models)
+    for fallback in FALLBACK_MODELS:
+        if fallback not in candidates:
+            candidates.append(fallback)
+    return candidates
+
+
+def _should_try_next_model(error: Exception) -> bool:
+    """
+    次のモデルを試すか
+
+    モデル固有のエラー（未対応・存在しない・モデルごとの利用制限（429））の場合のみ次のモデルを試す。
+    タイムアウトや5xxは再試行しても回復しなかった（サービス全体の不調）ため、
+    停止中（CircuitOpenError）と同様に他のモデルも試さない。
+    """
+    if isinstance(error, resilience.CircuitOpenError):
+        return False
+    return not resilience.is_retryable(error) or resilience.get_status_code(error) == 429
+
+
+def _parse_response(response) -> Optional[Dict[str, Any]]:
+    """レスポンスからテキストとトークン数を取り出す"""
+    if not response:
+        logger.warning("Gemini APIからのレスポンスがNoneです")
+        return None
+
+    # トークン数の取得
+    input_tokens = 0
+    output_tokens = 0
+    total_tokens = 0
+
+    # usage_metadataからトークン数を取得
+    if hasattr(response, 'usage_metadata'):
+        usage = response.usage_metadata
+        if hasattr(usage, 'prompt_token_count'):
+            input_tokens = usage.prompt_token_count
+        if hasattr(usage, 'candidates_token_count'):
+            output_tokens = usage.candidates_token_count
+        if hasattr(usage, 'total_token_count'):
+            total_tokens = usage.total_token_count
+        elif input_tokens > 0 or output_tokens > 0:
+            total_tokens = input_tokens + output_tokens
+
+    # レスポンステキストの取得
+    text = None
+    if hasattr(response, 'text') and response.text:
+        text = response.text
+    elif hasattr(response, 'candidates') and response.candidates:
+        # candidatesからテキストを取得
+        candidate = response.candidates[0]
+        if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts'):
+            text_parts = [part.text for part in candidate.content.parts if hasattr(part, 'text')]
+            if text_parts:
+                text = ''.join(text_parts)
+
+    if not text:
+        # レスポンスが空の場合
+        logger.warning("Gemini APIからのレスポンスが空です")
+        logger.warning(f"Response object type: {type(response)}")
+        logger.warning(f"Response attributes: {dir(response)}")
+        if hasattr(response, 'prompt_feedback'):
+            logger.warning(f"Prompt feedback: {response.prompt_feedback}")
+        return None
+
+    return {
+        'text': text,
+        'input_tokens': input_tokens,
+        'output_tokens': output_tokens,
+        'total_tokens': total_tokens,
+    }
+
+
+def _raise_api_error(e: Exception) -> NoReturn:
+    """例外を利用者向けのメッセージを持つValueErrorに変換して送出"""
+    if isinstance(e, resilience.CircuitOpenError):
+        # 障害が続いているため呼び出しを停止中
+        logger.warning(f"Gemini API circuit open: {e}")
+        raise ValueError(str(e))
+
+    if isinstance(e, ValueError):
+        # APIキー関連のエラー
+        logger.error(f"Gemini API configuration error: {e}", exc_info=True)
+        raise ValueError(f"Gemini APIの設定エラー: {str(e)}")
+
+    error_str = str(e)
+    error_type = type(e).__name__
+
+    # 429エラー（クォータ制限）の処理
+    if '429' in error_str or 'quota' in error_str.lower() or 'Quota exceeded' in error_str or 'RESOURCE_EXHAUSTED' in error_str:
+        logger.error(f"Gemini API quota/rate limit exceeded: {error_type} - {e}")
+
+        # エラーメッセージから詳細を抽出
+        error_message = "Gemini APIの利用制限に達しました。\n\n"
+
+        # プラン情報を確認（エラーメッセージから）
+        if 'free_tier' in error_str.lower():
+            error_message += "【無料プランの制限】\n"
+            error_message += "無料プランの1日のリクエスト数やトークン数の制限に達している可能性があります。\n"
+        else:
+            error_message += "【Proプランでも制限に達している可能性があります】\n"
+            error_message += "以下の可能性があります：\n"
+            error_message += "1. 1分あたりのリクエスト数制限（RPM: Requests Per Minute）\n"
+            error_message += "2. 1分あたりのトークン数制限（TPM: Tokens Per Minute）\n"
+            error_message += "3. 1日あたりのリクエスト数制限\n"
+            error_message += "4. APIキーが正しいプランに紐づいていない\n\n"
+
+        error_message += "【対処方法】\n"
+        error_message += "- しばらく時間をおいてから再度お試しください（通常1分程度）\n"
+        error_message += "- APIキーの設定を確認してください\n"
+        error_message += "- Google AI Studioで使用状況を確認してください: https://ai.dev/usage\n"
+        error_message += "- 詳細: https://ai.google.dev/gemini-api/docs/rate-limits\n\n"
+        error_message += f"【エラー詳細】\n{error_str[:500]}"  # 最初の500文字を表示
+
+        raise ValueError(error_message)
+
+    # その他のエラー
+    logger.error(f"Gemini API error: {error_type} - {e}", exc_info=True)
+    logger.error(f"Full error: {error_str}")
+    raise ValueError(f"Gemini APIエラー ({error_type}): {str(e)[:500]}")
+
+
 def get_gemini_response_with_tokens(
     prompt: str,
     system_instruction: Optional[str] = None,
     model: str = None,
-    api_key: Optional[str] = None
+    api_key: Optional[str] = None,
+    response_schema: Optional[Dict[str, Any]] = None
 ) -> Optional[Dict[str, Any]]:
     """
     Gemini APIを使用してテキスト生成（トークン数も返す）
@@ -135,6 +323,8 @@ def get_gemini_response_with_tokens(
         system_instruction: システム指示（オプション）
         model: 使用するGeminiモデル（Noneの場合は利用可能なモデルから自動選択）
         api_key: 使用するAPIキー（Noneの場合はSCOREのデフォルト）
+        response_schema: 構造化出力のJSONスキーマ（オプション）。
+            指定した場合はJSONで応答させ、textにJSON文字列が入る
         
     Returns:
         {'text': str, 'input_tokens': int, 'output_tokens': int, 'total_tokens': int} の辞書
@@ -142,42 +332,9 @@ def get_gemini_response_with_tokens(
     """
     _check_genai_installed()
     try:
-        # APIキーの設定
-        if api_key:
-            import os
-            os.environ['GOOGLE_API_KEY'] = api_key
-        else:
-            initialize_gemini()
-        
-        # Clientを作成
-        client = genai.Client(api_key=api_key or settings.GEMINI_API_KEY)
-        
-        # モデルの設定
-        generation_config = {
-            "temperature": 0.7,
-            "top_p": 0.95,
-            "top_k": 40,
-            "max_output_tokens": 8192,  # 回答文字数を増加（2048 → 8192）
-        }
-        
-        # プロンプトを準備
-        # system_instructionはモデルによってサポートされていない場合があるため、プロンプトに含める
-        if system_instruction:
-            full_prompt = f"{system_instruction}\n\n{prompt}"
-        else:
-            full_prompt = prompt
-        
-        # 利用可能なモデルを取得
-        if model:
-            available_models = [model]
-        else:
-            available_models = get_available_models()
-        
-        # フォールバック用のモデルリストを追加
-        fallback_models = ["gemini-2.0-flash-exp", "gemini-1.5-flash", "gemini-1.5-pro", "gemini-pro"]
-        for fallback in fallback_models:
-            if fallback not in available_models:
-                available_models.append(fallback)
+        client = _create_client(api_key)
+        full_prompt, generation_config = _build_request(prompt, system_instruction, response_schema)
+        available_models = _with_fallback_models([model] if model else get_available_models())
         
         response = None
         last_error = None
@@ -186,16 +343,21 @@ def get_gemini_response_with_tokens(
             try:
                 logger.info(f"Trying model: {model_name}")
                 # google.genaiパッケージのClientを使用してコンテンツを生成
-                response = client.models.generate_content(
-                    model=model_name,
-                    contents=full_prompt,
-                    config=generation_config
-                )
+                with external_call('gemini'):
+                    response = resilience.call(
+                        'gemini',
+                        client.models.generate_content,
+                        model=model_name,
+                        contents=full_prompt,
+                        config=generation_config
+                    )
                 
                 # モデルの初期化が成功したら、そのモデルを使用
                 logger.info(f"Successfully initialized model: {model_name}")
                 break
             except Exception as e:
+                if not _should_try_next_model(e):
+                    raise
                 logger.warning(f"Failed to initialize model {model_name}: {e}")
                 last_error = e
                 continue
@@ -203,96 +365,80 @@ def get_gemini_response_with_tokens(
         if response is None:
             raise ValueError(f"利用可能なGeminiモデルが見つかりませんでした。最後のエラー: {last_error}")
         
-        # レスポンスの確認
-        if not response:
-            logger.warning("Gemini APIからのレスポンスがNoneです")
-            return None
-        
-        # トークン数の取得
-        input_tokens = 0
-        output_tokens = 0
-        total_tokens = 0
-        
-        # usage_metadataからトークン数を取得
-        if hasattr(response, 'usage_metadata'):
-            usage = response.usage_metadata
-            if hasattr(usage, 'prompt_token_count'):
-                input_tokens = usage.prompt_token_count
-            if hasattr(usage, 'candidates_token_count'):
-                output_tokens = usage.candidates_token_count
-            if hasattr(usage, 'total_token_count'):
-                total_tokens = usage.total_token_count
-            elif input_tokens > 0 or output_tokens > 0:
-                total_tokens = input_tokens + output_tokens
-        
-        # レスポンステキストの取得
-        text = None
-        if hasattr(response, 'text') and response.text:
-            text = response.text
-        elif hasattr(response, 'candidates') and response.candidates:
-            # candidatesからテキストを取得
-            candidate = response.candidates[0]
-            if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts'):
-                text_parts = [part.text for part in candidate.content.parts if hasattr(part, 'text')]
-                if text_parts:
-                    text = ''.join(text_parts)
-        
-        if not text:
-            # レスポンスが空の場合
-            logger.warning("Gemini APIからのレスポンスが空です")
-            logger.warning(f"Response object type: {type(response)}")
-            logger.warning(f"Response attributes: {dir(response)}")
-            if hasattr(response, 'prompt_feedback'):
-                logger.warning(f"Prompt feedback: {response.prompt_feedback}")
-            return None
-        
-        return {
-            'text': text,
-            'input_tokens': input_tokens,
-            'output_tokens': output_tokens,
-            'total_tokens': total_tokens,
-        }
+        return _parse_response(response)
             
-    except ValueError as e:
-        # APIキー関連のエラー
-        logger.error(f"Gemini API configuration error: {e}", exc_info=True)
-        raise ValueError(f"Gemini APIの設定エラー: {str(e)}")
     except Exception as e:
-        error_str = str(e)
-        error_type = type(e).__name__
-        
-        # 429エラー（クォータ制限）の処理
-        if '429' in error_str or 'quota' in error_str.lower() or 'Quota exceeded' in error_str or 'RESOURCE_EXHAUSTED' in error_str:
-            logger.error(f"Gemini API quota/rate limit exceeded: {error_type} - {e}")
-            
-            # エラーメッセージから詳細を抽出
-            error_message = "Gemini APIの利用制限に達しました。\n\n"
-            
-            # プラン情報を確認（エラーメッセージから）
-            if 'free_tier' in error_str.lower():
-                error_message += "【無料プランの制限】\n"
-                error_message += "無料プランの1日のリクエスト数やトークン数の制限に達している可能性があります。\n"
-            else:
-                error_message += "【Proプランでも制限に達している可能性があります】\n"
-                error_message += "以下の可能性があります：\n"
-                error_message += "1. 1分あたりのリクエスト数制限（RPM: Requests Per Minute）\n"
-                error_message += "2. 1分あたりのトークン数制限（TPM: Tokens Per Minute）\n"
-                error_message += "3. 1日あたりのリクエスト数制限\n"
-                error_message += "4. APIキーが正しいプランに紐づいていない\n\n"
-            
-            error_message += "【対処方法】\n"
-            error_message += "- しばらく時間をおいてから再度お試しください（通常1分程度）\n"
-            error_message += "- APIキーの設定を確認してください\n"
-            error_message += "- Google AI Studioで使用状況を確認してください: https://ai.dev/usage\n"
-            error_message += "- 詳細: https://ai.google.dev/gemini-api/docs/rate-limits\n\n"
-            error_message += f"【エラー詳細】\n{error_str[:500]}"  # 最初の500文字を表示
-            
-            raise ValueError(error_message)
-        
-        # その他のエラー
-        logger.error(f"Gemini API error: {error_type} - {e}", exc_info=True)
-        logger.error(f"Full error: {error_str}")
-        raise ValueError(f"Gemini APIエラー ({error_type}): {str(e)[:500]}")
+        _raise_api_error(e)
+
+
+async def get_gemini_response_async(
+    prompt: str,
+    system_instruction: Optional[str] = None,
+    model: str = None,
+    api_key: Optional[str] = None
+) -> Optional[str]:
+    """get_gemini_response の非同期版（テキストのみを返す）"""
+    result = await get_gemini_response_with_tokens_async(prompt, system_instruction, model, api_key)
+    if result:
+        return result['text']
+    return None
+
+
+async def get_gemini_response_with_tokens_async(
+    prompt: str,
+    system_instruction: Optional[str] = None,
+    model: str = None,
+    api_key: Optional[str] = None,
+    response_schema: Optional[Dict[str, Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    get_gemini_response_with_tokens の非同期版（asyncビュー用）
+
+    google.genai の非同期クライアント（client.aio）で応答を待つため、
+    待機中もワーカーやスレッドを占有しない。引数・戻り値・例外は同期版と同じ。
+    """
+    _check_genai_installed()
+    try:
+        client = _create_client(api_key)
+        full_prompt, generation_config = _build_request(prompt, system_instruction, response_schema)
+        if model:
+            available_models = _with_fallback_models([model])
+        else:
+            # モデル一覧の取得は同期APIのためスレッドで実行
+            available_models = _with_fallback_models(
+                await sync_to_async(get_available_models, thread_sensitive=False)()
+            )
+
+        response = None
+        last_error = None
+
+        for model_name in available_models:
+            try:
+                logger.info(f"Trying model: {model_name}")
+                with external_call('gemini'):
+                    response = await resilience.acall(
+                        'gemini',
+                        client.aio.models.generate_content,
+                        model=model_name,
+                        contents=full_prompt,
+                        config=generation_config
+                    )
+                logger.info(f"Successfully initialized model: {model_name}")
+                break
+            except Exception as e:
+                if not _should_try_next_model(e):
+                    raise
+                logger.warning(f"Failed to initialize model {model_name}: {e}")
+                last_error = e
+                continue
+
+        if response is None:
+            raise ValueError(f"利用可能なGeminiモデルが見つかりませんでした。最後のエラー: {last_error}")
+
+        return _parse_response(response)
+
+    except Exception as e:
+        _raise_api_error(e)
 
 
 def get_financial_advice(
@@ -0,0 +1,108 @@
+"""
+ナビゲーション（ヘッダー・サイドバー）用のリクエスト単位のコンテキスト
+
+ベーステンプレートはすべてのページで描画されるため、ユーザーの所属情報（オーナーのFirm、
+選択中のCompany・Firm、未読通知数）をテンプレートタグごとに取得すると、
+ページビューのたびに同じクエリが何度も実行される。
+NavigationContext はリクエストごとに1つ作成し、各値を最初に参照されたときに1回だけ取得する。
+"""
+from functools import cached_property
+from typing import Optional
+
+from django.http import HttpRequest
+
+from ..models import Company, Firm, FirmCompany, UserCompany, UserFirm
+
+
+class NavigationContext:
+    """リクエストユーザーの所属情報（参照されたものだけを1回ずつ取得する）"""
+
+    def __init__(self, user):
+        self.user = user
+        self.is_authenticated = bool(user and user.is_authenticated)
+        self._company_firms = {}
+
+    @cached_property
+    def firm_owner(self) -> Optional[UserFirm]:
+        """ユーザーがオーナーであるFirmのUserFirm"""
+        if not self.is_authenticated:
+            return None
+        return UserFirm.objects.filter(
+            user=self.user,
+            is_owner=True,
+            active=True
+        ).select_related('firm').first()
+
+    @cached_property
+    def selected_user_company(self) -> Optional[UserCompany]:
+        """選択中のUserCompany（activeでないものも含む）"""
+        if not self.is_authenticated:
+            return None
+        return UserCompany.objects.filter(
+            user=self.user,
+            is_selected=True
+        ).select_related('company').first()
+
+    @property
+    def selected_company(self) -> Optional[Company]:
+        """選択中のCompany（activeでないものも含む）"""
+        user_company = self.selected_user_company
+        return user_company.company if user_company else None
+
+    @property
+    def selected_active_company(self) -> Optional[Company]:
+        """選択中のactiveなCompany"""
+        user_company = self.selected_user_company
+        return user_company.company if user_company and user_company.active else None
+
+    @cached_property
+    def selected_firm(self) -> Optional[Firm]:
+        """選択中のFirm"""
+        if not self.is_authenticated:
+            return None
+        user_firm = UserFirm.objects.filter(
+            user=self.user,
+            is_selected=True,
+            active=True
+        ).select_related('firm').first()
+        return user_firm.firm if user_firm else None
+
+    @cached_property
+    def user_companies(self):
+        """ユーザーが所属する全Company（会社切り替え用）"""
+        if not self.is_authenticated:
+            return []
+        return list(UserCompany.objects.filter(
+            user=self.user,
+            active=True
+        ).select_related('company').order_by('company__name'))
+
+    def get_company_firm(self, company: Optional[Company]) -> Optional[Firm]:
+        """Companyが属するFirm（プランチェック用。Companyごとに1回だけ取得する）"""
+        if not company:
+            return None
+        if company.pk not in self._company_firms:
+            firm_company = FirmCompany.objects.filter(
+                company=company,
+                active=True
+            ).select_related('firm', 'firm__subscription', 'firm__subscription__plan').first()
+            self._company_firms[company.pk] = firm_company.firm if firm_company else None
+        return self._company_firms[company.pk]
+
+    @cached_property
+    def unread_notification_count(self) -> int:
+        """オーナーであるFirmの未読通知数"""
+        from .notifications import get_unread_notification_count
+
+        if not self.firm_owner:
+            return 0
+        return get_unread_notification_count(self.firm_owner.firm_id)
+
+
+def get_navigation(request: HttpRequest) -> NavigationContext:
+    """リクエストのNavigationContextを取得（リクエストごとに1回だけ作成）"""
+    navigation = getattr(request, '_navigation_context', None)
+    if navigation is None or navigation.user is not request.user:
+        navigation = NavigationContext(getattr(request, 'user', None))
+        request._navigation_context = navigation
+    return navigation
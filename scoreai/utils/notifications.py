@@ -1,14 +1,101 @@
 """
 通知機能のユーティリティ関数
 """
+from collections import Counter
+from typing import Iterable, Optional
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
 from django.utils import timezone
-from ..models import Firm, FirmNotification, FirmSubscription, FirmUsageTracking
-from .plan_limits import get_current_company_count, get_max_companies_allowed
+from ..models import Firm, FirmNotification, FirmSubscription, FirmUsageTracking, PlanLimitNotificationState
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# 未読通知数のキャッシュ期間（秒）
+# 作成・既読時に更新するが、ワーカーごとのキャッシュ（LocMemCache）の場合は他のワーカーに反映されないため短めにする
+UNREAD_COUNT_CACHE_TIMEOUT = 300
+
+
+def _unread_count_key(firm_id: str) -> str:
+    return f'firm_notifications_unread:{firm_id}'
+
+
+def get_unread_notification_count(firm_id: str) -> int:
+    """
+    Firmの未読通知数を取得（キャッシュがない場合のみ集計する）
+    
+    Args:
+        firm_id: FirmのID
+    
+    Returns:
+        未読通知数
+    """
+    key = _unread_count_key(firm_id)
+    count = cache.get(key)
+    if count is None:
+        count = FirmNotification.objects.filter(firm_id=firm_id, is_read=False).count()
+        cache.add(key, count, UNREAD_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def adjust_unread_notification_count(firm_id: str, delta: int) -> None:
+    """
+    キャッシュした未読通知数を増減（トランザクションのコミット後に反映する）
+    
+    キャッシュがない場合は何もしない（次回の取得時に集計する）。
+    """
+    def _adjust():
+        try:
+            cache.incr(_unread_count_key(firm_id), delta)
+        except ValueError:
+            pass
+    transaction.on_commit(_adjust)
+
+
+def clear_unread_notification_count(firm_id: str) -> None:
+    """キャッシュした未読通知数を破棄（まとめて既読にした場合など）"""
+    transaction.on_commit(lambda: cache.delete(_unread_count_key(firm_id)))
+
+
+def mark_notification_read(notification: FirmNotification) -> bool:
+    """
+    通知を既読にする
+    
+    Returns:
+        未読から既読に変更した場合True
+    """
+    now = timezone.now()
+    updated = FirmNotification.objects.filter(pk=notification.pk, is_read=False).update(
+        is_read=True,
+        read_at=now,
+    )
+    notification.is_read = True
+    notification.read_at = notification.read_at or now
+    if updated:
+        adjust_unread_notification_count(notification.firm_id, -1)
+    return bool(updated)
+
+
+def mark_all_notifications_read(firm: Firm) -> int:
+    """
+    Firmのすべての未読通知を既読にする
+    
+    Returns:
+        既読にした件数
+    """
+    count = FirmNotification.objects.filter(
+        firm=firm,
+        is_read=False
+    ).update(
+        is_read=True,
+        read_at=timezone.now()
+    )
+    clear_unread_notification_count(firm.id)
+    return count
+
+
 def create_notification(firm: Firm, notification_type: str, title: str, message: str) -> FirmNotification:
     """
     通知を作成
@@ -22,76 +109,160 @@ def create_notification(firm: Firm, notification_type: str, title: str, message:
     Returns:
         FirmNotificationオブジェクト
     """
-    return FirmNotification.objects.create(
+    notification = FirmNotification.objects.create(
         firm=firm,
         notification_type=notification_type,
         title=title,
         message=message,
     )
+    adjust_unread_notification_count(firm.id, 1)
+    return notification
+
+
+# 通知するしきい値（利用率%）。しきい値を超えるたびに1回だけ通知する
+PLAN_LIMIT_THRESHOLDS = (80, 100)
+
+# 対象ごとの通知内容: (上限に近づいたときのタイトル, 上限に達したときのタイトル, メッセージ)
+PLAN_LIMIT_MESSAGES = {
+    'companies': (
+        'Company数制限に近づいています',
+        'Company数が上限に達しました',
+        '現在のCompany数: {current}社 / 上限: {limit}社 ({percentage:.1f}%)',
+    ),
+    'ai_consultation': (
+        'AI相談回数制限に近づいています',
+        'AI相談回数が上限に達しました',
+        '現在の利用回数: {current}回 / 上限: {limit}回 ({percentage:.1f}%)',
+    ),
+    'ocr': (
+        'OCR読み込み回数制限に近づいています',
+        'OCR読み込み回数が上限に達しました',
+        '現在の利用回数: {current}回 / 上限: {limit}回 ({percentage:.1f}%)',
+    ),
+}
+
+
+def _threshold_level(current: int, limit: int) -> int:
+    """利用率が超えている最大のしきい値（超えていない場合は0）"""
+    percentage = current / limit * 100
+    return max([level for level in PLAN_LIMIT_THRESHOLDS if percentage >= level], default=0)
+
+
+def notify_plan_limits(firm_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    プラン制限のしきい値を超えたFirmに通知を作成
+
+    Firm・対象（Company数、AI相談回数、OCR回数）・期間（月次の制限は当月）ごとに
+    最後に通知したしきい値を PlanLimitNotificationState に記録し、より高いしきい値を
+    超えた場合だけ通知する。利用率がしきい値を下回った場合は記録を下げ、再び超えたときに通知する。
+    すべてのFirmをまとめて判定し、Firm数に関わらず一定数のクエリで処理する。
+
+    Args:
+        firm_ids: 対象のFirmのID（指定しない場合は契約中のすべてのFirm）
+
+    Returns:
+        作成した通知の件数
+    """
+    now = timezone.now()
+    today = now.date()
+    period = f'{now.year:04d}-{now.month:02d}'
+
+    subscriptions = FirmSubscription.objects.filter(
+        status__in=['trial', 'active']
+    ).select_related('plan', 'firm').annotate(
+        # get_current_company_count と同じ条件（アクティブ + グレース期間中）
+        company_count=Count(
+            'firm__firm_companies',
+            filter=Q(firm__firm_companies__active=True) | Q(
+                firm__firm_companies__active=False,
+                firm__firm_companies__grace_period_end__gte=today,
+            ),
+        )
+    )
+    if firm_ids is not None:
+        subscriptions = subscriptions.filter(firm_id__in=list(firm_ids))
+    subscriptions = list(subscriptions)
+    if not subscriptions:
+        return 0
+
+    target_firm_ids = [subscription.firm_id for subscription in subscriptions]
+    usages = {
+        usage.firm_id: usage
+        for usage in FirmUsageTracking.objects.filter(
+            firm_id__in=target_firm_ids, year=now.year, month=now.month
+        )
+    }
+    states = {
+        (state.firm_id, state.metric, state.period): state
+        for state in PlanLimitNotificationState.objects.filter(
+            firm_id__in=target_firm_ids, period__in=['', period]
+        )
+    }
+
+    notifications = []
+    changed_states = []
+    for subscription in subscriptions:
+        usage = usages.get(subscription.firm_id)
+        # (対象, 期間, 現在値, 上限) 上限0は無制限
+        measurements = [
+            ('companies', '', subscription.company_count, subscription.total_companies_allowed),
+            ('ai_consultation', period, usage.ai_consultation_count if usage else 0, subscription.total_ai_consultations_allowed),
+            ('ocr', period, usage.ocr_count if usage else 0, subscription.total_ocr_allowed),
+        ]
+        for metric, metric_period, current, limit in measurements:
+            if limit <= 0:
+                continue
+            level = _threshold_level(current, limit)
+            key = (subscription.firm_id, metric, metric_period)
+            state = states.get(key)
+            notified_level = state.notified_level if state else 0
+            if level == notified_level:
+                continue
+
+            if level > notified_level:
+                near_title, reached_title, message = PLAN_LIMIT_MESSAGES[metric]
+                notifications.append(FirmNotification(
+                    firm_id=subscription.firm_id,
+                    notification_type='plan_limit_warning',
+                    title=reached_title if level >= 100 else near_title,
+                    message=message.format(current=current, limit=limit, percentage=current / limit * 100),
+                ))
+            if state is None:
+                state = PlanLimitNotificationState(
+                    firm_id=subscription.firm_id, metric=metric, period=metric_period
+                )
+            state.notified_level = level
+            state.updated_at = now
+            changed_states.append(state)
+
+    with transaction.atomic():
+        # 前月以前の記録は不要
+        PlanLimitNotificationState.objects.filter(
+            firm_id__in=target_firm_ids
+        ).exclude(period__in=['', period]).delete()
+        PlanLimitNotificationState.objects.bulk_create(
+            changed_states,
+            update_conflicts=True,
+            unique_fields=['firm', 'metric', 'period'],
+            update_fields=['notified_level', 'updated_at'],
+        )
+        FirmNotification.objects.bulk_create(notifications)
+        for firm_id, count in Counter(notification.firm_id for notification in notifications).items():
+            adjust_unread_notification_count(firm_id, count)
+
+    if notifications:
+        logger.info(f"Created {len(notifications)} plan limit notifications")
+    return len(notifications)
 
 
 def check_and_notify_plan_limits(firm: Firm):
     """
-    プラン制限に近づいている場合の通知をチェック
+    プラン制限に近づいている場合の通知をチェック（1つのFirmのみ）
     
     Args:
         firm: Firmオブジェクト
     """
-    try:
-        subscription = firm.subscription
-    except FirmSubscription.DoesNotExist:
-        return
-    
-    # Company数制限のチェック
-    current_count = get_current_company_count(firm)
-    max_allowed = get_max_companies_allowed(firm)
-    
-    if max_allowed > 0:
-        usage_percentage = (current_count / max_allowed) * 100
-        
-        # 80%以上の場合に警告
-        if usage_percentage >= 80:
-            create_notification(
-                firm=firm,
-                notification_type='plan_limit_warning',
-                title='Company数制限に近づいています',
-                message=f'現在のCompany数: {current_count}社 / 上限: {max_allowed}社 ({usage_percentage:.1f}%)'
-            )
-    
-    # 利用状況のチェック
-    now = timezone.now()
-    usage = FirmUsageTracking.objects.filter(
-        firm=firm,
-        year=now.year,
-        month=now.month
-    ).first()
-    
-    if usage:
-        # AI相談回数のチェック
-        if not subscription.plan.is_unlimited_ai_consultations:
-            total = subscription.total_ai_consultations_allowed
-            if total > 0:
-                usage_percentage = (usage.ai_consultation_count / total) * 100
-                if usage_percentage >= 80:
-                    create_notification(
-                        firm=firm,
-                        notification_type='plan_limit_warning',
-                        title='AI相談回数制限に近づいています',
-                        message=f'現在の利用回数: {usage.ai_consultation_count}回 / 上限: {total}回 ({usage_percentage:.1f}%)'
-                    )
-        
-        # OCR回数のチェック
-        if not subscription.plan.is_unlimited_ocr:
-            total = subscription.total_ocr_allowed
-            if total > 0:
-                usage_percentage = (usage.ocr_count / total) * 100
-                if usage_percentage >= 80:
-                    create_notification(
-                        firm=firm,
-                        notification_type='plan_limit_warning',
-                        title='OCR読み込み回数制限に近づいています',
-                        message=f'現在の利用回数: {usage.ocr_count}回 / 上限: {total}回 ({usage_percentage:.1f}%)'
-                    )
+    notify_plan_limits(firm_ids=[firm.id])
 
 
 def notify_payment_failed(firm: Firm, invoice_id: str = None):
@@ -4,10 +4,14 @@ Google Cloud Vision APIを使用したOCR機能
 from google.cloud import vision
 from django.conf import settings
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from io import BytesIO
 from PIL import Image
 import base64
+import contextvars
+
+from . import resilience
+from .profiling import profile_external
 
 logger = logging.getLogger(__name__)
 
@@ -143,36 +147,10 @@ def extract_text_from_image(image_file, use_document_detection=True, preprocess=
             image_content = image_file.read()
             image_file.seek(0)  # ファイルポインタをリセット
         
-        image = vision.Image(content=image_content)
-        
-        # OCRを実行（Document Text Detection APIを使用）
-        if use_document_detection:
-            # Document Text Detection API（表形式の文書に最適）
-            response = client.document_text_detection(
-                image=image,
-                image_context={
-                    'language_hints': ['ja']  # 日本語を優先
-                }
-            )
-            
-            # Document Text Detection APIの結果からテキストを抽出
-            if response.full_text_annotation:
-                return response.full_text_annotation.text
-            else:
-                logger.warning("Document Text Detection APIの結果が空です")
-                # フォールバック: text_detectionを試す
-                response = client.text_detection(image=image)
-                texts = response.text_annotations
-                if texts:
-                    return texts[0].description
-        else:
-            # 従来のtext_detection API
-            response = client.text_detection(image=image)
-            texts = response.text_annotations
-            
-            if texts:
-                # 最初の要素は全テキストを含む
-                return texts[0].description
+        # OCRを実行（Document Text Detectionが空の場合はtext_detectionにフォールバック）
+        text = _run_vision_ocr(client, image_content, use_document_detection)
+        if text:
+            return text
         
         logger.warning("OCR結果が空です")
         return None
@@ -182,7 +160,48 @@ def extract_text_from_image(image_file, use_document_detection=True, preprocess=
         return None
 
 
-def extract_text_from_pdf(pdf_file, use_document_detection=True, preprocess=True) -> Optional[str]:
+@profile_external('vision')
+def _run_vision_ocr(client, img_content: bytes, use_document_detection: bool = True) -> Optional[str]:
+    """
+    1枚の画像（バイト列）に対してVision APIでOCRを実行
+    
+    Args:
+        client: Vision APIクライアント
+        img_content: 画像のバイト列
+        use_document_detection: Document Text Detection APIを使用するか
+    
+    Returns:
+        抽出されたテキスト、結果が空の場合はNone
+    """
+    image = vision.Image(content=img_content)
+    # タイムアウトと再試行は utils.resilience で行う（クライアントライブラリの再試行は使わない）
+    timeout = resilience.get_timeout('vision')
+    
+    if use_document_detection:
+        # Document Text Detection APIを使用
+        response = resilience.call(
+            'vision',
+            client.document_text_detection,
+            image=image,
+            image_context={
+                'language_hints': ['ja']  # 日本語を優先
+            },
+            timeout=timeout,
+            retry=None,
+        )
+        
+        if response.full_text_annotation:
+            return response.full_text_annotation.text
+    
+    # 従来のtext_detection API（Document Text Detectionが空の場合のフォールバックを兼ねる）
+    response = resilience.call('vision', client.text_detection, image=image, timeout=timeout, retry=None)
+    texts = response.text_annotations
+    if texts:
+        return texts[0].description
+    return None
+
+
+def extract_text_from_pdf(pdf_file, use_document_detection=True, preprocess=True, page_cache=None) -> Optional[str]:
     """
     PDFからテキストを抽出（OCR）
     
@@ -193,6 +212,8 @@ def extract_text_from_pdf(pdf_file, use_document_detection=True, preprocess=True
         pdf_file: アップロードされたPDFファイル
         use_document_detection: Document Text Detection APIを使用するか
         preprocess: 画像の前処理を実行するか
+        page_cache: ページ画像ハッシュ単位のキャッシュ（get/setを持つオブジェクト、オプション）。
+            指定した場合、キャッシュ済みのページはVision APIを呼び出さない
     
     Returns:
         抽出されたテキスト、エラー時はNone
@@ -209,10 +230,8 @@ def extract_text_from_pdf(pdf_file, use_document_detection=True, preprocess=True
         
         # 各ページからテキストを抽出
         all_texts = []
-        client = initialize_vision_client()
-        
-        if not client:
-            return None
+        # クライアントはキャッシュミスのページが出た時点で初期化する
+        client = None
         
         for page_num, image_pil in enumerate(images, 1):
             logger.info(f"Processing PDF page {page_num}/{len(images)}")
@@ -229,33 +248,24 @@ def extract_text_from_pdf(pdf_file, use_document_detection=True, preprocess=True
             else:
                 img_content = img_byte_arr.getvalue()
             
-            # OCRを実行
-            image = vision.Image(content=img_content)
+            if page_cache is not None:
+                cached_text = page_cache.get(img_content)
+                if cached_text is not None:
+                    if cached_text:
+                        all_texts.append(cached_text)
+                    continue
             
-            if use_document_detection:
-                # Document Text Detection APIを使用
-                response = client.document_text_detection(
-                    image=image,
-                    image_context={
-                        'language_hints': ['ja']  # 日本語を優先
-                    }
-                )
-                
-                if response.full_text_annotation:
-                    all_texts.append(response.full_text_annotation.text)
-                else:
-                    # フォールバック: text_detectionを試す
-                    response = client.text_detection(image=image)
-                    texts = response.text_annotations
-                    if texts:
-                        all_texts.append(texts[0].description)
-            else:
-                # 従来のtext_detection API
-                response = client.text_detection(image=image)
-                texts = response.text_annotations
-                
-                if texts:
-                    all_texts.append(texts[0].description)
+            if client is None:
+                client = initialize_vision_client()
+                if not client:
+                    return None
+            
+            # OCRを実行
+            page_text = _run_vision_ocr(client, img_content, use_document_detection)
+            if page_text:
+                all_texts.append(page_text)
+            if page_cache is not None:
+                page_cache.set(img_content, page_text or '')
         
         return "\n\n--- ページ区切り ---\n\n".join(all_texts) if all_texts else None
         
@@ -271,351 +281,212 @@ def parse_financial_statement_from_text(text: str, use_ai: bool = False) -> Dict
     """
     OCRで抽出したテキストから決算書データをパース
     
-    注意: これは基本的な実装です。実際の決算書の形式に応じて
-    より高度なパースロジックが必要になる場合があります。
+    勘定科目の対応表（ocr_parser.FIELD_MAPPINGS）に基づき、
+    BS/PL/販管費のセクションごとに事前コンパイル済みのパターンで抽出する。
     
     Args:
         text: OCRで抽出したテキスト
+        use_ai: 正規表現で抽出できなかった項目をGemini APIで補完するか
         
     Returns:
-        パースされた決算書データの辞書
+        パースされた決算書データの辞書（金額は千円単位、'confidence'に項目ごとの信頼度）
     """
-    import re
-    from decimal import Decimal, InvalidOperation
-    
-    parsed_data = {
-        'year': None,
-        'sales': None,
-        'gross_profit': None,
-        'operating_profit': None,
-        'ordinary_profit': None,
-        'net_profit': None,
-        # その他の項目...
-    }
+    if use_ai:
+        return parse_financial_statement_with_ai(text)
     
-    # 年度の抽出（例: "令和6年" や "2024年"）
-    year_patterns = [
-        r'令和(\d+)年',
-        r'(\d{4})年',
-        r'R(\d+)年',  # R6年形式
-    ]
-    
-    for pattern in year_patterns:
-        match = re.search(pattern, text)
-        if match:
-            if '令和' in pattern or 'R' in pattern:
-                # 令和年を西暦に変換
-                reiwa_year = int(match.group(1))
-                parsed_data['year'] = 2018 + reiwa_year
-            else:
-                parsed_data['year'] = int(match.group(1))
-            break
-    
-    # 数値の抽出パターン
-    # 項目名と数値のマッピング
-    patterns = {
-        'sales': [
-            r'売上高[合計]*[：:]*\s*([\d,]+)',
-            r'売上[：:]*\s*([\d,]+)',
-        ],
-        'gross_profit': [
-            r'売上総利益[：:]*\s*([\d,]+)',
-            r'総利益[：:]*\s*([\d,]+)',
-        ],
-        'operating_profit': [
-            r'営業利益[：:]*\s*([\d,]+)',
-        ],
-        'ordinary_profit': [
-            r'経常利益[：:]*\s*([\d,]+)',
-        ],
-        'net_profit': [
-            r'当期純利益[：:]*\s*([\d,]+)',
-            r'純利益[：:]*\s*([\d,]+)',
-        ],
-    }
+    from .ocr_parser import parse_financial_statement
     
-    # 各項目を抽出
-    for key, pattern_list in patterns.items():
-        for pattern in pattern_list:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                try:
-                    # カンマを除去して数値に変換（千円単位に変換）
-                    value_str = match.group(1).replace(',', '').replace('，', '')
-                    value = int(Decimal(value_str) // 1000)
-                    parsed_data[key] = value
-                    break
-                except (ValueError, InvalidOperation):
-                    continue
+    return parse_financial_statement(text)
+
+
+# AI補完の1回の呼び出しに渡すテキストの上限（文字数）
+AI_CHUNK_MAX_CHARS = 8000
+# 1つの決算書に対するAI呼び出し回数の上限
+AI_MAX_CALLS = 6
+# AIで補完した項目の信頼度
+AI_FIELD_CONFIDENCE = 0.7
+
+_PAGE_SEPARATOR = "\n\n--- ページ区切り ---\n\n"
+
+
+def _split_bounded(text: str, max_chars: int = AI_CHUNK_MAX_CHARS) -> List[str]:
+    """テキストをページ区切り・改行の位置で上限文字数以下のチャンクに分割"""
+    chunks = []
+    current = ''
+    for block in text.replace(_PAGE_SEPARATOR, '\n').split('\n'):
+        while len(block) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ''
+            chunks.append(block[:max_chars])
+            block = block[max_chars:]
+        if len(current) + len(block) + 1 > max_chars:
+            chunks.append(current)
+            current = ''
+        current = f"{current}\n{block}" if current else block
+    if current.strip():
+        chunks.append(current)
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def _build_ai_requests(text: str, missing_fields: List[str]) -> List[Tuple[str, str, List[str]]]:
+    """
+    AI補完のリクエスト（セクション名, テキスト, 抽出する項目）を作成
     
-    return parsed_data
+    セクション見出しが検出できた場合は、そのセクションのテキストに
+    そのセクションの未抽出項目だけを問い合わせる。
+    """
+    from .ocr_parser import FIELD_MAPPINGS, detect_sections, normalize_ocr_text
+    
+    normalized = normalize_ocr_text(text)
+    sections = detect_sections(normalized)
+    field_sections = {mapping.field: mapping.section for mapping in FIELD_MAPPINGS if mapping.field}
+    
+    requests = []
+    if sections:
+        for section, spans in sections.items():
+            fields = [field for field in missing_fields if field_sections.get(field) == section]
+            if not fields:
+                continue
+            section_text = '\n'.join(normalized[start:end] for start, end in spans)
+            for chunk in _split_bounded(section_text):
+                requests.append((section, chunk, fields))
+        # 見出しのないセクションの項目は全文から探す
+        orphan_fields = [field for field in missing_fields if field_sections.get(field) not in sections]
+        if orphan_fields:
+            for chunk in _split_bounded(normalized):
+                requests.append(('ALL', chunk, orphan_fields))
+    else:
+        for chunk in _split_bounded(normalized):
+            requests.append(('ALL', chunk, list(missing_fields)))
+    
+    if len(requests) > AI_MAX_CALLS:
+        logger.warning(f"AI補完のリクエスト数が上限を超えたため切り詰めます: {len(requests)} -> {AI_MAX_CALLS}")
+        requests = requests[:AI_MAX_CALLS]
+    return requests
+
+
+def _request_ai_fields(section: str, chunk: str, fields: List[str]) -> Dict[str, int]:
+    """1セクション（チャンク）分の項目をGemini APIで抽出"""
+    import json
+    from ..models import FiscalSummary_Year
+    from ..utils.gemini import get_gemini_response_with_tokens
+    
+    field_lines = '\n'.join(
+        f"- {field}: {FiscalSummary_Year._meta.get_field(field).verbose_name}"
+        for field in fields
+    )
+    response_schema = {
+        'type': 'OBJECT',
+        'properties': {field: {'type': 'INTEGER', 'nullable': True} for field in fields},
+    }
+    prompt = f"""
+以下は決算書のOCRテキストの一部です（セクション: {section}）。
+次の項目の金額を千円単位の整数で抽出してください。マイナス（△・▲）は負の数にしてください。
+テキストに存在しない項目はnullにしてください。
+
+抽出する項目:
+{field_lines}
+
+OCRテキスト:
+{chunk}
+"""
+    system_instruction = """あなたは財務データ抽出の専門家です。
+OCRテキストから正確に数値を抽出し、指定されたJSON形式で返答してください。
+数値の単位（円、千円、万円など）を正しく千円単位に変換してください。"""
+    
+    result = get_gemini_response_with_tokens(
+        prompt=prompt,
+        system_instruction=system_instruction,
+        model='gemini-1.5-flash',  # 軽量で高速
+        response_schema=response_schema,
+    )
+    if not result or not result.get('text'):
+        return {}
+    
+    data = json.loads(result['text'])
+    values = {}
+    for field in fields:
+        value = data.get(field)
+        if value is None:
+            continue
+        try:
+            values[field] = int(value)
+        except (TypeError, ValueError):
+            continue
+    return values
 
 
 def parse_financial_statement_with_ai(text: str) -> Dict[str, Any]:
     """
-    Gemini APIを使用して決算書データをパース（高精度）
+    正規表現パーサーで抽出できなかった項目をGemini APIで補完して決算書データをパース
+    
+    テキストをセクション（BS/PL/販管費）ごとに上限文字数以下のチャンクに分け、
+    未抽出の項目だけを構造化出力（JSONスキーマ）で並行して問い合わせる。
+    結果は「資産合計 = 負債合計 + 純資産合計」の関係で検証してから統合する。
     
     Args:
         text: OCRで抽出したテキスト
         
     Returns:
-        パースされた決算書データの辞書
+        パースされた決算書データの辞書（'ai_fields'にAIで補完した項目名のリスト）
     """
-    try:
-        from ..utils.gemini import get_gemini_response_with_tokens
-        import json
-        import re
-        
-        # テキストが長すぎる場合は最初の8000文字のみ使用
-        text_to_analyze = text[:8000] if len(text) > 8000 else text
-        
-        prompt = f"""
-以下の決算書のOCRテキストから、決算書データを抽出してください。
-JSON形式で返答してください。数値は千円単位で返してください。
-
-OCRテキスト:
-{text_to_analyze}
-
-抽出する項目（存在する場合のみ）:
-- year: 年度（西暦、整数、例: 2024）
-- sales: 売上高（千円、整数）
-- gross_profit: 売上総利益（千円、整数）
-- operating_profit: 営業利益（千円、整数）
-- ordinary_profit: 経常利益（千円、整数）
-- net_profit: 当期純利益（千円、整数）
-- total_assets: 総資産（千円、整数）
-- total_liabilities: 総負債（千円、整数）
-- total_net_assets: 純資産合計（千円、整数）
-- capital_stock: 資本金（千円、整数）
-- retained_earnings: 利益剰余金（千円、整数）
-
-JSON形式で返答してください。存在しない項目はnullを返してください。
-例: {{"year": 2024, "sales": 1000000, "operating_profit": 50000, ...}}
-"""
-        
-        system_instruction = """あなたは財務データ抽出の専門家です。
-OCRテキストから正確に数値を抽出し、JSON形式で返答してください。
-数値の単位（円、千円、万円など）を正しく変換してください。
-数値にカンマが含まれている場合は除去してください。"""
-        
-        response_text, _, _, _ = get_gemini_response_with_tokens(
-            prompt=prompt,
-            system_instruction=system_instruction,
-            model='gemini-1.5-flash'  # 軽量で高速
-        )
-        
-        if not response_text:
-            logger.warning("AIパースが失敗しました。正規表現パースにフォールバックします。")
-            return parse_financial_statement_from_text(text, use_ai=False)
-        
-        # JSONをパース
-        # JSON部分を抽出（```json ... ``` または { ... }）
-        json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response_text, re.DOTALL)
-        if json_match:
+    from concurrent.futures import ThreadPoolExecutor
+    from .ocr_parser import FISCAL_SUMMARY_FIELDS, parse_financial_statement, reconcile_balance_sheet
+    
+    parsed_data = parse_financial_statement(text)
+    parsed_data['ai_fields'] = []
+    
+    missing_fields = [field for field in FISCAL_SUMMARY_FIELDS if parsed_data.get(field) is None]
+    if not missing_fields:
+        return parsed_data
+    
+    requests = _build_ai_requests(text, missing_fields)
+    if not requests:
+        return parsed_data
+    
+    ai_values: Dict[str, int] = {}
+    with ThreadPoolExecutor(max_workers=min(len(requests), 3)) as executor:
+        futures = [
+            # 呼び出し元のコンテキスト（プロファイリングの計測対象）を引き継ぐ
+            (section, executor.submit(contextvars.copy_context().run, _request_ai_fields, section, chunk, fields))
+            for section, chunk, fields in requests
+        ]
+        for section, future in futures:
             try:
-                parsed_data = json.loads(json_match.group(0))
-                logger.info(f"AIパース成功: {len(parsed_data)}項目を抽出")
-                return parsed_data
-            except json.JSONDecodeError as e:
-                logger.warning(f"JSONパースエラー: {e}. 正規表現パースにフォールバックします。")
-                return parse_financial_statement_from_text(text, use_ai=False)
-        else:
-            logger.warning("AIレスポンスからJSONが見つかりませんでした。正規表現パースにフォールバックします。")
-            return parse_financial_statement_from_text(text, use_ai=False)
-            
-    except Exception as e:
-        logger.error(f"AIパースエラー: {e}", exc_info=True)
-        # エラー時は正規表現パースにフォールバック
-        return parse_financial_statement_from_text(text, use_ai=False)
+                for field, value in future.result().items():
+                    # 先に見つかった値（セクションの先頭側）を優先
+                    ai_values.setdefault(field, value)
+            except Exception as e:
+                logger.warning(f"AIパースエラー（セクション: {section}）: {e}")
+    
+    confidence = parsed_data['confidence']
+    for field, value in ai_values.items():
+        if parsed_data.get(field) is None:
+            parsed_data[field] = value
+            confidence[field] = AI_FIELD_CONFIDENCE
+            parsed_data['ai_fields'].append(field)
+    
+    rejected = reconcile_balance_sheet(parsed_data, confidence, parsed_data['ai_fields'])
+    for field in rejected:
+        parsed_data[field] = None
+        confidence.pop(field, None)
+        parsed_data['ai_fields'].remove(field)
+    
+    logger.info(f"AIパース: {len(parsed_data['ai_fields'])}/{len(missing_fields)}項目を補完")
+    return parsed_data
 
 
 def parse_loan_contract_from_text(text: str) -> Dict[str, Any]:
     """
     OCRで抽出したテキストから金銭消費貸借契約書データをパース
     
-    注意: これは基本的な実装です。実際の契約書の形式に応じて
-    より高度なパースロジックが必要になる場合があります。
-    
     Args:
         text: OCRで抽出したテキスト
         
     Returns:
-        パースされた契約書データの辞書
+        パースされた契約書データの辞書（'confidence'に項目ごとの信頼度）
     """
-    import re
-    from decimal import Decimal, InvalidOperation
-    from datetime import datetime
-    
-    parsed_data = {
-        'financial_institution_name': None,
-        'principal': None,  # 借入元本（円）
-        'issue_date': None,  # 実行日
-        'start_date': None,  # 返済開始日
-        'interest_rate': None,  # 利息（%）
-        'monthly_repayment': None,  # 月返済額（円）
-        'is_securedby_management': None,  # 経営者保証
-        'is_collateraled': None,  # 担保
-    }
-    
-    # 金融機関名の抽出
-    # 一般的な金融機関名のパターン
-    financial_institution_patterns = [
-        r'(三菱UFJ銀行|三井住友銀行|みずほ銀行|りそな銀行|横浜銀行|静岡銀行|千葉銀行|きらぼし銀行)',
-        r'(地方銀行|信用金庫|信用組合|労働金庫)',
-        r'(株式会社\s*[^\s]+銀行)',
-        r'([^\s]+銀行)',
-        r'([^\s]+信用金庫)',
-        r'([^\s]+信用組合)',
-    ]
-    
-    for pattern in financial_institution_patterns:
-        match = re.search(pattern, text)
-        if match:
-            parsed_data['financial_institution_name'] = match.group(1).strip()
-            break
-    
-    # 借入元本の抽出（「金」「円」などの単位を含む）
-    principal_patterns = [
-        r'借入[金元本]*[：:]*\s*([\d,]+)\s*[千万億]*円',
-        r'元本[：:]*\s*([\d,]+)\s*[千万億]*円',
-        r'金額[：:]*\s*([\d,]+)\s*[千万億]*円',
-        r'([\d,]+)\s*[千万億]*円[^\d]*借入',
-        r'([\d,]+)\s*[千万億]*円[^\d]*元本',
-    ]
-    
-    for pattern in principal_patterns:
-        match = re.search(pattern, text)
-        if match:
-            try:
-                value_str = match.group(1).replace(',', '').replace('，', '')
-                # 千万億の単位を処理
-                multiplier = 1
-                if '千万' in text[match.start():match.end()+20]:
-                    multiplier = 10000000
-                elif '万' in text[match.start():match.end()+20]:
-                    multiplier = 10000
-                elif '億' in text[match.start():match.end()+20]:
-                    multiplier = 100000000
-                elif '千' in text[match.start():match.end()+20]:
-                    multiplier = 1000
-                
-                value = int(Decimal(value_str) * multiplier)
-                parsed_data['principal'] = value
-                break
-            except (ValueError, InvalidOperation):
-                continue
+    from .ocr_parser import parse_loan_contract
     
-    # 実行日の抽出
-    date_patterns = [
-        r'実行日[：:]*\s*(\d{4})[年/\-](\d{1,2})[月/\-](\d{1,2})日?',
-        r'契約日[：:]*\s*(\d{4})[年/\-](\d{1,2})[月/\-](\d{1,2})日?',
-        r'(\d{4})[年/\-](\d{1,2})[月/\-](\d{1,2})日?[^\d]*実行',
-        r'令和(\d+)年(\d{1,2})月(\d{1,2})日[^\d]*実行',
-    ]
-    
-    for pattern in date_patterns:
-        match = re.search(pattern, text)
-        if match:
-            try:
-                if '令和' in pattern:
-                    reiwa_year = int(match.group(1))
-                    year = 2018 + reiwa_year
-                    month = int(match.group(2))
-                    day = int(match.group(3))
-                else:
-                    year = int(match.group(1))
-                    month = int(match.group(2))
-                    day = int(match.group(3))
-                parsed_data['issue_date'] = datetime(year, month, day).date()
-                break
-            except (ValueError, IndexError):
-                continue
-    
-    # 返済開始日の抽出
-    start_date_patterns = [
-        r'返済開始日[：:]*\s*(\d{4})[年/\-](\d{1,2})[月/\-](\d{1,2})日?',
-        r'(\d{4})[年/\-](\d{1,2})[月/\-](\d{1,2})日?[^\d]*返済開始',
-        r'令和(\d+)年(\d{1,2})月(\d{1,2})日[^\d]*返済開始',
-    ]
-    
-    for pattern in start_date_patterns:
-        match = re.search(pattern, text)
-        if match:
-            try:
-                if '令和' in pattern:
-                    reiwa_year = int(match.group(1))
-                    year = 2018 + reiwa_year
-                    month = int(match.group(2))
-                    day = int(match.group(3))
-                else:
-                    year = int(match.group(1))
-                    month = int(match.group(2))
-                    day = int(match.group(3))
-                parsed_data['start_date'] = datetime(year, month, day).date()
-                break
-            except (ValueError, IndexError):
-                continue
-    
-    # 利息（年利）の抽出
-    interest_patterns = [
-        r'利息[：:]*\s*([\d.]+)\s*%',
-        r'年利[：:]*\s*([\d.]+)\s*%',
-        r'利率[：:]*\s*([\d.]+)\s*%',
-        r'([\d.]+)\s*%[^\d]*年利',
-        r'([\d.]+)\s*%[^\d]*利息',
-    ]
-    
-    for pattern in interest_patterns:
-        match = re.search(pattern, text)
-        if match:
-            try:
-                value = Decimal(match.group(1))
-                parsed_data['interest_rate'] = float(value)
-                break
-            except (ValueError, InvalidOperation):
-                continue
-    
-    # 月返済額の抽出
-    monthly_repayment_patterns = [
-        r'月返済[額]*[：:]*\s*([\d,]+)\s*[千万億]*円',
-        r'返済額[：:]*\s*([\d,]+)\s*[千万億]*円',
-        r'([\d,]+)\s*[千万億]*円[^\d]*月返済',
-        r'([\d,]+)\s*[千万億]*円[^\d]*返済額',
-    ]
-    
-    for pattern in monthly_repayment_patterns:
-        match = re.search(pattern, text)
-        if match:
-            try:
-                value_str = match.group(1).replace(',', '').replace('，', '')
-                # 千万億の単位を処理
-                multiplier = 1
-                if '千万' in text[match.start():match.end()+20]:
-                    multiplier = 10000000
-                elif '万' in text[match.start():match.end()+20]:
-                    multiplier = 10000
-                elif '億' in text[match.start():match.end()+20]:
-                    multiplier = 100000000
-                elif '千' in text[match.start():match.end()+20]:
-                    multiplier = 1000
-                
-                value = int(Decimal(value_str) * multiplier)
-                parsed_data['monthly_repayment'] = value
-                break
-            except (ValueError, InvalidOperation):
-                continue
-    
-    # 経営者保証の有無
-    if re.search(r'経営者保証|代表者保証|個人保証', text):
-        parsed_data['is_securedby_management'] = True
-    elif re.search(r'経営者保証なし|代表者保証なし|個人保証なし', text):
-        parsed_data['is_securedby_management'] = False
-    
-    # 担保の有無
-    if re.search(r'担保[あり有]|抵当権|質権', text):
-        parsed_data['is_collateraled'] = True
-    elif re.search(r'担保なし|無担保', text):
-        parsed_data['is_collateraled'] = False
-    
-    return parsed_data
-
+    return parse_loan_contract(text)
@@ -0,0 +1,204 @@
+"""
+OCR結果のキャッシュ
+
+同じファイルを再処理（OCR読み込みのリトライ、ストレージからの再読み込み）する際に、
+PDFのラスタライズとVision APIの呼び出しを省略するため、
+ファイル内容のSHA-256とOCRバックエンドのバージョンをキーにしてOCRテキストとパース結果を保存する。
+PDFの場合はページ画像ごとのハッシュでも保存し、一部のページだけ異なるファイルでも再利用する。
+"""
+import hashlib
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils.dateparse import parse_date
+
+from ..models import OcrPageResult, OcrResult, UploadedDocument
+
+logger = logging.getLogger(__name__)
+
+# OCRの実装（前処理・API・言語ヒント）を変更した場合はこの値を上げて、古いキャッシュを無効化する
+OCR_BACKEND_VERSION = 'google-vision-1'
+
+# パーサーの実装を変更した場合はこの値を上げて、保存済みのパース結果を無効化する
+PARSER_VERSION = '2'
+
+
+def compute_content_hash(content: bytes) -> str:
+    """バイト列のSHA-256（16進数）を返す"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def get_backend_version(use_document_detection: bool = True, preprocess: bool = True) -> str:
+    """
+    OCRオプションを含めたバックエンドバージョン文字列を返す
+
+    オプションが異なると抽出結果も異なるため、キャッシュキーに含める。
+    """
+    detection = 'document' if use_document_detection else 'text'
+    preprocessing = 'pre' if preprocess else 'raw'
+    return f"{OCR_BACKEND_VERSION}:{detection}:{preprocessing}"
+
+
+class OcrPageCache:
+    """ページ画像ハッシュ単位のOCRキャッシュ（extract_text_from_pdfのpage_cacheに渡す）"""
+
+    def __init__(self, backend_version: str):
+        self.backend_version = backend_version
+        self.page_hashes = []
+
+    def get(self, img_content: bytes) -> Optional[str]:
+        """キャッシュ済みのテキストを返す。未登録の場合はNone"""
+        image_hash = compute_content_hash(img_content)
+        self.page_hashes.append(image_hash)
+        return OcrPageResult.objects.filter(
+            image_hash=image_hash,
+            backend_version=self.backend_version
+        ).values_list('text', flat=True).first()
+
+    def set(self, img_content: bytes, text: str) -> None:
+        """ページのOCR結果を保存"""
+        OcrPageResult.objects.get_or_create(
+            image_hash=compute_content_hash(img_content),
+            backend_version=self.backend_version,
+            defaults={'text': text}
+        )
+
+
+def get_cached_ocr_result(content_hash: str, backend_version: str) -> Optional[OcrResult]:
+    """ファイルハッシュに対応するOCR結果を取得（ヒット時は利用回数を更新）"""
+    ocr_result = OcrResult.objects.filter(
+        content_hash=content_hash,
+        backend_version=backend_version
+    ).first()
+    if ocr_result:
+        OcrResult.objects.filter(pk=ocr_result.pk).update(hit_count=F('hit_count') + 1)
+        logger.info(f"OCR cache hit: {content_hash[:12]} ({backend_version})")
+    return ocr_result
+
+
+def extract_text_cached(
+    file_obj,
+    file_type: str,
+    use_document_detection: bool = True,
+    preprocess: bool = True
+) -> Tuple[Optional[str], Optional[OcrResult]]:
+    """
+    キャッシュを利用してファイルからテキストを抽出
+
+    Args:
+        file_obj: アップロードされたファイル（またはBytesIO）
+        file_type: 'pdf' または 'image'
+        use_document_detection: Document Text Detection APIを使用するか
+        preprocess: 画像の前処理を実行するか
+
+    Returns:
+        (抽出されたテキスト, OcrResult) のタプル。抽出に失敗した場合は (None, None)
+    """
+    from .ocr import extract_text_from_image, extract_text_from_pdf
+
+    file_obj.seek(0)
+    content = file_obj.read()
+    file_obj.seek(0)
+
+    content_hash = compute_content_hash(content)
+    backend_version = get_backend_version(use_document_detection, preprocess)
+
+    ocr_result = get_cached_ocr_result(content_hash, backend_version)
+    if ocr_result:
+        return ocr_result.extracted_text, ocr_result
+
+    page_hashes = []
+    if file_type == 'pdf':
+        page_cache = OcrPageCache(backend_version)
+        extracted_text = extract_text_from_pdf(
+            file_obj,
+            use_document_detection=use_document_detection,
+            preprocess=preprocess,
+            page_cache=page_cache
+        )
+        page_hashes = page_cache.page_hashes
+    else:
+        extracted_text = extract_text_from_image(
+            file_obj,
+            use_document_detection=use_document_detection,
+            preprocess=preprocess
+        )
+
+    if not extracted_text:
+        return None, None
+
+    try:
+        ocr_result, _ = OcrResult.objects.get_or_create(
+            content_hash=content_hash,
+            backend_version=backend_version,
+            defaults={
+                'file_type': file_type,
+                'page_hashes': page_hashes,
+                'extracted_text': extracted_text,
+            }
+        )
+    except IntegrityError:
+        # 同じファイルを並行して処理した場合
+        ocr_result = OcrResult.objects.get(content_hash=content_hash, backend_version=backend_version)
+
+    return extracted_text, ocr_result
+
+
+def _restore_dates(parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+    """JSONから復元したパース結果の日付フィールド（*_date）をdateに戻す"""
+    restored = dict(parsed_data)
+    for key, value in parsed_data.items():
+        if key.endswith('_date') and isinstance(value, str):
+            restored[key] = parse_date(value)
+    return restored
+
+
+def get_or_parse(
+    ocr_result: Optional[OcrResult],
+    parser_name: str,
+    parse_func: Callable[[str], Dict[str, Any]],
+    text: str
+) -> Dict[str, Any]:
+    """
+    OCR結果に保存済みのパース結果を返す。未保存の場合はパースして保存する
+
+    Args:
+        ocr_result: OcrResult（Noneの場合はキャッシュせずにパースのみ行う）
+        parser_name: パーサー名（例: 'financial_statement', 'loan_contract'）
+        parse_func: テキストを受け取りパース結果の辞書を返す関数
+        text: OCRで抽出したテキスト
+
+    Returns:
+        パース結果の辞書（呼び出し側で変更してもキャッシュには影響しない）
+    """
+    if ocr_result is None:
+        return parse_func(text)
+
+    cache_key = f"{parser_name}:{PARSER_VERSION}"
+    cached = (ocr_result.parsed_results or {}).get(cache_key)
+    if cached is not None:
+        return _restore_dates(cached)
+
+    parsed_data = parse_func(text)
+    parsed_results = dict(ocr_result.parsed_results or {})
+    parsed_results[cache_key] = parsed_data
+    ocr_result.parsed_results = parsed_results
+    ocr_result.save(update_fields=['parsed_results', 'last_used_at'])
+    return dict(parsed_data)
+
+
+def link_uploaded_document(uploaded_doc: Optional[UploadedDocument], ocr_result: Optional[OcrResult]) -> None:
+    """UploadedDocumentにOCR結果を紐付け、OCR処理済みにする"""
+    if not uploaded_doc or not ocr_result:
+        return
+    if uploaded_doc.ocr_result_id == ocr_result.pk and uploaded_doc.is_ocr_processed:
+        return
+
+    from django.utils import timezone
+
+    uploaded_doc.ocr_result = ocr_result
+    uploaded_doc.is_ocr_processed = True
+    uploaded_doc.ocr_processed_at = timezone.now()
+    uploaded_doc.save(update_fields=['ocr_result', 'is_ocr_processed', 'ocr_processed_at', 'updated_at'])
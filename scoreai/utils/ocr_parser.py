@@ -0,0 +1,606 @@
+"""
+OCRテキストのパーサーエンジン（決算書・金銭消費貸借契約書）
+
+正規表現はモジュール読み込み時に一度だけコンパイルする。
+決算書は勘定科目ラベル → FiscalSummary_Yearフィールドの対応表（FIELD_MAPPINGS）から
+セクション（BS/PL/販管費）ごとに1本の選択（alternation）パターンを生成し、
+セクションのテキストを1回走査するだけで全項目を抽出する。
+抽出した各項目には信頼度（0.0〜1.0）を付与する。
+"""
+import re
+import unicodedata
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# ========================================
+# テキストの正規化
+# ========================================
+
+# NFKCで変換されない記号の補正（マイナス記号、三角記号など）
+_EXTRA_TRANSLATION = str.maketrans({
+    '−': '-',  # −（MINUS SIGN）
+    '‐': '-',  # ‐
+    '–': '-',  # –
+})
+
+
+def normalize_ocr_text(text: str) -> str:
+    """
+    OCRテキストを正規化（全角英数字・記号を半角に統一）
+
+    全角数字（１２３）、全角カンマ（，）、全角コロン（：）、全角括弧などを
+    NFKC正規化で半角に揃え、パターンを1種類で済ませる。
+    """
+    if not text:
+        return ''
+    return unicodedata.normalize('NFKC', text).translate(_EXTRA_TRANSLATION)
+
+
+# ========================================
+# 決算書：勘定科目の対応表
+# ========================================
+
+SECTION_BS = 'BS'
+SECTION_PL = 'PL'
+SECTION_SGA = 'SGA'
+
+
+@dataclass(frozen=True)
+class FieldMapping:
+    """勘定科目ラベルとFiscalSummary_Yearフィールドの対応"""
+    field: Optional[str]  # Noneの場合は誤検出防止用のラベル（値は使用しない）
+    section: str
+    labels: Tuple[str, ...]  # 先頭が正式名称、以降は同義語
+    negative_labels: Tuple[str, ...] = ()  # 「営業損失」など、値の符号を反転するラベル
+    weak_labels: Tuple[str, ...] = ()  # 他の科目と混同しやすい略称（信頼度を下げる）
+    combine: str = 'first'  # 'first': 最初の値を採用 / 'sum': ラベルごとの値を合算
+    force_negative: bool = False  # 常にマイナスで保存する項目（減価償却累計額など）
+
+
+FIELD_MAPPINGS: Tuple[FieldMapping, ...] = (
+    # ---------- 貸借対照表 ----------
+    FieldMapping('cash_and_deposits', SECTION_BS, ('現金及び預金', '現金預金', '現金・預金')),
+    FieldMapping('accounts_receivable', SECTION_BS, ('売上債権', '受取手形及び売掛金', '売掛金')),
+    FieldMapping('inventory', SECTION_BS, ('棚卸資産', '商品及び製品'), weak_labels=('商品', '製品')),
+    FieldMapping('short_term_loans_receivable', SECTION_BS, ('短期貸付金',)),
+    FieldMapping('total_current_assets', SECTION_BS, ('流動資産合計', '流動資産計')),
+    FieldMapping('land', SECTION_BS, ('土地',)),
+    FieldMapping('buildings', SECTION_BS, ('建物及び附属設備', '建物附属設備'), weak_labels=('建物',)),
+    FieldMapping('machinery_equipment', SECTION_BS, ('機械及び装置', '機械装置')),
+    FieldMapping('vehicles', SECTION_BS, ('車両運搬具',)),
+    FieldMapping('accumulated_depreciation', SECTION_BS, ('減価償却累計額',), force_negative=True),
+    FieldMapping('total_tangible_fixed_assets', SECTION_BS, ('有形固定資産合計', '有形固定資産計')),
+    FieldMapping('goodwill', SECTION_BS, ('のれん',)),
+    FieldMapping('total_intangible_assets', SECTION_BS, ('無形固定資産合計', '無形固定資産計')),
+    FieldMapping('long_term_loans_receivable', SECTION_BS, ('長期貸付金',)),
+    FieldMapping('investment_other_assets', SECTION_BS, ('投資その他の資産合計', '投資その他の資産')),
+    FieldMapping('deferred_assets', SECTION_BS, ('繰延資産合計', '繰延資産')),
+    FieldMapping('total_fixed_assets', SECTION_BS, ('固定資産合計', '固定資産計')),
+    FieldMapping('total_assets', SECTION_BS, ('資産の部合計', '資産合計', '総資産')),
+    FieldMapping('accounts_payable', SECTION_BS, ('仕入債務', '支払手形及び買掛金', '買掛金')),
+    FieldMapping('short_term_loans_payable', SECTION_BS, ('短期借入金',)),
+    FieldMapping('total_current_liabilities', SECTION_BS, ('流動負債合計', '流動負債計')),
+    FieldMapping('long_term_loans_payable', SECTION_BS, ('長期借入金',)),
+    FieldMapping('total_long_term_liabilities', SECTION_BS, ('固定負債合計', '固定負債計')),
+    FieldMapping('total_liabilities', SECTION_BS, ('負債の部合計', '負債合計')),
+    FieldMapping('capital_stock', SECTION_BS, ('資本金',)),
+    FieldMapping('capital_surplus', SECTION_BS, ('資本剰余金合計', '資本剰余金')),
+    FieldMapping('retained_earnings', SECTION_BS, ('利益剰余金合計', '利益剰余金')),
+    FieldMapping('total_stakeholder_equity', SECTION_BS, ('株主資本合計',)),
+    FieldMapping(
+        'valuation_and_translation_adjustment', SECTION_BS,
+        ('評価・換算差額等合計', '評価・換算差額等', '評価換算差額等')
+    ),
+    FieldMapping('new_shares_reserve', SECTION_BS, ('新株予約権',)),
+    FieldMapping('total_net_assets', SECTION_BS, ('純資産の部合計', '純資産合計')),
+    # 「純資産合計」「負債合計」を含む合計行の誤検出防止
+    FieldMapping(None, SECTION_BS, (
+        '負債及び純資産の部合計', '負債及び純資産合計', '負債・純資産合計', '負債純資産合計',
+    )),
+
+    # ---------- 損益計算書 ----------
+    FieldMapping('sales', SECTION_PL, ('売上高', '売上高合計', '純売上高', '売上収益', '営業収益'), weak_labels=('売上',)),
+    FieldMapping('gross_profit', SECTION_PL, ('売上総利益', '粗利益'), negative_labels=('売上総損失',)),
+    FieldMapping('operating_profit', SECTION_PL, ('営業利益',), negative_labels=('営業損失',)),
+    FieldMapping('other_income', SECTION_PL, ('営業外収益合計', '営業外収益')),
+    FieldMapping('interest_expense', SECTION_PL, ('支払利息', '支払利息割引料')),
+    FieldMapping('other_loss', SECTION_PL, ('営業外費用合計', '営業外費用')),
+    FieldMapping('ordinary_profit', SECTION_PL, ('経常利益',), negative_labels=('経常損失',)),
+    FieldMapping('extraordinary_income', SECTION_PL, ('特別利益合計', '特別利益')),
+    FieldMapping('extraordinary_loss', SECTION_PL, ('特別損失合計', '特別損失')),
+    FieldMapping('income_taxes', SECTION_PL, ('法人税、住民税及び事業税', '法人税住民税及び事業税', '法人税等')),
+    FieldMapping(
+        'net_profit', SECTION_PL, ('当期純利益',),
+        negative_labels=('当期純損失',), weak_labels=('純利益',)
+    ),
+    # 「売上」「当期純利益」を含む別科目の誤検出防止
+    FieldMapping(None, SECTION_PL, (
+        '売上原価', '売上値引', '税引前当期純利益', '税引前当期純損失', '販売費及び一般管理費',
+    )),
+
+    # ---------- 販売費及び一般管理費 ----------
+    FieldMapping('directors_compensation', SECTION_SGA, ('役員報酬',)),
+    FieldMapping('payroll_expense', SECTION_SGA, ('給料手当', '給与手当', '給料及び手当', '雑給'), combine='sum'),
+    FieldMapping('depreciation_expense', SECTION_SGA, ('減価償却費',)),
+)
+
+# 金額の単位（FiscalSummary_Yearは千円単位）
+_UNIT_DIVISORS = {
+    '円': Decimal(1000),
+    '千円': Decimal(1),
+    '百万円': Decimal('0.001'),
+}
+
+_UNIT_RE = re.compile(r'単位\s*[:：]?\s*(百万円|千円|円)')
+_YEAR_PATTERNS = (
+    (re.compile(r'令和\s*(\d+)\s*年'), True),
+    (re.compile(r'(\d{4})\s*年'), False),
+    (re.compile(r'R\s*(\d+)\s*年'), True),  # R6年形式
+)
+
+# ラベルと金額の間に入りうる区切り（空白、コロン、リーダー）。改行は1回まで許容する
+_SEPARATOR = r'[^\S\n]*(?:[:…‥\.・]+[^\S\n]*)?(?P<newline>\n[^\S\n]*)?'
+_AMOUNT = r'(?P<amount>[△▲\-]?[^\S\n]*\d[\d,]*|\(\d[\d,]*\))'
+_TRAILING_AMOUNT_RE = re.compile(r'[^\S\n]+[△▲\-]?\d[\d,]*')
+
+
+def _spaced(label: str) -> str:
+    """OCRで文字間に空白が入っても一致するパターンに変換（例: 売 上 高）"""
+    return r'[^\S\n]*'.join(re.escape(char) for char in label)
+
+
+def _compact(label: str) -> str:
+    return re.sub(r'\s+', '', label)
+
+
+def _build_section_patterns():
+    """セクションごとの選択パターンとラベル索引を構築"""
+    patterns = {}
+    label_index = {}
+    for section in (SECTION_BS, SECTION_PL, SECTION_SGA):
+        labels = []
+        for mapping in FIELD_MAPPINGS:
+            if mapping.section != section:
+                continue
+            for position, label in enumerate(mapping.labels):
+                weight = 1.0 if position == 0 else 0.9
+                label_index[(section, label)] = (mapping, weight, 1)
+                labels.append(label)
+            for label in mapping.negative_labels:
+                label_index[(section, label)] = (mapping, 0.9, -1)
+                labels.append(label)
+            for label in mapping.weak_labels:
+                label_index[(section, label)] = (mapping, 0.6, 1)
+                labels.append(label)
+        # 長いラベルを優先（「売上高」を「売上」より先に試す）
+        labels.sort(key=len, reverse=True)
+        alternation = '|'.join(_spaced(label) for label in labels)
+        patterns[section] = re.compile(f'(?P<label>{alternation}){_SEPARATOR}{_AMOUNT}')
+    return patterns, label_index
+
+
+_SECTION_PATTERNS, _LABEL_INDEX = _build_section_patterns()
+
+# セクション見出し（「貸 借 対 照 表」のような字間の空白も許容）
+_SECTION_HEADER_RE = re.compile(
+    f'(?P<{SECTION_BS}>{_spaced("貸借対照表")})'
+    f'|(?P<{SECTION_SGA}>{_spaced("販売費及び一般管理費")}(?:の)?(?:内訳|明細))'
+    f'|(?P<{SECTION_PL}>{_spaced("損益計算書")})'
+)
+
+#: OCRで抽出できるFiscalSummary_Yearのフィールド名（保存処理で使用）
+FISCAL_SUMMARY_FIELDS: Tuple[str, ...] = tuple(
+    mapping.field for mapping in FIELD_MAPPINGS if mapping.field
+)
+
+
+# ========================================
+# 決算書のパース
+# ========================================
+
+def _parse_amount(raw: str) -> Optional[Decimal]:
+    """金額文字列（△1,234 / (1,234) / -1,234）をDecimalに変換"""
+    value = re.sub(r'[\s,]', '', raw)
+    negative = False
+    if value.startswith(('△', '▲', '-')):
+        negative = True
+        value = value[1:]
+    elif value.startswith('(') and value.endswith(')'):
+        negative = True
+        value = value[1:-1]
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        return None
+    return -amount if negative else amount
+
+
+def detect_sections(text: str) -> Dict[str, List[Tuple[int, int]]]:
+    """
+    セクション見出し（貸借対照表・損益計算書・販管費内訳）からセクションの範囲を検出
+
+    Returns:
+        {セクション: [(開始位置, 終了位置), ...]}。見出しがない場合は空の辞書
+    """
+    headers = []
+    for match in _SECTION_HEADER_RE.finditer(text):
+        headers.append((match.start(), match.lastgroup))
+    sections: Dict[str, List[Tuple[int, int]]] = {}
+    for index, (start, section) in enumerate(headers):
+        end = headers[index + 1][0] if index + 1 < len(headers) else len(text)
+        sections.setdefault(section, []).append((start, end))
+    return sections
+
+
+def detect_unit(text: str) -> str:
+    """金額の単位を検出（検出できない場合は円）"""
+    match = _UNIT_RE.search(text)
+    return match.group(1) if match else '円'
+
+
+def extract_year(text: str) -> Optional[int]:
+    """年度（西暦）を抽出"""
+    for pattern, is_reiwa in _YEAR_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            year = int(match.group(1))
+            return 2018 + year if is_reiwa else year
+    return None
+
+
+def _scan_section(section: str, text: str, spans, candidates, in_section: bool) -> None:
+    """セクションの範囲を1回走査し、各フィールドの候補を収集"""
+    pattern = _SECTION_PATTERNS[section]
+    for start, end in spans:
+        for match in pattern.finditer(text, start, end):
+            mapping, weight, sign = _LABEL_INDEX[(section, _compact(match.group('label')))]
+            if mapping.field is None:
+                continue
+            amount = _parse_amount(match.group('amount'))
+            if amount is None:
+                continue
+            confidence = weight
+            if match.group('newline'):
+                # ラベルと金額が別の行
+                confidence *= 0.85
+            if _TRAILING_AMOUNT_RE.match(text, match.end()):
+                # 同じ行に複数の金額（前期・当期の併記など）
+                confidence *= 0.8
+            if not in_section:
+                confidence *= 0.8
+            if sign < 0:
+                # 「営業損失 △1,230」「営業損失 1,230」はどちらもマイナス
+                amount = -abs(amount)
+            candidates.setdefault(mapping.field, []).append(
+                (_compact(match.group('label')), amount, confidence)
+            )
+
+
+def _resolve_candidates(mapping: FieldMapping, candidates) -> Tuple[Decimal, float]:
+    """候補から値と信頼度を決定"""
+    if mapping.combine == 'sum':
+        # ラベルごとに最初の値を合算
+        per_label = {}
+        for label, amount, confidence in candidates:
+            per_label.setdefault(label, (amount, confidence))
+        total = sum(amount for amount, _ in per_label.values())
+        confidence = min(confidence for _, confidence in per_label.values())
+        return total, confidence
+
+    # 信頼度が最も高い候補（同点の場合は先に出現したもの）
+    label, amount, confidence = max(candidates, key=lambda candidate: candidate[2])
+    if len({candidate[1] for candidate in candidates}) > 1:
+        # 異なる値が複数見つかった
+        confidence *= 0.7
+    return amount, confidence
+
+
+_BALANCE_SHEET_FIELDS = ('total_assets', 'total_liabilities', 'total_net_assets')
+
+
+def _balance_sheet_mismatch(values: Dict[str, Any]) -> bool:
+    """資産合計 = 負債合計 + 純資産合計 が（1%の誤差を超えて）成り立たない場合True"""
+    total_assets, total_liabilities, total_net_assets = (values.get(field) for field in _BALANCE_SHEET_FIELDS)
+    if None in (total_assets, total_liabilities, total_net_assets):
+        return False
+    return abs(total_assets - (total_liabilities + total_net_assets)) > max(abs(total_assets) * 0.01, 1)
+
+
+def _apply_consistency_checks(values: Dict[str, int], confidence: Dict[str, float]) -> None:
+    """会計上の関係が成り立たない項目の信頼度を下げる"""
+    def penalize(*fields):
+        for field in fields:
+            if field in confidence:
+                confidence[field] = round(confidence[field] * 0.7, 2)
+
+    if _balance_sheet_mismatch(values):
+        penalize(*_BALANCE_SHEET_FIELDS)
+
+    sales = values.get('sales')
+    gross_profit = values.get('gross_profit')
+    if sales is not None and gross_profit is not None and gross_profit > sales:
+        penalize('sales', 'gross_profit')
+
+
+def reconcile_balance_sheet(
+    values: Dict[str, Any],
+    confidence: Dict[str, float],
+    uncertain_fields: List[str]
+) -> List[str]:
+    """
+    推定値（AIでの補完など）を含む貸借対照表の合計を検証
+
+    資産合計 = 負債合計 + 純資産合計 が成り立たず、推定値が関係している場合は、
+    推定値を他の2項目からの計算値に置き換える（推定値が1項目の場合）。
+    置き換えられない場合は、採用しない推定値のフィールド名を返す。
+
+    Args:
+        values: パース結果（計算値で更新される）
+        confidence: 項目ごとの信頼度（計算値で更新される）
+        uncertain_fields: 推定値のフィールド名
+
+    Returns:
+        採用しない推定値のフィールド名のリスト
+    """
+    if not _balance_sheet_mismatch(values):
+        return []
+
+    uncertain = [field for field in _BALANCE_SHEET_FIELDS if field in uncertain_fields]
+    if len(uncertain) != 1:
+        return uncertain
+
+    field = uncertain[0]
+    if field == 'total_assets':
+        values[field] = values['total_liabilities'] + values['total_net_assets']
+    elif field == 'total_liabilities':
+        values[field] = values['total_assets'] - values['total_net_assets']
+    else:
+        values[field] = values['total_assets'] - values['total_liabilities']
+    confidence[field] = min(
+        confidence.get(other, 1.0) for other in _BALANCE_SHEET_FIELDS if other != field
+    )
+    return []
+
+
+def parse_financial_statement(text: str) -> Dict[str, Any]:
+    """
+    決算書のOCRテキストをパース
+
+    Args:
+        text: OCRで抽出したテキスト
+
+    Returns:
+        パース結果の辞書。金額は千円単位。
+        'confidence' に {フィールド名: 信頼度} 、'unit' に検出した単位を含む
+    """
+    text = normalize_ocr_text(text)
+    parsed_data: Dict[str, Any] = {
+        'year': extract_year(text),
+        'sales': None,
+        'gross_profit': None,
+        'operating_profit': None,
+        'ordinary_profit': None,
+        'net_profit': None,
+    }
+
+    unit = detect_unit(text)
+    divisor = _UNIT_DIVISORS[unit]
+    sections = detect_sections(text)
+    whole_text = [(0, len(text))]
+
+    candidates: Dict[str, list] = {}
+    for section in (SECTION_BS, SECTION_PL, SECTION_SGA):
+        if section in sections:
+            _scan_section(section, text, sections[section], candidates, in_section=True)
+    # セクション内で見つからなかった項目は全文から探す
+    missing_sections = {
+        mapping.section for mapping in FIELD_MAPPINGS
+        if mapping.field and mapping.field not in candidates
+    }
+    for section in (SECTION_BS, SECTION_PL, SECTION_SGA):
+        if section not in missing_sections:
+            continue
+        fallback_candidates: Dict[str, list] = {}
+        # 見出しがない文書（表の一部だけのOCRなど）はペナルティを小さくする
+        _scan_section(section, text, whole_text, fallback_candidates, in_section=not sections)
+        for field, field_candidates in fallback_candidates.items():
+            candidates.setdefault(field, field_candidates)
+
+    values: Dict[str, int] = {}
+    confidence: Dict[str, float] = {}
+    for mapping in FIELD_MAPPINGS:
+        if not mapping.field or mapping.field not in candidates:
+            continue
+        amount, score = _resolve_candidates(mapping, candidates[mapping.field])
+        value = int(amount // divisor) if divisor != 1 else int(amount)
+        if mapping.force_negative and value > 0:
+            value = -value
+        values[mapping.field] = value
+        confidence[mapping.field] = round(score, 2)
+
+    _apply_consistency_checks(values, confidence)
+
+    parsed_data.update(values)
+    if parsed_data['year'] is not None:
+        confidence['year'] = 1.0
+    parsed_data['confidence'] = confidence
+    parsed_data['unit'] = unit
+    return parsed_data
+
+
+# ========================================
+# 金銭消費貸借契約書のパース
+# ========================================
+
+_FINANCIAL_INSTITUTION_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'(三菱UFJ銀行|三井住友銀行|みずほ銀行|りそな銀行|横浜銀行|静岡銀行|千葉銀行|きらぼし銀行)',
+    r'(株式会社\s*[^\s]+銀行)',
+    r'([^\s:]+銀行)',
+    r'([^\s:]+信用金庫)',
+    r'([^\s:]+信用組合)',
+    # 名称の前に空白がなく種別だけが読み取れた場合
+    r'(地方銀行|信用金庫|信用組合|労働金庫)',
+))
+_PRINCIPAL_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'借入[金元本]*[:]*\s*([\d,]+)\s*[千万億]*円',
+    r'元本[:]*\s*([\d,]+)\s*[千万億]*円',
+    r'金額[:]*\s*([\d,]+)\s*[千万億]*円',
+    r'([\d,]+)\s*[千万億]*円[^\d]*借入',
+    r'([\d,]+)\s*[千万億]*円[^\d]*元本',
+))
+# (パターン, 令和表記か)
+_ISSUE_DATE_PATTERNS = (
+    (re.compile(r'実行日[:]*\s*(\d{4})[年/\-](\d{1,2})[月/\-](\d{1,2})日?'), False),
+    (re.compile(r'契約日[:]*\s*(\d{4})[年/\-](\d{1,2})[月/\-](\d{1,2})日?'), False),
+    (re.compile(r'(\d{4})[年/\-](\d{1,2})[月/\-](\d{1,2})日?[^\d]*実行'), False),
+    (re.compile(r'令和(\d+)年(\d{1,2})月(\d{1,2})日[^\d]*実行'), True),
+)
+_START_DATE_PATTERNS = (
+    (re.compile(r'返済開始日[:]*\s*(\d{4})[年/\-](\d{1,2})[月/\-](\d{1,2})日?'), False),
+    (re.compile(r'(\d{4})[年/\-](\d{1,2})[月/\-](\d{1,2})日?[^\d]*返済開始'), False),
+    (re.compile(r'令和(\d+)年(\d{1,2})月(\d{1,2})日[^\d]*返済開始'), True),
+)
+_INTEREST_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'利息[:]*\s*(?:年\s*)?([\d.]+)\s*%',
+    r'年利[:]*\s*([\d.]+)\s*%',
+    r'利率[:]*\s*(?:年\s*)?([\d.]+)\s*%',
+    r'([\d.]+)\s*%[^\d]*年利',
+    r'([\d.]+)\s*%[^\d]*利息',
+))
+_MONTHLY_REPAYMENT_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'月返済[額]*[:]*\s*([\d,]+)\s*[千万億]*円',
+    r'返済額[:]*\s*([\d,]+)\s*[千万億]*円',
+    r'([\d,]+)\s*[千万億]*円[^\d]*月返済',
+    r'([\d,]+)\s*[千万億]*円[^\d]*返済額',
+))
+_NO_MANAGEMENT_GUARANTEE_RE = re.compile(r'(?:経営者|代表者|個人)保証(?:なし|無し|不要)')
+_MANAGEMENT_GUARANTEE_RE = re.compile(r'経営者保証|代表者保証|個人保証')
+_NO_COLLATERAL_RE = re.compile(r'担保なし|無担保')
+_COLLATERAL_RE = re.compile(r'担保[あり有]|抵当権|質権')
+
+
+def _pattern_confidence(rank: int) -> float:
+    """優先度の高いパターン（明示的なラベル付き）ほど信頼度を高くする"""
+    return round(max(1.0 - 0.15 * rank, 0.4), 2)
+
+
+def _unit_multiplier(text: str, start: int, end: int) -> int:
+    """金額の直後にある単位（千万・万・億・千）から倍率を判定"""
+    window = text[start:end + 20]
+    if '千万' in window:
+        return 10000000
+    if '万' in window:
+        return 10000
+    if '億' in window:
+        return 100000000
+    if '千' in window:
+        return 1000
+    return 1
+
+
+def _search_amount(text: str, patterns) -> Tuple[Optional[int], Optional[float]]:
+    for rank, pattern in enumerate(patterns):
+        match = pattern.search(text)
+        if not match:
+            continue
+        try:
+            value = Decimal(match.group(1).replace(',', ''))
+        except InvalidOperation:
+            continue
+        return int(value * _unit_multiplier(text, match.start(), match.end())), _pattern_confidence(rank)
+    return None, None
+
+
+def _search_date(text: str, patterns) -> Tuple[Optional[date], Optional[float]]:
+    for rank, (pattern, is_reiwa) in enumerate(patterns):
+        match = pattern.search(text)
+        if not match:
+            continue
+        try:
+            year = int(match.group(1))
+            if is_reiwa:
+                year += 2018
+            return date(year, int(match.group(2)), int(match.group(3))), _pattern_confidence(rank)
+        except (ValueError, IndexError):
+            continue
+    return None, None
+
+
+def parse_loan_contract(text: str) -> Dict[str, Any]:
+    """
+    金銭消費貸借契約書のOCRテキストをパース
+
+    Args:
+        text: OCRで抽出したテキスト
+
+    Returns:
+        パース結果の辞書。'confidence' に {フィールド名: 信頼度} を含む
+    """
+    text = normalize_ocr_text(text)
+    parsed_data: Dict[str, Any] = {
+        'financial_institution_name': None,
+        'principal': None,  # 借入元本（円）
+        'issue_date': None,  # 実行日
+        'start_date': None,  # 返済開始日
+        'interest_rate': None,  # 利息（%）
+        'monthly_repayment': None,  # 月返済額（円）
+        'is_securedby_management': None,  # 経営者保証
+        'is_collateraled': None,  # 担保
+    }
+    confidence: Dict[str, float] = {}
+
+    for rank, pattern in enumerate(_FINANCIAL_INSTITUTION_PATTERNS):
+        match = pattern.search(text)
+        if match:
+            parsed_data['financial_institution_name'] = match.group(1).strip()
+            confidence['financial_institution_name'] = _pattern_confidence(rank)
+            break
+
+    for field, patterns in (
+        ('principal', _PRINCIPAL_PATTERNS),
+        ('monthly_repayment', _MONTHLY_REPAYMENT_PATTERNS),
+    ):
+        value, score = _search_amount(text, patterns)
+        if value is not None:
+            parsed_data[field] = value
+            confidence[field] = score
+
+    for field, patterns in (
+        ('issue_date', _ISSUE_DATE_PATTERNS),
+        ('start_date', _START_DATE_PATTERNS),
+    ):
+        value, score = _search_date(text, patterns)
+        if value is not None:
+            parsed_data[field] = value
+            confidence[field] = score
+
+    for rank, pattern in enumerate(_INTEREST_PATTERNS):
+        match = pattern.search(text)
+        if match:
+            try:
+                parsed_data['interest_rate'] = float(Decimal(match.group(1)))
+                confidence['interest_rate'] = _pattern_confidence(rank)
+                break
+            except InvalidOperation:
+                continue
+
+    # 「保証なし」「無担保」を先に判定する（「経営者保証なし」は「経営者保証」にも一致するため）
+    if _NO_MANAGEMENT_GUARANTEE_RE.search(text):
+        parsed_data['is_securedby_management'] = False
+    elif _MANAGEMENT_GUARANTEE_RE.search(text):
+        parsed_data['is_securedby_management'] = True
+    if parsed_data['is_securedby_management'] is not None:
+        confidence['is_securedby_management'] = 0.7
+
+    if _NO_COLLATERAL_RE.search(text):
+        parsed_data['is_collateraled'] = False
+    elif _COLLATERAL_RE.search(text):
+        parsed_data['is_collateraled'] = True
+    if parsed_data['is_collateraled'] is not None:
+        confidence['is_collateraled'] = 0.7
+
+    parsed_data['confidence'] = confidence
+    return parsed_data
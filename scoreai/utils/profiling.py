@@ -0,0 +1,209 @@
+"""
+リクエスト単位のプロファイリング（SQL・外部API呼び出し・処理時間）
+
+settings.PROFILING_ENABLED = True の場合に RequestProfilingMiddleware が有効になり、
+リクエストごとに以下を記録する。
+- 処理時間（ミリ秒）
+- SQLの件数と合計時間
+- 同じSQL（パラメーターを除いた形）が複数回実行されたもの（N+1の検出用）
+- 外部API（Gemini、Vision、クラウドストレージ）の呼び出し回数と合計時間
+
+サンプルはローテーションするJSON Linesファイル（settings.PROFILING_DIR）に保存し、
+管理コマンド profiling_report で集計する。
+"""
+import contextvars
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# サンプルに記録する重複SQLの件数（多い順）
+MAX_DUPLICATE_FINGERPRINTS = 5
+# 重複SQLとして記録する最小の実行回数
+DUPLICATE_QUERY_THRESHOLD = 2
+# フィンガープリントの最大長
+MAX_FINGERPRINT_LENGTH = 300
+
+SAMPLE_FILENAME = 'requests.jsonl'
+
+_current_profile: contextvars.ContextVar = contextvars.ContextVar('scoreai_request_profile', default=None)
+
+_IN_LIST_PATTERN = re.compile(r'IN \((?:%s, )*%s\)')
+_LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def fingerprint_sql(sql: str) -> str:
+    """SQLからパラメーターやリテラルを除いた形（同じ形のSQLは同じ文字列になる）"""
+    sql = _IN_LIST_PATTERN.sub('IN (...)', sql)
+    sql = _LITERAL_PATTERN.sub('?', sql)
+    return _WHITESPACE_PATTERN.sub(' ', sql).strip()[:MAX_FINGERPRINT_LENGTH]
+
+
+class RequestProfile:
+    """1リクエスト分の計測値"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.fingerprints: Counter = Counter()
+        self.external_time: Dict[str, float] = {}
+        self.external_calls: Dict[str, int] = {}
+        self._external_depth = threading.local()
+        self._lock = threading.Lock()
+
+    def record_query(self, execute, sql, params, many, context):
+        """connection.execute_wrapper に渡すラッパー"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.sql_count += 1
+                self.sql_time += elapsed
+                self.fingerprints[fingerprint_sql(sql)] += 1
+
+    @contextmanager
+    def external(self, service: str) -> Iterator[None]:
+        """外部API呼び出しの時間を計測（同じサービスの入れ子の呼び出しは外側だけを計測）"""
+        depth = getattr(self._external_depth, service, 0)
+        setattr(self._external_depth, service, depth + 1)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            setattr(self._external_depth, service, depth)
+            if depth == 0:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self.external_time[service] = self.external_time.get(service, 0.0) + elapsed
+                    self.external_calls[service] = self.external_calls.get(service, 0) + 1
+
+    def to_sample(self, url_name: str, method: str, status_code: int) -> Dict:
+        wall_time = time.perf_counter() - self.started
+        duplicates = [
+            {'fingerprint': fingerprint, 'count': count}
+            for fingerprint, count in self.fingerprints.most_common(MAX_DUPLICATE_FINGERPRINTS)
+            if count >= DUPLICATE_QUERY_THRESHOLD
+        ]
+        return {
+            'ts': time.time(),
+            'url_name': url_name,
+            'method': method,
+            'status': status_code,
+            'wall_ms': round(wall_time * 1000, 1),
+            'sql_count': self.sql_count,
+            'sql_ms': round(self.sql_time * 1000, 1),
+            'duplicates': duplicates,
+            'external_ms': {service: round(elapsed * 1000, 1) for service, elapsed in self.external_time.items()},
+            'external_calls': dict(self.external_calls),
+        }
+
+
+def start_profile() -> contextvars.Token:
+    """現在のコンテキストで計測を開始"""
+    return _current_profile.set(RequestProfile())
+
+
+def get_current_profile() -> Optional[RequestProfile]:
+    return _current_profile.get()
+
+
+def end_profile(token: contextvars.Token) -> None:
+    _current_profile.reset(token)
+
+
+@contextmanager
+def external_call(service: str) -> Iterator[None]:
+    """
+    外部API呼び出しを計測するコンテキストマネージャー（計測中でない場合は何もしない）
+
+    スレッドプールで呼び出す場合は contextvars.copy_context().run で実行すると計測対象になる。
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    with profile.external(service):
+        yield
+
+
+def profile_external(service: str):
+    """外部API呼び出しを計測するデコレーター"""
+    def decorator(func):
+        @wraps(func)
+        def _wrapped(*args, **kwargs):
+            with external_call(service):
+                return func(*args, **kwargs)
+        return _wrapped
+    return decorator
+
+
+def get_profiling_dir() -> Path:
+    return Path(getattr(settings, 'PROFILING_DIR', Path(settings.BASE_DIR) / 'logs' / 'profiling'))
+
+
+_sample_handler: Optional[RotatingFileHandler] = None
+_sample_handler_lock = threading.Lock()
+
+
+def _get_sample_logger() -> logging.Logger:
+    """サンプルを書き込むロガー（ローテーションするファイルに1行1サンプルで出力）"""
+    global _sample_handler
+    sample_logger = logging.getLogger('scoreai.profiling.samples')
+    path = get_profiling_dir() / SAMPLE_FILENAME
+    with _sample_handler_lock:
+        if _sample_handler is None or _sample_handler.baseFilename != str(path.resolve()):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(
+                path,
+                maxBytes=getattr(settings, 'PROFILING_MAX_BYTES', 10 * 1024 * 1024),
+                backupCount=getattr(settings, 'PROFILING_BACKUP_COUNT', 5),
+                encoding='utf-8',
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            if _sample_handler is not None:
+                _sample_handler.close()
+            sample_logger.handlers = [handler]
+            sample_logger.setLevel(logging.INFO)
+            sample_logger.propagate = False
+            _sample_handler = handler
+    return sample_logger
+
+
+def write_sample(sample: Dict) -> None:
+    """サンプルを保存"""
+    try:
+        _get_sample_logger().info(json.dumps(sample, ensure_ascii=False))
+    except Exception as e:
+        logger.warning(f"Failed to write profiling sample: {e}")
+
+
+def read_samples(profiling_dir: Optional[Path] = None) -> List[Dict]:
+    """保存したサンプルを読み込む（ローテーション済みのファイルを含む）"""
+    profiling_dir = Path(profiling_dir or get_profiling_dir())
+    samples = []
+    for path in sorted(profiling_dir.glob(f'{SAMPLE_FILENAME}*')):
+        with open(path, encoding='utf-8') as sample_file:
+            for line in sample_file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    samples.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return samples
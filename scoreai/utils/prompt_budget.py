@@ -0,0 +1,185 @@
+"""
+プロンプトのトークン予算
+
+AIに送るデータをセクション（決算書・借入・月次推移など）に分けてトークン数を見積もり、
+プロンプト全体が予算（settings.AI_PROMPT_TOKEN_BUDGET）に収まるよう、
+関連度の低いセクションから要約版に置き換え、それでも収まらなければ省略する。
+
+使い方:
+    sections = [
+        PromptSection('fiscal_summary', fiscal_text, required=True),
+        PromptSection('debt_info', debt_text, summarize=lambda: serialize(summarize_debts_by_bank(debts))),
+    ]  # 関連度の高い順
+    result = fit_sections(sections, get_prompt_token_budget(), fixed_tokens=estimate_tokens(template))
+    result.texts['debt_info']  # 元のまま・要約版・省略のいずれか
+"""
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+
+from .gemini import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# プロンプト全体（システムプロンプトを含む）のトークン数の既定の上限
+DEFAULT_PROMPT_TOKEN_BUDGET = 8000
+
+# 省略したセクションの代わりに埋め込む文字列
+OMITTED_TEXT = '（データ量が多いため省略）'
+
+
+def get_prompt_token_budget() -> int:
+    """プロンプトのトークン数の上限"""
+    return getattr(settings, 'AI_PROMPT_TOKEN_BUDGET', DEFAULT_PROMPT_TOKEN_BUDGET)
+
+
+@dataclass
+class PromptSection:
+    """
+    プロンプトに埋め込むデータの1区画
+
+    Attributes:
+        name: セクション名（テンプレート変数名など）
+        text: 埋め込む文字列
+        summarize: 要約版の文字列を返す関数（予算を超えたときだけ呼ぶ）
+        required: Trueの場合は予算を超えても省略しない
+    """
+    name: str
+    text: str
+    summarize: Optional[Callable[[], str]] = None
+    required: bool = False
+
+
+@dataclass
+class PromptBudgetResult:
+    """fit_sections の結果（texts はセクション名 → 埋め込む文字列）"""
+    texts: Dict[str, str]
+    budget: int
+    tokens: int
+    summarized: List[str] = field(default_factory=list)
+    dropped: List[str] = field(default_factory=list)
+
+    @property
+    def is_over_budget(self) -> bool:
+        return self.tokens > self.budget
+
+    def as_dict(self) -> Dict[str, Any]:
+        """履歴（AIConsultationHistory.prompt_budget）に保存する形式"""
+        return {
+            'budget': self.budget,
+            'tokens': self.tokens,
+            'summarized': self.summarized,
+            'dropped': self.dropped,
+        }
+
+
+def fit_sections(
+    sections: List[PromptSection],
+    token_budget: int,
+    fixed_tokens: int = 0,
+    omitted_text: str = OMITTED_TEXT,
+) -> PromptBudgetResult:
+    """
+    セクションを予算に収める
+
+    Args:
+        sections: 関連度の高い順のセクション
+        token_budget: プロンプト全体のトークン数の上限
+        fixed_tokens: セクション以外（テンプレート・質問・システムプロンプト）のトークン数
+        omitted_text: 省略したセクションの代わりの文字列
+    """
+    texts = {section.name: section.text for section in sections}
+    tokens = {section.name: estimate_tokens(section.text) for section in sections}
+    result = PromptBudgetResult(texts=texts, budget=token_budget, tokens=fixed_tokens + sum(tokens.values()))
+
+    def replace(name: str, text: str) -> None:
+        new_tokens = estimate_tokens(text)
+        result.tokens += new_tokens - tokens[name]
+        tokens[name] = new_tokens
+        texts[name] = text
+
+    # 1. 関連度の低いセクションから要約版に置き換える
+    for section in reversed(sections):
+        if result.tokens <= token_budget:
+            break
+        if section.summarize is None:
+            continue
+        try:
+            summary = section.summarize()
+        except Exception as e:
+            logger.warning(f"Failed to summarize prompt section {section.name}: {e}")
+            continue
+        if estimate_tokens(summary) < tokens[section.name]:
+            replace(section.name, summary)
+            result.summarized.append(section.name)
+
+    # 2. それでも収まらなければ、関連度の低いセクションから省略する
+    for section in reversed(sections):
+        if result.tokens <= token_budget:
+            break
+        if section.required:
+            continue
+        replace(section.name, omitted_text)
+        if section.name in result.summarized:
+            result.summarized.remove(section.name)
+        result.dropped.append(section.name)
+
+    if result.is_over_budget:
+        logger.warning(f"Prompt exceeds token budget even after omitting sections: {result.tokens} > {token_budget}")
+    return result
+
+
+# ========================================
+# 要約版のデータ
+# ========================================
+
+def summarize_debts_by_bank(debts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    借入の一覧を金融機関ごとに集計（件数・元本・月々の返済額の合計、元本で加重した平均金利、最長の残り月数）
+
+    balance_at_year_end（年度末残高）を持つ一覧の場合は、その合計も集計する。
+    """
+    groups = defaultdict(list)
+    for debt in debts:
+        groups[debt['financial_institution']].append(debt)
+
+    summary = []
+    for bank, bank_debts in groups.items():
+        principal = sum(debt['principal'] or 0 for debt in bank_debts)
+        weighted_rate = sum((debt['principal'] or 0) * (debt['interest_rate'] or 0) for debt in bank_debts)
+        item = {
+            'financial_institution': bank,
+            'count': len(bank_debts),
+            'principal': principal,
+            'interest_rate': round(weighted_rate / principal, 3) if principal else 0,
+            'monthly_repayment': sum(debt['monthly_repayment'] or 0 for debt in bank_debts),
+            'max_remaining_months': max(debt['remaining_months'] or 0 for debt in bank_debts),
+        }
+        if all('balance_at_year_end' in debt for debt in bank_debts):
+            item['balance_at_year_end'] = sum(debt['balance_at_year_end'] for debt in bank_debts)
+        summary.append(item)
+    return sorted(summary, key=lambda item: item['principal'], reverse=True)
+
+
+def summarize_monthly_by_year(monthly_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """月次推移を年度・予実ごとに集計（月数と各項目の合計）"""
+    items = ('sales', 'gross_profit', 'operating_profit', 'ordinary_profit')
+    groups = {}
+    for month in monthly_data:
+        key = (month['year'], month['is_budget'])
+        group = groups.setdefault(key, {'year': month['year'], 'is_budget': month['is_budget'], 'months': 0, **{name: 0 for name in items}})
+        group['months'] += 1
+        for name in items:
+            group[name] += month.get(name) or 0
+    return list(groups.values())
+
+
+def summarize_meeting_minutes(meeting_minutes: List[Dict[str, Any]], count: int = 5, max_chars: int = 100) -> List[Dict[str, Any]]:
+    """議事録を直近 count 件・先頭 max_chars 文字に絞る"""
+    return [
+        {**minutes, 'notes': minutes['notes'][:max_chars]}
+        for minutes in meeting_minutes[:count]
+    ]
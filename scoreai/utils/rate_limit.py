@@ -0,0 +1,256 @@
+"""
+レート制限
+
+AI・OCR・エクスポートなど、1リクエストでワーカーを長時間占有するエンドポイントへの
+短時間の集中アクセスを制限する。
+
+- カウンターは原子的にインクリメントする（共有キャッシュの incr、またはDBの UPDATE count = count + 1）
+- スライディングウィンドウ（前のウィンドウの回数を経過時間で按分して加算）で判定する
+- ユーザー単位（未ログインの場合はIPアドレス単位）と、Firm単位の両方で制限できる
+
+LocMemCacheはワーカープロセスごと、ファイルキャッシュは incr が原子的でないため、
+共有キャッシュ（Redis、Memcached）が設定されていない場合はDB（RateLimitCounter）にカウンターを保存する。
+
+使い方:
+    # 関数ビュー（クラスベースビューの場合は method_decorator を使用）
+    @rate_limit('export', {'user': '20/m', 'firm': '100/m'}, methods=('GET',))
+    def export_debts(request, format_type):
+        ...
+
+    # URL名ごとの設定（settings.RATE_LIMITS）は RateLimitMiddleware が適用する
+"""
+import logging
+import math
+import time
+from datetime import timedelta
+from functools import wraps
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.shortcuts import render
+from django.utils import timezone
+
+from .security import get_client_ip
+
+logger = logging.getLogger(__name__)
+
+# 複数のワーカーで共有され、incrが原子的なキャッシュバックエンド
+SHARED_CACHE_BACKENDS = ('RedisCache', 'PyMemcacheCache', 'PyLibMCCache', 'MemcachedCache')
+
+PERIOD_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+DEFAULT_MESSAGE = '短時間に多数のリクエストが検出されました。しばらく時間をおいてから再度お試しください。'
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """
+    '10/m'、'100/h'、'5/30s' 形式のレートを (回数, 秒数) に変換
+    """
+    count, period = rate.split('/')
+    period = period.strip()
+    multiplier = int(period[:-1]) if len(period) > 1 else 1
+    return int(count), multiplier * PERIOD_UNITS[period[-1]]
+
+
+class CacheCounterStore:
+    """共有キャッシュにカウンターを保存"""
+
+    def incr(self, key: str, timeout: int) -> int:
+        for _ in range(2):
+            cache.add(key, 0, timeout)
+            try:
+                return cache.incr(key)
+            except ValueError:
+                # add と incr の間に期限切れになった場合は作り直す
+                continue
+        return 1
+
+    def get(self, key: str) -> int:
+        return cache.get(key, 0)
+
+    def delete(self, key: str) -> None:
+        cache.delete(key)
+
+
+class DatabaseCounterStore:
+    """DBにカウンターを保存（共有キャッシュがない環境用）"""
+
+    def incr(self, key: str, timeout: int) -> int:
+        from ..models import RateLimitCounter
+
+        now = timezone.now()
+        counters = RateLimitCounter.objects.filter(key=key)
+        if not counters.filter(expires_at__gt=now).update(count=F('count') + 1):
+            # 新しいウィンドウ: 期限切れのカウンターを削除してから作成する
+            RateLimitCounter.objects.filter(expires_at__lte=now).delete()
+            try:
+                with transaction.atomic():
+                    RateLimitCounter.objects.create(
+                        key=key, count=1, expires_at=now + timedelta(seconds=timeout)
+                    )
+                return 1
+            except IntegrityError:
+                # 他のワーカーが先に作成した
+                counters.update(count=F('count') + 1)
+        return counters.values_list('count', flat=True).first() or 1
+
+    def get(self, key: str) -> int:
+        from ..models import RateLimitCounter
+
+        return RateLimitCounter.objects.filter(
+            key=key, expires_at__gt=timezone.now()
+        ).values_list('count', flat=True).first() or 0
+
+    def delete(self, key: str) -> None:
+        from ..models import RateLimitCounter
+
+        RateLimitCounter.objects.filter(key=key).delete()
+
+
+def get_counter_store():
+    """
+    カウンターの保存先を取得
+
+    settings.RATE_LIMIT_BACKEND が 'cache' または 'db' の場合はそれを使用し、
+    'auto'（デフォルト）の場合は共有キャッシュが設定されていればキャッシュ、なければDBを使用する。
+    """
+    backend = getattr(settings, 'RATE_LIMIT_BACKEND', 'auto')
+    if backend == 'auto':
+        cache_backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+        backend = 'cache' if cache_backend.rsplit('.', 1)[-1] in SHARED_CACHE_BACKENDS else 'db'
+    return CacheCounterStore() if backend == 'cache' else DatabaseCounterStore()
+
+
+def _now() -> float:
+    return time.time()
+
+
+def hit(store, key: str, limit: int, period: int) -> Optional[int]:
+    """
+    スライディングウィンドウでリクエストを1回記録
+
+    Returns:
+        制限内の場合None、超過した場合は再試行までの秒数
+    """
+    now = _now()
+    window = int(now // period)
+    elapsed = now - window * period
+
+    current = store.incr(f'{key}:{window}', period * 2)
+    previous = store.get(f'{key}:{window - 1}')
+    remaining_weight = (period - elapsed) / period
+    if previous * remaining_weight + current <= limit:
+        return None
+
+    if current > limit or not previous:
+        return max(1, math.ceil(period - elapsed))
+    # 前のウィンドウの按分が (limit - current) 以下になるまでの時間
+    wait_until = period - (limit - current) * period / previous
+    return max(1, math.ceil(wait_until - elapsed))
+
+
+def get_firm_id(request: HttpRequest) -> Optional[str]:
+    """リクエストユーザーの選択中のFirmのID（ない場合はNone）"""
+    if not hasattr(request, '_rate_limit_firm_id'):
+        from ..models import FirmCompany, UserCompany, UserFirm
+
+        firm_id = UserFirm.objects.filter(
+            user=request.user, is_selected=True, active=True
+        ).values_list('firm_id', flat=True).first()
+        if not firm_id:
+            # Companyユーザーの場合は選択中のCompanyに紐付くFirm
+            company_id = UserCompany.objects.filter(
+                user=request.user, is_selected=True
+            ).values_list('company_id', flat=True).first()
+            if company_id:
+                firm_id = FirmCompany.objects.filter(
+                    company_id=company_id, active=True
+                ).values_list('firm_id', flat=True).first()
+        request._rate_limit_firm_id = firm_id
+    return request._rate_limit_firm_id
+
+
+def _get_identity(request: HttpRequest, scope: str) -> Optional[str]:
+    """スコープごとのカウンターのキー（対象外の場合はNone）"""
+    is_authenticated = getattr(request, 'user', None) is not None and request.user.is_authenticated
+    if scope == 'user':
+        return f'user:{request.user.pk}' if is_authenticated else f'ip:{get_client_ip(request)}'
+    if scope == 'firm':
+        firm_id = get_firm_id(request) if is_authenticated else None
+        return f'firm:{firm_id}' if firm_id else None
+    if scope == 'ip':
+        return f'ip:{get_client_ip(request)}'
+    raise ValueError(f'Unknown rate limit scope: {scope}')
+
+
+def check_rate_limits(request: HttpRequest, name: str, rates: Dict[str, str]) -> Optional[int]:
+    """
+    レート制限をチェックしてリクエストを記録
+
+    Args:
+        request: HTTPリクエスト
+        name: 制限の名前（'ai'、'ocr'、'export' など。カウンターはこの名前ごと）
+        rates: スコープ（'user'、'firm'、'ip'）→ レート（'10/m' など）
+
+    Returns:
+        許可される場合None、制限を超えた場合は再試行までの秒数
+    """
+    if not getattr(settings, 'RATE_LIMIT_ENABLED', True):
+        return None
+
+    store = get_counter_store()
+    for scope, rate in rates.items():
+        identity = _get_identity(request, scope)
+        if identity is None:
+            continue
+        limit, period = parse_rate(rate)
+        retry_after = hit(store, f'ratelimit:{name}:{identity}:{period}', limit, period)
+        if retry_after is not None:
+            logger.warning(
+                f"Rate limit exceeded: {name} {identity} ({rate}), retry after {retry_after}s"
+            )
+            return retry_after
+    return None
+
+
+def _wants_json(request: HttpRequest) -> bool:
+    return (
+        request.headers.get('x-requested-with') == 'XMLHttpRequest'
+        or 'application/json' in request.headers.get('accept', '')
+        or request.content_type == 'application/json'
+    )
+
+
+def rate_limited_response(request: HttpRequest, retry_after: int, message: str = DEFAULT_MESSAGE) -> HttpResponse:
+    """429レスポンス（AjaxリクエストにはJSON、それ以外はエラーページ）"""
+    if _wants_json(request):
+        response = JsonResponse({'success': False, 'error': message}, status=429)
+    else:
+        response = render(request, '429.html', {'message': message}, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def rate_limit(name: str, rates: Dict[str, str], methods: Optional[Iterable[str]] = ('POST',)):
+    """
+    ビューにレート制限を適用するデコレーター
+
+    Args:
+        name: 制限の名前
+        rates: スコープ → レート
+        methods: 制限するHTTPメソッド（Noneの場合はすべて）
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                retry_after = check_rate_limits(request, name, rates)
+                if retry_after is not None:
+                    return rate_limited_response(request, retry_after)
+            return view_func(request, *args, **kwargs)
+        return _wrapped_view
+    return decorator
@@ -0,0 +1,284 @@
+"""
+外部API呼び出しの耐障害性（タイムアウト・再試行・サーキットブレーカー）
+
+Gemini・Vision・クラウドストレージ（Google Drive / Box）・Stripe の呼び出しに、
+サービスごとの設定（ServicePolicy、settings.EXTERNAL_SERVICE_POLICIES で上書き）を適用する。
+
+- タイムアウト: 1回の呼び出しの上限秒数。各クライアントライブラリに渡す（get_timeout）
+- 再試行: タイムアウト・接続エラー・429/5xx のみ、ジッター付きの指数バックオフで max_attempts 回まで。
+  次の試行が deadline（呼び出し全体の上限秒数）を超える場合は再試行しない
+- サーキットブレーカー: 再試行しても失敗した呼び出しが failure_threshold 回続いたら、
+  recovery_timeout 秒間は呼び出さずに CircuitOpenError を送出する。
+  その後は1つのワーカーだけが試し（half-open）、成功すれば元に戻る。
+  状態は共有キャッシュに保存するため、すべてのワーカーで共有される
+
+使い方:
+    result = call('vision', client.document_text_detection, image=image, timeout=get_timeout('vision'))
+
+    @resilient('storage', idempotent=False)  # 冪等でない呼び出しは再試行しない
+    def upload_file(...): ...
+"""
+import asyncio
+import logging
+import random
+import socket
+import time
+from dataclasses import dataclass, replace
+from functools import wraps
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ServicePolicy:
+    """
+    外部サービスごとの設定
+
+    Attributes:
+        timeout: 1回の呼び出しの上限秒数
+        max_attempts: 最大試行回数（1の場合は再試行しない）
+        backoff_base: バックオフの基準秒数（n回目の再試行は最大 backoff_base * 2**(n-1) 秒待つ）
+        backoff_max: バックオフの上限秒数
+        deadline: 再試行を含めた呼び出し全体の上限秒数
+        failure_threshold: サーキットブレーカーを開く連続失敗回数
+        failure_window: 連続失敗を数える秒数（この間に成功がなければカウントを継続）
+        recovery_timeout: サーキットブレーカーを開いておく秒数
+    """
+    timeout: float = 30.0
+    max_attempts: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    deadline: float = 90.0
+    failure_threshold: int = 5
+    failure_window: int = 60
+    recovery_timeout: int = 30
+
+
+DEFAULT_POLICIES = {
+    # 応答の生成に時間がかかるため、タイムアウトは長く、試行回数は少なくする（gunicornのタイムアウト120秒以内）
+    'gemini': ServicePolicy(timeout=50.0, max_attempts=2, backoff_base=1.0, deadline=100.0),
+    'vision': ServicePolicy(timeout=30.0, max_attempts=3, deadline=90.0),
+    'storage': ServicePolicy(timeout=60.0, max_attempts=3, deadline=100.0),
+    'stripe': ServicePolicy(timeout=20.0, max_attempts=3, deadline=60.0),
+}
+
+# 再試行する（サービスの一時的な不調を表す）HTTPステータス
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+CACHE_KEY_PREFIX = 'resilience'
+
+
+class CircuitOpenError(Exception):
+    """サーキットブレーカーが開いているため、外部サービスを呼び出さなかった"""
+
+    def __init__(self, service: str, retry_after: float):
+        self.service = service
+        self.retry_after = retry_after
+        super().__init__(
+            f"{service} は現在応答が不安定なため、呼び出しを一時停止しています。"
+            f"{max(1, int(retry_after))}秒ほど後に再度お試しください。"
+        )
+
+
+def get_policy(service: str) -> ServicePolicy:
+    """サービスの設定（settings.EXTERNAL_SERVICE_POLICIES の値で既定値を上書き）"""
+    policy = DEFAULT_POLICIES.get(service, ServicePolicy())
+    overrides = getattr(settings, 'EXTERNAL_SERVICE_POLICIES', {}).get(service)
+    if overrides:
+        policy = replace(policy, **overrides)
+    return policy
+
+
+def get_timeout(service: str) -> float:
+    """サービスの1回の呼び出しの上限秒数"""
+    return get_policy(service).timeout
+
+
+def get_status_code(error: BaseException) -> Optional[int]:
+    """例外からHTTPステータスを取り出す（各クライアントライブラリの属性名の違いを吸収）"""
+    for candidate in (
+        getattr(error, 'status_code', None),
+        getattr(error, 'http_status', None),  # stripe
+        getattr(error, 'code', None),  # google.genai / google.api_core
+        getattr(error, 'status', None),  # boxsdk
+        getattr(getattr(error, 'resp', None), 'status', None),  # googleapiclient
+        getattr(getattr(error, 'response', None), 'status_code', None),  # requests
+    ):
+        try:
+            return int(candidate)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """再試行で回復する可能性がある（サービスの一時的な不調を表す）例外か"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (TimeoutError, socket.timeout, ConnectionError, asyncio.TimeoutError)):
+        return True
+    status = get_status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    # requests・httplib2・stripe などの接続エラー・タイムアウト（クラス名で判定）
+    name = type(error).__name__
+    return any(keyword in name for keyword in ('Timeout', 'ConnectionError', 'APIConnectionError', 'DeadlineExceeded'))
+
+
+def backoff_delay(attempt: int, policy: ServicePolicy) -> float:
+    """attempt 回目の失敗後に待つ秒数（フルジッター付きの指数バックオフ）"""
+    return random.uniform(0, min(policy.backoff_max, policy.backoff_base * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """
+    共有キャッシュに状態を保存するサーキットブレーカー
+
+    キャッシュのキー:
+        resilience:<service>:failures  連続失敗回数（failure_window 秒で期限切れ）
+        resilience:<service>:open_until  開いている期限（UNIX時刻）
+        resilience:<service>:probe  half-open で試しているワーカーのロック
+    """
+
+    def __init__(self, service: str, policy: Optional[ServicePolicy] = None):
+        self.service = service
+        self.policy = policy or get_policy(service)
+
+    def _key(self, name: str) -> str:
+        return f'{CACHE_KEY_PREFIX}:{self.service}:{name}'
+
+    @property
+    def state(self) -> str:
+        """'closed'（通常）、'open'（停止中）、'half_open'（試行待ち）"""
+        if cache.get(self._key('failures'), 0) < self.policy.failure_threshold:
+            return 'closed'
+        if cache.get(self._key('open_until'), 0) > time.time():
+            return 'open'
+        return 'half_open'
+
+    def before_call(self) -> None:
+        """呼び出してよいか確認（停止中は CircuitOpenError を送出）"""
+        state = self.state
+        if state == 'closed':
+            return
+        if state == 'half_open' and cache.add(self._key('probe'), 1, int(self.policy.timeout) + 1):
+            # このワーカーだけが試す
+            return
+        retry_after = max(cache.get(self._key('open_until'), 0) - time.time(), 1)
+        raise CircuitOpenError(self.service, retry_after)
+
+    def record_success(self) -> None:
+        if cache.get(self._key('failures')):
+            logger.info(f"Circuit for {self.service} closed")
+        cache.delete_many([self._key('failures'), self._key('open_until'), self._key('probe')])
+
+    def record_failure(self) -> None:
+        key = self._key('failures')
+        # ブレーカーを開いている間はカウントを消さない
+        timeout = self.policy.failure_window + self.policy.recovery_timeout
+        if cache.add(key, 1, timeout):
+            failures = 1
+        else:
+            try:
+                failures = cache.incr(key)
+            except ValueError:
+                # 期限切れと競合した場合
+                cache.set(key, 1, timeout)
+                failures = 1
+            cache.touch(key, timeout)
+        if failures >= self.policy.failure_threshold:
+            cache.set(self._key('open_until'), time.time() + self.policy.recovery_timeout, timeout)
+            cache.delete(self._key('probe'))
+            logger.warning(f"Circuit for {self.service} opened after {failures} consecutive failures")
+
+    def reset(self) -> None:
+        cache.delete_many([self._key('failures'), self._key('open_until'), self._key('probe')])
+
+
+def _record_error(breaker: CircuitBreaker, error: BaseException) -> None:
+    """失敗を記録（再試行しない例外はサービスが応答したものとして成功扱い）"""
+    if is_retryable(error):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+def _next_delay(attempt: int, started: float, policy: ServicePolicy, idempotent: bool, error: BaseException) -> Optional[float]:
+    """再試行する場合は待つ秒数、しない場合はNone"""
+    if not idempotent or attempt >= policy.max_attempts or not is_retryable(error):
+        return None
+    delay = backoff_delay(attempt, policy)
+    if time.monotonic() - started + delay + policy.timeout > policy.deadline:
+        return None
+    return delay
+
+
+def call(service: str, func: Callable, *args, idempotent: bool = True, **kwargs) -> Any:
+    """
+    外部サービスを呼び出す（サーキットブレーカーの確認と再試行）
+
+    Args:
+        service: サービス名（DEFAULT_POLICIES のキー）
+        func: 呼び出す関数（タイムアウトは関数側に get_timeout で渡す）
+        idempotent: Falseの場合は再試行しない（冪等でない呼び出し）
+
+    Raises:
+        CircuitOpenError: サーキットブレーカーが開いている場合
+        func の例外: 再試行しても失敗した場合、または再試行しない例外の場合
+    """
+    policy = get_policy(service)
+    breaker = CircuitBreaker(service, policy)
+    breaker.before_call()
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            delay = _next_delay(attempt, started, policy, idempotent, e)
+            if delay is None:
+                _record_error(breaker, e)
+                raise
+            logger.warning(f"{service} call failed (attempt {attempt}/{policy.max_attempts}), retrying in {delay:.2f}s: {e}")
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+
+
+async def acall(service: str, func: Callable, *args, idempotent: bool = True, **kwargs) -> Any:
+    """call の非同期版（func はコルーチン関数）"""
+    policy = get_policy(service)
+    breaker = CircuitBreaker(service, policy)
+    breaker.before_call()
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            delay = _next_delay(attempt, started, policy, idempotent, e)
+            if delay is None:
+                _record_error(breaker, e)
+                raise
+            logger.warning(f"{service} call failed (attempt {attempt}/{policy.max_attempts}), retrying in {delay:.2f}s: {e}")
+            await asyncio.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+
+
+def resilient(service: str, idempotent: bool = True):
+    """call を適用するデコレーター"""
+    def decorator(func):
+        @wraps(func)
+        def _wrapped(*args, **kwargs):
+            return call(service, func, *args, idempotent=idempotent, **kwargs)
+        return _wrapped
+    return decorator
@@ -3,10 +3,8 @@
 """
 import logging
 from typing import Optional, Tuple
-from django.core.cache import cache
 from django.http import HttpRequest
 from django.utils import timezone
-from datetime import timedelta
 
 logger = logging.getLogger(__name__)
 
@@ -50,27 +48,27 @@ def check_rate_limit(
         - is_allowed: リクエストが許可される場合True
         - error_message: ブロックされている場合のエラーメッセージ
     """
+    from .rate_limit import get_counter_store
+
+    store = get_counter_store()
     ip_address = get_client_ip(request)
     
     # ブロックチェック
     block_key = f'{key_prefix}_block_{ip_address}'
-    if cache.get(block_key):
+    if store.get(block_key):
         logger.warning(f"Rate limit blocked: IP {ip_address} is blocked for {key_prefix}")
         return False, f'短時間に多数のリクエストが検出されました。{block_duration // 60}分後に再度お試しください。'
     
-    # 試行回数チェック
+    # 試行回数をインクリメント（原子的に加算し、ワーカー間で共有する）
     attempt_key = f'{key_prefix}_attempts_{ip_address}'
-    attempts = cache.get(attempt_key, 0)
+    attempts = store.incr(attempt_key, time_window)
     
-    if attempts >= max_attempts:
+    if attempts > max_attempts:
         # ブロックを設定
-        cache.set(block_key, True, block_duration)
+        store.incr(block_key, block_duration)
         logger.warning(f"Rate limit exceeded: IP {ip_address} exceeded {max_attempts} attempts for {key_prefix}")
         return False, f'短時間に多数のリクエストが検出されました。{block_duration // 60}分後に再度お試しください。'
     
-    # 試行回数をインクリメント
-    cache.set(attempt_key, attempts + 1, time_window)
-    
     return True, None
 
 
@@ -81,9 +79,11 @@ def reset_rate_limit(request: HttpRequest, key_prefix: str) -> None:
         request: HTTPリクエストオブジェクト
         key_prefix: キャッシュキーのプレフィックス
     """
+    from .rate_limit import get_counter_store
+
     ip_address = get_client_ip(request)
     attempt_key = f'{key_prefix}_attempts_{ip_address}'
-    cache.delete(attempt_key)
+    get_counter_store().delete(attempt_key)
 
 
 def verify_recaptcha(token: str, secret_key: str) -> Tuple[bool, Optional[str]]:
@@ -4,10 +4,12 @@
 from .base import StorageAdapter
 from .google_drive import GoogleDriveAdapter
 from .box import BoxAdapter
+from .folder_cache import FolderIdCache
 
 __all__ = [
     'StorageAdapter',
     'GoogleDriveAdapter',
     'BoxAdapter',
+    'FolderIdCache',
 ]
 
@@ -110,6 +110,48 @@ class StorageAdapter(ABC):
         """
         pass
     
+    def is_not_found_error(self, error: Exception) -> bool:
+        """
+        例外が「ファイル・フォルダが存在しない（404）」を表すか判定
+        
+        Google Drive（HttpError.resp.status）とBox（BoxAPIException.status）の
+        両方の形式に対応する。
+        
+        Args:
+            error: APIクライアントが送出した例外
+        
+        Returns:
+            404エラーの場合True
+        """
+        status = getattr(error, 'status', None)
+        if status is None:
+            status = getattr(getattr(error, 'resp', None), 'status', None)
+        try:
+            return int(status) == 404
+        except (TypeError, ValueError):
+            return False
+    
+    def is_auth_error(self, error: Exception) -> bool:
+        """
+        例外がアクセストークンの期限切れ・無効（401）を表すか判定
+        
+        Args:
+            error: APIクライアントが送出した例外
+        
+        Returns:
+            認証エラーの場合True（refresh_access_tokenで回復できる可能性がある）
+        """
+        status = getattr(error, 'status', None)
+        if status is None:
+            status = getattr(getattr(error, 'resp', None), 'status', None)
+        try:
+            if int(status) == 401:
+                return True
+        except (TypeError, ValueError):
+            pass
+        error_str = str(error).lower()
+        return 'invalid_grant' in error_str or 'expired' in error_str or 'unauthorized' in error_str
+    
     @abstractmethod
     def test_connection(self) -> bool:
         """
@@ -5,10 +5,15 @@ import logging
 from typing import Optional, Dict, BinaryIO, Any
 from io import BytesIO
 from django.conf import settings
+from ..profiling import profile_external
+from ..resilience import get_timeout, resilient
 from .base import StorageAdapter
 
 logger = logging.getLogger(__name__)
 
+# このサイズ以上のファイルはチャンクアップロード（アップロードセッション）を使用（Boxの下限は20MB）
+CHUNKED_UPLOAD_THRESHOLD = 20 * 1024 * 1024
+
 
 class BoxAdapter(StorageAdapter):
     """Box APIアダプター"""
@@ -45,6 +50,8 @@ class BoxAdapter(StorageAdapter):
             logger.error(f"Box API client initialization error: {e}", exc_info=True)
             raise
     
+    @profile_external('storage')
+    @resilient('storage', idempotent=False)
     def create_folder(self, folder_name: str, parent_folder_id: Optional[str] = None) -> Dict:
         """フォルダを作成"""
         try:
@@ -64,8 +71,33 @@ class BoxAdapter(StorageAdapter):
             logger.error(f"Box folder creation error: {e}", exc_info=True)
             raise
     
+    @profile_external('storage')
+    @resilient('storage')
+    def _find_folder_id(self, folder_name: str, parent_folder_id: str) -> Optional[str]:
+        """親フォルダ直下の同名のフォルダのIDを検索（見つからない場合は None）"""
+        for item in self._client.folder(folder_id=parent_folder_id).get_items():
+            if item.type == 'folder' and item.name == folder_name:
+                return item.id
+        return None
+
+    @profile_external('storage')
+    @resilient('storage')
+    def _get_folder(self, folder_id: str) -> Dict:
+        """フォルダの情報を取得"""
+        folder = self._client.folder(folder_id=folder_id).get()
+        return {
+            'id': folder.id,
+            'name': folder.name,
+            'webViewLink': folder.get_shared_link() or f"https://app.box.com/folder/{folder.id}",
+        }
+
     def get_or_create_folder(self, folder_path: str, root_folder_id: Optional[str] = None) -> Dict:
-        """フォルダを取得または作成（パス指定）"""
+        """
+        フォルダを取得または作成（パス指定）
+
+        リトライとサーキットブレーカーは個々のAPI呼び出し（検索・作成）にだけ適用する。
+        ここでもリトライすると、内側のリトライと掛け合わさって呼び出し回数と失敗数が重複するため。
+        """
         try:
             current_folder_id = root_folder_id or '0'
             folder_names = folder_path.split('/')
@@ -74,36 +106,20 @@ class BoxAdapter(StorageAdapter):
                 if not folder_name.strip():
                     continue
                 
-                # 既存のフォルダを検索
-                current_folder = self._client.folder(folder_id=current_folder_id)
-                items = current_folder.get_items()
-                
-                found_folder = None
-                for item in items:
-                    if item.type == 'folder' and item.name == folder_name:
-                        found_folder = item
-                        break
-                
-                if found_folder:
-                    # 既存のフォルダを使用
-                    current_folder_id = found_folder.id
-                else:
-                    # 新しいフォルダを作成
-                    folder = current_folder.create_subfolder(folder_name)
-                    current_folder_id = folder.id
+                # 既存のフォルダを検索し、なければ新しいフォルダを作成
+                found_folder_id = self._find_folder_id(folder_name, current_folder_id)
+                if found_folder_id is None:
+                    found_folder_id = self.create_folder(folder_name, current_folder_id)['id']
+                current_folder_id = found_folder_id
             
             # 最終的なフォルダ情報を取得
-            folder = self._client.folder(folder_id=current_folder_id).get()
-            
-            return {
-                'id': folder.id,
-                'name': folder.name,
-                'webViewLink': folder.get_shared_link() or f"https://app.box.com/folder/{folder.id}",
-            }
+            return self._get_folder(current_folder_id)
         except Exception as e:
             logger.error(f"Box get_or_create_folder error: {e}", exc_info=True)
             raise
     
+    @profile_external('storage')
+    @resilient('storage', idempotent=False)
     def upload_file(
         self,
         file_content: BinaryIO,
@@ -115,13 +131,27 @@ class BoxAdapter(StorageAdapter):
         try:
             folder = self._client.folder(folder_id=folder_id)
             
-            # ファイルをアップロード
-            uploaded_file = folder.upload_stream(
-                file_stream=file_content,
-                file_name=filename,
-                file_description=None,
-                preflight_check=True,
-            )
+            file_content.seek(0, 2)
+            file_size = file_content.tell()
+            file_content.seek(0)
+            
+            if file_size >= CHUNKED_UPLOAD_THRESHOLD:
+                # 大きいファイルはチャンク単位でアップロードし、失敗したチャンクから再開する
+                upload_session = folder.create_upload_session(file_size, filename)
+                chunked_uploader = upload_session.get_chunked_uploader_for_stream(file_content, file_size)
+                try:
+                    uploaded_file = chunked_uploader.start()
+                except Exception as e:
+                    logger.warning(f"Box chunked upload interrupted, resuming: {e}")
+                    uploaded_file = chunked_uploader.resume()
+            else:
+                # ファイルをアップロード
+                uploaded_file = folder.upload_stream(
+                    file_stream=file_content,
+                    file_name=filename,
+                    file_description=None,
+                    preflight_check=True,
+                )
             
             # ファイル情報を取得
             file_info = uploaded_file.get()
@@ -138,6 +168,8 @@ class BoxAdapter(StorageAdapter):
             logger.error(f"Box file upload error: {e}", exc_info=True)
             raise
     
+    @profile_external('storage')
+    @resilient('storage')
     def download_file(self, file_id: str) -> bytes:
         """ファイルをダウンロード"""
         try:
@@ -148,6 +180,8 @@ class BoxAdapter(StorageAdapter):
             logger.error(f"Box file download error: {e}", exc_info=True)
             raise
     
+    @profile_external('storage')
+    @resilient('storage')
     def get_file_info(self, file_id: str) -> Dict:
         """ファイル情報を取得"""
         try:
@@ -166,6 +200,7 @@ class BoxAdapter(StorageAdapter):
             logger.error(f"Box get_file_info error: {e}", exc_info=True)
             raise
     
+    @profile_external('storage')
     def refresh_access_token(self) -> bool:
         """アクセストークンをリフレッシュ"""
         try:
@@ -186,7 +221,7 @@ class BoxAdapter(StorageAdapter):
                 'client_secret': client_secret,
             }
             
-            response = requests.post(token_url, data=token_data)
+            response = requests.post(token_url, data=token_data, timeout=get_timeout('storage'))
             response.raise_for_status()
             token_response = response.json()
             
@@ -202,6 +237,7 @@ class BoxAdapter(StorageAdapter):
             logger.error(f"Box token refresh error: {e}", exc_info=True)
             return False
     
+    @profile_external('storage')
     def test_connection(self) -> bool:
         """接続をテスト"""
         try:
@@ -228,6 +264,8 @@ class BoxAdapter(StorageAdapter):
                 logger.error(f"Box connection test error: {e}", exc_info=True)
                 return False
     
+    @profile_external('storage')
+    @resilient('storage')
     def get_user_info(self) -> Dict[str, Any]:
         """ユーザー情報とストレージ情報を取得"""
         try:
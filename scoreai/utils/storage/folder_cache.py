@@ -0,0 +1,159 @@
+"""
+クラウドストレージのフォルダIDキャッシュ
+
+get_or_create_folder はパスの階層ごとにフォルダの検索（または作成）APIを呼び出すため、
+アップロードのたびに4〜5回の往復が発生する。
+CloudStorageSettingごとに「ルートフォルダからのパス → フォルダID」の対応を保存し、
+通常のアップロードではフォルダの解決にAPIを呼び出さないようにする。
+
+キャッシュしたフォルダが削除・移動されていた場合（404）は、そのパス以下を破棄して再解決する。
+"""
+import logging
+from typing import BinaryIO, Dict, Iterable, Optional, Tuple
+
+from .base import StorageAdapter
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_path(folder_path: str) -> str:
+    """空のセグメントと前後の空白を除いたパスを返す"""
+    return '/'.join(segment.strip() for segment in folder_path.split('/') if segment.strip())
+
+
+class FolderIdCache:
+    """CloudStorageSettingごとのフォルダIDキャッシュ"""
+
+    def __init__(self, storage_setting, adapter: StorageAdapter):
+        """
+        Args:
+            storage_setting: CloudStorageSetting（folder_id_cacheに保存する）
+            adapter: ストレージアダプター
+        """
+        self.storage_setting = storage_setting
+        self.adapter = adapter
+        self.root_folder_id = storage_setting.root_folder_id or None
+
+        cache = storage_setting.folder_id_cache or {}
+        if cache.get('root_folder_id') == self.root_folder_id:
+            self._folders: Dict[str, str] = dict(cache.get('folders', {}))
+        else:
+            # ルートフォルダが変更された場合は既存のキャッシュを使用しない
+            self._folders = {}
+        self._dirty = False
+
+    def get(self, folder_path: str) -> Optional[str]:
+        """キャッシュ済みのフォルダIDを返す（APIは呼び出さない）"""
+        return self._folders.get(_normalize_path(folder_path))
+
+    def resolve(self, folder_path: str) -> str:
+        """
+        フォルダパスをフォルダIDに解決（存在しない階層は作成）
+
+        キャッシュ済みの最も深い階層から、未解決の階層だけをAPIで解決する。
+
+        Args:
+            folder_path: ルートフォルダからのパス（例: "試算表/貸借対照表"）
+
+        Returns:
+            フォルダID
+        """
+        path = _normalize_path(folder_path)
+        if path in self._folders:
+            return self._folders[path]
+
+        segments = path.split('/') if path else []
+        parent_id = self.root_folder_id
+        start = 0
+        for depth in range(len(segments), 0, -1):
+            cached_id = self._folders.get('/'.join(segments[:depth]))
+            if cached_id:
+                parent_id = cached_id
+                start = depth
+                break
+
+        try:
+            for depth in range(start, len(segments)):
+                folder_info = self.adapter.get_or_create_folder(segments[depth], parent_id)
+                parent_id = folder_info['id']
+                self._folders['/'.join(segments[:depth + 1])] = parent_id
+                self._dirty = True
+        except Exception as e:
+            if start == 0 or not self.adapter.is_not_found_error(e):
+                raise
+            # キャッシュしていた親フォルダが存在しない場合は、ルートから解決し直す
+            logger.info(f"Cached parent folder not found, resolving again: {'/'.join(segments[:start])}")
+            self.invalidate('/'.join(segments[:start]))
+            return self.resolve(path)
+
+        self.save()
+        return parent_id
+
+    def invalidate(self, folder_path: str) -> None:
+        """指定したパスとその配下のキャッシュを破棄"""
+        path = _normalize_path(folder_path)
+        stale = [key for key in self._folders if key == path or key.startswith(f'{path}/')]
+        for key in stale:
+            del self._folders[key]
+        if stale:
+            self._dirty = True
+            self.save()
+
+    def clear(self) -> None:
+        """キャッシュをすべて破棄"""
+        if self._folders:
+            self._folders = {}
+            self._dirty = True
+            self.save()
+
+    def prewarm(self, folder_paths: Iterable[str]) -> Dict[str, str]:
+        """
+        フォルダを事前に解決してキャッシュに登録
+
+        Args:
+            folder_paths: フォルダパスのリスト
+
+        Returns:
+            {フォルダパス: フォルダID} の辞書
+        """
+        return {folder_path: self.resolve(folder_path) for folder_path in folder_paths}
+
+    def upload_file(
+        self,
+        file_content: BinaryIO,
+        filename: str,
+        folder_path: str,
+        mime_type: Optional[str] = None
+    ) -> Tuple[Dict, str]:
+        """
+        フォルダパスを指定してファイルをアップロード
+
+        キャッシュしたフォルダが存在しない（404）場合は、再解決して1回だけ再試行する。
+
+        Returns:
+            (アップロードされたファイルの情報, フォルダID) のタプル
+        """
+        folder_id = self.resolve(folder_path)
+        try:
+            return self.adapter.upload_file(file_content, filename, folder_id, mime_type), folder_id
+        except Exception as e:
+            if not self.adapter.is_not_found_error(e):
+                raise
+            logger.info(f"Cached folder not found, resolving again: {folder_path} ({folder_id})")
+
+        self.invalidate(folder_path)
+        folder_id = self.resolve(folder_path)
+        file_content.seek(0)
+        return self.adapter.upload_file(file_content, filename, folder_id, mime_type), folder_id
+
+    def save(self) -> None:
+        """変更があればCloudStorageSettingに保存"""
+        if not self._dirty:
+            return
+        self.storage_setting.folder_id_cache = {
+            'root_folder_id': self.root_folder_id,
+            'folders': self._folders,
+        }
+        if self.storage_setting.pk:
+            self.storage_setting.save(update_fields=['folder_id_cache', 'updated_at'])
+        self._dirty = False
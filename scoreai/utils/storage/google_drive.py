@@ -5,10 +5,15 @@ import logging
 from typing import Optional, Dict, BinaryIO, Any
 from io import BytesIO
 from django.conf import settings
+from ..profiling import profile_external
+from ..resilience import get_timeout, resilient
 from .base import StorageAdapter
 
 logger = logging.getLogger(__name__)
 
+# レジューマブルアップロードのチャンクサイズ（256KBの倍数）
+RESUMABLE_CHUNK_SIZE = 5 * 1024 * 1024
+
 
 class GoogleDriveAdapter(StorageAdapter):
     """Google Drive APIアダプター"""
@@ -21,7 +26,9 @@ class GoogleDriveAdapter(StorageAdapter):
     def _initialize_client(self):
         """Google Drive APIクライアントを初期化"""
         try:
+            import httplib2
             from google.oauth2.credentials import Credentials
+            from google_auth_httplib2 import AuthorizedHttp
             from googleapiclient.discovery import build
             from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload
             
@@ -33,7 +40,11 @@ class GoogleDriveAdapter(StorageAdapter):
                 client_secret=getattr(settings, 'GOOGLE_DRIVE_CLIENT_SECRET', None),
             )
             
-            self._client = build('drive', 'v3', credentials=credentials)
+            # 1回のリクエストのタイムアウト（utils.resilience のストレージの設定）
+            http = AuthorizedHttp(credentials, http=httplib2.Http(timeout=get_timeout('storage')))
+            
+            # 同梱のディスカバリードキュメントを使用し、ディスカバリーAPIの取得とキャッシュを省略
+            self._client = build('drive', 'v3', http=http, cache_discovery=False, static_discovery=True)
             self._MediaIoBaseUpload = MediaIoBaseUpload
             self._MediaIoBaseDownload = MediaIoBaseDownload
             
@@ -44,6 +55,8 @@ class GoogleDriveAdapter(StorageAdapter):
             logger.error(f"Google Drive API client initialization error: {e}", exc_info=True)
             raise
     
+    @profile_external('storage')
+    @resilient('storage', idempotent=False)
     def create_folder(self, folder_name: str, parent_folder_id: Optional[str] = None) -> Dict:
         """フォルダを作成"""
         try:
@@ -69,43 +82,53 @@ class GoogleDriveAdapter(StorageAdapter):
             logger.error(f"Google Drive folder creation error: {e}", exc_info=True)
             raise
     
+    @profile_external('storage')
+    @resilient('storage')
+    def _find_folder(self, folder_name: str, parent_folder_id: str) -> Optional[Dict]:
+        """親フォルダ直下の同名のフォルダを検索（見つからない場合は None）"""
+        query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
+        query += f" and '{parent_folder_id}' in parents"
+        results = self._client.files().list(
+            q=query,
+            fields='files(id, name, webViewLink)'
+        ).execute()
+        folders = results.get('files', [])
+        return folders[0] if folders else None
+
+    @profile_external('storage')
+    @resilient('storage')
+    def _get_folder(self, folder_id: str) -> Dict:
+        """フォルダの情報を取得"""
+        return self._client.files().get(
+            fileId=folder_id,
+            fields='id, name, webViewLink'
+        ).execute()
+
     def get_or_create_folder(self, folder_path: str, root_folder_id: Optional[str] = None) -> Dict:
-        """フォルダを取得または作成（パス指定）"""
+        """
+        フォルダを取得または作成（パス指定）
+
+        リトライとサーキットブレーカーは個々のAPI呼び出し（検索・作成）にだけ適用する。
+        ここでもリトライすると、内側のリトライと掛け合わさって呼び出し回数と失敗数が重複するため。
+        """
         try:
             current_folder_id = root_folder_id or 'root'
             folder_names = folder_path.split('/')
+            folder_info = None
             
             for folder_name in folder_names:
                 if not folder_name.strip():
                     continue
                 
-                # 既存のフォルダを検索
-                query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-                if current_folder_id != 'root':
-                    query += f" and '{current_folder_id}' in parents"
-                else:
-                    query += " and 'root' in parents"
-                
-                results = self._client.files().list(
-                    q=query,
-                    fields='files(id, name)'
-                ).execute()
-                
-                folders = results.get('files', [])
-                
-                if folders:
-                    # 既存のフォルダを使用
-                    current_folder_id = folders[0]['id']
-                else:
-                    # 新しいフォルダを作成
-                    folder = self.create_folder(folder_name, current_folder_id)
-                    current_folder_id = folder['id']
+                # 既存のフォルダを検索し、なければ新しいフォルダを作成
+                folder_info = self._find_folder(folder_name, current_folder_id)
+                if folder_info is None:
+                    folder_info = self.create_folder(folder_name, current_folder_id)
+                current_folder_id = folder_info['id']
             
-            # 最終的なフォルダ情報を取得
-            folder_info = self._client.files().get(
-                fileId=current_folder_id,
-                fields='id, name, webViewLink'
-            ).execute()
+            # パスが空の場合のみ、ルートフォルダの情報を取得
+            if folder_info is None:
+                folder_info = self._get_folder(current_folder_id)
             
             return {
                 'id': folder_info.get('id'),
@@ -116,6 +139,8 @@ class GoogleDriveAdapter(StorageAdapter):
             logger.error(f"Google Drive get_or_create_folder error: {e}", exc_info=True)
             raise
     
+    @profile_external('storage')
+    @resilient('storage', idempotent=False)
     def upload_file(
         self,
         file_content: BinaryIO,
@@ -138,18 +163,26 @@ class GoogleDriveAdapter(StorageAdapter):
                 'parents': [folder_id],
             }
             
-            # メディアアップロード
+            # メディアアップロード（チャンク単位のレジューマブルアップロード）
             media = self._MediaIoBaseUpload(
                 file_content,
                 mimetype=mime_type,
+                chunksize=RESUMABLE_CHUNK_SIZE,
                 resumable=True
             )
             
-            file = self._client.files().create(
+            request = self._client.files().create(
                 body=file_metadata,
                 media_body=media,
                 fields='id, name, size, mimeType, webViewLink, createdTime'
-            ).execute()
+            )
+            
+            # 一時的なエラーはチャンク単位で再試行し、送信済みの位置から再開する
+            file = None
+            while file is None:
+                status, file = request.next_chunk(num_retries=3)
+                if status:
+                    logger.debug(f"Google Drive upload progress: {filename} {int(status.progress() * 100)}%")
             
             return {
                 'id': file.get('id'),
@@ -163,6 +196,8 @@ class GoogleDriveAdapter(StorageAdapter):
             logger.error(f"Google Drive file upload error: {e}", exc_info=True)
             raise
     
+    @profile_external('storage')
+    @resilient('storage')
     def download_file(self, file_id: str) -> bytes:
         """ファイルをダウンロード"""
         try:
@@ -178,6 +213,8 @@ class GoogleDriveAdapter(StorageAdapter):
             logger.error(f"Google Drive file download error: {e}", exc_info=True)
             raise
     
+    @profile_external('storage')
+    @resilient('storage')
     def get_file_info(self, file_id: str) -> Dict:
         """ファイル情報を取得"""
         try:
@@ -199,6 +236,7 @@ class GoogleDriveAdapter(StorageAdapter):
             logger.error(f"Google Drive get_file_info error: {e}", exc_info=True)
             raise
     
+    @profile_external('storage')
     def refresh_access_token(self) -> bool:
         """アクセストークンをリフレッシュ"""
         try:
@@ -219,11 +257,15 @@ class GoogleDriveAdapter(StorageAdapter):
             if credentials.refresh_token:
                 self.refresh_token = credentials.refresh_token
             
+            # クライアントを再初期化
+            self._initialize_client()
+            
             return True
         except Exception as e:
             logger.error(f"Google Drive token refresh error: {e}", exc_info=True)
             return False
     
+    @profile_external('storage')
     def test_connection(self) -> bool:
         """接続をテスト"""
         try:
@@ -236,8 +278,7 @@ class GoogleDriveAdapter(StorageAdapter):
             if 'invalid' in error_str or 'expired' in error_str or '401' in error_str:
                 logger.info("Access token may be expired, attempting refresh...")
                 if self.refresh_access_token():
-                    # リフレッシュ成功後、クライアントを再初期化して再試行
-                    self._initialize_client()
+                    # リフレッシュ成功後（クライアントは再初期化済み）、再試行
                     try:
                         about = self._client.about().get(fields='user').execute()
                         return about.get('user') is not None
@@ -251,6 +292,8 @@ class GoogleDriveAdapter(StorageAdapter):
                 logger.error(f"Google Drive connection test error: {e}", exc_info=True)
                 return False
     
+    @profile_external('storage')
+    @resilient('storage')
     def get_user_info(self) -> Dict[str, Any]:
         """ユーザー情報とストレージ情報を取得"""
         try:
@@ -0,0 +1,46 @@
+"""
+Stripe API のHTTPクライアント（utils.resilience のタイムアウト・再試行・サーキットブレーカーを適用）
+
+Stripe のライブラリは冪等キーを付けて自ら再試行するため、再試行回数（stripe.max_network_retries）と
+タイムアウトだけを設定し、再試行しても失敗した呼び出しをサーキットブレーカーに記録する。
+ScoreaiConfig.ready() で install_stripe_client() を呼び出して使う。
+"""
+import stripe
+
+from . import resilience
+
+SERVICE = 'stripe'
+
+
+class ResilientRequestsClient(stripe.RequestsClient):
+    """サーキットブレーカーを確認してから Stripe API を呼び出すクライアント"""
+
+    def request_with_retries(self, method, url, headers, post_data=None, max_network_retries=None, *, _usage=None):
+        breaker = resilience.CircuitBreaker(SERVICE)
+        try:
+            breaker.before_call()
+        except resilience.CircuitOpenError as e:
+            # 各ビューの except stripe.error.StripeError で扱えるようにする
+            raise stripe.APIConnectionError(str(e)) from e
+
+        try:
+            response = super().request_with_retries(
+                method, url, headers, post_data, max_network_retries, _usage=_usage,
+            )
+        except stripe.APIConnectionError:
+            breaker.record_failure()
+            raise
+
+        status_code = response[1]
+        if status_code in resilience.RETRYABLE_STATUS_CODES:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+
+def install_stripe_client() -> None:
+    """Stripe のライブラリ全体で使うHTTPクライアントと再試行回数を設定"""
+    policy = resilience.get_policy(SERVICE)
+    stripe.max_network_retries = max(policy.max_attempts - 1, 0)
+    stripe.default_http_client = ResilientRequestsClient(timeout=policy.timeout)
@@ -271,34 +271,13 @@ class DebtsOverviewView(SelectedCompanyMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        debt_list, debt_list_totals, debt_list_nodisplay, debt_list_rescheduled, debt_list_finished = get_debt_list(self.this_company)
-        
-        debt_list_byBank = get_debt_list_byAny('financial_institution', debt_list)
-        debt_list_bySecuredType = get_debt_list_byAny('secured_type', debt_list)
-        debt_list_bySecuredByManagement = get_debt_list_byAny('is_securedby_management', debt_list)
-        debt_list_byCollateraled = get_debt_list_byAny('is_collateraled', debt_list)
-        debt_list_byBankAndSecuredType = get_debt_list_byBankAndSecuredType(debt_list)
-        
-        # Calculate weighted_average_interest using service layer
-        from .services.debt_service import DebtService
-        weighted_average_interest = DebtService.calculate_weighted_average_interest(
-            debt_list_totals['total_interest_amount_monthly'],
-            debt_list_totals['total_balances_monthly']
-        )
+        # 金融機関別・保証別などの集計は借入一覧の1回の走査でまとめて作成
+        from .services.debt_analytics_service import get_debt_analytics
+        analytics = get_debt_analytics(self.this_company)
 
+        context.update(analytics.context())
         context.update({
             'title': '借入管理',
-            'debt_list': debt_list,
-            'debt_list_totals': debt_list_totals,
-            'debt_list_byBank': debt_list_byBank,
-            'debt_list_byBankAndSecuredType': debt_list_byBankAndSecuredType,
-            'debt_list_bySecuredType': debt_list_bySecuredType,
-            'debt_list_bySecuredByManagement': debt_list_bySecuredByManagement,
-            'debt_list_byCollateraled': debt_list_byCollateraled,
-            'debt_list_rescheduled': debt_list_rescheduled,
-            'debt_list_finished': debt_list_finished,
-            'debt_list_nodisplay': debt_list_nodisplay,
-            'weighted_average_interest': weighted_average_interest,
             'today': timezone.now().date(),
             'show_title_card': False,
         })
@@ -306,10 +285,15 @@ class DebtsOverviewView(SelectedCompanyMixin, TemplateView):
 
 
 class DebtsAllListView(SelectedCompanyMixin, ListView):
+    """
+    借入一覧ビュー
+
+    一覧は画面側（DataTables）でページングと並べ替えを行うため、サーバー側ではページングしない。
+    絞り込み条件（DebtFilter）を適用したクエリセットから一覧と合計を作成する。
+    """
     model = Debt
     template_name = 'scoreai/debt_list_all.html'
     context_object_name = 'debt_list'
-    paginate_by = 20
 
     def get_queryset(self):
         """検索・フィルタリング機能付きクエリセット（django-filter使用）"""
@@ -324,12 +308,12 @@ class DebtsAllListView(SelectedCompanyMixin, ListView):
         )
         
         # django-filterを使用したフィルタリング
-        debt_filter = DebtFilter(
+        self.filterset = DebtFilter(
             self.request.GET,
             queryset=queryset,
             company=self.this_company
         )
-        queryset = debt_filter.qs
+        queryset = self.filterset.qs
         
         # ソート機能
         order_by = self.request.GET.get('order_by', '-issue_date')
@@ -339,19 +323,8 @@ class DebtsAllListView(SelectedCompanyMixin, ListView):
         return queryset
 
     def get_context_data(self, **kwargs):
-        from .filters import DebtFilter
-        
         context = super().get_context_data(**kwargs)
-        debt_list, debt_list_totals, debt_list_nodisplay, debt_list_rescheduled, debt_list_finished = get_debt_list(self.this_company)
-        
-        # django-filterを使用したフィルタリング
-        queryset = Debt.objects.filter(company=self.this_company)
-        debt_filter = DebtFilter(
-            self.request.GET,
-            queryset=queryset,
-            company=self.this_company
-        )
-        context['filter'] = debt_filter
+        context['filter'] = self.filterset
         
         # 検索・フィルタリング用のコンテキスト（後方互換性のため保持）
         context['financial_institutions'] = FinancialInstitution.objects.all().order_by('name')
@@ -362,31 +335,14 @@ class DebtsAllListView(SelectedCompanyMixin, ListView):
         context['selected_is_rescheduled'] = self.request.GET.get('is_rescheduled', '')
         context['selected_is_nodisplay'] = self.request.GET.get('is_nodisplay', '')
         context['order_by'] = self.request.GET.get('order_by', '-issue_date')
-        debt_list_byBank = get_debt_list_byAny('financial_institution', debt_list)
-        debt_list_bySecuredType = get_debt_list_byAny('secured_type', debt_list)
-        debt_list_bySecuredByManagement = get_debt_list_byAny('is_securedby_management', debt_list)
-        debt_list_byCollateraled = get_debt_list_byAny('is_collateraled', debt_list)
-        debt_list_byBankAndSecuredType = get_debt_list_byBankAndSecuredType(debt_list)
-        # Calculate weighted_average_interest using service layer
-        from .services.debt_service import DebtService
-        weighted_average_interest = DebtService.calculate_weighted_average_interest(
-            debt_list_totals['total_interest_amount_monthly'],
-            debt_list_totals['total_balances_monthly']
-        )
 
+        # 絞り込み後の借入から一覧と合計を作成（この画面では金融機関別などの集計は表示しない）
+        from .services.debt_analytics_service import get_debt_analytics
+        analytics = get_debt_analytics(self.this_company, debts=self.object_list, groupings={})
+
+        context.update(analytics.context())
         context.update({
             'title': '借入管理',
-            'debt_list': debt_list,
-            'debt_list_totals': debt_list_totals,
-            'debt_list_byBank': debt_list_byBank,
-            'debt_list_byBankAndSecuredType': debt_list_byBankAndSecuredType,
-            'debt_list_bySecuredType': debt_list_bySecuredType,
-            'debt_list_bySecuredByManagement': debt_list_bySecuredByManagement,
-            'debt_list_byCollateraled': debt_list_byCollateraled,
-            'debt_list_rescheduled': debt_list_rescheduled,
-            'debt_list_finished': debt_list_finished,
-            'debt_list_nodisplay': debt_list_nodisplay,
-            'weighted_average_interest': weighted_average_interest,
             'today': timezone.now().date(),
             'show_title_card': False,  # タイトルカードを非表示（他の借入管理ページと統一）
         })
@@ -2297,81 +2253,6 @@ def get_monthly_summaries(this_company, num_years=5):
     return monthly_summaries
 
 
-# 選択済みの会社のDebtデータを取得
-# 後方互換性のため残されていますが、内部ではDebtServiceを使用します
-def get_debt_list(this_company):
-    from .services.debt_service import DebtService
-    return DebtService.get_debt_list_with_totals(this_company)
-
-
-##########################################################################
-###        取得済みの自社情報をさらに扱いやすいようにまとめる関数                   ###
-##########################################################################
-
-# 選択済みの会社のDebtデータを金融機関単位で集計したリスト
-def get_debt_list_byAny(summary_field_label, debt_list):
-    summary_field = summary_field_label.strip("'")
-    debt_list_byAny = {}
-
-    for debt in debt_list:
-        if debt[summary_field_label] not in debt_list_byAny:
-            debt_list_byAny[debt[summary_field_label]] = {
-                'principal': 0,
-                'monthly_repayment': 0,
-                'balances_monthly': [0] * 12,  # Initialize with 12 zeros
-                'interest_amount_monthly': [0] * 12,  # Initialize with 12 zeros
-                'balance_fy1': 0,
-            }
-
-        debt_list_byAny[debt[summary_field_label]]['principal'] += debt['principal']
-        debt_list_byAny[debt[summary_field_label]]['monthly_repayment'] += debt['monthly_repayment']
-        debt_list_byAny[debt[summary_field_label]]['balance_fy1'] += debt['balance_fy1']
-
-        # Sum up the monthly balances and interest amounts
-        for i in range(12):
-            debt_list_byAny[debt[summary_field_label]]['balances_monthly'][i] += debt['balances_monthly'][i]
-            debt_list_byAny[debt[summary_field_label]]['interest_amount_monthly'][i] += debt['interest_amount_monthly'][i]
-    # Convert the dictionary to a list of dictionaries
-    debt_list_byAny = [{ summary_field_label: summary_field, **values} for summary_field, values in debt_list_byAny.items()]
-
-    return debt_list_byAny
-
-def get_debt_list_byBankAndSecuredType(debt_list):
-    debt_list_byBankAndSecuredType = {}
-
-    for debt in debt_list:
-        key = (debt['financial_institution'], debt['secured_type'])
-        if key not in debt_list_byBankAndSecuredType:
-            debt_list_byBankAndSecuredType[key] = {
-                'principal': 0,
-                'monthly_repayment': 0,
-                'balances_monthly': [0] * 12,  # Initialize with 12 zeros
-                'interest_amount_monthly': [0] * 12,  # Initialize with 12 zeros
-                'balance_fy1': 0,
-            }
-
-        debt_list_byBankAndSecuredType[key]['principal'] += debt['principal']
-        debt_list_byBankAndSecuredType[key]['monthly_repayment'] += debt['monthly_repayment']
-        debt_list_byBankAndSecuredType[key]['balance_fy1'] += debt['balance_fy1']
-
-        # Sum up the monthly balances and interest amounts
-        for i in range(12):
-            debt_list_byBankAndSecuredType[key]['balances_monthly'][i] += debt['balances_monthly'][i]
-            debt_list_byBankAndSecuredType[key]['interest_amount_monthly'][i] += debt['interest_amount_monthly'][i]
-
-    # Convert the dictionary to a list of dictionaries
-    debt_list_byBankAndSecuredType = [
-        {
-            'financial_institution': key[0],
-            'secured_type': key[1],
-            **values
-        } for key, values in debt_list_byBankAndSecuredType.items()
-    ]
-
-    return debt_list_byBankAndSecuredType
-
-
-
 ##########################################################################
 ###                    管理者向け便利関数                                 ###
 ###                自分の会社以外のデータも扱えるため注意が必要                 ###
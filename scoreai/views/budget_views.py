@@ -1,20 +1,32 @@
 """
 予算管理機能のビュー
 """
+import json
 from typing import Any, Dict
 from django import forms
 from django.contrib import messages
 from django.shortcuts import redirect, get_object_or_404
 from django.urls import reverse_lazy
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseBadRequest, HttpResponseRedirect
 from django.views.generic import CreateView, UpdateView, FormView, TemplateView
 from django.db.models import Q, Max
 from django.utils import timezone
 from datetime import datetime
 
 from ..models import FiscalSummary_Year, FiscalSummary_Month, Company, UserAIConsultationScript, AIConsultationType, UserCompany
-from ..forms import FiscalSummary_YearForm, FiscalSummary_MonthForm
+from ..forms import FiscalSummary_YearForm, FiscalSummary_MonthForm, NumberListField
 from ..mixins import SelectedCompanyMixin, TransactionMixin
+from ..services.budget_comparison_service import BS, PL, RATIO, get_available_years, load_budget_comparison
+from ..services.monthly_budget_service import DEFAULT_REFERENCE_YEARS, generate_monthly_budgets
+from ..services.budget_scenario_service import (
+    DRIVER_LABELS,
+    DRIVER_NAMES,
+    MAX_SCENARIOS,
+    RESULT_LABELS,
+    ScenarioDrivers,
+    load_debt_schedule,
+    simulate_scenarios,
+)
 from django.db.models import Q
 import logging
 
@@ -186,833 +198,112 @@ class FiscalSummary_MonthBudgetUpdateView(SelectedCompanyMixin, UpdateView):
         return context
 
 
-class BudgetVsActualComparisonView(SelectedCompanyMixin, TemplateView):
+class BudgetVsActualBaseView(SelectedCompanyMixin, TemplateView):
+    """予算と実績の比較ビューの共通処理（年度の選択と比較結果の取得）"""
+
+    def get_year(self, available_years) -> int:
+        """URLパラメータの年度（なければデータが存在する最新年度、データがなければ現在年度）"""
+        default_year = available_years[0] if available_years else timezone.now().year
+        try:
+            return int(self.request.GET.get('year') or default_year)
+        except ValueError:
+            return default_year
+
+    def get_context_data(self, **kwargs) -> Dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        available_years = get_available_years(self.this_company)
+        year = self.get_year(available_years)
+        self.comparison = load_budget_comparison(self.this_company, year)
+        context.update({
+            'show_title_card': False,
+            'year': year,
+            'available_years': available_years,
+        })
+        return context
+
+
+class BudgetVsActualComparisonView(BudgetVsActualBaseView):
     """予算と実績の比較ビュー"""
     template_name = 'scoreai/budget_vs_actual_comparison.html'
 
     def get_context_data(self, **kwargs) -> Dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        company = self.this_company
-        
-        # 利用可能な年度を取得（予算または実績データが存在する年度）
-        available_years_list = list(FiscalSummary_Year.objects.filter(
-            company=company
-        ).values_list('year', flat=True).distinct().order_by('-year'))
-        
-        # デフォルト年度を取得
-        default_year = None
-        if available_years_list:
-            default_year = available_years_list[0]
-        else:
-            default_year = timezone.now().year
-        
-        # 年度を取得
-        year_param = self.request.GET.get('year')
-        if year_param:
-            try:
-                year = int(year_param)
-            except ValueError:
-                year = default_year
-        else:
-            year = default_year
-        
-        # 予算データを取得
-        budget_year = FiscalSummary_Year.objects.filter(
-            company=company,
-            year=year,
-            is_budget=True
-        ).first()
-        
-        # 実績データを取得（is_draftの条件を緩和）
-        actual_year = FiscalSummary_Year.objects.filter(
-            company=company,
-            year=year,
-            is_budget=False
-        ).order_by('-is_draft').first()
-        
-        # 月次データを取得
-        budget_monthly = []
-        actual_monthly = []
-        monthly_comparison = []  # period順にソートされた比較データ
-        
-        # 決算月を取得
-        fiscal_month = company.fiscal_month if hasattr(company, 'fiscal_month') else 1
-        
-        if budget_year:
-            budget_monthly_queryset = FiscalSummary_Month.objects.filter(
-                fiscal_summary_year=budget_year,
-                is_budget=True
-            ).order_by('period')
-            # 決算月を考慮して表示月を計算してリストに変換
-            budget_monthly = []
-            for month in budget_monthly_queryset:
-                # period（1-12）を決算月を考慮した表示月に変換
-                # period=1が決算月の次の月、period=12が決算月
-                display_month = (fiscal_month + month.period) % 12
-                if display_month == 0:
-                    display_month = 12
-                month.display_month = display_month
-                budget_monthly.append(month)
-        
-        if actual_year:
-            actual_monthly_queryset = FiscalSummary_Month.objects.filter(
-                fiscal_summary_year=actual_year,
-                is_budget=False
-            ).order_by('period')
-            # 決算月を考慮して表示月を計算してリストに変換
-            actual_monthly = []
-            for month in actual_monthly_queryset:
-                # period（1-12）を決算月を考慮した表示月に変換
-                display_month = (fiscal_month + month.period) % 12
-                if display_month == 0:
-                    display_month = 12
-                month.display_month = display_month
-                actual_monthly.append(month)
-        
-        # periodをキーにした辞書を作成（重複を防ぐため）
-        budget_monthly_dict = {m.period: m for m in budget_monthly}
-        actual_monthly_dict = {m.period: m for m in actual_monthly}
-        
-        # period順（1-12）に比較データを作成
-        monthly_labels = []  # グラフ用のラベル（決算月を考慮）
-        for period in range(1, 13):
-            # 決算月を考慮して表示月を計算
-            display_month = (fiscal_month + period) % 12
-            if display_month == 0:
-                display_month = 12
-            monthly_labels.append(f"{display_month}月")
-            
-            budget_month = budget_monthly_dict.get(period)
-            actual_month = actual_monthly_dict.get(period)
-            if budget_month and actual_month:
-                monthly_comparison.append({
-                    'period': period,
-                    'display_month': budget_month.display_month,
-                    'budget_month': budget_month,
-                    'actual_month': actual_month,
-                })
-        
-        # BS（貸借対照表）データを計算
-        bs_indicators = {}
-        bs_chart_data = {
-            'labels': [],
-            'budget': [],
-            'actual': [],
-        }
-        
-        if budget_year and actual_year:
-            # 資産の部
-            bs_indicators['cash_and_deposits'] = {
-                'budget': budget_year.cash_and_deposits,
-                'actual': actual_year.cash_and_deposits,
-                'diff': actual_year.cash_and_deposits - budget_year.cash_and_deposits,
-                'diff_rate': ((actual_year.cash_and_deposits - budget_year.cash_and_deposits) / budget_year.cash_and_deposits * 100) if budget_year.cash_and_deposits != 0 else 0,
-            }
-            
-            bs_indicators['accounts_receivable'] = {
-                'budget': budget_year.accounts_receivable if budget_year else 0,
-                'actual': actual_year.accounts_receivable,
-                'diff': (actual_year.accounts_receivable - budget_year.accounts_receivable) if budget_year else None,
-                'diff_rate': ((actual_year.accounts_receivable - budget_year.accounts_receivable) / budget_year.accounts_receivable * 100) if budget_year and budget_year.accounts_receivable != 0 else None,
-            }
-            
-            bs_indicators['inventory'] = {
-                'budget': budget_year.inventory if budget_year else 0,
-                'actual': actual_year.inventory,
-                'diff': (actual_year.inventory - budget_year.inventory) if budget_year else None,
-                'diff_rate': ((actual_year.inventory - budget_year.inventory) / budget_year.inventory * 100) if budget_year and budget_year.inventory != 0 else None,
-            }
-            
-            bs_indicators['total_current_assets'] = {
-                'budget': budget_year.total_current_assets if budget_year else 0,
-                'actual': actual_year.total_current_assets,
-                'diff': (actual_year.total_current_assets - budget_year.total_current_assets) if budget_year else None,
-                'diff_rate': ((actual_year.total_current_assets - budget_year.total_current_assets) / budget_year.total_current_assets * 100) if budget_year and budget_year.total_current_assets != 0 else None,
-            }
-            
-            bs_indicators['total_fixed_assets'] = {
-                'budget': budget_year.total_fixed_assets if budget_year else 0,
-                'actual': actual_year.total_fixed_assets,
-                'diff': (actual_year.total_fixed_assets - budget_year.total_fixed_assets) if budget_year else None,
-                'diff_rate': ((actual_year.total_fixed_assets - budget_year.total_fixed_assets) / budget_year.total_fixed_assets * 100) if budget_year and budget_year.total_fixed_assets != 0 else None,
-            }
-            
-            bs_indicators['total_assets'] = {
-                'budget': budget_year.total_assets if budget_year else 0,
-                'actual': actual_year.total_assets,
-                'diff': (actual_year.total_assets - budget_year.total_assets) if budget_year else None,
-                'diff_rate': ((actual_year.total_assets - budget_year.total_assets) / budget_year.total_assets * 100) if budget_year and budget_year.total_assets != 0 else None,
-            }
-            
-            # 負債の部
-            bs_indicators['accounts_payable'] = {
-                'budget': budget_year.accounts_payable if budget_year else 0,
-                'actual': actual_year.accounts_payable,
-                'diff': (actual_year.accounts_payable - budget_year.accounts_payable) if budget_year else None,
-                'diff_rate': ((actual_year.accounts_payable - budget_year.accounts_payable) / budget_year.accounts_payable * 100) if budget_year and budget_year.accounts_payable != 0 else None,
-            }
-            
-            bs_indicators['short_term_loans_payable'] = {
-                'budget': budget_year.short_term_loans_payable if budget_year else 0,
-                'actual': actual_year.short_term_loans_payable,
-                'diff': (actual_year.short_term_loans_payable - budget_year.short_term_loans_payable) if budget_year else None,
-                'diff_rate': ((actual_year.short_term_loans_payable - budget_year.short_term_loans_payable) / budget_year.short_term_loans_payable * 100) if budget_year and budget_year.short_term_loans_payable != 0 else None,
-            }
-            
-            bs_indicators['total_current_liabilities'] = {
-                'budget': budget_year.total_current_liabilities if budget_year else 0,
-                'actual': actual_year.total_current_liabilities,
-                'diff': (actual_year.total_current_liabilities - budget_year.total_current_liabilities) if budget_year else None,
-                'diff_rate': ((actual_year.total_current_liabilities - budget_year.total_current_liabilities) / budget_year.total_current_liabilities * 100) if budget_year and budget_year.total_current_liabilities != 0 else None,
-            }
-            
-            bs_indicators['long_term_loans_payable'] = {
-                'budget': budget_year.long_term_loans_payable if budget_year else 0,
-                'actual': actual_year.long_term_loans_payable,
-                'diff': (actual_year.long_term_loans_payable - budget_year.long_term_loans_payable) if budget_year else None,
-                'diff_rate': ((actual_year.long_term_loans_payable - budget_year.long_term_loans_payable) / budget_year.long_term_loans_payable * 100) if budget_year and budget_year.long_term_loans_payable != 0 else None,
-            }
-            
-            bs_indicators['total_liabilities'] = {
-                'budget': budget_year.total_liabilities if budget_year else 0,
-                'actual': actual_year.total_liabilities,
-                'diff': (actual_year.total_liabilities - budget_year.total_liabilities) if budget_year else None,
-                'diff_rate': ((actual_year.total_liabilities - budget_year.total_liabilities) / budget_year.total_liabilities * 100) if budget_year and budget_year.total_liabilities != 0 else None,
-            }
-            
-            # 純資産の部
-            bs_indicators['capital_stock'] = {
-                'budget': budget_year.capital_stock if budget_year else 0,
-                'actual': actual_year.capital_stock,
-                'diff': (actual_year.capital_stock - budget_year.capital_stock) if budget_year else None,
-                'diff_rate': ((actual_year.capital_stock - budget_year.capital_stock) / budget_year.capital_stock * 100) if budget_year and budget_year.capital_stock != 0 else None,
-            }
-            
-            bs_indicators['retained_earnings'] = {
-                'budget': budget_year.retained_earnings if budget_year else 0,
-                'actual': actual_year.retained_earnings,
-                'diff': (actual_year.retained_earnings - budget_year.retained_earnings) if budget_year else None,
-                'diff_rate': ((actual_year.retained_earnings - budget_year.retained_earnings) / budget_year.retained_earnings * 100) if budget_year and budget_year.retained_earnings != 0 else None,
-            }
-            
-            bs_indicators['total_net_assets'] = {
-                'budget': budget_year.total_net_assets if budget_year else 0,
-                'actual': actual_year.total_net_assets,
-                'diff': (actual_year.total_net_assets - budget_year.total_net_assets) if budget_year else None,
-                'diff_rate': ((actual_year.total_net_assets - budget_year.total_net_assets) / budget_year.total_net_assets * 100) if budget_year and budget_year.total_net_assets != 0 else None,
-            }
-            
-            # BSグラフ用データ
-            bs_chart_data = {
-                'labels': ['現金及び預金', '売上債権', '棚卸資産', '流動資産合計', '固定資産合計', '資産合計', '仕入債務', '短期借入金', '流動負債合計', '長期借入金', '負債合計', '資本金', '利益剰余金', '純資産合計'],
-                'budget': [
-                    budget_year.cash_and_deposits if budget_year else None,
-                    budget_year.accounts_receivable if budget_year else None,
-                    budget_year.inventory if budget_year else None,
-                    budget_year.total_current_assets if budget_year else None,
-                    budget_year.total_fixed_assets if budget_year else None,
-                    budget_year.total_assets if budget_year else None,
-                    budget_year.accounts_payable if budget_year else None,
-                    budget_year.short_term_loans_payable if budget_year else None,
-                    budget_year.total_current_liabilities if budget_year else None,
-                    budget_year.long_term_loans_payable if budget_year else None,
-                    budget_year.total_liabilities if budget_year else None,
-                    budget_year.capital_stock if budget_year else None,
-                    budget_year.retained_earnings if budget_year else None,
-                    budget_year.total_net_assets if budget_year else None,
-                ],
-                'actual': [
-                    actual_year.cash_and_deposits,
-                    actual_year.accounts_receivable,
-                    actual_year.inventory,
-                    actual_year.total_current_assets,
-                    actual_year.total_fixed_assets,
-                    actual_year.total_assets,
-                    actual_year.accounts_payable,
-                    actual_year.short_term_loans_payable,
-                    actual_year.total_current_liabilities,
-                    actual_year.long_term_loans_payable,
-                    actual_year.total_liabilities,
-                    actual_year.capital_stock,
-                    actual_year.retained_earnings,
-                    actual_year.total_net_assets,
-                ],
-            }
-        
-        # グラフデータをJSON形式に変換
-        import json
-        bs_chart_data_json = json.dumps(bs_chart_data)
-        
+        comparison = self.comparison
+
+        # BSは予算と実績の両方がある場合のみ比較
+        has_both = comparison.budget_year is not None and comparison.actual_year is not None
+        bs_indicators = comparison.bs_indicators if has_both else {}
+        bs_chart_data = comparison.chart_data(BS) if has_both else {'labels': [], 'budget': [], 'actual': []}
+
         context.update({
             'title': '予算管理',
-            'show_title_card': False,
-            'year': year,
-            'budget_year': budget_year,
-            'actual_year': actual_year,
-            'budget_monthly': budget_monthly,
-            'actual_monthly': actual_monthly,
-            'monthly_comparison': monthly_comparison,  # period順にソートされた比較データ
-            'monthly_labels': monthly_labels,  # グラフ用のラベル（決算月を考慮）
+            'budget_year': comparison.budget_year,
+            'actual_year': comparison.actual_year,
+            'budget_monthly': comparison.budget_months,
+            'actual_monthly': comparison.actual_months,
+            # 予算と実績の両方がある月（period順）
+            'monthly_comparison': [
+                row for row in comparison.monthly
+                if row['budget_month'] is not None and row['actual_month'] is not None
+            ],
+            'monthly_labels': comparison.monthly_labels,  # グラフ用のラベル（決算月を考慮）
             'bs_indicators': bs_indicators,
             'bs_chart_data': bs_chart_data,
-            'bs_chart_data_json': bs_chart_data_json,
-            'available_years': available_years_list,
-            'fiscal_month': fiscal_month,  # 決算月を追加
+            'bs_chart_data_json': json.dumps(bs_chart_data),
+            'fiscal_month': comparison.fiscal_month,
         })
-        
         return context
 
 
-class BudgetVsActualYearlyComparisonView(SelectedCompanyMixin, TemplateView):
+class BudgetVsActualYearlyComparisonView(BudgetVsActualBaseView):
     """年次予算と実績の詳細比較ビュー（経営指標含む）"""
     template_name = 'scoreai/budget_vs_actual_yearly.html'
 
     def get_context_data(self, **kwargs) -> Dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        company = self.this_company
-        
-        # 利用可能な年度を取得
-        available_years_list = list(FiscalSummary_Year.objects.filter(
-            company=company
-        ).values_list('year', flat=True).distinct().order_by('-year'))
-        
-        # デフォルト年度を取得
-        default_year = None
-        if available_years_list:
-            default_year = available_years_list[0]
-        else:
-            default_year = timezone.now().year
-        
-        # 年度を取得
-        year_param = self.request.GET.get('year')
-        if year_param:
-            try:
-                year = int(year_param)
-            except ValueError:
-                year = default_year
-        else:
-            year = default_year
-        
-        # 予算データを取得
-        budget_year = FiscalSummary_Year.objects.filter(
-            company=company,
-            year=year,
-            is_budget=True
-        ).first()
-        
-        # 実績データを取得（is_draftの条件を緩和）
-        actual_year = FiscalSummary_Year.objects.filter(
-            company=company,
-            year=year,
-            is_budget=False
-        ).order_by('-is_draft').first()
-        
-        # 経営指標を計算（予算がなくても実績があれば表示）
-        financial_indicators = {}
-        if actual_year:  # 実績があれば表示
-            # 売上高関連
-            financial_indicators['sales'] = {
-                'budget': budget_year.sales if budget_year else 0,
-                'actual': actual_year.sales,
-                'diff': (actual_year.sales - budget_year.sales) if budget_year else None,
-                'diff_rate': ((actual_year.sales - budget_year.sales) / budget_year.sales * 100) if budget_year and budget_year.sales > 0 else None,
-            }
-            
-            # 利益関連
-            financial_indicators['gross_profit'] = {
-                'budget': budget_year.gross_profit if budget_year else 0,
-                'actual': actual_year.gross_profit,
-                'diff': (actual_year.gross_profit - budget_year.gross_profit) if budget_year else None,
-                'diff_rate': ((actual_year.gross_profit - budget_year.gross_profit) / budget_year.gross_profit * 100) if budget_year and budget_year.gross_profit != 0 else None,
-            }
-            
-            financial_indicators['operating_profit'] = {
-                'budget': budget_year.operating_profit if budget_year else 0,
-                'actual': actual_year.operating_profit,
-                'diff': (actual_year.operating_profit - budget_year.operating_profit) if budget_year else None,
-                'diff_rate': ((actual_year.operating_profit - budget_year.operating_profit) / budget_year.operating_profit * 100) if budget_year and budget_year.operating_profit != 0 else None,
-            }
-            
-            financial_indicators['ordinary_profit'] = {
-                'budget': budget_year.ordinary_profit if budget_year else 0,
-                'actual': actual_year.ordinary_profit,
-                'diff': (actual_year.ordinary_profit - budget_year.ordinary_profit) if budget_year else None,
-                'diff_rate': ((actual_year.ordinary_profit - budget_year.ordinary_profit) / budget_year.ordinary_profit * 100) if budget_year and budget_year.ordinary_profit != 0 else None,
-            }
-            
-            financial_indicators['net_profit'] = {
-                'budget': budget_year.net_profit if budget_year else 0,
-                'actual': actual_year.net_profit,
-                'diff': (actual_year.net_profit - budget_year.net_profit) if budget_year else None,
-                'diff_rate': ((actual_year.net_profit - budget_year.net_profit) / budget_year.net_profit * 100) if budget_year and budget_year.net_profit != 0 else None,
-            }
-            
-            # 経営指標
-            financial_indicators['gross_profit_margin'] = {
-                'budget': float(budget_year.gross_profit_margin) if budget_year and budget_year.gross_profit_margin else 0,
-                'actual': float(actual_year.gross_profit_margin) if actual_year.gross_profit_margin else 0,
-                'diff': (float(actual_year.gross_profit_margin) if actual_year.gross_profit_margin else 0) - (float(budget_year.gross_profit_margin) if budget_year and budget_year.gross_profit_margin else 0) if budget_year else None,
-            }
-            
-            financial_indicators['operating_profit_margin'] = {
-                'budget': float(budget_year.operating_profit_margin) if budget_year and budget_year.operating_profit_margin else 0,
-                'actual': float(actual_year.operating_profit_margin) if actual_year.operating_profit_margin else 0,
-                'diff': (float(actual_year.operating_profit_margin) if actual_year.operating_profit_margin else 0) - (float(budget_year.operating_profit_margin) if budget_year and budget_year.operating_profit_margin else 0) if budget_year else None,
-            }
-            
-            financial_indicators['ROA'] = {
-                'budget': float(budget_year.ROA) if budget_year and budget_year.ROA else 0,
-                'actual': float(actual_year.ROA) if actual_year.ROA else 0,
-                'diff': (float(actual_year.ROA) if actual_year.ROA else 0) - (float(budget_year.ROA) if budget_year and budget_year.ROA else 0) if budget_year else None,
-            }
-            
-            financial_indicators['equity_ratio'] = {
-                'budget': float(budget_year.equity_ratio) if budget_year and budget_year.equity_ratio else 0,
-                'actual': float(actual_year.equity_ratio) if actual_year.equity_ratio else 0,
-                'diff': (float(actual_year.equity_ratio) if actual_year.equity_ratio else 0) - (float(budget_year.equity_ratio) if budget_year and budget_year.equity_ratio else 0) if budget_year else None,
-            }
-            
-            financial_indicators['current_ratio'] = {
-                'budget': float(budget_year.current_ratio) if budget_year and budget_year.current_ratio else 0,
-                'actual': float(actual_year.current_ratio) if actual_year.current_ratio else 0,
-                'diff': (float(actual_year.current_ratio) if actual_year.current_ratio else 0) - (float(budget_year.current_ratio) if budget_year and budget_year.current_ratio else 0) if budget_year else None,
-            }
-            
-            # グラフ用データ
-            chart_data = {
-                'labels': ['売上高', '粗利益', '営業利益', '経常利益', '当期純利益'],
-                'budget': [
-                    budget_year.sales if budget_year else None,
-                    budget_year.gross_profit if budget_year else None,
-                    budget_year.operating_profit if budget_year else None,
-                    budget_year.ordinary_profit if budget_year else None,
-                    budget_year.net_profit if budget_year else None,
-                ],
-                'actual': [
-                    actual_year.sales,
-                    actual_year.gross_profit,
-                    actual_year.operating_profit,
-                    actual_year.ordinary_profit,
-                    actual_year.net_profit,
-                ],
-            }
-            
-            # 経営指標グラフ用データ
-            indicators_chart_data = {
-                'labels': ['売上総利益率', '営業利益率', 'ROA', '自己資本比率', '流動比率'],
-                'budget': [
-                    float(budget_year.gross_profit_margin) if budget_year and budget_year.gross_profit_margin else None,
-                    float(budget_year.operating_profit_margin) if budget_year and budget_year.operating_profit_margin else None,
-                    float(budget_year.ROA) if budget_year and budget_year.ROA else None,
-                    float(budget_year.equity_ratio) if budget_year and budget_year.equity_ratio else None,
-                    float(budget_year.current_ratio) if budget_year and budget_year.current_ratio else None,
-                ],
-                'actual': [
-                    float(actual_year.gross_profit_margin) if actual_year.gross_profit_margin else 0,
-                    float(actual_year.operating_profit_margin) if actual_year.operating_profit_margin else 0,
-                    float(actual_year.ROA) if actual_year.ROA else 0,
-                    float(actual_year.equity_ratio) if actual_year.equity_ratio else 0,
-                    float(actual_year.current_ratio) if actual_year.current_ratio else 0,
-                ],
-            }
-            
-            # BS（貸借対照表）データを計算
-            bs_indicators = {}
-            
-            # 資産の部
-            bs_indicators['cash_and_deposits'] = {
-                'budget': budget_year.cash_and_deposits if budget_year else 0,
-                'actual': actual_year.cash_and_deposits,
-                'diff': (actual_year.cash_and_deposits - budget_year.cash_and_deposits) if budget_year else None,
-                'diff_rate': ((actual_year.cash_and_deposits - budget_year.cash_and_deposits) / budget_year.cash_and_deposits * 100) if budget_year and budget_year.cash_and_deposits != 0 else None,
-            }
-            
-            bs_indicators['accounts_receivable'] = {
-                'budget': budget_year.accounts_receivable if budget_year else 0,
-                'actual': actual_year.accounts_receivable,
-                'diff': (actual_year.accounts_receivable - budget_year.accounts_receivable) if budget_year else None,
-                'diff_rate': ((actual_year.accounts_receivable - budget_year.accounts_receivable) / budget_year.accounts_receivable * 100) if budget_year and budget_year.accounts_receivable != 0 else None,
-            }
-            
-            bs_indicators['inventory'] = {
-                'budget': budget_year.inventory if budget_year else 0,
-                'actual': actual_year.inventory,
-                'diff': (actual_year.inventory - budget_year.inventory) if budget_year else None,
-                'diff_rate': ((actual_year.inventory - budget_year.inventory) / budget_year.inventory * 100) if budget_year and budget_year.inventory != 0 else None,
-            }
-            
-            bs_indicators['total_current_assets'] = {
-                'budget': budget_year.total_current_assets if budget_year else 0,
-                'actual': actual_year.total_current_assets,
-                'diff': (actual_year.total_current_assets - budget_year.total_current_assets) if budget_year else None,
-                'diff_rate': ((actual_year.total_current_assets - budget_year.total_current_assets) / budget_year.total_current_assets * 100) if budget_year and budget_year.total_current_assets != 0 else None,
-            }
-            
-            bs_indicators['total_fixed_assets'] = {
-                'budget': budget_year.total_fixed_assets if budget_year else 0,
-                'actual': actual_year.total_fixed_assets,
-                'diff': (actual_year.total_fixed_assets - budget_year.total_fixed_assets) if budget_year else None,
-                'diff_rate': ((actual_year.total_fixed_assets - budget_year.total_fixed_assets) / budget_year.total_fixed_assets * 100) if budget_year and budget_year.total_fixed_assets != 0 else None,
-            }
-            
-            bs_indicators['total_assets'] = {
-                'budget': budget_year.total_assets if budget_year else 0,
-                'actual': actual_year.total_assets,
-                'diff': (actual_year.total_assets - budget_year.total_assets) if budget_year else None,
-                'diff_rate': ((actual_year.total_assets - budget_year.total_assets) / budget_year.total_assets * 100) if budget_year and budget_year.total_assets != 0 else None,
-            }
-            
-            # 負債の部
-            bs_indicators['accounts_payable'] = {
-                'budget': budget_year.accounts_payable if budget_year else 0,
-                'actual': actual_year.accounts_payable,
-                'diff': (actual_year.accounts_payable - budget_year.accounts_payable) if budget_year else None,
-                'diff_rate': ((actual_year.accounts_payable - budget_year.accounts_payable) / budget_year.accounts_payable * 100) if budget_year and budget_year.accounts_payable != 0 else None,
-            }
-            
-            bs_indicators['short_term_loans_payable'] = {
-                'budget': budget_year.short_term_loans_payable if budget_year else 0,
-                'actual': actual_year.short_term_loans_payable,
-                'diff': (actual_year.short_term_loans_payable - budget_year.short_term_loans_payable) if budget_year else None,
-                'diff_rate': ((actual_year.short_term_loans_payable - budget_year.short_term_loans_payable) / budget_year.short_term_loans_payable * 100) if budget_year and budget_year.short_term_loans_payable != 0 else None,
-            }
-            
-            bs_indicators['total_current_liabilities'] = {
-                'budget': budget_year.total_current_liabilities if budget_year else 0,
-                'actual': actual_year.total_current_liabilities,
-                'diff': (actual_year.total_current_liabilities - budget_year.total_current_liabilities) if budget_year else None,
-                'diff_rate': ((actual_year.total_current_liabilities - budget_year.total_current_liabilities) / budget_year.total_current_liabilities * 100) if budget_year and budget_year.total_current_liabilities != 0 else None,
-            }
-            
-            bs_indicators['long_term_loans_payable'] = {
-                'budget': budget_year.long_term_loans_payable if budget_year else 0,
-                'actual': actual_year.long_term_loans_payable,
-                'diff': (actual_year.long_term_loans_payable - budget_year.long_term_loans_payable) if budget_year else None,
-                'diff_rate': ((actual_year.long_term_loans_payable - budget_year.long_term_loans_payable) / budget_year.long_term_loans_payable * 100) if budget_year and budget_year.long_term_loans_payable != 0 else None,
-            }
-            
-            bs_indicators['total_liabilities'] = {
-                'budget': budget_year.total_liabilities if budget_year else 0,
-                'actual': actual_year.total_liabilities,
-                'diff': (actual_year.total_liabilities - budget_year.total_liabilities) if budget_year else None,
-                'diff_rate': ((actual_year.total_liabilities - budget_year.total_liabilities) / budget_year.total_liabilities * 100) if budget_year and budget_year.total_liabilities != 0 else None,
-            }
-            
-            # 純資産の部
-            bs_indicators['capital_stock'] = {
-                'budget': budget_year.capital_stock if budget_year else 0,
-                'actual': actual_year.capital_stock,
-                'diff': (actual_year.capital_stock - budget_year.capital_stock) if budget_year else None,
-                'diff_rate': ((actual_year.capital_stock - budget_year.capital_stock) / budget_year.capital_stock * 100) if budget_year and budget_year.capital_stock != 0 else None,
-            }
-            
-            bs_indicators['retained_earnings'] = {
-                'budget': budget_year.retained_earnings if budget_year else 0,
-                'actual': actual_year.retained_earnings,
-                'diff': (actual_year.retained_earnings - budget_year.retained_earnings) if budget_year else None,
-                'diff_rate': ((actual_year.retained_earnings - budget_year.retained_earnings) / budget_year.retained_earnings * 100) if budget_year and budget_year.retained_earnings != 0 else None,
-            }
-            
-            bs_indicators['total_net_assets'] = {
-                'budget': budget_year.total_net_assets if budget_year else 0,
-                'actual': actual_year.total_net_assets,
-                'diff': (actual_year.total_net_assets - budget_year.total_net_assets) if budget_year else None,
-                'diff_rate': ((actual_year.total_net_assets - budget_year.total_net_assets) / budget_year.total_net_assets * 100) if budget_year and budget_year.total_net_assets != 0 else None,
-            }
-            
-            # BSグラフ用データ
-            bs_chart_data = {
-                'labels': ['現金及び預金', '売上債権', '棚卸資産', '流動資産合計', '固定資産合計', '資産合計', '仕入債務', '短期借入金', '流動負債合計', '長期借入金', '負債合計', '資本金', '利益剰余金', '純資産合計'],
-                'budget': [
-                    budget_year.cash_and_deposits if budget_year else None,
-                    budget_year.accounts_receivable if budget_year else None,
-                    budget_year.inventory if budget_year else None,
-                    budget_year.total_current_assets if budget_year else None,
-                    budget_year.total_fixed_assets if budget_year else None,
-                    budget_year.total_assets if budget_year else None,
-                    budget_year.accounts_payable if budget_year else None,
-                    budget_year.short_term_loans_payable if budget_year else None,
-                    budget_year.total_current_liabilities if budget_year else None,
-                    budget_year.long_term_loans_payable if budget_year else None,
-                    budget_year.total_liabilities if budget_year else None,
-                    budget_year.capital_stock if budget_year else None,
-                    budget_year.retained_earnings if budget_year else None,
-                    budget_year.total_net_assets if budget_year else None,
-                ],
-                'actual': [
-                    actual_year.cash_and_deposits,
-                    actual_year.accounts_receivable,
-                    actual_year.inventory,
-                    actual_year.total_current_assets,
-                    actual_year.total_fixed_assets,
-                    actual_year.total_assets,
-                    actual_year.accounts_payable,
-                    actual_year.short_term_loans_payable,
-                    actual_year.total_current_liabilities,
-                    actual_year.long_term_loans_payable,
-                    actual_year.total_liabilities,
-                    actual_year.capital_stock,
-                    actual_year.retained_earnings,
-                    actual_year.total_net_assets,
-                ],
-            }
-        else:
-            chart_data = {
-                'labels': [],
-                'budget': [],
-                'actual': [],
-            }
-            indicators_chart_data = {
-                'labels': [],
-                'budget': [],
-                'actual': [],
-            }
-            bs_indicators = {}
-            bs_chart_data = {
-                'labels': [],
-                'budget': [],
-                'actual': [],
-            }
-        
-        # グラフデータをJSON形式に変換
-        import json
-        chart_data_json = json.dumps(chart_data)
-        indicators_chart_data_json = json.dumps(indicators_chart_data)
-        bs_chart_data_json = json.dumps(bs_chart_data)
-        
+        comparison = self.comparison
+
+        # 予算がなくても実績があれば表示（実績がない場合の比較結果は空）
+        chart_data = comparison.chart_data(PL)
+        indicators_chart_data = comparison.chart_data(RATIO)
+        bs_chart_data = comparison.chart_data(BS)
+
         context.update({
             'title': '年次予算vs実績比較',
-            'show_title_card': False,
-            'year': year,
-            'budget_year': budget_year,
-            'actual_year': actual_year,
-            'financial_indicators': financial_indicators,
-            'bs_indicators': bs_indicators,
+            'budget_year': comparison.budget_year,
+            'actual_year': comparison.actual_year,
+            'financial_indicators': comparison.financial_indicators,
+            'bs_indicators': comparison.bs_indicators,
             'chart_data': chart_data,
-            'chart_data_json': chart_data_json,
+            'chart_data_json': json.dumps(chart_data),
             'indicators_chart_data': indicators_chart_data,
-            'indicators_chart_data_json': indicators_chart_data_json,
+            'indicators_chart_data_json': json.dumps(indicators_chart_data),
             'bs_chart_data': bs_chart_data,
-            'bs_chart_data_json': bs_chart_data_json,
-            'available_years': available_years_list,
+            'bs_chart_data_json': json.dumps(bs_chart_data),
         })
-        
         return context
 
 
-class BudgetVsActualMonthlyComparisonView(SelectedCompanyMixin, TemplateView):
+class BudgetVsActualMonthlyComparisonView(BudgetVsActualBaseView):
     """月次予算と実績の推移比較ビュー"""
     template_name = 'scoreai/budget_vs_actual_monthly.html'
 
     def get_context_data(self, **kwargs) -> Dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        company = self.this_company
-        
-        # 利用可能な年度を取得（予算または実績データが存在する年度）
-        available_years_list = list(FiscalSummary_Year.objects.filter(
-            company=company
-        ).values_list('year', flat=True).distinct().order_by('-year'))
-        
-        # デフォルト年度を取得（データが存在する最新年度、または現在年度）
-        default_year = None
-        if available_years_list:
-            default_year = available_years_list[0]
-        else:
-            default_year = timezone.now().year
-        
-        # 年度を取得（デフォルトはデータが存在する最新年度）
-        # URLパラメータから年度を取得、なければデフォルト年度を使用
-        year_param = self.request.GET.get('year')
-        if year_param:
-            try:
-                year = int(year_param)
-            except ValueError:
-                year = default_year
-        else:
-            year = default_year
-        
-        # 月次データから直接取得（FiscalSummary_Yearに依存しない）
-        # 指定年度の予算月次データを取得
-        budget_monthly_all = FiscalSummary_Month.objects.filter(
-            fiscal_summary_year__company=company,
-            fiscal_summary_year__year=year,
-            is_budget=True
-        ).select_related('fiscal_summary_year').order_by('period')
-        
-        # 指定年度の実績月次データを取得
-        actual_monthly_all = FiscalSummary_Month.objects.filter(
-            fiscal_summary_year__company=company,
-            fiscal_summary_year__year=year,
-            is_budget=False
-        ).select_related('fiscal_summary_year').order_by('period')
-        
-        # 年度データは取得しない（月次データのみを使用）
-        # デバッグログ
-        logger.info(f"BudgetVsActualMonthlyComparisonView: year={year}")
-        logger.info(f"budget_monthly_all count: {budget_monthly_all.count()}")
-        logger.info(f"actual_monthly_all count: {actual_monthly_all.count()}")
-        
-        # 月次データを取得（12ヶ月分）
-        monthly_comparison = []
-        chart_data = {
-            'labels': [],
-            'budget_sales': [],
-            'actual_sales': [],
-            'budget_operating_profit': [],
-            'actual_operating_profit': [],
-        }
-        
-        # 会社の決算月を取得
-        fiscal_month = company.fiscal_month  # 1-12の値（1=1月、2=2月、...、12=12月）
-        
-        # 月次データが存在する場合、12ヶ月分のデータを準備
-        if budget_monthly_all.exists() or actual_monthly_all.exists():
-            # 予算と実績の月次データを辞書に変換（periodをキーに）
-            budget_monthly_dict = {m.period: m for m in budget_monthly_all}
-            actual_monthly_dict = {m.period: m for m in actual_monthly_all}
-            
-            # 決算月を考慮した月度順序を計算
-            # 決算月の次の月から始まる（例：決算月が5月の場合、6月から始まる）
-            # periodは1-12の値で、決算月の次の月が1、その次が2、...、決算月が12となる
-            def get_display_month(period):
-                """period（1-12）を決算月を考慮した表示月に変換"""
-                # periodは決算月の次の月を1として始まる
-                # 例：決算月が5月の場合、period=1は6月、period=2は7月、...、period=12は5月
-                display_month = (fiscal_month + period) % 12
-                if display_month == 0:
-                    display_month = 12
-                return display_month
-            
-            # 12ヶ月分のデータを準備（決算月の次の月から順に）
-            for period in range(1, 13):
-                budget_month = budget_monthly_dict.get(period)
-                actual_month = actual_monthly_dict.get(period)
-                
-                # デバッグログ
-                if period == 1:
-                    logger.info(f"Period {period}: budget_month={budget_month}, actual_month={actual_month}")
-                
-                if budget_month and actual_month:
-                    # 両方のデータがある場合：実績vs予算を表示
-                    display_month = get_display_month(period)
-                    sales_diff = float(actual_month.sales) - float(budget_month.sales)
-                    sales_achievement_rate = (float(actual_month.sales) / float(budget_month.sales) * 100) if float(budget_month.sales) > 0 else 0
-                    
-                    operating_profit_diff = float(actual_month.operating_profit) - float(budget_month.operating_profit)
-                    operating_profit_achievement_rate = (float(actual_month.operating_profit) / float(budget_month.operating_profit) * 100) if float(budget_month.operating_profit) != 0 else 0
-                    
-                    monthly_comparison.append({
-                        'period': period,
-                        'display_month': display_month,  # 表示用の月（決算月を考慮）
-                        'budget_sales': budget_month.sales,
-                        'actual_sales': actual_month.sales,
-                        'sales_diff': sales_diff,
-                        'sales_achievement_rate': sales_achievement_rate,
-                        'budget_operating_profit': budget_month.operating_profit,
-                        'actual_operating_profit': actual_month.operating_profit,
-                        'operating_profit_diff': operating_profit_diff,
-                        'operating_profit_achievement_rate': operating_profit_achievement_rate,
-                        'budget_gross_profit': budget_month.gross_profit,
-                        'actual_gross_profit': actual_month.gross_profit,
-                        'gross_profit_diff': float(actual_month.gross_profit) - float(budget_month.gross_profit),
-                        'budget_ordinary_profit': budget_month.ordinary_profit,
-                        'actual_ordinary_profit': actual_month.ordinary_profit,
-                        'ordinary_profit_diff': float(actual_month.ordinary_profit) - float(budget_month.ordinary_profit),
-                        'has_actual': True,  # 実績データがあることを示すフラグ
-                    })
-                    
-                    # グラフ用データ
-                    chart_data['labels'].append(f'{display_month}月')
-                    chart_data['budget_sales'].append(float(budget_month.sales))
-                    chart_data['actual_sales'].append(float(actual_month.sales))
-                    chart_data['budget_operating_profit'].append(float(budget_month.operating_profit))
-                    chart_data['actual_operating_profit'].append(float(actual_month.operating_profit))
-                elif budget_month:
-                    # 予算のみの場合：予算のみを表示
-                    display_month = get_display_month(period)
-                    monthly_comparison.append({
-                        'period': period,
-                        'display_month': display_month,  # 表示用の月（決算月を考慮）
-                        'budget_sales': budget_month.sales,
-                        'actual_sales': None,  # 実績データなし
-                        'sales_diff': None,
-                        'sales_achievement_rate': None,
-                        'budget_operating_profit': budget_month.operating_profit,
-                        'actual_operating_profit': None,
-                        'operating_profit_diff': None,
-                        'operating_profit_achievement_rate': None,
-                        'budget_gross_profit': budget_month.gross_profit,
-                        'actual_gross_profit': None,
-                        'gross_profit_diff': None,
-                        'budget_ordinary_profit': budget_month.ordinary_profit,
-                        'actual_ordinary_profit': None,
-                        'ordinary_profit_diff': None,
-                        'has_actual': False,  # 実績データがないことを示すフラグ
-                    })
-                    
-                    # グラフ用データ（予算のみ）
-                    chart_data['labels'].append(f'{display_month}月')
-                    chart_data['budget_sales'].append(float(budget_month.sales))
-                    chart_data['actual_sales'].append(None)  # 実績データなし
-                    chart_data['budget_operating_profit'].append(float(budget_month.operating_profit))
-                    chart_data['actual_operating_profit'].append(None)  # 実績データなし
-                elif actual_month:
-                    # 実績のみの場合（通常は発生しないが、念のため）
-                    display_month = get_display_month(period)
-                    monthly_comparison.append({
-                        'period': period,
-                        'display_month': display_month,  # 表示用の月（決算月を考慮）
-                        'budget_sales': None,
-                        'actual_sales': actual_month.sales,
-                        'sales_diff': None,
-                        'sales_achievement_rate': None,
-                        'budget_operating_profit': None,
-                        'actual_operating_profit': actual_month.operating_profit,
-                        'operating_profit_diff': None,
-                        'operating_profit_achievement_rate': None,
-                        'budget_gross_profit': None,
-                        'actual_gross_profit': actual_month.gross_profit,
-                        'gross_profit_diff': None,
-                        'budget_ordinary_profit': None,
-                        'actual_ordinary_profit': actual_month.ordinary_profit,
-                        'ordinary_profit_diff': None,
-                        'has_actual': True,
-                    })
-                    
-                    chart_data['labels'].append(f'{display_month}月')
-                    chart_data['budget_sales'].append(None)
-                    chart_data['actual_sales'].append(float(actual_month.sales))
-                    chart_data['budget_operating_profit'].append(None)
-                    chart_data['actual_operating_profit'].append(float(actual_month.operating_profit))
-        
-        # 月次データから合計を計算（年度データがない場合に備えて）
-        total_budget_sales = sum(float(m['budget_sales']) for m in monthly_comparison if m.get('budget_sales') is not None)
-        total_actual_sales = sum(float(m['actual_sales']) for m in monthly_comparison if m.get('actual_sales') is not None)
-        total_budget_operating_profit = sum(float(m['budget_operating_profit']) for m in monthly_comparison if m.get('budget_operating_profit') is not None)
-        total_actual_operating_profit = sum(float(m['actual_operating_profit']) for m in monthly_comparison if m.get('actual_operating_profit') is not None)
-        
-        # グラフデータをJSON形式に変換
-        import json
-        chart_data_json = json.dumps(chart_data)
-        
-        # デバッグログ
-        logger.info(f"BudgetVsActualMonthlyComparisonView: year={year}, monthly_comparison_count={len(monthly_comparison)}")
-        
+        comparison = self.comparison
+        chart_data = comparison.monthly_chart_data()
+
         context.update({
             'title': '予算vs実績推移表',
-            'show_title_card': False,
-            'year': year,
-            'monthly_comparison': monthly_comparison,
+            'monthly_comparison': comparison.monthly,
             'chart_data': chart_data,
-            'chart_data_json': chart_data_json,
-            'available_years': available_years_list,
-            # 月次データから計算した合計
-            'total_budget_sales': total_budget_sales,
-            'total_actual_sales': total_actual_sales,
-            'total_budget_operating_profit': total_budget_operating_profit,
-            'total_actual_operating_profit': total_actual_operating_profit,
+            'chart_data_json': json.dumps(chart_data),
+            # 月次データから計算した合計（年度データがない場合に備えて）
+            'total_budget_sales': comparison.monthly_total('budget_sales'),
+            'total_actual_sales': comparison.monthly_total('actual_sales'),
+            'total_budget_operating_profit': comparison.monthly_total('budget_operating_profit'),
+            'total_actual_operating_profit': comparison.monthly_total('actual_operating_profit'),
         })
-        
         return context
 
 
@@ -1263,11 +554,20 @@ class BudgetSuggest_MonthForm(forms.Form):
         label='作成方法',
         choices=[
             ('equal', '1. 単純に12分割する'),
-            ('previous_ratio', '2. 前年の実績をもとに、各月の売り上げなどを算出'),
+            ('previous_ratio', '2. 過去の実績をもとに、各月の売り上げなどを算出'),
         ],
         widget=forms.RadioSelect(attrs={'class': 'form-check-input'}),
         help_text='月次予算の作成方法を選択してください'
     )
+    reference_years = forms.IntegerField(
+        label='参考にする過去の年数（方法2）',
+        required=False,
+        initial=DEFAULT_REFERENCE_YEARS,
+        min_value=1,
+        max_value=10,
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+        help_text='方法2では、過去の年数分の月次実績の平均で各月の割合を算出します'
+    )
     override_flag = forms.BooleanField(
         label='既存データを上書きする',
         required=False,
@@ -1341,235 +641,193 @@ class BudgetSuggest_MonthView(SelectedCompanyMixin, TransactionMixin, FormView):
 
     def form_valid(self, form):
         """フォームバリデーション成功時の処理"""
-        company = self.this_company
         budget_year = form.cleaned_data['budget_year']
         method = form.cleaned_data['method']
+        reference_years = form.cleaned_data.get('reference_years') or DEFAULT_REFERENCE_YEARS
         override_flag = form.cleaned_data.get('override_flag', False)
         
-        # 既存データのチェック
-        existing_budget = FiscalSummary_Month.objects.filter(
-            fiscal_summary_year=budget_year,
-            is_budget=True
-        ).exists()
+        try:
+            result = generate_monthly_budgets(
+                [budget_year], method=method, reference_years=reference_years, override=override_flag
+            )
+        except Exception as e:
+            logger.error(f"Monthly budget creation error: {e}", exc_info=True)
+            messages.error(
+                self.request,
+                f'月次予算の作成中にエラーが発生しました: {str(e)}'
+            )
+            return self.form_invalid(form)
         
-        if existing_budget and not override_flag:
+        if result.skipped:
             messages.error(
                 self.request,
                 f'{budget_year.year}年の月次予算データが既に存在します。「既存データを上書きする」にチェックを入れて再度実行してください。'
             )
             return self.form_invalid(form)
         
-        try:
-            if method == 'equal':
-                # 方法1: 単純に12分割
-                monthly_data = self._create_monthly_budget_equal(budget_year)
-            else:
-                # 方法2: 前年の実績の割合を基に算出
-                previous_year = budget_year.year - 1
-                previous_actual = FiscalSummary_Year.objects.filter(
-                    company=company,
-                    year=previous_year,
-                    is_budget=False,
-                    is_draft=False
-                ).first()
-                
-                if not previous_actual:
-                    messages.error(
-                        self.request,
-                        f'{previous_year}年の実績データが見つかりません。先に実績データを登録してください。'
-                    )
-                    return self.form_invalid(form)
-                
-                previous_monthly = FiscalSummary_Month.objects.filter(
-                    fiscal_summary_year=previous_actual,
-                    is_budget=False
-                ).order_by('period')
-                
-                if not previous_monthly.exists():
-                    messages.error(
-                        self.request,
-                        f'{previous_year}年の月次実績データが見つかりません。先に月次実績データを登録してください。'
-                    )
-                    return self.form_invalid(form)
-                
-                monthly_data = self._create_monthly_budget_from_previous_ratio(
-                    budget_year, previous_monthly
-                )
-            
-            # 上書きフラグがTrueの場合、既存の月次予算を削除
-            if override_flag:
-                deleted_count, _ = FiscalSummary_Month.objects.filter(
-                    fiscal_summary_year=budget_year,
-                    is_budget=True
-                ).delete()
-                logger.info(f"Deleted {deleted_count} existing monthly budget records for year {budget_year.year}")
-            
-            # 月次予算データを作成
-            # 上書きフラグがFalseの場合、既存データをチェックしてスキップ
-            created_count = 0
-            updated_count = 0
-            skipped_count = 0
-            
-            for period, data in monthly_data.items():
-                # 既存データをチェック（is_budgetに関わらず、同じ年度・月度のデータをチェック）
-                # unique_togetherが('fiscal_summary_year', 'period')なので、is_budgetに関わらず1つしか存在できない
-                existing = FiscalSummary_Month.objects.filter(
-                    fiscal_summary_year=budget_year,
-                    period=period
-                ).first()
-                
-                if existing:
-                    if override_flag:
-                        # 上書きフラグがTrueの場合、既存データを更新または削除して再作成
-                        if existing.is_budget:
-                            # 予算データの場合は更新
-                            existing.sales = data['sales']
-                            existing.gross_profit = data['gross_profit']
-                            existing.operating_profit = data['operating_profit']
-                            existing.ordinary_profit = data['ordinary_profit']
-                            existing.save()
-                            updated_count += 1
-                        else:
-                            # 実績データの場合は削除して予算データを作成
-                            existing.delete()
-                            FiscalSummary_Month.objects.create(
-                                fiscal_summary_year=budget_year,
-                                period=period,
-                                is_budget=True,
-                                sales=data['sales'],
-                                gross_profit=data['gross_profit'],
-                                operating_profit=data['operating_profit'],
-                                ordinary_profit=data['ordinary_profit'],
-                            )
-                            created_count += 1
-                    else:
-                        # 上書きフラグがFalseの場合、スキップ
-                        skipped_count += 1
-                else:
-                    # 新規作成
-                    FiscalSummary_Month.objects.create(
-                        fiscal_summary_year=budget_year,
-                        period=period,
-                        is_budget=True,
-                        sales=data['sales'],
-                        gross_profit=data['gross_profit'],
-                        operating_profit=data['operating_profit'],
-                        ordinary_profit=data['ordinary_profit'],
-                    )
-                    created_count += 1
-            
-            if override_flag:
-                messages.success(
-                    self.request,
-                    f'{budget_year.year}年の月次予算を{created_count + updated_count}ヶ月分作成しました（既存データを上書きしました）。'
+        if result.missing_actuals:
+            first_year = budget_year.year - reference_years
+            messages.error(
+                self.request,
+                f'{first_year}〜{budget_year.year - 1}年の月次実績データが見つかりません。先に月次実績データを登録してください。'
+            )
+            return self.form_invalid(form)
+        
+        if override_flag:
+            messages.success(
+                self.request,
+                f'{budget_year.year}年の月次予算を{result.month_count}ヶ月分作成しました（既存データを上書きしました）。'
+            )
+        else:
+            messages.success(
+                self.request,
+                f'{budget_year.year}年の月次予算を{result.month_count}ヶ月分作成しました。'
+            )
+        return redirect('fiscal_summary_month_list')
+
+
+class BudgetScenarioForm(forms.Form):
+    """予算シナリオ分析フォーム（ドライバーはカンマ区切りで複数の候補値を入力）"""
+    target_year = forms.IntegerField(
+        label='対象年度',
+        min_value=2000,
+        max_value=2100,
+        help_text='予算を作成する年度を選択してください'
+    )
+    sales_growth = NumberListField(
+        label=DRIVER_LABELS['sales_growth'],
+        initial='0, 5, 10',
+        help_text='前期比の売上高成長率の候補（例: -5, 0, 5, 10）'
+    )
+    gross_margin_change = NumberListField(
+        label=DRIVER_LABELS['gross_margin_change'],
+        initial='0',
+        help_text='前期の粗利率からの変化の候補（例: -1, 0, 1）'
+    )
+    sga_growth = NumberListField(
+        label=DRIVER_LABELS['sga_growth'],
+        initial='0, 3',
+        help_text='前期比の販管費の増加率の候補'
+    )
+    new_borrowing = NumberListField(
+        label=DRIVER_LABELS['new_borrowing'],
+        initial='0',
+        help_text='期首の新規借入額の候補（5年の元金均等返済として計算）'
+    )
+    interest_rate_change = NumberListField(
+        label=DRIVER_LABELS['interest_rate_change'],
+        initial='0',
+        help_text='既存借入・新規借入の金利の変化の候補（例: 0, 0.5, 1）'
+    )
+    investment_amount = forms.IntegerField(
+        label='今期投資予定額（千円）',
+        min_value=0,
+        initial=0,
+        required=False,
+    )
+    capital_increase = forms.IntegerField(
+        label='今期資本金増加予定額（千円）',
+        min_value=0,
+        initial=0,
+        required=False,
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if all(name in cleaned_data for name in DRIVER_NAMES):
+            drivers = self.drivers
+            if drivers.scenario_count > MAX_SCENARIOS:
+                raise forms.ValidationError(
+                    f'シナリオ数が多すぎます（{drivers.scenario_count}通り）。{MAX_SCENARIOS}通り以下になるよう候補を減らしてください。'
                 )
-            else:
-                if skipped_count > 0:
-                    messages.warning(
-                        self.request,
-                        f'{budget_year.year}年の月次予算を{created_count}ヶ月分作成しました。{skipped_count}ヶ月分は既存データのためスキップしました。上書きする場合は「既存データを上書きする」にチェックを入れてください。'
-                    )
-                else:
-                    messages.success(
-                        self.request,
-                        f'{budget_year.year}年の月次予算を{created_count}ヶ月分作成しました。'
-                    )
-            
-            return redirect('fiscal_summary_month_list')
-            
-        except Exception as e:
-            logger.error(f"Monthly budget creation error: {e}", exc_info=True)
+        return cleaned_data
+
+    @property
+    def drivers(self) -> ScenarioDrivers:
+        return ScenarioDrivers(**{name: self.cleaned_data[name] for name in DRIVER_NAMES})
+
+
+class BudgetScenarioView(SelectedCompanyMixin, TransactionMixin, FormView):
+    """
+    予算シナリオ分析ビュー
+
+    ドライバーの全組み合わせの損益・現預金・借入残高を一覧で比較し、選んだシナリオを年次予算として保存する。
+    数値はAIを使わずに計算する（AIはAI予算策定のコメント作成で使う）。
+    """
+    template_name = 'scoreai/budget_scenario.html'
+    form_class = BudgetScenarioForm
+
+    def get_initial(self):
+        initial = super().get_initial()
+        max_year = FiscalSummary_Year.objects.filter(
+            company=self.this_company,
+            is_budget=False,
+            is_draft=False
+        ).aggregate(Max('year'))['year__max']
+        initial['target_year'] = max_year + 1 if max_year is not None else timezone.now().year + 1
+        return initial
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['title'] = '予算シナリオ分析'
+        context['show_title_card'] = False
+        context['driver_labels'] = DRIVER_LABELS
+        context['result_labels'] = RESULT_LABELS
+        context['max_scenarios'] = MAX_SCENARIOS
+        return context
+
+    def form_valid(self, form):
+        """シナリオを計算して表示（scenario が送信された場合はそのシナリオを予算として保存）"""
+        company = self.this_company
+        target_year = form.cleaned_data['target_year']
+        previous_year = target_year - 1
+        previous_actual = FiscalSummary_Year.objects.filter(
+            company=company,
+            year=previous_year,
+            is_budget=False,
+            is_draft=False
+        ).first()
+        if not previous_actual:
             messages.error(
                 self.request,
-                f'月次予算の作成中にエラーが発生しました: {str(e)}'
+                f'{previous_year}年の実績データが見つかりません。先に実績データを登録してください。'
             )
             return self.form_invalid(form)
 
-    def _create_monthly_budget_equal(self, budget_year):
-        """方法1: 年次予算を12で分割"""
-        from decimal import Decimal, ROUND_DOWN
-        
-        monthly_data = {}
-        
-        # 年次予算の値を12で割る（Decimal型に変換、小数点以下2桁で切り捨て）
-        # max_digits=12, decimal_places=2 なので、整数部分は10桁まで
-        quantize_value = Decimal('0.01')  # 小数点以下2桁
-        
-        for period in range(1, 13):
-            monthly_data[period] = {
-                'sales': (Decimal(str(budget_year.sales)) / Decimal('12')).quantize(quantize_value, rounding=ROUND_DOWN),
-                'gross_profit': (Decimal(str(budget_year.gross_profit)) / Decimal('12')).quantize(quantize_value, rounding=ROUND_DOWN),
-                'operating_profit': (Decimal(str(budget_year.operating_profit)) / Decimal('12')).quantize(quantize_value, rounding=ROUND_DOWN),
-                'ordinary_profit': (Decimal(str(budget_year.ordinary_profit)) / Decimal('12')).quantize(quantize_value, rounding=ROUND_DOWN),
-            }
-        
-        return monthly_data
+        grid = simulate_scenarios(
+            previous_actual,
+            form.drivers,
+            load_debt_schedule(company, previous_year, target_year),
+            target_year=target_year,
+            investment_amount=form.cleaned_data.get('investment_amount') or 0,
+            capital_increase=form.cleaned_data.get('capital_increase') or 0,
+        )
 
-    def _create_monthly_budget_from_previous_ratio(self, budget_year, previous_monthly):
-        """方法2: 前年の実績の割合を基に算出"""
-        from decimal import Decimal, ROUND_DOWN
-        
-        monthly_data = {}
-        
-        # 前年の年次合計を計算
-        previous_year_total = {
-            'sales': sum(Decimal(str(m.sales)) for m in previous_monthly),
-            'gross_profit': sum(Decimal(str(m.gross_profit)) for m in previous_monthly),
-            'operating_profit': sum(Decimal(str(m.operating_profit)) for m in previous_monthly),
-            'ordinary_profit': sum(Decimal(str(m.ordinary_profit)) for m in previous_monthly),
-        }
-        
-        # 小数点以下2桁で切り捨て
-        quantize_value = Decimal('0.01')
-        
-        # 各月の割合を計算し、年次予算に適用
-        for month in previous_monthly:
-            period = month.period
-            if period > 12:  # 13（決算整理）はスキップ
-                continue
-            
-            # 前年の各月が年次合計に占める割合
-            sales_ratio = Decimal(str(month.sales)) / previous_year_total['sales'] if previous_year_total['sales'] > 0 else Decimal('1') / Decimal('12')
-            gross_profit_ratio = Decimal(str(month.gross_profit)) / previous_year_total['gross_profit'] if previous_year_total['gross_profit'] > 0 else Decimal('1') / Decimal('12')
-            operating_profit_ratio = Decimal(str(month.operating_profit)) / previous_year_total['operating_profit'] if previous_year_total['operating_profit'] > 0 else Decimal('1') / Decimal('12')
-            ordinary_profit_ratio = Decimal(str(month.ordinary_profit)) / previous_year_total['ordinary_profit'] if previous_year_total['ordinary_profit'] > 0 else Decimal('1') / Decimal('12')
-            
-            # 年次予算に割合を適用（Decimal型に変換、小数点以下2桁で切り捨て）
-            monthly_data[period] = {
-                'sales': (Decimal(str(budget_year.sales)) * sales_ratio).quantize(quantize_value, rounding=ROUND_DOWN),
-                'gross_profit': (Decimal(str(budget_year.gross_profit)) * gross_profit_ratio).quantize(quantize_value, rounding=ROUND_DOWN),
-                'operating_profit': (Decimal(str(budget_year.operating_profit)) * operating_profit_ratio).quantize(quantize_value, rounding=ROUND_DOWN),
-                'ordinary_profit': (Decimal(str(budget_year.ordinary_profit)) * ordinary_profit_ratio).quantize(quantize_value, rounding=ROUND_DOWN),
-            }
-        
-        # 12ヶ月分が作成されていない場合、残りを均等に分配
-        if len(monthly_data) < 12:
-            created_periods = set(monthly_data.keys())
-            missing_periods = [p for p in range(1, 13) if p not in created_periods]
-            
-            if missing_periods:
-                quantize_value = Decimal('0.01')
-                # 既存のデータの平均を計算
-                if monthly_data:
-                    avg_sales = (sum(d['sales'] for d in monthly_data.values()) / len(monthly_data)).quantize(quantize_value, rounding=ROUND_DOWN)
-                    avg_gross_profit = (sum(d['gross_profit'] for d in monthly_data.values()) / len(monthly_data)).quantize(quantize_value, rounding=ROUND_DOWN)
-                    avg_operating_profit = (sum(d['operating_profit'] for d in monthly_data.values()) / len(monthly_data)).quantize(quantize_value, rounding=ROUND_DOWN)
-                    avg_ordinary_profit = (sum(d['ordinary_profit'] for d in monthly_data.values()) / len(monthly_data)).quantize(quantize_value, rounding=ROUND_DOWN)
-                else:
-                    avg_sales = (Decimal(str(budget_year.sales)) / Decimal('12')).quantize(quantize_value, rounding=ROUND_DOWN)
-                    avg_gross_profit = (Decimal(str(budget_year.gross_profit)) / Decimal('12')).quantize(quantize_value, rounding=ROUND_DOWN)
-                    avg_operating_profit = (Decimal(str(budget_year.operating_profit)) / Decimal('12')).quantize(quantize_value, rounding=ROUND_DOWN)
-                    avg_ordinary_profit = (Decimal(str(budget_year.ordinary_profit)) / Decimal('12')).quantize(quantize_value, rounding=ROUND_DOWN)
-                
-                for period in missing_periods:
-                    monthly_data[period] = {
-                        'sales': avg_sales,
-                        'gross_profit': avg_gross_profit,
-                        'operating_profit': avg_operating_profit,
-                        'ordinary_profit': avg_ordinary_profit,
-                    }
-        
-        return monthly_data
+        scenario = self.request.POST.get('scenario')
+        if scenario is None:
+            return self.render_to_response(self.get_context_data(
+                form=form, previous_actual=previous_actual, grid=grid, rows=grid.rows(),
+            ))
+
+        try:
+            index = int(scenario)
+        except ValueError:
+            index = -1
+        if not 0 <= index < len(grid):
+            return HttpResponseBadRequest('選択したシナリオが見つかりません。')
+        budget_data = grid.budget_data(index)
+
+        budget_year, created = FiscalSummary_Year.objects.update_or_create(
+            company=company,
+            year=target_year,
+            is_budget=True,
+            defaults=budget_data
+        )
+        if created:
+            messages.success(self.request, f'{target_year}年の予算をシナリオから作成しました。必要に応じて修正してください。')
+        else:
+            messages.success(self.request, f'{target_year}年の予算をシナリオで更新しました。')
+        return redirect('fiscal_summary_year_update', pk=budget_year.pk)
 
 
 class BudgetAnalysisView(SelectedCompanyMixin, TemplateView):
@@ -49,7 +49,8 @@ def export_debts(request, format_type='csv'):
         company=this_company
     ).select_related(
         'financial_institution',
-        'secured_type'
+        'secured_type',
+        'company'
     )
     
     # フィルタリング
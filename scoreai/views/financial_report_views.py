@@ -15,6 +15,7 @@ from ..mixins import SelectedCompanyMixin
 from ..forms import FinancialReportForm
 from ..models import CloudStorageSetting
 from ..services.financial_report_generator import FinancialReportGenerator, ReportConfig
+from ..utils.storage.folder_cache import FolderIdCache
 
 logger = logging.getLogger(__name__)
 
@@ -154,13 +155,13 @@ class FinancialReportView(SelectedCompanyMixin, FormView):
                 
                 # 「財務会議資料」フォルダを取得または作成
                 folder_name = "財務会議資料"
-                folder = adapter.get_or_create_folder(folder_name, root_folder_id)
+                folder_id = FolderIdCache(storage_setting, adapter).resolve(folder_name)
                 
                 # ファイルをアップロード
                 uploaded_file = adapter.upload_file(
                     file_content=file_content,
                     filename=filename,
-                    folder_id=folder['id'],
+                    folder_id=folder_id,
                     mime_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
                 )
                 
@@ -184,13 +185,13 @@ class FinancialReportView(SelectedCompanyMixin, FormView):
                 
                 # 「財務会議資料」フォルダを取得または作成
                 folder_name = "財務会議資料"
-                folder = adapter.get_or_create_folder(folder_name, root_folder_id)
+                folder_id = FolderIdCache(storage_setting, adapter).resolve(folder_name)
                 
                 # ファイルをアップロード
                 uploaded_file = adapter.upload_file(
                     file_content=file_content,
                     filename=filename,
-                    folder_id=folder['id']
+                    folder_id=folder_id
                 )
                 
                 logger.info(f"Boxにファイルをアップロードしました: {uploaded_file.get('id')}")
@@ -17,6 +17,19 @@ from ..utils.fiscal_ai_diagnosis import (
     build_ai_diagnosis_prompt,
 )
 from ..utils.gemini import get_gemini_response
+from ..services.diagnosis_conversation_service import (
+    get_conversation,
+    get_report,
+    is_report_ready,
+    reply_to,
+    start_conversation,
+)
+from ..services.diagnosis_report_service import (
+    RENDERERS,
+    get_saved_report,
+    render_report,
+    save_report,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +63,8 @@ class FiscalAIDiagnosisGenerateView(SelectedCompanyMixin, LoginRequiredMixin, Er
                 company_edit_url = reverse('company_update', kwargs={'id': company.id})
                 missing_info_text = '、'.join(missing_company_info)
                 message = f'診断に必要な情報が不足しています。\n\n以下の項目を設定してください：{missing_info_text}\n\n設定は<a href="{company_edit_url}" target="_blank">会社情報編集画面</a>から行えます。'
+                # 情報入力の会話を新しく始める
+                start_conversation(request.user, fiscal_summary_year)
                 
                 return JsonResponse({
                     'success': True,
@@ -90,6 +105,8 @@ class FiscalAIDiagnosisGenerateView(SelectedCompanyMixin, LoginRequiredMixin, Er
                         questions.append(f"{info}を入力してください。")
                     elif 'ベンチマーク' in info:
                         questions.append("業界分類と企業規模を設定してください。")
+                # 情報入力の会話を新しく始める（収集したデータは会話で再利用する）
+                start_conversation(request.user, fiscal_summary_year, fiscal_data=fiscal_data)
                 
                 return JsonResponse({
                     'success': True,
@@ -110,33 +127,24 @@ class FiscalAIDiagnosisGenerateView(SelectedCompanyMixin, LoginRequiredMixin, Er
 
 分析は具体的で実践的であることを心がけ、数値に基づいた客観的な評価を行ってください。"""
             
-            # より軽量なモデルを試す（クォータ制限を回避するため）
-            models_to_try = ['gemini-1.5-flash', 'gemini-1.5-pro', 'gemini-2.0-flash-exp']
-            report = None
-            last_error = None
-            
-            for model_name in models_to_try:
-                try:
-                    report = get_gemini_response(
-                        prompt=prompt,
-                        system_instruction=system_instruction,
-                        model=model_name
-                    )
-                    if report:
-                        break
-                except ValueError as ve:
-                    # クォータ制限エラーの場合は、ユーザーに分かりやすいメッセージを返す
-                    if '利用制限' in str(ve) or 'quota' in str(ve).lower():
-                        return JsonResponse({
-                            'success': False,
-                            'error': str(ve)
-                        }, status=429)
-                    last_error = ve
-                    continue
-                except Exception as e:
-                    logger.warning(f"Error with model {model_name}: {e}")
-                    last_error = e
-                    continue
+            # より軽量なモデルから試す（クォータ制限を回避するため）
+            # 他のモデルへの切り替え・再試行は get_gemini_response が行う（タイムアウトや障害時は切り替えない）
+            try:
+                report = get_gemini_response(
+                    prompt=prompt,
+                    system_instruction=system_instruction,
+                    model='gemini-1.5-flash'
+                )
+                last_error = None
+            except ValueError as ve:
+                # クォータ制限エラーの場合は、ユーザーに分かりやすいメッセージを返す
+                if '利用制限' in str(ve) or 'quota' in str(ve).lower():
+                    return JsonResponse({
+                        'success': False,
+                        'error': str(ve)
+                    }, status=429)
+                report = None
+                last_error = ve
             
             if not report:
                 error_message = 'AI診断レポートの生成に失敗しました。'
@@ -151,6 +159,9 @@ class FiscalAIDiagnosisGenerateView(SelectedCompanyMixin, LoginRequiredMixin, Er
                     'error': error_message
                 }, status=500)
             
+            # ダウンロード用に文書モデルに変換して保存
+            save_report(fiscal_summary_year, report, user=request.user)
+            
             return JsonResponse({
                 'success': True,
                 'needs_info': False,
@@ -217,29 +228,15 @@ class FiscalAIDiagnosisChatView(SelectedCompanyMixin, LoginRequiredMixin, ErrorH
                         'company_edit_url': company_edit_url,
                     })
             
-            # 会話履歴を取得（セッションから）
-            chat_history = request.session.get(f'diagnosis_chat_{fiscal_summary_year_id}', [])
-            chat_history.append({'role': 'user', 'content': user_message})
-            
-            # AI応答を生成
-            system_instruction = """あなたは財務分析の専門家です。ユーザーから不足している財務情報を聞き出し、適切な質問をして情報を収集してください。
-情報が十分に集まったら、分析レポートを作成してください。"""
-            
-            # 会話履歴をプロンプトに含める
-            conversation = "\n".join([f"{msg['role']}: {msg['content']}" for msg in chat_history])
-            prompt = f"以下の会話を続けてください：\n\n{conversation}\n\nassistant:"
-            
-            ai_response = get_gemini_response(
-                prompt=prompt,
-                system_instruction=system_instruction,
-                model='gemini-2.0-flash-exp'
-            )
-            
-            chat_history.append({'role': 'assistant', 'content': ai_response})
-            request.session[f'diagnosis_chat_{fiscal_summary_year_id}'] = chat_history
+            # 会話はモデルに保存（最初のリクエストで新しい会話を開始）
+            if user_message:
+                conversation = get_conversation(request.user, fiscal_summary_year)
+            else:
+                conversation = start_conversation(request.user, fiscal_summary_year)
+            ai_response = reply_to(conversation, user_message)
             
             # レポートが準備できたかどうかを判定（簡易版：会話が一定回数以上の場合）
-            report_ready = len(chat_history) >= 6  # 3往復以上
+            report_ready = is_report_ready(conversation)
             
             response_data = {
                 'success': True,
@@ -248,18 +245,8 @@ class FiscalAIDiagnosisChatView(SelectedCompanyMixin, LoginRequiredMixin, ErrorH
             }
             
             if report_ready:
-                # レポートを生成
-                fiscal_data = collect_fiscal_data_for_diagnosis(
-                    self.this_company,
-                    fiscal_summary_year.year
-                )
-                prompt = build_ai_diagnosis_prompt(fiscal_data, missing_info=None)
-                report = get_gemini_response(
-                    prompt=prompt,
-                    system_instruction=system_instruction,
-                    model='gemini-2.0-flash-exp'
-                )
-                response_data['report'] = report
+                # レポートを生成（会話の開始時に収集したデータを使い、作成済みなら再利用）
+                response_data['report'] = get_report(conversation)
             
             return JsonResponse(response_data)
             
@@ -299,18 +286,17 @@ class FiscalAIDiagnosisDownloadView(SelectedCompanyMixin, LoginRequiredMixin, Er
                 pass
             
             # フォーマットチェック
-            if format_type not in ['pdf', 'pptx', 'excel']:
+            if format_type not in RENDERERS:
                 return JsonResponse({'error': '無効なフォーマットです。'}, status=400)
             
-            if format_type in ['pptx', 'excel'] and not can_download_advanced:
+            if format_type != 'pdf' and not can_download_advanced:
                 return JsonResponse({
                     'error': 'このフォーマットはProfessionalプラン以上で利用できます。'
                 }, status=403)
             
-            # レポートを生成（セッションから取得、または再生成）
-            report_text = request.session.get(f'diagnosis_report_{fiscal_summary_year_id}')
-            if not report_text:
-                # レポートがセッションにない場合、再生成
+            # 保存済みのレポート（なければ作成して保存）
+            report = get_saved_report(fiscal_summary_year)
+            if report is None:
                 fiscal_data = collect_fiscal_data_for_diagnosis(
                     self.this_company,
                     fiscal_summary_year.year
@@ -322,14 +308,20 @@ class FiscalAIDiagnosisDownloadView(SelectedCompanyMixin, LoginRequiredMixin, Er
                     system_instruction=system_instruction,
                     model='gemini-2.0-flash-exp'
                 )
+                if not report_text:
+                    return JsonResponse({'error': 'AI診断レポートの生成に失敗しました。'}, status=500)
+                report = save_report(fiscal_summary_year, report_text, user=request.user)
+            
+            # フォーマットに応じてレポートを出力（同じ内容の出力はキャッシュを使う）
+            _, content_type, extension, library = RENDERERS[format_type]
+            try:
+                content = render_report(report, format_type)
+            except ImportError:
+                return JsonResponse({'error': f'{extension.upper()}生成ライブラリ（{library}）がインストールされていません。'}, status=500)
             
-            # フォーマットに応じてレポートを生成
-            if format_type == 'pdf':
-                return self._generate_pdf(report_text, fiscal_summary_year)
-            elif format_type == 'pptx':
-                return self._generate_pptx(report_text, fiscal_summary_year)
-            elif format_type == 'excel':
-                return self._generate_excel(report_text, fiscal_summary_year)
+            response = HttpResponse(content, content_type=content_type)
+            response['Content-Disposition'] = f'attachment; filename="ai_diagnosis_{fiscal_summary_year.company.name}_{fiscal_summary_year.year}.{extension}"'
+            return response
             
         except FiscalSummary_Year.DoesNotExist:
             return JsonResponse({
@@ -340,180 +332,3 @@ class FiscalAIDiagnosisDownloadView(SelectedCompanyMixin, LoginRequiredMixin, Er
             return JsonResponse({
                 'error': f'エラーが発生しました: {str(e)}'
             }, status=500)
-    
-    def _generate_pdf(self, report_text: str, fiscal_summary_year: FiscalSummary_Year) -> HttpResponse:
-        """PDFレポートを生成"""
-        try:
-            from reportlab.lib import colors
-            from reportlab.lib.pagesizes import A4
-            from reportlab.lib.units import inch
-            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.lib.enums import TA_LEFT, TA_CENTER
-            import io
-            
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-            
-            styles = getSampleStyleSheet()
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=16,
-                textColor=colors.HexColor('#366092'),
-                spaceAfter=30,
-                alignment=TA_CENTER
-            )
-            heading_style = ParagraphStyle(
-                'CustomHeading',
-                parent=styles['Heading2'],
-                fontSize=12,
-                textColor=colors.HexColor('#366092'),
-                spaceAfter=12,
-                spaceBefore=12
-            )
-            
-            story = []
-            
-            # タイトル
-            title = Paragraph(f"{fiscal_summary_year.company.name} - AI診断レポート（{fiscal_summary_year.year}年度）", title_style)
-            story.append(title)
-            story.append(Spacer(1, 0.2*inch))
-            
-            # レポート内容をパースして追加
-            lines = report_text.split('\n')
-            current_page = 1
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    story.append(Spacer(1, 0.1*inch))
-                elif line.startswith('###'):
-                    # 小見出し
-                    text = line.replace('###', '').strip()
-                    story.append(Paragraph(text, heading_style))
-                elif line.startswith('##'):
-                    # 中見出し
-                    if current_page > 1:
-                        story.append(PageBreak())
-                    text = line.replace('##', '').strip()
-                    story.append(Paragraph(text, heading_style))
-                    current_page += 1
-                elif line.startswith('#'):
-                    # 大見出し
-                    if current_page > 1:
-                        story.append(PageBreak())
-                    text = line.replace('#', '').strip()
-                    story.append(Paragraph(text, title_style))
-                    current_page += 1
-                else:
-                    # 本文
-                    story.append(Paragraph(line, styles['Normal']))
-            
-            doc.build(story)
-            
-            response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="ai_diagnosis_{fiscal_summary_year.company.name}_{fiscal_summary_year.year}.pdf"'
-            return response
-            
-        except ImportError:
-            return JsonResponse({'error': 'PDF生成ライブラリ（reportlab）がインストールされていません。'}, status=500)
-    
-    def _generate_pptx(self, report_text: str, fiscal_summary_year: FiscalSummary_Year) -> HttpResponse:
-        """PPTXレポートを生成"""
-        try:
-            from pptx import Presentation
-            from pptx.util import Inches, Pt
-            import io
-            
-            prs = Presentation()
-            prs.slide_width = Inches(10)
-            prs.slide_height = Inches(7.5)
-            
-            # レポートを3ページに分割
-            lines = report_text.split('\n')
-            pages = []
-            current_page = []
-            
-            for line in lines:
-                if line.startswith('##') and current_page:
-                    pages.append('\n'.join(current_page))
-                    current_page = [line]
-                else:
-                    current_page.append(line)
-            if current_page:
-                pages.append('\n'.join(current_page))
-            
-            # 各ページをスライドとして追加
-            for i, page_content in enumerate(pages[:3]):  # 最大3ページ
-                slide = prs.slides.add_slide(prs.slide_layouts[5])  # 空白レイアウト
-                
-                # タイトル
-                title_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(9), Inches(1))
-                title_frame = title_box.text_frame
-                title_frame.text = f"AI診断レポート - ページ {i+1}"
-                title_frame.paragraphs[0].font.size = Pt(24)
-                title_frame.paragraphs[0].font.bold = True
-                
-                # 本文
-                content_box = slide.shapes.add_textbox(Inches(0.5), Inches(1.5), Inches(9), Inches(5.5))
-                content_frame = content_box.text_frame
-                content_frame.word_wrap = True
-                
-                # 内容を追加
-                for line in page_content.split('\n'):
-                    if line.strip():
-                        p = content_frame.add_paragraph()
-                        p.text = line.strip()
-                        p.font.size = Pt(12)
-            
-            buffer = io.BytesIO()
-            prs.save(buffer)
-            buffer.seek(0)
-            
-            response = HttpResponse(buffer.getvalue(), content_type='application/vnd.openxmlformats-officedocument.presentationml.presentation')
-            response['Content-Disposition'] = f'attachment; filename="ai_diagnosis_{fiscal_summary_year.company.name}_{fiscal_summary_year.year}.pptx"'
-            return response
-            
-        except ImportError:
-            return JsonResponse({'error': 'PPTX生成ライブラリ（python-pptx）がインストールされていません。'}, status=500)
-    
-    def _generate_excel(self, report_text: str, fiscal_summary_year: FiscalSummary_Year) -> HttpResponse:
-        """Excelレポートを生成"""
-        try:
-            from openpyxl import Workbook
-            from openpyxl.styles import Font, Alignment
-            import io
-            
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "AI診断レポート"
-            
-            # タイトル
-            ws['A1'] = f"{fiscal_summary_year.company.name} - AI診断レポート（{fiscal_summary_year.year}年度）"
-            ws['A1'].font = Font(size=16, bold=True)
-            ws.merge_cells('A1:D1')
-            
-            # レポート内容を追加
-            row = 3
-            lines = report_text.split('\n')
-            for line in lines:
-                if line.strip():
-                    ws[f'A{row}'] = line.strip()
-                    if line.startswith('#'):
-                        ws[f'A{row}'].font = Font(bold=True, size=12)
-                    row += 1
-            
-            # 列幅を調整
-            ws.column_dimensions['A'].width = 100
-            
-            buffer = io.BytesIO()
-            wb.save(buffer)
-            buffer.seek(0)
-            
-            response = HttpResponse(buffer.getvalue(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            response['Content-Disposition'] = f'attachment; filename="ai_diagnosis_{fiscal_summary_year.company.name}_{fiscal_summary_year.year}.xlsx"'
-            return response
-            
-        except ImportError:
-            return JsonResponse({'error': 'Excel生成ライブラリ（openpyxl）がインストールされていません。'}, status=500)
-
@@ -655,6 +655,8 @@ class ImportFiscalSummary_Month(SelectedCompanyMixin, TransactionMixin, FormView
                     'gross_profit': safe_value('gross_profit', row['粗利益（千円）']),
                     'operating_profit': safe_value('operating_profit', row['営業利益（千円）']),
                     'ordinary_profit': safe_value('ordinary_profit', row['経常利益（千円）']),
+                    # 取得済みの年度を渡し、キャッシュ無効化で会社IDを引くSQLを省く
+                    'fiscal_summary_year': fiscal_summary_year,
                 }
                 
                 existing_data = FiscalSummary_Month.objects.filter(
@@ -847,6 +849,8 @@ class ImportFiscalSummary_Month_FromMoneyforward(SelectedCompanyMixin, Transacti
                             'gross_profit': gross_profit,
                             'operating_profit': operating_profit,
                             'ordinary_profit': ordinary_profit,
+                            # 取得済みの年度を渡し、キャッシュ無効化で会社IDを引くSQLを省く
+                            'fiscal_summary_year': fiscal_year,
                         }
                     )
                     
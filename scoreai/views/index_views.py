@@ -15,8 +15,8 @@ from .utils import (
     get_monthly_summaries,
     calculate_total_monthly_summaries,
     get_debt_list,
-    get_debt_list_byAny,
 )
+from ..services.debt_analytics_service import DEFAULT_GROUPINGS, group_debts
 
 logger = logging.getLogger(__name__)
 
@@ -97,8 +97,12 @@ class IndexView(SelectedCompanyMixin, generic.TemplateView):
             self.this_company
         )
         debt_list = sorted(debt_list, key=lambda x: x['balances_monthly'][0], reverse=True)
-        debt_list_byBank = get_debt_list_byAny('financial_institution', debt_list)
-        debt_list_bySecuredType = get_debt_list_byAny('secured_type', debt_list)
+        debt_groups = group_debts(debt_list, {
+            'byBank': DEFAULT_GROUPINGS['byBank'],
+            'bySecuredType': DEFAULT_GROUPINGS['bySecuredType'],
+        })
+        debt_list_byBank = debt_groups['byBank']
+        debt_list_bySecuredType = debt_groups['bySecuredType']
 
         # Calculate weighted_average_interest using service layer
         from ..services.debt_service import DebtService
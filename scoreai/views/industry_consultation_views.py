@@ -2,19 +2,21 @@
 業界別専門相談室のビュー
 """
 from django.shortcuts import render, get_object_or_404, redirect
-from django.views.generic import TemplateView, CreateView, UpdateView, DetailView, ListView, DeleteView
+from django.views.generic import TemplateView, CreateView, UpdateView, DetailView, ListView, DeleteView, FormView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.db import transaction
 from django.http import JsonResponse, HttpResponse
 from django.views import View
 from django.urls import reverse, reverse_lazy
+from django.utils.functional import cached_property
 from decimal import Decimal
 
 from ..models import IndustryClassification, IzakayaPlan
 from ..mixins import SelectedCompanyMixin
-from ..izakaya_plan_forms import IzakayaPlanForm
+from ..izakaya_plan_forms import IzakayaPlanForm, IzakayaScenarioForm
 from ..services.izakaya_plan_service import IzakayaPlanService
+from ..services.izakaya_scenario_service import DRIVER_LABELS, MAX_SCENARIOS, RESULT_LABELS, simulate_plan_scenarios
 
 
 class IndustryConsultationCenterView(SelectedCompanyMixin, LoginRequiredMixin, TemplateView):
@@ -430,6 +432,51 @@ class IzakayaPlanPreviewView(SelectedCompanyMixin, LoginRequiredMixin, DetailVie
         return context
 
 
+class IzakayaPlanScenarioView(SelectedCompanyMixin, LoginRequiredMixin, FormView):
+    """
+    居酒屋出店計画のシナリオ分析ビュー
+
+    客単価・客数・営業曜日数・家賃・原価率の候補値の全組み合わせについて月間利益と回収期間を計算し、
+    損益の表（客単価 × 客数など）と回収期間の分布を表示する。計画自体は変更しない。
+    """
+    template_name = 'scoreai/izakaya_plan_scenario.html'
+    form_class = IzakayaScenarioForm
+
+    @cached_property
+    def plan(self):
+        return get_object_or_404(IzakayaPlan, pk=self.kwargs['pk'], company=self.this_company)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['plan'] = self.plan
+        context['title'] = '居酒屋出店計画 - シナリオ分析'
+        context['driver_labels'] = DRIVER_LABELS
+        context['result_labels'] = RESULT_LABELS
+        context['max_scenarios'] = MAX_SCENARIOS
+        return context
+
+    def form_valid(self, form):
+        """シナリオを計算して表示"""
+        try:
+            grid = simulate_plan_scenarios(self.plan, form.drivers)
+        except ValueError as e:
+            messages.error(self.request, str(e))
+            return self.form_invalid(form)
+
+        base = grid.rows()[grid.base_index()]
+        return self.render_to_response(self.get_context_data(
+            form=form,
+            grid=grid,
+            base=base,
+            profit_surface=grid.surface('monthly_profit', 'price_change', 'customer_change'),
+            break_even_surface=grid.surface('break_even_customers', 'price_change', 'cost_rate_change'),
+            rent_surface=grid.surface('monthly_profit', 'monthly_rent', 'customer_change'),
+            payback_distribution=grid.payback_distribution(),
+            payback_percentiles=grid.payback_percentiles(),
+            recoverable_count=int((grid.results['monthly_profit'] > 0).sum()),
+        ))
+
+
 class IzakayaPlanListView(SelectedCompanyMixin, LoginRequiredMixin, ListView):
     """居酒屋出店計画一覧ビュー"""
     model = IzakayaPlan
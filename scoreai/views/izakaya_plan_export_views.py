@@ -12,6 +12,7 @@ from ..models import IzakayaPlan
 from ..mixins import SelectedCompanyMixin
 from ..services.izakaya_plan_service import IzakayaPlanService
 from ..services.export_service import ExportService
+from ..services.pdf_service import PdfDocument
 
 
 class IzakayaPlanExportView(SelectedCompanyMixin, LoginRequiredMixin, View):
@@ -51,93 +52,35 @@ class IzakayaPlanExportView(SelectedCompanyMixin, LoginRequiredMixin, View):
     def _export_pdf(self, plan):
         """PDF形式でエクスポート"""
         try:
-            from reportlab.lib.pagesizes import A4
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.lib.units import inch
-            from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-            from reportlab.lib import colors
-            from reportlab.pdfbase import pdfmetrics
-            from reportlab.pdfbase.ttfonts import TTFont
-            import os
-            from io import BytesIO
-            
-            # 日本語フォントの登録
-            try:
-                font_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static/fonts/ipaexg.ttf')
-                pdfmetrics.registerFont(TTFont('JapaneseFont', font_path))
-                font_name = 'JapaneseFont'
-            except:
-                font_name = 'Helvetica'
-            
-            buffer = BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4)
-            story = []
-            
-            styles = getSampleStyleSheet()
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontName=font_name,
-                fontSize=18,
-                textColor=colors.HexColor('#366092'),
-                spaceAfter=30,
-                alignment=1
-            )
-            
-            normal_style = ParagraphStyle(
-                'CustomNormal',
-                parent=styles['Normal'],
-                fontName=font_name,
-                fontSize=10,
-                leading=12
-            )
+            pdf = PdfDocument()
             
             # 表紙
-            story.append(Paragraph('居酒屋出店計画書', title_style))
-            story.append(Spacer(1, 0.5 * inch))
-            story.append(Paragraph(f'会社名: {plan.company.name}', normal_style))
-            story.append(Paragraph(f'作成日: {datetime.now().strftime("%Y年%m月%d日")}', normal_style))
-            story.append(PageBreak())
+            pdf.title('居酒屋出店計画書')
+            pdf.spacer(0.3)
+            pdf.paragraph(f'会社名: {plan.company.name}')
+            pdf.paragraph(f'作成日: {datetime.now().strftime("%Y年%m月%d日")}')
+            pdf.page_break()
             
             # 事業概要
-            story.append(Paragraph('1. 事業概要', title_style))
-            story.append(Spacer(1, 0.2 * inch))
+            pdf.title('1. 事業概要')
             
             # 営業時間の表示（旧フィールドがNoneの場合は表示しない）
             opening_hours_text = '未設定'
             if plan.opening_hours_start and plan.opening_hours_end:
                 opening_hours_text = f'{plan.opening_hours_start.strftime("%H:%M")} ～ {plan.opening_hours_end.strftime("%H:%M")}'
             
-            overview_data = [
-                ['項目', '内容'],
+            pdf.table(['項目', '内容'], [
                 ['店のコンセプト', plan.store_concept or '未設定'],
                 ['席数', f'{plan.number_of_seats}席'],
                 ['営業時間', opening_hours_text],
                 ['ターゲット顧客', plan.target_customer or '未設定'],
                 ['客単価', f'{plan.average_price_per_customer:,.0f}円' if plan.average_price_per_customer else '未設定'],
-            ]
-            
-            overview_table = Table(overview_data)
-            overview_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), font_name + '-Bold'),
-                ('FONTNAME', (0, 1), (-1, -1), font_name),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('FONTSIZE', (0, 1), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            story.append(overview_table)
-            story.append(PageBreak())
+            ], striped=False)
+            pdf.page_break()
             
             # 投資計画
-            story.append(Paragraph('2. 投資計画', title_style))
-            story.append(Spacer(1, 0.2 * inch))
-            
-            investment_data = [
-                ['項目', '金額'],
+            pdf.title('2. 投資計画')
+            pdf.table(['項目', '金額'], [
                 ['初期投資額', f'{plan.initial_investment:,.0f}円'],
                 ['月額家賃', f'{plan.monthly_rent:,.0f}円'],
                 ['社員人数', f'{plan.number_of_staff}人'],
@@ -145,117 +88,52 @@ class IzakayaPlanExportView(SelectedCompanyMixin, LoginRequiredMixin, View):
                 ['アルバイト時間数/月', f'{plan.part_time_hours_per_month}時間'],
                 ['アルバイト時給', f'{plan.part_time_hourly_wage:,.0f}円'],
                 ['アルバイト人件費/月', f'{plan.part_time_hours_per_month * plan.part_time_hourly_wage:,.0f}円'],
-            ]
-            
-            investment_table = Table(investment_data)
-            investment_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), font_name + '-Bold'),
-                ('FONTNAME', (0, 1), (-1, -1), font_name),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('FONTSIZE', (0, 1), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            story.append(investment_table)
-            story.append(PageBreak())
+            ], striped=False)
+            pdf.page_break()
             
             # 収支計画
-            story.append(Paragraph('3. 収支計画', title_style))
-            story.append(Spacer(1, 0.2 * inch))
+            pdf.title('3. 収支計画')
             
             # 月次収支表（12ヶ月分）
-            monthly_data = [['月', '売上', '経費', '利益']]
-            for month in range(1, 13):
-                monthly_data.append([
+            pdf.table(['月', '売上', '経費', '利益'], [
+                [
                     f'{month}月',
                     f'{plan.monthly_revenue:,.0f}円',
                     f'{plan.monthly_cost:,.0f}円',
                     f'{plan.monthly_profit:,.0f}円'
-                ])
-            
-            monthly_table = Table(monthly_data)
-            monthly_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), font_name + '-Bold'),
-                ('FONTNAME', (0, 1), (-1, -1), font_name),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('FONTSIZE', (0, 1), (-1, -1), 9),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            story.append(monthly_table)
-            story.append(Spacer(1, 0.3 * inch))
+                ]
+                for month in range(1, 13)
+            ], align='CENTER', striped=False)
+            pdf.spacer(0.3)
             
             # 年次収支表（3年分）
-            yearly_data = [['年度', '売上', '経費', '利益']]
-            for year in range(1, 4):
-                yearly_data.append([
+            pdf.table(['年度', '売上', '経費', '利益'], [
+                [
                     f'{year}年目',
                     f'{plan.monthly_revenue * 12:,.0f}円',
                     f'{plan.monthly_cost * 12:,.0f}円',
                     f'{plan.monthly_profit * 12:,.0f}円'
-                ])
-            
-            yearly_table = Table(yearly_data)
-            yearly_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), font_name + '-Bold'),
-                ('FONTNAME', (0, 1), (-1, -1), font_name),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('FONTSIZE', (0, 1), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            story.append(yearly_table)
-            story.append(PageBreak())
+                ]
+                for year in range(1, 4)
+            ], align='CENTER', striped=False)
+            pdf.page_break()
             
             # 回収期間分析
-            story.append(Paragraph('4. 回収期間分析', title_style))
-            story.append(Spacer(1, 0.2 * inch))
+            pdf.title('4. 回収期間分析')
             
             if plan.payback_period_years == 999:
                 payback_text = '回収不可能（月間利益が0以下）'
             else:
                 payback_text = f'{plan.payback_period_years}年{plan.payback_period_months}ヶ月'
             
-            payback_data = [
-                ['項目', '内容'],
+            pdf.table(['項目', '内容'], [
                 ['初期投資額', f'{plan.initial_investment:,.0f}円'],
                 ['月間利益', f'{plan.monthly_profit:,.0f}円'],
                 ['初期投資回収期間', payback_text],
-            ]
+            ], striped=False)
             
-            payback_table = Table(payback_data)
-            payback_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), font_name + '-Bold'),
-                ('FONTNAME', (0, 1), (-1, -1), font_name),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('FONTSIZE', (0, 1), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            story.append(payback_table)
-            
-            # PDF生成
-            doc.build(story)
-            
-            response = HttpResponse(content_type='application/pdf')
             filename = f"居酒屋出店計画書_{plan.company.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            response.write(buffer.getvalue())
-            buffer.close()
-            
-            return response
+            return pdf.to_response(filename)
         except ImportError:
             return JsonResponse({'error': 'reportlabがインストールされていません。'}, status=400)
         except Exception as e:
@@ -9,11 +9,13 @@ from django.shortcuts import redirect
 from django.db import transaction
 import logging
 
+from asgiref.sync import sync_to_async
+
 from ..models import Firm, MeetingMinutes
-from ..mixins import SelectedCompanyMixin, ErrorHandlingMixin
+from ..mixins import AsyncDispatchMixin, SelectedCompanyMixin, ErrorHandlingMixin
 from ..forms import MeetingMinutesAIGenerateForm
 from ..utils.plan_features import check_plan_feature_access
-from ..utils.gemini import get_gemini_response
+from ..utils.gemini import get_gemini_response_async
 from ..utils.meeting_minutes_templates import (
     get_meeting_title,
     build_meeting_minutes_prompt,
@@ -23,13 +25,24 @@ from ..utils.meeting_minutes_templates import (
 logger = logging.getLogger(__name__)
 
 
-class MeetingMinutesAIGenerateView(SelectedCompanyMixin, LoginRequiredMixin, ErrorHandlingMixin, FormView):
-    """AI議事録生成ビュー"""
+class MeetingMinutesAIGenerateView(AsyncDispatchMixin, SelectedCompanyMixin, LoginRequiredMixin, ErrorHandlingMixin, FormView):
+    """
+    AI議事録生成ビュー
+
+    Geminiの応答待ちでワーカーを占有しないよう非同期で処理する（DBとセッションの処理はスレッドで実行）。
+    """
     form_class = MeetingMinutesAIGenerateForm
     template_name = 'scoreai/meeting_minutes_ai_generate.html'
     
-    def dispatch(self, request, *args, **kwargs):
+    async def dispatch(self, request, *args, **kwargs):
         """プラン制限チェック"""
+        response = await sync_to_async(self._check_plan_access)(request)
+        if response is not None:
+            return response
+        return await super().dispatch(request, *args, **kwargs)
+    
+    def _check_plan_access(self, request):
+        """Firmとプランを確認し、利用できない場合はリダイレクトを返す"""
         # Firmを取得（SelectedCompanyMixinから）
         try:
             from ..models import UserFirm
@@ -57,7 +70,7 @@ class MeetingMinutesAIGenerateView(SelectedCompanyMixin, LoginRequiredMixin, Err
             messages.error(request, 'エラーが発生しました。')
             return redirect('index')
         
-        return super().dispatch(request, *args, **kwargs)
+        return None
     
     def get_context_data(self, **kwargs) -> Dict[str, Any]:
         """コンテキストデータの取得"""
@@ -67,47 +80,68 @@ class MeetingMinutesAIGenerateView(SelectedCompanyMixin, LoginRequiredMixin, Err
         context['company'] = self.this_company
         return context
     
-    def form_valid(self, form):
+    async def get(self, request, *args, **kwargs):
+        return await sync_to_async(super().get)(request, *args, **kwargs)
+    
+    async def post(self, request, *args, **kwargs):
+        form = self.get_form()
+        if not await sync_to_async(form.is_valid)():
+            return await sync_to_async(self.form_invalid)(form)
+        return await self.form_valid(form)
+    
+    async def put(self, *args, **kwargs):
+        return await self.post(*args, **kwargs)
+    
+    async def form_valid(self, form):
         """フォームが有効な場合の処理"""
         meeting_type = form.cleaned_data['meeting_type']
         meeting_category = form.cleaned_data['meeting_category']
         agenda = form.cleaned_data['agenda']
-        additional_info = form.cleaned_data.get('additional_info', '')
         
-        # スクリプトを取得（管理画面で設定されたものがあれば使用）
-        script = get_meeting_minutes_script(meeting_type, meeting_category, agenda)
-        
-        # プロンプトを構築
-        prompt, system_instruction = build_meeting_minutes_prompt(
-            meeting_type=meeting_type,
-            meeting_category=meeting_category,
-            agenda=agenda,
-            additional_info=additional_info,
-            company_name=self.this_company.name,
-            script=script
-        )
+        prompt, system_instruction = await sync_to_async(self._build_prompt)(form)
         
         # AIで議事録を生成
         try:
-            generated_text = get_gemini_response(prompt, system_instruction=system_instruction)
+            generated_text = await get_gemini_response_async(prompt, system_instruction=system_instruction)
             
             if not generated_text:
                 messages.error(self.request, '議事録の生成に失敗しました。もう一度お試しください。')
-                return self.form_invalid(form)
+                return await sync_to_async(self.form_invalid)(form)
             
             # セッションに生成結果を保存
-            self.request.session['generated_minutes'] = generated_text
-            self.request.session['meeting_type'] = meeting_type
-            self.request.session['meeting_category'] = meeting_category
-            self.request.session['agenda'] = agenda
-            self.request.session['meeting_title'] = get_meeting_title(meeting_type, meeting_category, agenda)
+            await sync_to_async(self.request.session.update)({
+                'generated_minutes': generated_text,
+                'meeting_type': meeting_type,
+                'meeting_category': meeting_category,
+                'agenda': agenda,
+                'meeting_title': get_meeting_title(meeting_type, meeting_category, agenda),
+            })
             
             return redirect('meeting_minutes_ai_result')
             
         except Exception as e:
             logger.error(f"Error generating meeting minutes: {e}", exc_info=True)
             messages.error(self.request, f'議事録の生成中にエラーが発生しました: {str(e)}')
-            return self.form_invalid(form)
+            return await sync_to_async(self.form_invalid)(form)
+    
+    def _build_prompt(self, form):
+        """スクリプトとCompany名を取得してプロンプトを構築"""
+        meeting_type = form.cleaned_data['meeting_type']
+        meeting_category = form.cleaned_data['meeting_category']
+        agenda = form.cleaned_data['agenda']
+        
+        # スクリプトを取得（管理画面で設定されたものがあれば使用）
+        script = get_meeting_minutes_script(meeting_type, meeting_category, agenda)
+        
+        # プロンプトを構築
+        return build_meeting_minutes_prompt(
+            meeting_type=meeting_type,
+            meeting_category=meeting_category,
+            agenda=agenda,
+            additional_info=form.cleaned_data.get('additional_info', ''),
+            company_name=self.this_company.name,
+            script=script
+        )
 
 
 class MeetingMinutesAIResultView(SelectedCompanyMixin, LoginRequiredMixin, ErrorHandlingMixin, TemplateView):
@@ -6,11 +6,11 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, DetailView, View
 from django.contrib import messages
 from django.shortcuts import redirect, get_object_or_404
-from django.utils import timezone
 from django.http import JsonResponse
 
 from ..models import Firm, FirmNotification
 from ..mixins import ErrorHandlingMixin, FirmOwnerMixin
+from ..utils.notifications import get_unread_notification_count, mark_all_notifications_read, mark_notification_read
 
 
 class NotificationListView(FirmOwnerMixin, ListView):
@@ -34,10 +34,7 @@ class NotificationListView(FirmOwnerMixin, ListView):
         context['firm'] = self.firm
         
         # 未読通知数
-        context['unread_count'] = FirmNotification.objects.filter(
-            firm=self.firm,
-            is_read=False
-        ).count()
+        context['unread_count'] = get_unread_notification_count(self.firm.id)
         
         return context
 
@@ -59,9 +56,7 @@ class NotificationDetailView(FirmOwnerMixin, DetailView):
         
         # 未読の場合は既読にする
         if not notification.is_read:
-            notification.is_read = True
-            notification.read_at = timezone.now()
-            notification.save()
+            mark_notification_read(notification)
         
         return notification
     
@@ -86,9 +81,7 @@ class NotificationMarkReadView(FirmOwnerMixin, View):
         )
         
         if not notification.is_read:
-            notification.is_read = True
-            notification.read_at = timezone.now()
-            notification.save()
+            mark_notification_read(notification)
         
         return JsonResponse({
             'success': True,
@@ -101,13 +94,7 @@ class NotificationMarkAllReadView(FirmOwnerMixin, View):
     
     def post(self, request, firm_id):
         """すべての未読通知を既読にする"""
-        count = FirmNotification.objects.filter(
-            firm=self.firm,
-            is_read=False
-        ).update(
-            is_read=True,
-            read_at=timezone.now()
-        )
+        count = mark_all_notifications_read(self.firm)
         
         messages.success(request, f'{count}件の通知を既読にしました。')
         return redirect('notification_list', firm_id=firm_id)
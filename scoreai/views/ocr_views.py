@@ -6,8 +6,6 @@ from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.views.generic import FormView
 from django.urls import reverse_lazy
-from django.utils import timezone
-from io import BytesIO
 import logging
 
 from ..mixins import SelectedCompanyMixin, TransactionMixin
@@ -16,8 +14,10 @@ from ..models import (
     CloudStorageSetting, UploadedDocument
 )
 from ..forms import OcrUploadForm
-from ..utils.document_naming import generate_document_filename, get_folder_path
+from ..utils.document_naming import generate_document_filename
 from ..utils.usage_tracking import increment_ocr_count
+from ..services.storage_upload_service import SUPPORTED_STORAGE_TYPES, enqueue_upload
+from ..utils.ocr_parser import FISCAL_SUMMARY_FIELDS
 try:
     from ..utils.ocr import (
         extract_text_from_image,
@@ -25,12 +25,15 @@ try:
         parse_financial_statement_from_text,
         parse_loan_contract_from_text
     )
+    from ..utils.ocr_cache import extract_text_cached, get_or_parse
 except ImportError:
     # OCR機能が利用できない場合のフォールバック
     extract_text_from_image = None
     extract_text_from_pdf = None
     parse_financial_statement_from_text = None
     parse_loan_contract_from_text = None
+    extract_text_cached = None
+    get_or_parse = None
 
 logger = logging.getLogger(__name__)
 
@@ -63,7 +66,7 @@ class ImportFiscalSummaryFromOcrView(SelectedCompanyMixin, TransactionMixin, For
             パースされたデータの辞書。エラー時はNone
         """
         # OCR機能が利用可能かチェック
-        if extract_text_from_image is None or extract_text_from_pdf is None:
+        if extract_text_cached is None:
             messages.error(
                 self.request,
                 'OCR機能が利用できません。必要なライブラリがインストールされているか確認してください。'
@@ -92,18 +95,13 @@ class ImportFiscalSummaryFromOcrView(SelectedCompanyMixin, TransactionMixin, For
                     return None
 
             # OCRでテキストを抽出（Document Text Detection APIと前処理を使用）
-            if file_type == 'pdf':
-                extracted_text = extract_text_from_pdf(
-                    uploaded_file,
-                    use_document_detection=True,  # 表形式に最適化されたAPIを使用
-                    preprocess=True  # 画像前処理を有効化
-                )
-            else:
-                extracted_text = extract_text_from_image(
-                    uploaded_file,
-                    use_document_detection=True,  # 表形式に最適化されたAPIを使用
-                    preprocess=True  # 画像前処理を有効化
-                )
+            # 同じファイルの再処理時はキャッシュしたOCR結果を再利用する
+            extracted_text, ocr_result = extract_text_cached(
+                uploaded_file,
+                file_type,
+                use_document_detection=True,  # 表形式に最適化されたAPIを使用
+                preprocess=True  # 画像前処理を有効化
+            )
 
             if not extracted_text:
                 messages.error(
@@ -118,11 +116,18 @@ class ImportFiscalSummaryFromOcrView(SelectedCompanyMixin, TransactionMixin, For
             
             if document_type == 'loan_contract':
                 # 金銭消費貸借契約書をパース
-                parsed_data = parse_loan_contract_from_text(extracted_text)
+                parsed_data = get_or_parse(
+                    ocr_result, 'loan_contract', parse_loan_contract_from_text, extracted_text
+                )
                 parsed_data['document_type'] = 'loan_contract'
             else:
                 # 決算書をパース（AIパースオプション付き）
-                parsed_data = parse_financial_statement_from_text(extracted_text, use_ai=use_ai_parsing)
+                parsed_data = get_or_parse(
+                    ocr_result,
+                    'financial_statement_ai' if use_ai_parsing else 'financial_statement',
+                    lambda text: parse_financial_statement_from_text(text, use_ai=use_ai_parsing),
+                    extracted_text
+                )
                 parsed_data['document_type'] = 'financial_statement'
                 
                 # 年度の確定
@@ -138,6 +143,8 @@ class ImportFiscalSummaryFromOcrView(SelectedCompanyMixin, TransactionMixin, For
                 parsed_data['fiscal_year'] = fiscal_year
             
             parsed_data['extracted_text_preview'] = extracted_text[:500]  # プレビュー用に最初の500文字
+            # 保存時にUploadedDocumentへ紐付けるため、OCR結果のIDを保持
+            parsed_data['ocr_result_id'] = ocr_result.id if ocr_result else None
             
             return parsed_data
 
@@ -219,17 +226,11 @@ class ImportFiscalSummaryFromOcrView(SelectedCompanyMixin, TransactionMixin, For
             return self.get(request)
 
         # データの更新
-        update_fields = {}
-        if parsed_data.get('sales'):
-            update_fields['sales'] = parsed_data['sales']
-        if parsed_data.get('gross_profit'):
-            update_fields['gross_profit'] = parsed_data['gross_profit']
-        if parsed_data.get('operating_profit'):
-            update_fields['operating_profit'] = parsed_data['operating_profit']
-        if parsed_data.get('ordinary_profit'):
-            update_fields['ordinary_profit'] = parsed_data['ordinary_profit']
-        if parsed_data.get('net_profit'):
-            update_fields['net_profit'] = parsed_data['net_profit']
+        update_fields = {
+            field: parsed_data[field]
+            for field in FISCAL_SUMMARY_FIELDS
+            if parsed_data.get(field) is not None
+        }
 
         if update_fields:
             for field, value in update_fields.items():
@@ -259,7 +260,8 @@ class ImportFiscalSummaryFromOcrView(SelectedCompanyMixin, TransactionMixin, For
                 'financial_statement',
                 None,
                 fiscal_year=fiscal_year,
-                fiscal_month=None
+                fiscal_month=None,
+                ocr_result_id=parsed_data.get('ocr_result_id')
             )
 
         # セッションをクリア
@@ -342,7 +344,8 @@ class ImportFiscalSummaryFromOcrView(SelectedCompanyMixin, TransactionMixin, For
                 uploaded_file,
                 'loan_contract',
                 None,
-                financial_institution_name=parsed_data.get('financial_institution_name')
+                financial_institution_name=parsed_data.get('financial_institution_name'),
+                ocr_result_id=parsed_data.get('ocr_result_id')
             )
 
         # セッションをクリア
@@ -439,7 +442,8 @@ class ImportFiscalSummaryFromOcrView(SelectedCompanyMixin, TransactionMixin, For
         fiscal_year: Optional[int] = None,
         fiscal_month: Optional[int] = None,
         financial_institution_name: Optional[str] = None,
-        contract_partner: Optional[str] = None
+        contract_partner: Optional[str] = None,
+        ocr_result_id: Optional[str] = None
     ) -> Optional[UploadedDocument]:
         """
         アップロードされたファイルをクラウドストレージに保存
@@ -459,22 +463,7 @@ class ImportFiscalSummaryFromOcrView(SelectedCompanyMixin, TransactionMixin, For
                 logger.info(f"Cloud storage not configured for user {request.user.id} and company {self.this_company.id}")
                 return None
             
-            # ストレージアダプターを初期化
-            if storage_setting.storage_type == 'google_drive':
-                from ..utils.storage.google_drive import GoogleDriveAdapter
-                adapter = GoogleDriveAdapter(
-                    user=request.user,
-                    access_token=storage_setting.access_token,
-                    refresh_token=storage_setting.refresh_token
-                )
-            elif storage_setting.storage_type == 'box':
-                from ..utils.storage.box import BoxAdapter
-                adapter = BoxAdapter(
-                    user=request.user,
-                    access_token=storage_setting.access_token,
-                    refresh_token=storage_setting.refresh_token
-                )
-            else:
+            if storage_setting.storage_type not in SUPPORTED_STORAGE_TYPES:
                 logger.info(f"Storage type {storage_setting.storage_type} not yet supported")
                 return None
             
@@ -491,55 +480,32 @@ class ImportFiscalSummaryFromOcrView(SelectedCompanyMixin, TransactionMixin, For
                 file_extension=file_extension
             )
             
-            # フォルダパスを取得
-            folder_path = get_folder_path(document_type, subfolder_type)
-            
-            # フォルダを取得または作成
-            root_folder_id = storage_setting.root_folder_id or None
-            folder_info = adapter.get_or_create_folder(folder_path, root_folder_id)
-            
-            # ファイルをアップロード
             # ファイルをメモリに読み込む
             uploaded_file.seek(0)  # ファイルポインタを先頭に戻す
-            file_content = BytesIO(uploaded_file.read())
-            file_content.seek(0)
+            file_content = uploaded_file.read()
             
             # MIMEタイプを判定
             mime_type = 'application/pdf' if file_extension.lower() == 'pdf' else f'image/{file_extension.lower()}'
             
-            # アップロード
-            uploaded_file_info = adapter.upload_file(
+            # スプールに保存してアップロード待ちにする（アップロードはバックグラウンドで実行）
+            uploaded_doc = enqueue_upload(
+                storage_setting=storage_setting,
                 file_content=file_content,
-                filename=stored_filename,
-                folder_id=folder_info['id'],
-                mime_type=mime_type
-            )
-            
-            # UploadedDocumentレコードを作成
-            uploaded_doc = UploadedDocument.objects.create(
-                user=request.user,
-                company=self.this_company,
-                document_type=document_type,
-                subfolder_type=subfolder_type or '',
                 original_filename=uploaded_file.name,
                 stored_filename=stored_filename,
-                storage_type=storage_setting.storage_type,
-                file_id=uploaded_file_info['id'],
-                folder_id=folder_info['id'],
-                file_url=uploaded_file_info.get('webViewLink', ''),
-                file_size=uploaded_file.size if hasattr(uploaded_file, 'size') else None,
+                document_type=document_type,
+                subfolder_type=subfolder_type,
                 mime_type=mime_type,
-                is_ocr_processed=True,
-                ocr_processed_at=timezone.now(),
+                ocr_result_id=ocr_result_id,
             )
             
             logger.info(
-                f"File uploaded to cloud storage: {stored_filename} (user: {request.user.id}, company: {self.this_company.id})"
+                f"File queued for cloud storage: {stored_filename} (user: {request.user.id}, company: {self.this_company.id})"
             )
             
             messages.success(
                 request,
-                f'ファイルを{storage_setting.get_storage_type_display()}に保存しました: {stored_filename}'
+                f'ファイルを{storage_setting.get_storage_type_display()}に保存しています: {stored_filename}'
             )
             
             return uploaded_doc
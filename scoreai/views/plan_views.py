@@ -353,8 +353,8 @@ class SubscriptionSuccessView(FirmOwnerMixin, TemplateView):
                     stripe_subscription = stripe.Subscription.retrieve(stripe_subscription_id)
                     
                     # Webhookハンドラーと同じ処理を実行
-                    from .stripe_webhook_views import StripeWebhookView
-                    webhook_handler = StripeWebhookView()
+                    from ..services.stripe_event_service import StripeEventHandler
+                    webhook_handler = StripeEventHandler()
                     
                     # metadataを追加
                     if not stripe_subscription.get('metadata'):
@@ -363,16 +363,16 @@ class SubscriptionSuccessView(FirmOwnerMixin, TemplateView):
                     stripe_subscription['metadata']['firm_id'] = firm_id
                     
                     # サブスクリプション作成処理を呼び出す
-                    webhook_handler._handle_subscription_created(stripe_subscription)
+                    webhook_handler.handle_subscription_created(stripe_subscription)
                     
                     messages.success(request, 'サブスクリプション情報を同期しました。')
                 elif stripe_subscription_id:
                     # subscription_idだけがある場合、Stripeから直接取得して同期
                     try:
                         stripe_subscription = stripe.Subscription.retrieve(stripe_subscription_id)
-                        from .stripe_webhook_views import StripeWebhookView
-                        webhook_handler = StripeWebhookView()
-                        webhook_handler._handle_subscription_created(stripe_subscription)
+                        from ..services.stripe_event_service import StripeEventHandler
+                        webhook_handler = StripeEventHandler()
+                        webhook_handler.handle_subscription_created(stripe_subscription)
                         messages.success(request, 'サブスクリプション情報を同期しました。')
                     except Exception as e:
                         logger.error(f"Error syncing subscription: {e}", exc_info=True)
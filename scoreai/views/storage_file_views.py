@@ -15,11 +15,16 @@ from ..models import CloudStorageSetting, UploadedDocument
 from ..utils.storage.google_drive import GoogleDriveAdapter
 from ..utils.storage.box import BoxAdapter
 from ..utils.ocr import (
-    extract_text_from_image,
-    extract_text_from_pdf,
     parse_financial_statement_from_text,
     parse_loan_contract_from_text
 )
+from ..utils.ocr_parser import FISCAL_SUMMARY_FIELDS
+from ..utils.ocr_cache import (
+    extract_text_cached,
+    get_backend_version,
+    get_or_parse,
+    link_uploaded_document,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -60,7 +65,7 @@ class StorageFileProcessView(SelectedCompanyMixin, TransactionMixin, LoginRequir
     """ストレージからファイルをダウンロードしてOCR処理"""
     
     def post(self, request, *args, **kwargs):
-        """ファイルをダウンロードしてOCR処理"""
+        """ファイルをダウンロードしてOCR処理（処理済みのファイルはOCR結果を再利用）"""
         file_id = request.POST.get('file_id')
         document_id = request.POST.get('document_id')
         
@@ -83,76 +88,38 @@ class StorageFileProcessView(SelectedCompanyMixin, TransactionMixin, LoginRequir
                 uploaded_doc = None
                 document_type = request.POST.get('document_type', 'financial_statement')
             
-            # ストレージ設定を取得（選択中のCompanyに基づく）
-            storage_setting = CloudStorageSetting.objects.get(
-                user=request.user,
-                company=self.this_company,
-                is_active=True
-            )
-            
-            # ストレージアダプターを初期化
-            if storage_setting.storage_type == 'google_drive':
-                adapter = GoogleDriveAdapter(
-                    user=request.user,
-                    access_token=storage_setting.access_token,
-                    refresh_token=storage_setting.refresh_token
-                )
-            elif storage_setting.storage_type == 'box':
-                adapter = BoxAdapter(
-                    user=request.user,
-                    access_token=storage_setting.access_token,
-                    refresh_token=storage_setting.refresh_token
-                )
-            else:
-                messages.error(request, f'ストレージタイプ {storage_setting.get_storage_type_display()} はまだサポートされていません。')
+            # 処理済みのドキュメントはキャッシュしたOCR結果を再利用（ダウンロードとOCRを省略）
+            ocr_result = None
+            if (
+                uploaded_doc
+                and uploaded_doc.ocr_result_id
+                and uploaded_doc.ocr_result.backend_version == get_backend_version()
+            ):
+                ocr_result = uploaded_doc.ocr_result
+                extracted_text = ocr_result.extracted_text
+            elif uploaded_doc and uploaded_doc.upload_status != 'uploaded':
+                messages.warning(request, 'ストレージへのアップロードが完了していません。しばらく待ってから再度お試しください。')
                 return redirect('storage_file_list')
-            
-            # ファイル情報を取得
-            file_info = adapter.get_file_info(file_id)
-            
-            # ファイルをダウンロード
-            file_content = adapter.download_file(file_id)
-            
-            # ファイルをBytesIOに変換
-            file_io = BytesIO(file_content)
-            file_io.name = file_info['name']
-            
-            # MIMEタイプからファイルタイプを判定
-            mime_type = file_info.get('mimeType', '')
-            if mime_type == 'application/pdf':
-                file_type = 'pdf'
-            elif mime_type.startswith('image/'):
-                file_type = 'image'
             else:
-                # ファイル名から拡張子を判定
-                file_name = file_info['name'].lower()
-                if file_name.endswith('.pdf'):
-                    file_type = 'pdf'
-                elif file_name.endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp')):
-                    file_type = 'image'
-                else:
-                    messages.error(request, 'サポートされていないファイル形式です。')
+                result = self._download_and_extract(request, file_id)
+                if result is None:
                     return redirect('storage_file_list')
-            
-            # OCRでテキストを抽出
-            if file_type == 'pdf':
-                extracted_text = extract_text_from_pdf(file_io)
-            else:
-                extracted_text = extract_text_from_image(file_io)
-            
-            if not extracted_text:
-                messages.error(request, 'テキストの抽出に失敗しました。')
-                return redirect('storage_file_list')
+                extracted_text, ocr_result = result
+                link_uploaded_document(uploaded_doc, ocr_result)
             
             # 書類タイプに応じてパース
             if document_type == 'loan_contract':
-                parsed_data = parse_loan_contract_from_text(extracted_text)
+                parsed_data = get_or_parse(
+                    ocr_result, 'loan_contract', parse_loan_contract_from_text, extracted_text
+                )
                 parsed_data['document_type'] = 'loan_contract'
                 
                 # 金銭消費貸借契約書の保存処理
                 return self._save_loan_contract_from_storage(request, parsed_data, uploaded_doc)
             else:
-                parsed_data = parse_financial_statement_from_text(extracted_text)
+                parsed_data = get_or_parse(
+                    ocr_result, 'financial_statement', parse_financial_statement_from_text, extracted_text
+                )
                 parsed_data['document_type'] = 'financial_statement'
                 
                 # 年度の取得
@@ -178,6 +145,73 @@ class StorageFileProcessView(SelectedCompanyMixin, TransactionMixin, LoginRequir
             messages.error(request, f'ファイル処理中にエラーが発生しました: {str(e)}')
             return redirect('storage_file_list')
     
+    def _download_and_extract(self, request, file_id):
+        """
+        ストレージからファイルをダウンロードしてテキストを抽出
+        
+        Returns:
+            (抽出されたテキスト, OcrResult) のタプル。エラー時はNone（メッセージは設定済み）
+        """
+        # ストレージ設定を取得（選択中のCompanyに基づく）
+        storage_setting = CloudStorageSetting.objects.get(
+            user=request.user,
+            company=self.this_company,
+            is_active=True
+        )
+        
+        # ストレージアダプターを初期化
+        if storage_setting.storage_type == 'google_drive':
+            adapter = GoogleDriveAdapter(
+                user=request.user,
+                access_token=storage_setting.access_token,
+                refresh_token=storage_setting.refresh_token
+            )
+        elif storage_setting.storage_type == 'box':
+            adapter = BoxAdapter(
+                user=request.user,
+                access_token=storage_setting.access_token,
+                refresh_token=storage_setting.refresh_token
+            )
+        else:
+            messages.error(request, f'ストレージタイプ {storage_setting.get_storage_type_display()} はまだサポートされていません。')
+            return None
+        
+        # ファイル情報を取得
+        file_info = adapter.get_file_info(file_id)
+        
+        # ファイルをダウンロード
+        file_content = adapter.download_file(file_id)
+        
+        # ファイルをBytesIOに変換
+        file_io = BytesIO(file_content)
+        file_io.name = file_info['name']
+        
+        # MIMEタイプからファイルタイプを判定
+        mime_type = file_info.get('mimeType', '')
+        if mime_type == 'application/pdf':
+            file_type = 'pdf'
+        elif mime_type.startswith('image/'):
+            file_type = 'image'
+        else:
+            # ファイル名から拡張子を判定
+            file_name = file_info['name'].lower()
+            if file_name.endswith('.pdf'):
+                file_type = 'pdf'
+            elif file_name.endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp')):
+                file_type = 'image'
+            else:
+                messages.error(request, 'サポートされていないファイル形式です。')
+                return None
+        
+        # OCRでテキストを抽出（同じ内容のファイルはキャッシュを再利用）
+        extracted_text, ocr_result = extract_text_cached(file_io, file_type)
+        
+        if not extracted_text:
+            messages.error(request, 'テキストの抽出に失敗しました。')
+            return None
+        
+        return extracted_text, ocr_result
+    
     def _save_financial_statement_from_storage(self, request, parsed_data, fiscal_year, uploaded_doc):
         """ストレージから取得した決算書データを保存"""
         from ..models import FiscalSummary_Year
@@ -196,17 +230,11 @@ class StorageFileProcessView(SelectedCompanyMixin, TransactionMixin, LoginRequir
             fiscal_summary_year.version = 1
         
         # データの更新
-        update_fields = {}
-        if parsed_data.get('sales'):
-            update_fields['sales'] = parsed_data['sales']
-        if parsed_data.get('gross_profit'):
-            update_fields['gross_profit'] = parsed_data['gross_profit']
-        if parsed_data.get('operating_profit'):
-            update_fields['operating_profit'] = parsed_data['operating_profit']
-        if parsed_data.get('ordinary_profit'):
-            update_fields['ordinary_profit'] = parsed_data['ordinary_profit']
-        if parsed_data.get('net_profit'):
-            update_fields['net_profit'] = parsed_data['net_profit']
+        update_fields = {
+            field: parsed_data[field]
+            for field in FISCAL_SUMMARY_FIELDS
+            if parsed_data.get(field) is not None
+        }
         
         if update_fields:
             for field, value in update_fields.items():
@@ -30,17 +30,7 @@ except ImportError:
     logger.warning("openpyxl is not installed. Excel export will not be available.")
 
 # PDFエクスポート用
-try:
-    from reportlab.lib import colors
-    from reportlab.lib.pagesizes import A4, letter
-    from reportlab.lib.units import inch
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.enums import TA_CENTER, TA_LEFT
-    REPORTLAB_AVAILABLE = True
-except ImportError:
-    REPORTLAB_AVAILABLE = False
-    logger.warning("reportlab is not installed. PDF export will not be available.")
+from ..services.pdf_service import REPORTLAB_AVAILABLE, PdfDocument
 
 
 class UsageReportView(FirmOwnerMixin, TemplateView):
@@ -643,101 +633,43 @@ class UsageReportExportView(FirmOwnerMixin, TemplateView):
     
     def _export_pdf(self, months: int) -> HttpResponse:
         """PDF形式でエクスポート"""
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-        
-        # スタイル定義
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=16,
-            textColor=colors.HexColor('#366092'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=12,
-            textColor=colors.HexColor('#366092'),
-            spaceAfter=12,
-            spaceBefore=12
-        )
-        
-        # ストーリー（PDFの内容）を構築
-        story = []
+        pdf = PdfDocument(rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
         
         # タイトル
-        title = Paragraph(f"{self.firm.name} - 利用状況レポート（過去{months}ヶ月）", title_style)
-        story.append(title)
-        story.append(Spacer(1, 0.2*inch))
+        pdf.title(f"{self.firm.name} - 利用状況レポート（過去{months}ヶ月）")
         
         # データを取得
         usage_data = self._get_usage_data(months)
         
         # 利用状況一覧テーブル
-        story.append(Paragraph("利用状況一覧", heading_style))
-        
-        table_data = [['年月', 'AI相談回数', 'OCR読み込み回数', 'AI相談トークン数']]
-        for month_data in usage_data['table_data']:
-            table_data.append([
-                month_data['label'],
-                str(month_data['ai_consultation']),
-                str(month_data['ocr']),
-                str(month_data['tokens']),
-            ])
-        
-        table = Table(table_data, colWidths=[1.5*inch, 1.5*inch, 1.5*inch, 1.5*inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-        ]))
-        story.append(table)
-        story.append(Spacer(1, 0.3*inch))
+        pdf.heading("利用状況一覧")
+        pdf.table(
+            ['年月', 'AI相談回数', 'OCR読み込み回数', 'AI相談トークン数'],
+            [
+                [month_data['label'], month_data['ai_consultation'], month_data['ocr'], month_data['tokens']]
+                for month_data in usage_data['table_data']
+            ],
+            col_widths=[1.5, 1.5, 1.5, 1.5],
+            align='CENTER',
+        )
+        pdf.spacer(0.3)
         
         # Company別利用状況
         company_usage = self._get_company_usage_summary(months)
         if company_usage:
-            story.append(Paragraph("Company別利用状況", heading_style))
-            
-            company_table_data = [['Company名', 'AI相談回数', 'OCR読み込み回数', '合計']]
-            for company in company_usage:
-                company_table_data.append([
-                    company['company_name'],
-                    str(company['ai_consultation']),
-                    str(company['ocr']),
-                    str(company['total']),
-                ])
-            
-            company_table = Table(company_table_data, colWidths=[2.5*inch, 1.5*inch, 1.5*inch, 1*inch])
-            company_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-            ]))
-            story.append(company_table)
+            pdf.heading("Company別利用状況")
+            pdf.table(
+                ['Company名', 'AI相談回数', 'OCR読み込み回数', '合計'],
+                [
+                    [company['company_name'], company['ai_consultation'], company['ocr'], company['total']]
+                    for company in company_usage
+                ],
+                col_widths=[2.5, 1.5, 1.5, 1],
+                align='CENTER',
+            )
         
         # PDFを生成
-        doc.build(story)
-        
-        # レスポンスを作成
-        response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="usage_report_{self.firm.id}_{timezone.now().strftime("%Y%m%d")}.pdf"'
-        return response
+        return pdf.to_response(f'usage_report_{self.firm.id}_{timezone.now().strftime("%Y%m%d")}.pdf')
 
 
 class CompanyUsageReportView(FirmOwnerMixin, TemplateView):
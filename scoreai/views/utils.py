@@ -475,6 +475,7 @@ def get_debt_list_byAny(
     
     金融機関や保証区分など、指定されたフィールドごとに借入を集計し、
     元本、月返済額、月次残高、決算期残高の合計を計算します。
+    複数の集計を行う場合は debt_analytics_service.group_debts で1回の走査にまとめてください。
     
     Args:
         summary_field_label: 集計するフィールドのキー（例: 'financial_institution', 'secured_type'）
@@ -494,31 +495,8 @@ def get_debt_list_byAny(
         >>> print(by_bank[0]['principal'])
         5000000
     """
-    summary_field = summary_field_label.strip("'")
-    debt_list_byAny = {}
-
-    for debt in debt_list:
-        if debt[summary_field_label] not in debt_list_byAny:
-            debt_list_byAny[debt[summary_field_label]] = {
-                'principal': 0,
-                'monthly_repayment': 0,
-                'balances_monthly': [0] * 12,  # Initialize with 12 zeros
-                'interest_amount_monthly': [0] * 12,  # Initialize with 12 zeros
-                'balance_fy1': 0,
-            }
-
-        debt_list_byAny[debt[summary_field_label]]['principal'] += debt['principal']
-        debt_list_byAny[debt[summary_field_label]]['monthly_repayment'] += debt['monthly_repayment']
-        debt_list_byAny[debt[summary_field_label]]['balance_fy1'] += debt['balance_fy1']
-
-        # Sum up the monthly balances and interest amounts
-        for i in range(12):
-            debt_list_byAny[debt[summary_field_label]]['balances_monthly'][i] += debt['balances_monthly'][i]
-            debt_list_byAny[debt[summary_field_label]]['interest_amount_monthly'][i] += debt['interest_amount_monthly'][i]
-    # Convert the dictionary to a list of dictionaries
-    debt_list_byAny = [{summary_field_label: summary_field, **values} for summary_field, values in debt_list_byAny.items()]
-
-    return debt_list_byAny
+    from ..services.debt_analytics_service import group_debts
+    return group_debts(debt_list, {'result': (summary_field_label,)})['result']
 
 
 def get_debt_list_byBankAndSecuredType(
@@ -548,38 +526,8 @@ def get_debt_list_byBankAndSecuredType(
         >>> print(by_bank_and_type[0]['principal'])
         3000000
     """
-    debt_list_byBankAndSecuredType = {}
-
-    for debt in debt_list:
-        key = (debt['financial_institution'], debt['secured_type'])
-        if key not in debt_list_byBankAndSecuredType:
-            debt_list_byBankAndSecuredType[key] = {
-                'principal': 0,
-                'monthly_repayment': 0,
-                'balances_monthly': [0] * 12,  # Initialize with 12 zeros
-                'interest_amount_monthly': [0] * 12,  # Initialize with 12 zeros
-                'balance_fy1': 0,
-            }
-
-        debt_list_byBankAndSecuredType[key]['principal'] += debt['principal']
-        debt_list_byBankAndSecuredType[key]['monthly_repayment'] += debt['monthly_repayment']
-        debt_list_byBankAndSecuredType[key]['balance_fy1'] += debt['balance_fy1']
-
-        # Sum up the monthly balances and interest amounts
-        for i in range(12):
-            debt_list_byBankAndSecuredType[key]['balances_monthly'][i] += debt['balances_monthly'][i]
-            debt_list_byBankAndSecuredType[key]['interest_amount_monthly'][i] += debt['interest_amount_monthly'][i]
-
-    # Convert the dictionary to a list of dictionaries
-    debt_list_byBankAndSecuredType = [
-        {
-            'financial_institution': key[0],
-            'secured_type': key[1],
-            **values
-        } for key, values in debt_list_byBankAndSecuredType.items()
-    ]
-
-    return debt_list_byBankAndSecuredType
+    from ..services.debt_analytics_service import group_debts
+    return group_debts(debt_list, {'result': ('financial_institution', 'secured_type')})['result']
 
 
 def get_YearlyFiscalSummary(